@@ -2,6 +2,7 @@
 import sys
 sys.path.insert(0, '/home/jloli/codebase-comparison/suppression_tools')
 from tools import db
+from tools.src import metrics
 import pandas as pd
 
 db_path = db.get_default_db_path()
@@ -11,6 +12,7 @@ ds = "gamoshi"
 mover_ind = False
 test_date = "2025-07-25"
 test_winner = "Windstream"
+window_start, window_end = "2025-06-01", "2025-08-31"
 
 cube_name = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
 
@@ -43,6 +45,18 @@ for threshold in [5, 10, 15, 20, 25]:
 print("\n\nTop 20 pairs:")
 print(pair_data.head(20))
 
+# Same thresholds across the whole window - streamed one day of pairs at a time
+eligibility = metrics.pair_eligibility(ds, mover_ind, window_start, window_end,
+                                       winners=[test_winner], db_path=db_path)
+eligibility['coverage'] = eligibility['eligible_wins'] / eligibility['total_wins']
+print(f"\n\nPair-level eligibility for {test_winner}, {window_start} to {window_end} "
+      f"({eligibility['the_date'].nunique()} days):")
+print(eligibility.groupby('min_wins').agg(
+    median_pairs=('eligible_pairs', 'median'),
+    median_coverage=('coverage', 'median'),
+    days_under_half=('coverage', lambda c: int((c < 0.5).sum())),
+).to_string())
+
 # Query DMA-level data (what it SHOULD use)
 dma_query = f"""
 SELECT 
@@ -4,18 +4,27 @@ Iterative Suppression Testing Framework
 
 Tests the effectiveness of outlier detection and removal through multiple rounds.
 Goal: Remove DMA-level outliers until national and H2H metrics stabilize.
+
+Rounds come from tools.src.iterative: only round 1 scans the rolling view,
+later rounds re-check just the rows whose baselines a suppression changed,
+and national/H2H metrics are updated by subtracting each round's rows.
 """
 
-import duckdb
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import json
-from typing import Dict, List, Tuple
+from typing import Dict, List
 import sys
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import db
+from tools.src import iterative
+
 # Database path assertion
-DB_PATH = Path(__file__).parent / "data" / "databases" / "duck_suppression.db"
+DB_PATH = PROJECT_ROOT / "data" / "databases" / "duck_suppression.db"
 assert DB_PATH.exists(), f"❌ CRITICAL: Database not found at {DB_PATH}. DO NOT create multiple DBs!"
 
 # Configuration
@@ -24,8 +33,10 @@ MOVER_IND = True  # Start with movers
 ANALYSIS_START = "2025-06-01"
 ANALYSIS_END = "2025-09-04"
 Z_THRESHOLD = 1.5
+PCT_THRESHOLD = 30.0  # percent above the rolling baseline
 MIN_WINS_THRESHOLD = 10
-MAX_ROUNDS = 3
+MAX_ROUNDS = 10
+ROUND_NAME = None  # e.g. "iterative_gamoshi_mover" to keep the suppressions as a saved round
 
 
 class SuppressionRound:
@@ -50,83 +61,27 @@ class SuppressionRound:
         }
 
 
-def get_national_metrics(con: duckdb.DuckDBPyConnection, mover_type: str, 
-                        suppression_table: str = None) -> pd.DataFrame:
-    """Calculate national win shares for each carrier"""
+def get_national_metrics(mover_type: str) -> pd.DataFrame:
+    """Wins per date and carrier (before any suppression)"""
     
     base_table = f"{DATASET}_win_{mover_type}_cube"
-    
-    if suppression_table:
-        # Apply suppressions
-        query = f"""
-        WITH base AS (
-            SELECT c.* 
-            FROM {base_table} c
-            LEFT JOIN {suppression_table} s
-                ON c.the_date = s.the_date
-                AND c.dma_name = s.dma_name
-                AND c.winner = s.winner
-                AND c.loser = s.loser
-            WHERE s.the_date IS NULL  -- Not suppressed
-                AND c.the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
-        )
+    return db.query(f"""
         SELECT 
             the_date,
             winner as carrier,
-            SUM(total_wins) as wins,
-            SUM(SUM(total_wins)) OVER (PARTITION BY the_date) as total_daily_wins
-        FROM base
-        GROUP BY the_date, winner
-        ORDER BY the_date, carrier
-        """
-    else:
-        query = f"""
-        SELECT 
-            the_date,
-            winner as carrier,
-            SUM(total_wins) as wins,
-            SUM(SUM(total_wins)) OVER (PARTITION BY the_date) as total_daily_wins
+            SUM(total_wins) as wins
         FROM {base_table}
         WHERE the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
         GROUP BY the_date, winner
         ORDER BY the_date, carrier
-        """
-    
-    df = con.execute(query).df()
-    df['win_share'] = df['wins'] / df['total_daily_wins'] * 100
-    return df
+    """, str(DB_PATH))
 
 
-def get_h2h_metrics(con: duckdb.DuckDBPyConnection, mover_type: str,
-                   suppression_table: str = None) -> pd.DataFrame:
-    """Calculate H2H win rates for carrier pairs"""
+def get_h2h_metrics(mover_type: str) -> pd.DataFrame:
+    """Wins per date and carrier pair (before any suppression)"""
     
     base_table = f"{DATASET}_win_{mover_type}_cube"
-    
-    if suppression_table:
-        query = f"""
-        WITH base AS (
-            SELECT c.* 
-            FROM {base_table} c
-            LEFT JOIN {suppression_table} s
-                ON c.the_date = s.the_date
-                AND c.dma_name = s.dma_name
-                AND c.winner = s.winner
-                AND c.loser = s.loser
-            WHERE s.the_date IS NULL
-                AND c.the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
-        )
-        SELECT 
-            the_date,
-            winner,
-            loser,
-            SUM(total_wins) as wins
-        FROM base
-        GROUP BY the_date, winner, loser
-        ORDER BY the_date, winner, loser
-        """
-    else:
-        query = f"""
+    return db.query(f"""
         SELECT 
             the_date,
             winner,
@@ -136,10 +91,30 @@ def get_h2h_metrics(con: duckdb.DuckDBPyConnection, mover_type: str,
         WHERE the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
         GROUP BY the_date, winner, loser
         ORDER BY the_date, winner, loser
-        """
+    """, str(DB_PATH))
+
+
+def subtract_suppressed(df: pd.DataFrame, suppressed: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """Remove the wins of suppressed rows from a metrics frame keyed by keys"""
+    
+    removed = suppressed.rename(columns={'winner': 'carrier'} if 'carrier' in keys else {})
+    removed = removed.assign(the_date=pd.to_datetime(removed['the_date']))
+    removed = removed.groupby(keys, as_index=False)['total_wins'].sum()
+    out = df.assign(the_date=pd.to_datetime(df['the_date'])).merge(removed, on=keys, how='left')
+    out['wins'] = out['wins'] - out.pop('total_wins').fillna(0)
+    return out
+
+
+def summarize(national: pd.DataFrame, h2h: pd.DataFrame) -> Dict:
+    """Round metrics from the current national and H2H wins"""
     
-    df = con.execute(query).df()
-    return df
+    national = national.assign(total_daily_wins=national.groupby('the_date')['wins'].transform('sum'))
+    national['win_share'] = national['wins'] / national['total_daily_wins'] * 100
+    return {
+        'national': calculate_anomaly_score(national),
+        'h2h_records': int((h2h['wins'] > 0).sum()),
+        'total_wins': int(national['wins'].sum())
+    }
 
 
 def calculate_anomaly_score(df: pd.DataFrame, metric_col: str = 'win_share') -> Dict:
@@ -170,165 +145,34 @@ def calculate_anomaly_score(df: pd.DataFrame, metric_col: str = 'win_share') ->
     }
 
 
-def detect_dma_outliers(con: duckdb.DuckDBPyConnection, mover_type: str,
-                       suppression_table: str = None) -> pd.DataFrame:
-    """Detect DMA-level outliers using the rolling view"""
-    
-    view_name = f"{DATASET}_win_{mover_type}_rolling"
-    
-    if suppression_table:
-        # Apply existing suppressions
-        query = f"""
-        WITH base AS (
-            SELECT v.*,
-                   CASE WHEN v.avg_wins_28d > 0 
-                        THEN v.current_wins - v.avg_wins_28d
-                        ELSE v.current_wins 
-                   END as impact
-            FROM {view_name} v
-            LEFT JOIN {suppression_table} s
-                ON v.the_date = s.the_date
-                AND v.dma_name = s.dma_name
-                AND v.winner = s.winner
-                AND v.loser = s.loser
-            WHERE s.the_date IS NULL
-                AND v.the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
-        )
-        SELECT *
-        FROM base
-        WHERE current_wins >= {MIN_WINS_THRESHOLD}
-            AND (
-                z_score_28d > {Z_THRESHOLD}
-                OR pct_change_28d > 0.30
-                OR is_first_appearance = true
-            )
-        ORDER BY impact DESC
-        """
-    else:
-        query = f"""
-        WITH base AS (
-            SELECT *,
-                   CASE WHEN avg_wins_28d > 0 
-                        THEN current_wins - avg_wins_28d
-                        ELSE current_wins 
-                   END as impact
-            FROM {view_name}
-            WHERE the_date BETWEEN '{ANALYSIS_START}' AND '{ANALYSIS_END}'
-        )
-        SELECT *
-        FROM base
-        WHERE current_wins >= {MIN_WINS_THRESHOLD}
-            AND (
-                z_score_28d > {Z_THRESHOLD}
-                OR pct_change_28d > 0.30
-                OR is_first_appearance = true
-            )
-        ORDER BY impact DESC
-        """
-    
-    return con.execute(query).df()
-
-
-def run_suppression_round(con: duckdb.DuckDBPyConnection, round_num: int,
-                         mover_type: str, prev_suppression_table: str = None) -> SuppressionRound:
-    """Execute one round of outlier detection and suppression"""
+def print_round(round_obj: SuppressionRound, suppressed: pd.DataFrame, rechecked: int):
+    """Report one round of outlier detection and suppression"""
     
     print(f"\n{'='*80}")
-    print(f"ROUND {round_num}: Detecting and Suppressing Outliers")
+    print(f"ROUND {round_obj.round_num}: Detecting and Suppressing Outliers")
     print(f"{'='*80}\n")
     
-    round_obj = SuppressionRound(round_num)
-    
-    # 1. Get baseline metrics BEFORE suppression
-    print("📊 Calculating baseline metrics...")
-    nat_before = get_national_metrics(con, mover_type, prev_suppression_table)
-    h2h_before = get_h2h_metrics(con, mover_type, prev_suppression_table)
-    
-    round_obj.metrics_before = {
-        'national': calculate_anomaly_score(nat_before),
-        'h2h_records': len(h2h_before),
-        'total_wins': int(nat_before['wins'].sum())
-    }
-    
-    print(f"  National volatility: {round_obj.metrics_before['national']['total_volatility']:.4f}")
-    print(f"  Max carrier range: {round_obj.metrics_before['national']['max_range']:.2f}%")
-    print(f"  Total wins: {round_obj.metrics_before['total_wins']:,}")
-    
-    # 2. Detect outliers
-    print("\n🔍 Detecting DMA-level outliers...")
-    outliers = detect_dma_outliers(con, mover_type, prev_suppression_table)
+    before, after = round_obj.metrics_before, round_obj.metrics_after
+    print(f"📊 Before: volatility {before['national']['total_volatility']:.4f} | "
+          f"max carrier range {before['national']['max_range']:.2f}% | total wins {before['total_wins']:,}")
     
-    if len(outliers) == 0:
-        print("✅ No outliers detected! Suppression complete.")
-        # Set after metrics same as before since nothing changed
-        round_obj.metrics_after = round_obj.metrics_before
-        return round_obj
-    
-    round_obj.outliers_detected = outliers.to_dict('records')
-    round_obj.records_suppressed = len(outliers)
-    
-    print(f"  Found {len(outliers)} outlier records")
-    print(f"  Total impact to suppress: {outliers['impact'].sum():,.0f} wins")
+    print(f"\n🔍 Found {len(suppressed)} outlier records")
+    print(f"  Total impact to suppress: {suppressed['impact'].sum():,.0f} wins")
     
     # Show top outliers
     print("\n  Top 10 outliers by impact:")
-    top_outliers = outliers.head(10)
-    for idx, row in top_outliers.iterrows():
+    for _, row in suppressed.nlargest(10, 'impact').iterrows():
         print(f"    {row['the_date']} | {row['dma_name']:20s} | {row['winner']:15s} vs {row['loser']:15s}")
-        print(f"      Current: {row['current_wins']:6.0f} | Avg: {row['avg_wins_28d']:6.1f} | "
-              f"Z-score: {row['z_score_28d']:5.2f} | Impact: {row['impact']:6.0f}")
-    
-    # 3. Create suppression table for this round
-    suppression_table = f"suppression_round_{round_num}_{'mover' if mover_type == 'mover' else 'non_mover'}"
-    
-    # Select key columns for suppression tracking
-    outliers_subset = outliers[['the_date', 'dma_name', 'winner', 'loser', 'state',
-                                 'current_wins', 'avg_wins_28d', 'z_score_28d', 'pct_change_28d', 
-                                 'impact', 'is_first_appearance']].copy()
-    outliers_subset['suppression_round'] = round_num
-    
-    # Combine with previous suppressions if they exist
-    if prev_suppression_table:
-        con.execute(f"""
-        CREATE OR REPLACE TABLE {suppression_table} AS
-        SELECT * FROM {prev_suppression_table}
-        UNION ALL
-        SELECT * FROM outliers_subset
-        """)
-        outliers_subset.to_sql(name='outliers_subset', con=con, if_exists='replace', index=False)
-        con.execute(f"""
-        CREATE OR REPLACE TABLE {suppression_table} AS
-        SELECT * FROM {prev_suppression_table}
-        UNION ALL
-        SELECT * FROM outliers_subset
-        """)
-    else:
-        # Create new suppression table
-        outliers_subset.to_sql(name=suppression_table, con=con, if_exists='replace', index=False)
-    
-    # 4. Calculate metrics AFTER suppression
-    print("\n📊 Calculating metrics after suppression...")
-    nat_after = get_national_metrics(con, mover_type, suppression_table)
-    h2h_after = get_h2h_metrics(con, mover_type, suppression_table)
-    
-    round_obj.metrics_after = {
-        'national': calculate_anomaly_score(nat_after),
-        'h2h_records': len(h2h_after),
-        'total_wins': int(nat_after['wins'].sum())
-    }
-    
-    print(f"  National volatility: {round_obj.metrics_after['national']['total_volatility']:.4f}")
-    print(f"  Max carrier range: {round_obj.metrics_after['national']['max_range']:.2f}%")
-    print(f"  Total wins: {round_obj.metrics_after['total_wins']:,}")
-    
-    # 5. Calculate improvement
-    vol_before = round_obj.metrics_before['national']['total_volatility']
-    vol_after = round_obj.metrics_after['national']['total_volatility']
-    improvement = (vol_before - vol_after) / vol_before * 100
+        print(f"      Current: {row['total_wins']:6.0f} | Avg: {row['avg_wins']:6.1f} | "
+              f"Z-score: {row['zscore']:5.2f} | Impact: {row['impact']:6.0f} | {row['reason']}")
     
-    print(f"\n📈 Improvement: {improvement:.2f}% reduction in volatility")
+    print(f"\n📊 After: volatility {after['national']['total_volatility']:.4f} | "
+          f"max carrier range {after['national']['max_range']:.2f}% | total wins {after['total_wins']:,}")
     
-    return round_obj
+    vol_before = before['national']['total_volatility']
+    vol_after = after['national']['total_volatility']
+    print(f"\n📈 Improvement: {(vol_before - vol_after) / vol_before * 100:.2f}% reduction in volatility")
+    print(f"   {rechecked:,} rows re-checked for the next round")
 
 
 def run_iterative_suppression(mover_type: str = "mover") -> List[SuppressionRound]:
@@ -341,33 +185,50 @@ def run_iterative_suppression(mover_type: str = "mover") -> List[SuppressionRoun
     print(f"# Max Rounds: {MAX_ROUNDS}")
     print(f"{'#'*80}\n")
     
-    con = duckdb.connect(str(DB_PATH))
+    national = get_national_metrics(mover_type)
+    h2h = get_h2h_metrics(mover_type)
+    metrics = summarize(national, h2h)
     rounds = []
     
-    prev_suppression_table = None
-    
-    for round_num in range(1, MAX_ROUNDS + 1):
-        round_obj = run_suppression_round(con, round_num, mover_type, prev_suppression_table)
-        rounds.append(round_obj)
-        
-        # Check if we found any outliers
-        if len(round_obj.outliers_detected) == 0:
-            print(f"\n✅ Convergence achieved in {round_num} rounds!")
-            break
+    results = iterative.iter_suppression_rounds(
+        DATASET, mover_type == "mover", ANALYSIS_START, ANALYSIS_END,
+        max_rounds=MAX_ROUNDS,
+        z_threshold=Z_THRESHOLD,
+        pct_threshold=PCT_THRESHOLD,
+        min_wins=MIN_WINS_THRESHOLD,
+        db_path=str(DB_PATH),
+        round_name=ROUND_NAME
+    )
+    for result in results:
+        suppressed = result['suppressed']
+        round_obj = SuppressionRound(result['round'])
+        round_obj.outliers_detected = suppressed.to_dict('records')
+        round_obj.records_suppressed = len(suppressed)
+        round_obj.metrics_before = metrics
         
-        # Update for next round
-        prev_suppression_table = f"suppression_round_{round_num}_{'mover' if mover_type == 'mover' else 'non_mover'}"
+        national = subtract_suppressed(national, suppressed, ['the_date', 'carrier'])
+        h2h = subtract_suppressed(h2h, suppressed, ['the_date', 'winner', 'loser'])
+        metrics = round_obj.metrics_after = summarize(national, h2h)
+        rounds.append(round_obj)
+        print_round(round_obj, suppressed, result['rechecked'])
         
         # Check improvement
-        if round_num > 1:
+        if len(rounds) > 1:
             prev_vol = rounds[-2].metrics_after['national']['total_volatility']
             curr_vol = rounds[-1].metrics_after['national']['total_volatility']
             
             if abs(prev_vol - curr_vol) / prev_vol < 0.01:  # Less than 1% improvement
-                print(f"\n⚠️  Minimal improvement detected. Stopping after {round_num} rounds.")
+                print(f"\n⚠️  Minimal improvement detected. Stopping after {len(rounds)} rounds.")
                 break
-    
-    con.close()
+    else:
+        if len(rounds) < MAX_ROUNDS:
+            # Nothing (more) flagged
+            round_obj = SuppressionRound(len(rounds) + 1)
+            round_obj.metrics_before = round_obj.metrics_after = metrics
+            rounds.append(round_obj)
+            print(f"\n✅ Convergence achieved in {len(rounds)} rounds!")
+        else:
+            print(f"\n⚠️  Stopped at the {MAX_ROUNDS}-round limit before convergence.")
     
     # Generate summary
     print_summary(rounds, mover_type)
@@ -432,6 +293,7 @@ def save_results(rounds: List[SuppressionRound], mover_type: str):
         },
         'configuration': {
             'z_threshold': Z_THRESHOLD,
+            'pct_threshold': PCT_THRESHOLD,
             'min_wins_threshold': MIN_WINS_THRESHOLD,
             'max_rounds': MAX_ROUNDS
         },
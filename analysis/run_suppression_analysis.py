@@ -21,8 +21,7 @@ from plotly.subplots import make_subplots
 # Add tools to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'tools'))
 
-from tools import db
-from tools.src import metrics, outliers, suppress
+from tools.src import apply, metrics, outliers, suppress
 
 
 def get_national_timeseries(
@@ -31,33 +30,30 @@ def get_national_timeseries(
     mover_ind: bool,
     start_date: str,
     end_date: str,
-    winners: list = None
+    winners: list = None,
+    suppression_plan: pd.DataFrame = None
 ) -> pd.DataFrame:
-    """Get national win share time series for winners."""
-    table_suffix = "mover" if mover_ind else "non_mover"
-    table_name = f"{ds}_win_{table_suffix}_cube"
-    
+    """Get national win share time series for winners (optionally after a suppression plan)."""
     winner_filter = ""
     if winners:
         winner_list = "', '".join([w.replace("'", "''") for w in winners])
-        winner_filter = f"AND winner IN ('{winner_list}')"
+        winner_filter = f"WHERE winner IN ('{winner_list}')"
     
+    # The market spans all winners, so only the date window is pushed into the cube
     sql = f"""
     WITH market AS (
         SELECT 
             the_date,
             SUM(total_wins) AS market_total_wins
-        FROM {table_name}
-        WHERE the_date BETWEEN DATE '{start_date}' AND DATE '{end_date}'
+        FROM {{suppressed}}
         GROUP BY the_date
     ), selected AS (
         SELECT 
             the_date,
             winner,
             SUM(total_wins) AS total_wins
-        FROM {table_name}
-        WHERE the_date BETWEEN DATE '{start_date}' AND DATE '{end_date}'
-            {winner_filter}
+        FROM {{suppressed}}
+        {winner_filter}
         GROUP BY the_date, winner
     )
     SELECT 
@@ -71,7 +67,10 @@ def get_national_timeseries(
     ORDER BY s.the_date, s.winner
     """
     
-    return db.query(sql, db_path)
+    return apply.query_suppressed(
+        sql, ds, mover_ind, plan=suppression_plan,
+        start_date=start_date, end_date=end_date, db_path=db_path
+    )
 
 
 def apply_suppression_to_data(
@@ -86,77 +85,17 @@ def apply_suppression_to_data(
     Apply suppression plan to raw data and return modified dataset.
     
     The plan contains: date, winner, loser, dma_name, remove_units
-    We subtract remove_units from the corresponding pair-DMA-date combination.
+    We subtract remove_units from the corresponding pair-DMA-date combination
+    (tools.src.apply.suppressed_cube_sql), without copying the cube.
     """
     if suppression_plan.empty:
         print("[WARNING] Empty suppression plan, returning original data")
         return get_national_timeseries(db_path, ds, mover_ind, start_date, end_date)
     
-    table_suffix = "mover" if mover_ind else "non_mover"
-    table_name = f"{ds}_win_{table_suffix}_cube"
-    
-    # Create temporary table with suppression amounts
-    print("[INFO] Creating temporary suppression table...")
-    
-    # Build the plan as VALUES clause
-    plan_values = []
-    for _, row in suppression_plan.iterrows():
-        date_str = row['date']
-        winner = row['winner'].replace("'", "''")
-        loser = row['loser'].replace("'", "''")
-        dma = row['dma_name'].replace("'", "''")
-        remove = int(row['remove_units'])
-        plan_values.append(f"(DATE '{date_str}', '{winner}', '{loser}', '{dma}', {remove})")
-    
-    values_clause = ",\n        ".join(plan_values)
-    
-    sql = f"""
-    WITH suppression_plan AS (
-        SELECT * FROM (VALUES
-            {values_clause}
-        ) AS t(the_date, winner, loser, dma_name, remove_units)
-    ), suppressed_cube AS (
-        SELECT 
-            c.the_date,
-            c.winner,
-            c.loser,
-            c.dma_name,
-            c.state,
-            GREATEST(0, c.total_wins - COALESCE(s.remove_units, 0)) AS total_wins_suppressed
-        FROM {table_name} c
-        LEFT JOIN suppression_plan s
-            ON c.the_date = s.the_date
-            AND c.winner = s.winner
-            AND c.loser = s.loser
-            AND c.dma_name = s.dma_name
-        WHERE c.the_date BETWEEN DATE '{start_date}' AND DATE '{end_date}'
-    ), market AS (
-        SELECT 
-            the_date,
-            SUM(total_wins_suppressed) AS market_total_wins
-        FROM suppressed_cube
-        GROUP BY the_date
-    ), selected AS (
-        SELECT 
-            the_date,
-            winner,
-            SUM(total_wins_suppressed) AS total_wins
-        FROM suppressed_cube
-        GROUP BY the_date, winner
-    )
-    SELECT 
-        s.the_date,
-        s.winner,
-        s.total_wins,
-        m.market_total_wins,
-        s.total_wins / NULLIF(m.market_total_wins, 0) AS win_share
-    FROM selected s
-    JOIN market m USING (the_date)
-    ORDER BY s.the_date, s.winner
-    """
-    
     print("[INFO] Executing suppression query...")
-    return db.query(sql, db_path)
+    return get_national_timeseries(
+        db_path, ds, mover_ind, start_date, end_date, suppression_plan=suppression_plan
+    )
 
 
 def create_before_after_visualization(
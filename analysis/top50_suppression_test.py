@@ -6,10 +6,15 @@ Runs 3 rounds of suppression and validates results at national and H2H levels.
 
 import duckdb
 import json
+import sys
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.src import apply
+
 DB_PATH = "data/databases/duck_suppression.db"
 OUTPUT_DIR = Path("analysis/top50_suppression")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -124,45 +129,21 @@ def calculate_suppression_impact(outliers_df):
     
     return pd.DataFrame(suppressions)
 
-def apply_suppressions(con, base_table, suppressions_df, output_table):
-    """Apply suppressions to create a cleaned table"""
-    
-    # Create temp table with suppressions
-    con.execute("DROP TABLE IF EXISTS temp_suppressions")
-    con.execute("""
-        CREATE TEMP TABLE temp_suppressions AS 
-        SELECT * FROM suppressions_df
-    """)
-    
-    # Create output table with suppressions applied
-    con.execute(f"DROP TABLE IF EXISTS {output_table}")
-    con.execute(f"""
-        CREATE TABLE {output_table} AS
-        SELECT 
-            c.the_date,
-            c.year,
-            c.month,
-            c.day,
-            c.day_of_week,
-            c.state,
-            c.dma,
-            c.dma_name,
-            c.winner,
-            c.loser,
-            GREATEST(c.total_wins - COALESCE(s.suppress_amount, 0), 0) as total_wins,
-            c.record_count
-        FROM {base_table} c
-        LEFT JOIN temp_suppressions s 
-            ON c.the_date = s.the_date
-            AND c.state = s.state
-            AND c.dma_name = s.dma_name
-            AND c.winner = s.winner
-            AND c.loser = s.loser
-        WHERE c.total_wins - COALESCE(s.suppress_amount, 0) > 0
-    """)
-    
-    rows = con.execute(f"SELECT COUNT(*) as cnt FROM {output_table}").fetchone()[0]
-    return rows
+def apply_suppressions(con, rounds_so_far, top50_carriers, round_num):
+    """
+    Suppressed mover cube after every round so far, as a lazy relation.
+
+    The rounds' suppressions are registered on the connection and summed per
+    pair-DMA-state-date (tools.src.apply.suppressed_cube_sql), which is the
+    same as applying them one round after another; no table is written.
+    """
+    removals = pd.concat(rounds_so_far, ignore_index=True).rename(columns={'suppress_amount': 'remove_units'})
+    relation_name = f"round{round_num}_removals"
+    con.register(relation_name, removals)
+    return apply.suppressed_cube_sql(
+        'gamoshi', True, plan_relation=relation_name, winners=top50_carriers,
+        keys=apply.PLAN_KEYS + ['state']
+    )
 
 def count_anomalies(df, metric_col='win_share', z_threshold=1.5):
     """Count anomalies in a dataframe using z-score"""
@@ -218,7 +199,8 @@ def main():
     }
     
     # Start with original mover cube
-    current_table = "gamoshi_win_mover_cube"
+    current_table = current_label = "gamoshi_win_mover_cube"
+    applied = []
     
     for round_num in range(1, 4):
         print(f"\n{'='*80}")
@@ -226,7 +208,7 @@ def main():
         print(f"{'='*80}\n")
         
         # Get baseline metrics BEFORE suppression
-        print(f"📊 Analyzing {current_table}...")
+        print(f"📊 Analyzing {current_label}...")
         
         # National shares
         national_before = get_national_shares(con, current_table, top50_carriers)
@@ -272,14 +254,14 @@ def main():
         print(f"  Total wins to suppress: {total_suppressed:,.0f}")
         
         # Apply suppressions
-        next_table = f"gamoshi_win_mover_round{round_num}"
-        print(f"\n✂️  Applying suppressions to create {next_table}...")
+        applied.append(suppressions)
+        print(f"\n✂️  Applying suppressions from rounds 1-{round_num}...")
         
-        rows = apply_suppressions(con, current_table, suppressions, next_table)
-        print(f"  Created table with {rows:,} rows")
+        next_table = apply_suppressions(con, applied, top50_carriers, round_num)
         
         # Get metrics AFTER suppression
-        print(f"\n📊 Analyzing {next_table} (after suppression)...")
+        next_label = f"round {round_num} suppressed cube"
+        print(f"\n📊 Analyzing {next_label} (after suppression)...")
         national_after = get_national_shares(con, next_table, top50_carriers)
         h2h_after = get_h2h_shares(con, next_table, top50_carriers)
         
@@ -320,7 +302,7 @@ def main():
         h2h_after.to_csv(OUTPUT_DIR / f"round{round_num}_h2h_after.csv", index=False)
         
         # Move to next round
-        current_table = next_table
+        current_table, current_label = next_table, next_label
     
     # Save final results
     with open(OUTPUT_DIR / 'results_summary.json', 'w') as f:
@@ -293,7 +293,8 @@ def where_clause(filters: dict) -> str:
     return ""
 
 
-@st.cache_data
+# Query results are memoized by tools.db.query, which is shared with the other
+# dashboards and invalidated when the database is rebuilt - no st.cache_data
 def get_date_bounds(db_path: str, filters: dict):
     """Get min/max dates from database for the filtered data"""
     try:
@@ -339,7 +340,6 @@ def get_date_bounds(db_path: str, filters: dict):
         return (pd.to_datetime('1970-01-01').date(), pd.to_datetime('1970-01-01').date())
 
 
-@st.cache_data
 def get_distinct_options(db_path: str, column: str, table: str = 'carrier_data'):
     """Get distinct values for a column"""
     try:
@@ -354,7 +354,6 @@ def get_distinct_options(db_path: str, column: str, table: str = 'carrier_data')
         return ["All"]
 
 
-@st.cache_data
 def get_ranked_winners(db_path: str, filters: dict):
     """Get carriers ranked by total wins"""
     try:
@@ -395,8 +394,10 @@ def get_ranked_winners(db_path: str, filters: dict):
         return []
 
 
+# The pandas post-processing is cached per rerun as well; generation
+# (db.database_generation) is part of the key so a rebuild is not served stale
 @st.cache_data
-def compute_national_pdf(db_path: str, filters: dict, selected_winners: list, show_other: bool, metric: str, window: int, z_thresh: float, start_date: str, end_date: str, display_mode: str = "share") -> pd.DataFrame:
+def compute_national_pdf(db_path: str, filters: dict, selected_winners: list, show_other: bool, metric: str, window: int, z_thresh: float, start_date: str, end_date: str, display_mode: str = "share", generation: tuple = None) -> pd.DataFrame:
     """Compute national PDF with outliers using database"""
     if not selected_winners:
         return pd.DataFrame(columns=["the_date", "winner", metric])
@@ -510,7 +511,7 @@ def compute_national_pdf(db_path: str, filters: dict, selected_winners: list, sh
 
 
 @st.cache_data
-def compute_competitor_pdf(db_path: str, filters: dict, primary: str, competitors: list, metric: str, window: int, z_thresh: float, start_date: str, end_date: str, display_mode: str = "share", outlier_direction: str = "all") -> pd.DataFrame:
+def compute_competitor_pdf(db_path: str, filters: dict, primary: str, competitors: list, metric: str, window: int, z_thresh: float, start_date: str, end_date: str, display_mode: str = "share", outlier_direction: str = "all", generation: tuple = None) -> pd.DataFrame:
     """Compute competitor PDF with outliers using database"""
     if not competitors:
         return pd.DataFrame(columns=["the_date", "competitor", metric])
@@ -857,6 +858,7 @@ def main():
                 str(st.session_state.graph_end),
                 display_mode=st.session_state.display_mode,
                 outlier_direction=outlier_dir,
+                generation=db.database_generation(db_path),
             )
         else:
             if st.session_state.selection_mode == "Top N Carriers":
@@ -875,6 +877,7 @@ def main():
                 start_date=str(st.session_state.graph_start),
                 end_date=str(st.session_state.graph_end),
                 display_mode=st.session_state.display_mode,
+                generation=db.database_generation(db_path),
             )
         st.session_state.last_pdf = pdf
         # capture applied signature
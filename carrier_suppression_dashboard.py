@@ -12,8 +12,11 @@ import json
 import importlib.util
 from datetime import date
 
+from tools import db
 from tools.src import metrics
 from tools.src import outliers
+from tools.src import rolling
+from tools.src import rounds
 
 
 # Cache expensive min/max date queries
@@ -144,40 +147,19 @@ def where_clause(filters: dict) -> str:
     return ""
 
 
-def load_suppressions(supp_dir: str) -> pd.DataFrame:
-    if not supp_dir or not os.path.isdir(supp_dir):
-        return pd.DataFrame(columns=['date','winner','loser','dma_name','mover_ind','remove_units'])
-    files = sorted(glob.glob(os.path.join(supp_dir, "*.csv")))
-    frames = []
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-            frames.append(df)
-        except Exception:
-            pass
-    if not frames:
-        return pd.DataFrame(columns=['date','winner','loser','dma_name','mover_ind','remove_units'])
-    out = pd.concat(frames, ignore_index=True)
-    # Normalize columns
-    for col in ['date','winner','loser','dma_name','mover_ind','remove_units']:
-        if col not in out.columns:
-            out[col] = None
-    # Parse date
-    # Accept either 'date' or legacy 'the_date'
-    if 'date' not in out.columns and 'the_date' in out.columns:
-        out['date'] = out['the_date']
-    out['date'] = pd.to_datetime(out['date'], errors='coerce').dt.date
-    # Keep only expected columns
-    # Normalize mover_ind to boolean where possible
-    if 'mover_ind' in out.columns:
-        out['mover_ind'] = out['mover_ind'].apply(lambda v: True if str(v).strip().lower() in ('true','1') else (False if str(v).strip().lower() in ('false','0') else None))
-    # Keep expected columns (including mover_ind if present)
-    out = out[['date','winner','loser','dma_name','mover_ind','remove_units']]
-    # Drop rows without required keys
-    out = out.dropna(subset=['date','winner'])
-    # Cast remove_units
-    out['remove_units'] = pd.to_numeric(out['remove_units'], errors='coerce').fillna(0).astype(int)
-    return out
+SUPPRESSION_COLUMNS = ['date', 'winner', 'loser', 'dma_name', 'mover_ind', 'remove_units']
+
+
+def load_suppressions(round_ids=(), db_path: str | None = None) -> pd.DataFrame:
+    """
+    Rows of the selected saved rounds (suppressions schema).
+    
+    CSVs in the suppressions folder are not read on reruns; the sidebar's
+    import button saves them as rounds once (rounds.import_csv_rounds).
+    """
+    if not round_ids:
+        return pd.DataFrame(columns=SUPPRESSION_COLUMNS)
+    return rounds.load_rounds(round_ids, db_path)[SUPPRESSION_COLUMNS]
 
 
 def compute_national_pdf(ds_glob: str, filters: dict, selected_winners: list, show_other: bool, metric: str,
@@ -735,25 +717,25 @@ def compute_ts_outliers(pdf: pd.DataFrame, window: int = 14, z_thresh: float = 2
     if not pd.api.types.is_datetime64_any_dtype(df['the_date']):
         df['the_date'] = pd.to_datetime(df['the_date'])
     df['day_type'] = df['the_date'].dt.dayofweek.map(lambda x: 'Sat' if x==6 else ('Sun' if x==0 else 'Weekday'))
-    out_rows = []
-    for (winner, day_type), g in df.groupby(['winner','day_type']):
-        g = g.sort_values('the_date')
-        s = pd.to_numeric(g['win_share'], errors='coerce').fillna(0.0)
-        minp = 10 if day_type in ('Sat','Sun') else int(window)
-        mu = s.rolling(window=window, min_periods=minp).mean()
-        sig = s.rolling(window=window, min_periods=minp).std(ddof=1)
-        z = (s - mu) / sig
-        if positive_only:
-            mask = (sig > 0) & (z > float(z_thresh))
-        else:
-            mask = (sig > 0) & (z.abs() > float(z_thresh))
-        if mask.any():
-            m = g.loc[mask, ['the_date']].copy()
-            m['winner'] = winner
-            m['day_type'] = day_type
-            m['zscore'] = z.loc[mask].values
-            out_rows.append(m)
-    return pd.concat(out_rows, ignore_index=True) if out_rows else pd.DataFrame(columns=['the_date','winner','day_type','zscore'])
+    df['win_share'] = pd.to_numeric(df['win_share'], errors='coerce').fillna(0.0)
+    df = df.sort_values(['winner','day_type','the_date'], kind='stable').reset_index(drop=True)
+    # Trailing `window` rows incl. the current one, per (winner, day_type), in one kernel pass
+    stats = rolling.rolling_stats(df, ['winner','day_type'], 'the_date', 'win_share',
+                                  {window: int(window) - 1}, include_current=True, names=('mu', 'sig', 'n'))
+    minp = df['day_type'].isin(['Sat','Sun']).map({True: 10, False: int(window)})
+    enough = stats['n'] >= minp
+    mu = stats['mu'].where(enough)
+    sig = stats['sig'].where(enough)
+    z = (df['win_share'] - mu) / sig
+    if positive_only:
+        mask = (sig > 0) & (z > float(z_thresh))
+    else:
+        mask = (sig > 0) & (z.abs() > float(z_thresh))
+    if not mask.any():
+        return pd.DataFrame(columns=['the_date','winner','day_type','zscore'])
+    out = df.loc[mask, ['the_date','winner','day_type']].reset_index(drop=True)
+    out['zscore'] = z[mask].values
+    return out
 
 
 def compute_national_outliers(ds_glob: str, filters: dict, winners: list, lookback_days: int, same_dow: bool, z_thresh: float) -> pd.DataFrame:
@@ -779,25 +761,8 @@ def compute_national_outliers(ds_glob: str, filters: dict, winners: list, lookba
         df = con.execute(q).df()
     finally:
         con.close()
-    if df.empty:
-        return df
-    # Compute rolling/bounded baseline by lookback and DOW constraint
-    out_rows = []
-    for winner in sorted(set(df['winner'])):
-        wdf = df[df['winner']==winner].copy()
-        for d in sorted(set(wdf['d'])):
-            end = pd.Timestamp(d)
-            start = end - pd.Timedelta(days=int(lookback_days))
-            base = wdf[(wdf['d']>=start) & (wdf['d']<end)].copy()
-            if same_dow:
-                base = base[pd.to_datetime(base['d']).dt.dayofweek == end.dayofweek]
-            mu = base['share'].mean() if not base.empty else 0.0
-            sigma = base['share'].std(ddof=1) if len(base)>=3 else 0.0
-            s = float(wdf[wdf['d']==d]['share'].iloc[0])
-            z = (s - mu) / sigma if sigma and sigma>0 else float('nan')
-            if not pd.isna(z) and z >= z_thresh:
-                out_rows.append({'the_date': pd.to_datetime(d), 'winner': winner, 'share': s, 'mu': mu, 'sigma': sigma, 'z': z})
-    return pd.DataFrame(out_rows).sort_values(['the_date','winner'])
+    # Rolling/bounded baseline by lookback and DOW constraint (one vectorized pass)
+    return outliers.lookback_outliers(df, lookback_days, same_dow, z_thresh)
 
 
 def main():
@@ -922,15 +887,33 @@ def main():
     # Suppression controls
     st.sidebar.markdown("---")
     st.sidebar.subheader("🗜️ Suppressions")
+    db_path = db.get_default_db_path()
+    saved_rounds = rounds.list_rounds(db_path) if os.path.exists(db_path) else pd.DataFrame(columns=rounds.ROUND_COLUMNS)
+    round_labels = {int(r.round_id): f"#{r.round_id} {r.round_name}" for r in saved_rounds.itertuples()}
+    # Rounds saved on the previous run start out selected; deleted ones drop out
+    selected = [*st.session_state.get('supp_round_ids', []), *st.session_state.pop('supp_new_rounds', [])]
+    st.session_state.supp_round_ids = [i for i in dict.fromkeys(selected) if i in round_labels]
+    round_ids = st.sidebar.multiselect("Saved rounds", options=list(round_labels), format_func=round_labels.get,
+                                       key='supp_round_ids',
+                                       help="Plans saved from main.py or below (suppressions schema)")
     supp_dir = st.sidebar.text_input("Suppressions folder", value=os.path.join(os.getcwd(), 'suppressions'))
     apply_supp = st.sidebar.checkbox("Apply suppressions", value=True)
     os.makedirs(supp_dir, exist_ok=True)
-    loaded = load_suppressions(supp_dir)
+    if st.sidebar.button("📥 Import CSVs as rounds",
+                         help="Save each {name}.csv in the folder as round {name} (existing names are skipped)"):
+        try:
+            new_ids = rounds.import_csv_rounds(supp_dir, db_path)
+            st.session_state.supp_new_rounds = new_ids
+            st.sidebar.success(f"Imported {len(new_ids)} round(s)")
+            st.rerun()
+        except Exception as e:
+            st.sidebar.error(f"Import failed: {e}")
+    loaded = load_suppressions(round_ids, db_path)
     pending_cnt = len(st.session_state.supp_rows) if isinstance(st.session_state.supp_rows, list) else 0
-    st.sidebar.write(f"Loaded files: {len(glob.glob(os.path.join(supp_dir, '*.csv')))} | Rows: {len(loaded)} | Pending: {pending_cnt}")
+    st.sidebar.write(f"Rounds: {len(round_ids)} | Rows: {len(loaded)} | Pending: {pending_cnt}")
 
     # Manual add + quick refresh
-    if st.sidebar.button("🔄 Reload & Apply", help="Reload files from the folder and re-apply suppressions"):
+    if st.sidebar.button("🔄 Reload & Apply", help="Reload the selected rounds and re-apply suppressions"):
         st.rerun()
 
     with st.sidebar.expander("Add suppression row"):
@@ -945,13 +928,17 @@ def main():
         if st.session_state.supp_rows:
             st.caption("Pending (unsaved) rows:")
             st.dataframe(pd.DataFrame(st.session_state.supp_rows))
-            if st.button("💾 Save pending rows to file"):
+            if st.button("💾 Save pending rows as a round"):
                 ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                path = os.path.join(supp_dir, f"supp_{ts}.csv")
-                pd.DataFrame(st.session_state.supp_rows).to_csv(path, index=False)
-                st.session_state.supp_rows = []
-                st.success(f"Saved {path}")
-                st.rerun()
+                try:
+                    round_id = rounds.save_round(pd.DataFrame(st.session_state.supp_rows), f"supp_{ts}",
+                                                 db_path=db_path)
+                    st.session_state.supp_rows = []
+                    st.session_state.supp_new_rounds = [round_id]
+                    st.success(f"Saved round #{round_id} supp_{ts}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Save failed: {e}")
 
     # Compose combined suppressions (loaded + pending)
     sup_df = loaded.copy()
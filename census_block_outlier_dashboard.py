@@ -11,15 +11,20 @@ Use Cases:
   3. Fraud Detection with geo-spatial anomaly detection
 """
 import streamlit as st
-import duckdb
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 
+from tools import db
+from tools.src import census
+
 # Database configuration
 DB_PATH = "data/databases/duck_suppression.db"
 
+# Census blocks per page in the Level 5 listing
+BLOCK_PAGE_SIZE = 200
+
 st.set_page_config(
     page_title="Census Block Outlier Detection",
     page_icon="🔬",
@@ -30,24 +35,22 @@ st.set_page_config(
 # ============================================================================
 # Database Query Functions
 # ============================================================================
+# Results are memoized by tools.db.query (shared across dashboards and
+# invalidated when the cubes are rebuilt), so no st.cache_data here.
+# Everything below reads the H2H summary tables built next to each census
+# cube (tools.src.census); without them it falls back to the raw cube.
 
-@st.cache_resource
-def get_db_connection():
-    """Get cached database connection."""
-    return duckdb.connect(DB_PATH, read_only=True)
-
-@st.cache_data(ttl=300)
-def get_available_datasets(_con):
+def get_available_datasets():
     """Get list of datasets with census block cubes."""
     try:
-        result = _con.execute("""
+        result = db.query("""
             SELECT name FROM sqlite_master 
             WHERE type='table' AND name LIKE '%_census_cube'
-        """).fetchall()
+        """, DB_PATH)
         
         # Extract unique dataset names
         datasets = set()
-        for (table_name,) in result:
+        for table_name in result['name']:
             # Format: {ds}_{win/loss}_{mover/non_mover}_census_cube
             parts = table_name.split('_')
             if len(parts) >= 4:
@@ -59,181 +62,36 @@ def get_available_datasets(_con):
         st.error(f"Error getting datasets: {e}")
         return []
 
-@st.cache_data(ttl=300)
-def get_national_stats(_con, ds, mover_ind, metric_type):
+def get_national_stats(ds, mover_ind, metric_type):
     """Get national-level statistics for initial outlier screening."""
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    sql = f"""
-    SELECT 
-        winner,
-        loser,
-        COUNT(DISTINCT census_blockid) as unique_blocks,
-        COUNT(DISTINCT state) as unique_states,
-        COUNT(DISTINCT dma_name) as unique_dmas,
-        SUM(total_{metric_type}s) as total_metric,
-        AVG(total_{metric_type}s) as avg_metric,
-        STDDEV(total_{metric_type}s) as stddev_metric,
-        MAX(total_{metric_type}s) as max_metric,
-        MIN(total_{metric_type}s) as min_metric,
-        COUNT(*) as total_records
-    FROM {table}
-    GROUP BY winner, loser
-    ORDER BY total_metric DESC
-    """
-    
-    return _con.execute(sql).fetchdf()
+    return census.h2h_summary(ds, mover_ind, metric_type, DB_PATH)
 
-@st.cache_data(ttl=300)
-def get_h2h_timeseries(_con, ds, mover_ind, metric_type, winner, loser):
+def get_h2h_timeseries(ds, mover_ind, metric_type, winner, loser):
     """Get time series for a specific H2H matchup."""
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    sql = f"""
-    SELECT 
-        the_date,
-        SUM(total_{metric_type}s) as total_metric,
-        COUNT(DISTINCT census_blockid) as unique_blocks,
-        COUNT(*) as record_count
-    FROM {table}
-    WHERE winner = ? AND loser = ?
-    GROUP BY the_date
-    ORDER BY the_date
-    """
-    
-    return _con.execute(sql, [winner, loser]).fetchdf()
+    return census.h2h_timeseries(ds, mover_ind, metric_type, winner, loser, DB_PATH)
 
-@st.cache_data(ttl=300)
-def get_state_breakdown(_con, ds, mover_ind, metric_type, winner, loser):
+def get_state_breakdown(ds, mover_ind, metric_type, winner, loser):
     """Get state-level breakdown for H2H matchup."""
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    sql = f"""
-    SELECT 
-        state,
-        COUNT(DISTINCT census_blockid) as unique_blocks,
-        COUNT(DISTINCT dma_name) as unique_dmas,
-        SUM(total_{metric_type}s) as total_metric,
-        AVG(total_{metric_type}s) as avg_metric,
-        STDDEV(total_{metric_type}s) as stddev_metric,
-        MAX(total_{metric_type}s) as max_metric,
-        COUNT(*) as record_count
-    FROM {table}
-    WHERE winner = ? AND loser = ?
-    GROUP BY state
-    ORDER BY total_metric DESC
-    """
-    
-    return _con.execute(sql, [winner, loser]).fetchdf()
+    return census.state_breakdown(ds, mover_ind, metric_type, winner, loser, DB_PATH)
 
-@st.cache_data(ttl=300)
-def get_dma_breakdown(_con, ds, mover_ind, metric_type, winner, loser, state=None):
+def get_dma_breakdown(ds, mover_ind, metric_type, winner, loser, state=None):
     """Get DMA-level breakdown."""
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    where_clause = "WHERE winner = ? AND loser = ?"
-    params = [winner, loser]
-    
-    if state:
-        where_clause += " AND state = ?"
-        params.append(state)
-    
-    sql = f"""
-    SELECT 
-        dma_name,
-        state,
-        COUNT(DISTINCT census_blockid) as unique_blocks,
-        SUM(total_{metric_type}s) as total_metric,
-        AVG(total_{metric_type}s) as avg_metric,
-        STDDEV(total_{metric_type}s) as stddev_metric,
-        MAX(total_{metric_type}s) as max_metric,
-        COUNT(*) as record_count
-    FROM {table}
-    {where_clause}
-    GROUP BY dma_name, state
-    ORDER BY total_metric DESC
-    """
-    
-    return _con.execute(sql, params).fetchdf()
+    return census.dma_breakdown(ds, mover_ind, metric_type, winner, loser, state, DB_PATH)
 
-@st.cache_data(ttl=300)
-def get_census_block_breakdown(_con, ds, mover_ind, metric_type, winner, loser, state=None, dma=None):
-    """Get census block-level breakdown - the finest granularity."""
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    where_clause = "WHERE winner = ? AND loser = ?"
-    params = [winner, loser]
-    
-    if state:
-        where_clause += " AND state = ?"
-        params.append(state)
-    
-    if dma:
-        where_clause += " AND dma_name = ?"
-        params.append(dma)
-    
-    sql = f"""
-    SELECT 
-        census_blockid,
-        state,
-        dma_name,
-        the_date,
-        total_{metric_type}s as metric_value,
-        record_count
-    FROM {table}
-    {where_clause}
-    ORDER BY metric_value DESC, the_date DESC
-    LIMIT 1000
+def get_census_block_page(ds, mover_ind, metric_type, winner, loser, state=None, dma=None, after=None):
     """
-    
-    return _con.execute(sql, params).fetchdf()
+    Get one page of census blocks - the finest granularity.
+    Returns (page, next_cursor); next_cursor is None on the last page.
+    """
+    return census.block_page(ds, mover_ind, metric_type, winner, loser, state, dma,
+                             after=after, page_size=BLOCK_PAGE_SIZE, db_path=DB_PATH)
 
-@st.cache_data(ttl=300)
-def detect_census_block_outliers(_con, ds, mover_ind, metric_type, winner, loser, threshold_std=3.0):
+def detect_census_block_outliers(ds, mover_ind, metric_type, winner, loser, threshold_std=3.0):
     """
     Detect outlier census blocks using statistical methods.
     Returns blocks where metrics exceed threshold_std standard deviations.
     """
-    mover_str = 'mover' if mover_ind else 'non_mover'
-    table = f"{ds}_{metric_type}_{mover_str}_census_cube"
-    
-    sql = f"""
-    WITH block_stats AS (
-        SELECT 
-            census_blockid,
-            state,
-            dma_name,
-            SUM(total_{metric_type}s) as total_metric,
-            COUNT(*) as record_count,
-            COUNT(DISTINCT the_date) as days_active
-        FROM {table}
-        WHERE winner = ? AND loser = ?
-        GROUP BY census_blockid, state, dma_name
-    ),
-    global_stats AS (
-        SELECT 
-            AVG(total_metric) as mean_metric,
-            STDDEV(total_metric) as stddev_metric
-        FROM block_stats
-    )
-    SELECT 
-        b.*,
-        g.mean_metric,
-        g.stddev_metric,
-        (b.total_metric - g.mean_metric) / NULLIF(g.stddev_metric, 0) as z_score,
-        b.total_metric / NULLIF(b.days_active, 0) as avg_daily_metric
-    FROM block_stats b
-    CROSS JOIN global_stats g
-    WHERE ABS((b.total_metric - g.mean_metric) / NULLIF(g.stddev_metric, 0)) > ?
-    ORDER BY ABS((b.total_metric - g.mean_metric) / NULLIF(g.stddev_metric, 0)) DESC
-    """
-    
-    return _con.execute(sql, [winner, loser, threshold_std]).fetchdf()
+    return census.block_outliers(ds, mover_ind, metric_type, winner, loser, threshold_std, DB_PATH)
 
 # ============================================================================
 # UI Helper Functions
@@ -270,11 +128,9 @@ def main():
     Drill-down path: **National → H2H → State → DMA → Census Block**
     """)
     
-    # Get database connection
-    try:
-        con = get_db_connection()
-    except Exception as e:
-        st.error(f"Failed to connect to database: {e}")
+    # Check the database exists
+    if not Path(DB_PATH).exists():
+        st.error(f"Database not found: {DB_PATH}")
         st.info(f"Ensure {DB_PATH} exists. Run `build_census_block_cubes.py` first.")
         return
     
@@ -285,7 +141,7 @@ def main():
     st.sidebar.header("🔍 Detection Parameters")
     
     # Dataset selection
-    datasets = get_available_datasets(con)
+    datasets = get_available_datasets()
     if not datasets:
         st.error("No census block cubes found. Run `build_census_block_cubes.py` first.")
         return
@@ -340,7 +196,7 @@ def main():
     st.markdown(f"**Dataset:** {ds} | **Type:** {'Movers' if mover_ind else 'Non-Movers'} | **Metric:** {metric_type.title()}s")
     
     with st.spinner("Loading national statistics..."):
-        national_df = get_national_stats(con, ds, mover_ind, metric_type)
+        national_df = get_national_stats(ds, mover_ind, metric_type)
     
     if national_df.empty:
         st.warning("No data available")
@@ -396,7 +252,7 @@ def main():
     
     if winner and loser:
         # Time series
-        ts_df = get_h2h_timeseries(con, ds, mover_ind, metric_type, winner, loser)
+        ts_df = get_h2h_timeseries(ds, mover_ind, metric_type, winner, loser)
         
         if not ts_df.empty:
             fig = px.line(
@@ -422,7 +278,7 @@ def main():
         
         st.header("🗺️ Level 3: State Analysis")
         
-        state_df = get_state_breakdown(con, ds, mover_ind, metric_type, winner, loser)
+        state_df = get_state_breakdown(ds, mover_ind, metric_type, winner, loser)
         
         if not state_df.empty:
             state_df = flag_outliers(state_df, 'total_metric', outlier_threshold)
@@ -466,7 +322,7 @@ def main():
         )
         
         state_filter = None if selected_state == 'All States' else selected_state
-        dma_df = get_dma_breakdown(con, ds, mover_ind, metric_type, winner, loser, state_filter)
+        dma_df = get_dma_breakdown(ds, mover_ind, metric_type, winner, loser, state_filter)
         
         if not dma_df.empty:
             dma_df = flag_outliers(dma_df, 'total_metric', outlier_threshold)
@@ -507,7 +363,7 @@ def main():
         if st.button("🔍 Detect Census Block Outliers", key="detect_outliers_btn"):
             with st.spinner("Analyzing census blocks for outliers..."):
                 outlier_blocks = detect_census_block_outliers(
-                    con, ds, mover_ind, metric_type, winner, loser, outlier_threshold
+                    ds, mover_ind, metric_type, winner, loser, outlier_threshold
                 )
             
             if not outlier_blocks.empty:
@@ -551,24 +407,44 @@ def main():
             else:
                 st.info("No outlier census blocks detected at this threshold")
         
-        # Show all census blocks for selected filters
+        # Show census blocks for selected filters, one page at a time
         st.subheader("Census Block Details")
-        block_df = get_census_block_breakdown(con, ds, mover_ind, metric_type, winner, loser, state_filter, dma_filter)
+        
+        # Cursors of the pages seen so far; reset when the filters change
+        listing = (ds, mover_ind, metric_type, winner, loser, state_filter, dma_filter)
+        if st.session_state.get('block_listing') != listing:
+            st.session_state['block_listing'] = listing
+            st.session_state['block_cursors'] = [None]
+        cursors = st.session_state['block_cursors']
+        
+        block_df, next_cursor = get_census_block_page(
+            ds, mover_ind, metric_type, winner, loser, state_filter, dma_filter, after=cursors[-1]
+        )
         
         if not block_df.empty:
+            page_num = len(cursors)
+            first = (page_num - 1) * BLOCK_PAGE_SIZE + 1
+            st.caption(f"Blocks {first:,}-{first + len(block_df) - 1:,}, largest {metric_type} totals first")
             st.dataframe(block_df, width="stretch", height=400)
             
+            col1, col2, col3 = st.columns([1, 1, 2])
+            if col1.button("◀ Previous page", disabled=page_num == 1, key="block_prev_btn"):
+                cursors.pop()
+                st.rerun()
+            if col2.button("Next page ▶", disabled=next_cursor is None, key="block_next_btn"):
+                cursors.append(next_cursor)
+                st.rerun()
+            
             # Download option
             csv = block_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download Census Block Data",
+            col3.download_button(
+                label="📥 Download This Page",
                 data=csv,
-                file_name=f"census_blocks_{winner}_vs_{loser}_{ds}.csv",
+                file_name=f"census_blocks_{winner}_vs_{loser}_{ds}_p{page_num}.csv",
                 mime="text/csv"
             )
         else:
             st.info("No census block data available for selected filters")
 
-
 if __name__ == "__main__":
     main()
@@ -2,7 +2,8 @@
 import os
 from datetime import date
 import pandas as pd
-import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import streamlit as st
 import plotly.graph_objs as go
 import plotly.express as px
@@ -11,8 +12,14 @@ from tools.src.plan import (
     get_top_n_carriers,
     base_national_series,
     scan_base_outliers,
+    scan_all_segments,
+    segment_summary,
+    list_segments,
     build_enriched_cube
 )
+from tools.src.apply import preview_series
+from tools.src.suppress import build_enriched_plan
+from tools.src import rounds
 
 
 def ui():
@@ -27,6 +34,23 @@ def ui():
     # Database info (read-only display)
     db_path = db.get_default_db_path()
     st.sidebar.info(f"📊 Database: `{os.path.basename(db_path)}`")
+    with st.sidebar.expander('🔌 Connection Pool & Cache', expanded=False):
+        pool_stats = db.stats()
+        st.caption(
+            f"{pool_stats['connections_opened']} connection(s) opened "
+            f"({pool_stats['connect_seconds']:.2f}s), "
+            f"{pool_stats['reuse_rate']:.0%} reuse over {pool_stats['checkouts']} checkouts"
+        )
+        st.caption(
+            f"Reopened {pool_stats['idle_closes']}x after idle, "
+            f"{pool_stats['reopened']}x after a rebuild"
+        )
+        cache_stats = db.cache_stats()
+        st.caption(
+            f"Result cache: {cache_stats['hit_rate']:.0%} hits "
+            f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+            f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 2**20:.1f} MB"
+        )
 
     st.sidebar.header('Graph Window')
     view_start = st.sidebar.date_input('Start Date', value=date(2025,6,1))
@@ -355,6 +379,81 @@ def ui():
             import traceback
             with st.expander('Show traceback'):
                 st.code(traceback.format_exc())
+
+    # Step 1b: Sweep every dataset / mover / win-loss segment at once
+    st.markdown('**🧭 Scan All Segments (QA sweep)**')
+    st.caption('Runs the national scan for every dataset, mover type and win/loss cube concurrently, '
+               'using the thresholds above. Segments appear as they finish.')
+    try:
+        all_segments = list_segments(db_path)
+    except Exception as e:
+        all_segments = []
+        st.error(f'❌ Could not list cube tables: {e}')
+    all_datasets = sorted({s['ds'] for s in all_segments})
+    sweep_datasets = st.multiselect('Datasets', options=all_datasets, default=all_datasets,
+                                    key='sweep_datasets')
+    sweep_segments = [s for s in all_segments if s['ds'] in sweep_datasets]
+
+    if st.button(f'Scan All Segments ({len(sweep_segments)})', key='scan_all_segments',
+                 disabled=not sweep_segments):
+        progress = st.progress(0.0, text='Scanning segments...')
+        results = []
+        for result in scan_all_segments(
+            start_date=str(view_start),
+            end_date=str(view_end),
+            segments=sweep_segments,
+            z_threshold=z_threshold,
+            top_n=top_n,
+            min_share_pct=min_share_pct,
+            egregious_threshold=egregious_threshold,
+            db_path=db_path
+        ):
+            results.append(result)
+            progress.progress(len(results) / len(sweep_segments),
+                              text=f'{len(results)}/{len(sweep_segments)} segments scanned')
+
+            label = (f"{result['ds']} · {'Mover' if result['mover_ind'] else 'Non-Mover'} · "
+                     f"{result['metric']} ({result['seconds']:.1f}s)")
+            out = result['outliers']
+            if result['error']:
+                st.error(f'❌ {label}: {result["error"]}')
+            elif out.empty:
+                st.success(f'✅ {label}: no outliers')
+            else:
+                with st.expander(f'⚠️ {label}: {len(out)} outliers', expanded=False):
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric('Dates with Outliers', out['the_date'].nunique())
+                    col2.metric('Carriers Flagged', out['winner'].nunique())
+                    col3.metric('Total Impact', f"{int(out['impact'].sum()):,}")
+                    st.dataframe(
+                        out[['the_date', 'winner', 'impact', 'nat_total_wins', 'nat_z_score']]
+                        .sort_values(['the_date', 'impact'], ascending=[True, False]),
+                        width='stretch',
+                        hide_index=True
+                    )
+
+            # The sidebar's own segment feeds "Build Plan" as a single scan would
+            if (result['ds'], result['mover_ind'], result['metric']) == (ds, mover_ind, 'win') \
+                    and not result['error']:
+                st.session_state['base_outliers'] = out if not out.empty else None
+        progress.empty()
+        st.session_state['segment_summary'] = segment_summary(results)
+
+    summary = st.session_state.get('segment_summary')
+    if summary is not None and not summary.empty:
+        st.markdown('**Sweep Summary**')
+        st.dataframe(
+            summary.assign(mover_ind=summary['mover_ind'].map({True: 'Mover', False: 'Non-Mover'})),
+            width='stretch',
+            hide_index=True,
+            column_config={
+                'mover_ind': st.column_config.TextColumn('Mover Type'),
+                'total_impact': st.column_config.NumberColumn('Total Impact', format='%d'),
+                'max_z': st.column_config.NumberColumn('Max Z', format='%.2f'),
+                'seconds': st.column_config.NumberColumn('Seconds', format='%.2f'),
+            }
+        )
+
     # Show cached outliers if available
     base_outliers = st.session_state.get('base_outliers')
     if base_outliers is not None and not base_outliers.empty:
@@ -410,15 +509,26 @@ def ui():
                         dma_z_threshold=dma_z_threshold,
                         dma_pct_threshold=dma_pct_threshold,
                         rare_pair_impact_threshold=rare_pair_impact,
-                        db_path=db_path
+                        db_path=db_path,
+                        as_arrow=True
                     )
                     
-                    if enriched.empty:
+                    if enriched.num_rows == 0:
                         st.warning('No data found in enriched cube.')
                     else:
                         # Filter to only outlier dates/winners
                         outlier_keys = base_outliers[['the_date', 'winner']].drop_duplicates()
                         outlier_keys['the_date'] = pd.to_datetime(outlier_keys['the_date'])
+                        
+                        # Narrow the Arrow table to outlier winners and dates before
+                        # it becomes a DataFrame (the full window is mostly non-outliers)
+                        date_type = enriched.schema.field('the_date').type
+                        enriched = db.arrow_to_pandas(enriched.filter(pc.and_(
+                            pc.is_in(enriched['winner'],
+                                     value_set=pa.array(outlier_keys['winner'].astype(str).unique())),
+                            pc.is_in(enriched['the_date'],
+                                     value_set=pa.array(outlier_keys['the_date'].dt.date.unique()).cast(date_type)),
+                        )))
                         enriched['the_date'] = pd.to_datetime(enriched['the_date'])
                         
                         # Merge to get enriched data for outliers only
@@ -427,186 +537,14 @@ def ui():
                         if enriched_outliers.empty:
                             st.warning('No enriched data matched the outliers.')
                         else:
-                            # Build suppression plan using your distribution algorithm
-                            plan_rows = []
-                            insufficient_threshold_cases = []  # Track carriers that couldn't meet distribution threshold
+                            # Stage-1 budget cut and stage-2 spread for every outlier at once
+                            plan_df, insufficient_df = build_enriched_plan(
+                                enriched_outliers, mover_ind,
+                                auto_min_wins=auto_min_wins,
+                                distributed_min_wins=distributed_min_wins
+                            )
                             
-                            for (the_date, winner), sub in enriched_outliers.groupby(['the_date', 'winner']):
-                                # Calculate removal need (excess over baseline)
-                                nat_info = sub.iloc[0]
-                                W = float(nat_info['nat_total_wins'])
-                                T = float(nat_info['nat_market_wins'])
-                                mu_share = float(nat_info['nat_mu_share'])
-                                
-                                # Calculate need: remove excess to bring share back to baseline
-                                need = int(np.ceil(max((W - mu_share * T) / max(1e-12, (1 - mu_share)), 0)))
-                                
-                                if need <= 0:
-                                    continue  # No removal needed
-                                
-                                # DMA-level aggregates for share calculations
-                                dma_totals = sub.groupby('dma_name')['pair_wins_current'].sum().to_dict()
-                                dma_mu_totals = sub.groupby('dma_name')['pair_mu_wins'].sum().to_dict()
-                                
-                                # ===  STAGE 1: AUTO SUPPRESSION ===
-                                # Trigger conditions per requirements:
-                                # - pair_outlier_pos (z-score violation)
-                                # - pct_outlier_pos (30% spike)
-                                # - rare_pair (appearance_rank <= 5) WITH z-score violation AND impact > 15
-                                # - new_pair (first appearance at DMA level)
-                                
-                                # Rare pairs need both z-score AND impact > 15
-                                is_rare_eligible = (sub['rare_pair'] == True) & (sub['pair_z'] > 1.5) & (sub['impact'].abs() > 15)
-                                
-                                auto_candidates = sub[
-                                    (sub['pair_outlier_pos'] == True) |
-                                    (sub['pct_outlier_pos'] == True) |
-                                    (is_rare_eligible) |
-                                    (sub['new_pair'] == True)
-                                ].copy()
-                                
-                                # Apply minimum volume filter (configurable)
-                                auto_candidates = auto_candidates[auto_candidates['pair_wins_current'] >= auto_min_wins]
-                                
-                                if not auto_candidates.empty:
-                                    # Calculate removal amount: NO CAP, remove FULL excess
-                                    pw = pd.to_numeric(auto_candidates['pair_wins_current'], errors='coerce').fillna(0.0)
-                                    mu_eff = pd.to_numeric(auto_candidates['pair_mu_wins'], errors='coerce').fillna(0.0)
-                                    
-                                    # Remove full excess (current - baseline)
-                                    rm_excess = np.ceil(np.maximum(0.0, pw - mu_eff)).astype(int)
-                                    auto_candidates['rm_pair'] = rm_excess
-                                    
-                                    # Sort by severity (z-score, then current wins)
-                                    auto_candidates = auto_candidates.sort_values(
-                                        ['pair_z', 'pair_wins_current'],
-                                        ascending=[False, False]
-                                    )
-                                    
-                                    # Allocate removals up to need
-                                    auto_candidates['cum_remove'] = auto_candidates['rm_pair'].cumsum()
-                                    auto_candidates['rm_final'] = np.where(
-                                        auto_candidates['cum_remove'] <= need,
-                                        auto_candidates['rm_pair'],
-                                        np.maximum(0, need - auto_candidates['cum_remove'].shift(fill_value=0))
-                                    ).astype(int)
-                                    
-                                    auto_final = auto_candidates[auto_candidates['rm_final'] > 0]
-                                    auto_removed = int(auto_final['rm_final'].sum())
-                                else:
-                                    auto_final = pd.DataFrame()
-                                    auto_removed = 0
-                                
-                                # === STAGE 2: DISTRIBUTED SUPPRESSION ===
-                                need_remaining = max(0, need - auto_removed)
-                                
-                                if need_remaining > 0:
-                                    # Get all pairs NOT already in auto suppression
-                                    auto_pairs = set()
-                                    if not auto_final.empty:
-                                        for _, r in auto_final.iterrows():
-                                            auto_pairs.add((r['loser'], r['dma_name']))
-                                    
-                                    # Filter to pairs meeting distributed minimum threshold
-                                    eligible_pairs = sub[
-                                        (~sub.apply(lambda r: (r['loser'], r['dma_name']) in auto_pairs, axis=1)) &
-                                        (sub['pair_wins_current'] >= distributed_min_wins)
-                                    ].copy()
-                                    
-                                    if len(eligible_pairs) == 0:
-                                        # Track this case for reporting
-                                        insufficient_threshold_cases.append({
-                                            'date': pd.to_datetime(the_date).date(),
-                                            'winner': winner,
-                                            'need_remaining': need_remaining,
-                                            'auto_removed': auto_removed,
-                                            'min_wins_required': distributed_min_wins,
-                                            'reason': f'All remaining pairs have < {distributed_min_wins} wins'
-                                        })
-                                        distributed_final = pd.DataFrame()
-                                    else:
-                                        # Distribute proportionally across eligible pairs
-                                        eligible_pairs['capacity'] = pd.to_numeric(eligible_pairs['pair_wins_current'], errors='coerce').fillna(0.0)
-                                        total_eligible = eligible_pairs['capacity'].sum()
-                                        
-                                        if total_eligible > 0:
-                                            eligible_pairs['proportion'] = eligible_pairs['capacity'] / total_eligible
-                                            eligible_pairs['rm_final'] = (eligible_pairs['proportion'] * need_remaining).round().astype(int)
-                                            
-                                            # Only keep pairs with actual removals
-                                            distributed_final = eligible_pairs[eligible_pairs['rm_final'] > 0].copy()
-                                        else:
-                                            distributed_final = pd.DataFrame()
-                                else:
-                                    distributed_final = pd.DataFrame()
-                                
-                                # === COLLECT PLAN ROWS ===
-                                # Auto stage rows
-                                for _, r in auto_final.iterrows():
-                                    dma_total = dma_totals.get(r['dma_name'], 0)
-                                    dma_mu_total = dma_mu_totals.get(r['dma_name'], 0)
-                                    
-                                    pair_share = (r['pair_wins_current'] / dma_total) if dma_total > 0 else None
-                                    pair_share_mu = (r['pair_mu_wins'] / dma_mu_total) if dma_mu_total > 0 else None
-                                    
-                                    plan_rows.append({
-                                        'date': pd.to_datetime(the_date).date(),
-                                        'winner': winner,
-                                        'loser': r['loser'],
-                                        'dma_name': r['dma_name'],
-                                        'state': r['state'],
-                                        'mover_ind': mover_ind,
-                                        'remove_units': int(r['rm_final']),
-                                        'stage': 'auto',
-                                        'pair_wins_current': r['pair_wins_current'],
-                                        'pair_mu_wins': r['pair_mu_wins'],
-                                        'pair_sigma_wins': r['pair_sigma_wins'],
-                                        'pair_z': r['pair_z'],
-                                        'pair_pct_change': r['pair_pct_change'],
-                                        'dma_wins': dma_total,
-                                        'pair_share': pair_share,
-                                        'pair_share_mu': pair_share_mu,
-                                        'nat_total_wins': nat_info['nat_total_wins'],
-                                        'nat_share_current': nat_info['nat_share_current'],
-                                        'nat_mu_share': nat_info['nat_mu_share'],
-                                        'nat_z_score': nat_info['nat_z_score'],
-                                        'impact': int(r['rm_final'])
-                                    })
-                                
-                                # Distributed stage rows
-                                for _, r in distributed_final.iterrows():
-                                    dma_total = dma_totals.get(r['dma_name'], 0)
-                                    dma_mu_total = dma_mu_totals.get(r['dma_name'], 0)
-                                    
-                                    pair_share = (r['pair_wins_current'] / dma_total) if dma_total > 0 else None
-                                    pair_share_mu = (r['pair_mu_wins'] / dma_mu_total) if dma_mu_total > 0 else None
-                                    
-                                    plan_rows.append({
-                                        'date': pd.to_datetime(the_date).date(),
-                                        'winner': winner,
-                                        'loser': r['loser'],
-                                        'dma_name': r['dma_name'],
-                                        'state': r['state'],
-                                        'mover_ind': mover_ind,
-                                        'remove_units': int(r['rm_final']),
-                                        'stage': 'distributed',
-                                        'pair_wins_current': r['pair_wins_current'],
-                                        'pair_mu_wins': r['pair_mu_wins'],
-                                        'pair_sigma_wins': r['pair_sigma_wins'],
-                                        'pair_z': r['pair_z'],
-                                        'pair_pct_change': r['pair_pct_change'],
-                                        'dma_wins': dma_total,
-                                        'pair_share': pair_share,
-                                        'pair_share_mu': pair_share_mu,
-                                        'nat_total_wins': nat_info['nat_total_wins'],
-                                        'nat_share_current': nat_info['nat_share_current'],
-                                        'nat_mu_share': nat_info['nat_mu_share'],
-                                        'nat_z_score': nat_info['nat_z_score'],
-                                        'impact': int(r['rm_final'])
-                                    })
-                            
-                            if plan_rows:
-                                plan_df = pd.DataFrame(plan_rows)
+                            if not plan_df.empty:
                                 st.session_state['suppression_plan'] = plan_df
                                 
                                 # Display summary
@@ -644,11 +582,9 @@ def ui():
                                 st.success('✅ Suppression plan generated successfully!')
                                 
                                 # Display carriers that didn't meet distribution threshold
-                                if insufficient_threshold_cases:
-                                    st.warning(f'⚠️ {len(insufficient_threshold_cases)} carrier-date combinations could not fully distribute (all pairs < {distributed_min_wins} wins)')
+                                if not insufficient_df.empty:
+                                    st.warning(f'⚠️ {len(insufficient_df)} carrier-date combinations could not fully distribute (all pairs < {distributed_min_wins} wins)')
                                     with st.expander('📊 Carriers Not Meeting Distribution Threshold', expanded=True):
-                                        insufficient_df = pd.DataFrame(insufficient_threshold_cases)
-                                        
                                         # Aggregate by carrier to show total unaddressed impact
                                         carrier_summary = insufficient_df.groupby('winner').agg({
                                             'date': 'count',
@@ -699,36 +635,49 @@ def ui():
             st.error('❌ No plan to save. Build a plan first.')
         else:
             try:
-                # Check if round already exists
+                # CSV copy for sharing and the legacy dataset builder
                 csv_dir = os.path.join(os.getcwd(), 'suppressions', 'rounds')
                 os.makedirs(csv_dir, exist_ok=True)
                 csv_path = os.path.join(csv_dir, f'{round_name}.csv')
                 
+                # A legacy CSV round may never have been imported into the database
                 if os.path.exists(csv_path) and not overwrite:
-                    st.error(f'❌ Round "{round_name}" already exists! Check "Overwrite if exists" to replace it.')
+                    st.error(f'❌ Round "{round_name}" already exists (`{csv_path}`)! Check "Overwrite if exists" to replace it.')
                 else:
-                    # Save to CSV
+                    # Save to the database (suppressions schema); refuses an existing round unless overwriting
+                    round_id = rounds.save_round(plan_df, round_name, ds=ds, db_path=db_path, overwrite=overwrite)
                     plan_df.to_csv(csv_path, index=False)
                     
-                    # TODO: Save to database (suppressions schema)
-                    # For now, CSV only
-                    
-                    st.success(f'✅ Saved plan to: `{csv_path}`')
+                    st.success(f'✅ Saved round #{round_id} "{round_name}" to the database and `{csv_path}`')
                     st.info(f'📊 {len(plan_df)} rows, {plan_df["remove_units"].sum():,} total removals')
                     st.caption('Use the carrier_suppression_dashboard.py to apply and visualize this plan.')
                     
+            except rounds.RoundExistsError as e:
+                st.error(f'❌ {e}. Check "Overwrite if exists" to replace it.')
             except Exception as e:
                 st.error(f'❌ Save failed: {e}')
                 import traceback
                 with st.expander('Show traceback'):
                     st.code(traceback.format_exc())
 
+    saved_rounds = rounds.list_rounds(db_path)
+    if not saved_rounds.empty:
+        with st.expander(f'📂 Load a saved round ({len(saved_rounds)} saved)'):
+            labels = {
+                int(r.round_id): f'#{r.round_id} {r.round_name} ({r.ds or "?"}, {r.n_rows:,} rows, {r.remove_units:,} units)'
+                for r in saved_rounds.itertuples()
+            }
+            load_id = st.selectbox('Round', options=list(labels), format_func=labels.get)
+            if st.button('Load Round', key='load_round'):
+                st.session_state['suppression_plan'] = rounds.load_round(load_id, db_path)
+                st.rerun()
+
     st.subheader('4️⃣ Build Suppressed Dataset (Optional)')
     st.caption('Generate suppressed parquet files (advanced users only).')
     if st.button('Run Dataset Builder'):
         try:
             import subprocess, sys
-            cmd = [sys.executable, os.path.join(os.getcwd(), 'tools', 'build_suppressed_dataset.py')]
+            cmd = [sys.executable, os.path.join(os.getcwd(), 'scripts', 'legacy', 'build_suppressed_dataset.py')]
             res = subprocess.run(cmd, capture_output=True, text=True)
             if res.returncode == 0:
                 st.success('✅ Dataset builder completed')
@@ -769,74 +718,21 @@ def ui():
                         db_path=db_path
                     )
                     
-                    # Get base national series for ALL top carriers
-                    base_series = base_national_series(
+                    # Base series (cached per ds/mover/window) plus the plan's
+                    # per-day removals, applied to the cube inside DuckDB
+                    base_series, suppressed_series = preview_series(
                         ds=ds,
                         mover_ind=mover_ind,
                         winners=all_top_carriers,
                         start_date=str(view_start),
                         end_date=str(view_end),
+                        plan=plan_df,
                         db_path=db_path
                     )
                     
                     if base_series.empty:
                         st.warning('No base data found for comparison.')
                     else:
-                        # Apply suppressions to create suppressed series
-                        # Aggregate plan by date/winner/loser/dma
-                        suppressions = plan_df.groupby(['date', 'winner', 'loser', 'dma_name'])['remove_units'].sum().reset_index()
-                        suppressions['date'] = pd.to_datetime(suppressions['date'])
-                        
-                        # Get detailed pair-level data from cube for ALL top carriers
-                        cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
-                        
-                        import duckdb
-                        con = duckdb.connect(db_path)
-                        
-                        # Query cube data for ALL top carriers
-                        winners_str = ','.join([f"'{w}'" for w in all_top_carriers])
-                        pair_data = con.execute(f"""
-                            SELECT 
-                                the_date,
-                                winner,
-                                loser,
-                                dma_name,
-                                total_wins
-                            FROM {cube_table}
-                            WHERE the_date BETWEEN '{view_start}' AND '{view_end}'
-                                AND winner IN ({winners_str})
-                        """).df()
-                        con.close()
-                        
-                        # Merge suppressions
-                        pair_data['the_date'] = pd.to_datetime(pair_data['the_date'])
-                        suppressions = suppressions.rename(columns={'date': 'the_date'})
-                        
-                        pair_suppressed = pair_data.merge(
-                            suppressions,
-                            on=['the_date', 'winner', 'loser', 'dma_name'],
-                            how='left'
-                        )
-                        pair_suppressed['remove_units'] = pair_suppressed['remove_units'].fillna(0).infer_objects(copy=False)
-                        
-                        # Apply suppressions
-                        pair_suppressed['suppressed_wins'] = np.maximum(
-                            0,
-                            pair_suppressed['total_wins'] - pair_suppressed['remove_units']
-                        )
-                        
-                        # Calculate suppressed national series
-                        suppressed_agg = pair_suppressed.groupby(['the_date', 'winner']).agg({
-                            'suppressed_wins': 'sum'
-                        }).reset_index()
-                        
-                        suppressed_market = suppressed_agg.groupby('the_date')['suppressed_wins'].sum().reset_index()
-                        suppressed_market = suppressed_market.rename(columns={'suppressed_wins': 'market_total'})
-                        
-                        suppressed_series = suppressed_agg.merge(suppressed_market, on='the_date')
-                        suppressed_series['win_share'] = suppressed_series['suppressed_wins'] / suppressed_series['market_total']
-                        suppressed_series = suppressed_series.rename(columns={'suppressed_wins': 'total_wins'})
-                        
                         # Create overlay chart with beautiful formatting (matching carrier_dashboard_duckdb.py)
                         # Sort winners by total base wins (ascending for proper ranking)
                         winner_totals = base_series.groupby('winner')['total_wins'].sum().sort_values(ascending=False)
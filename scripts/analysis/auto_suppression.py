@@ -9,6 +9,9 @@ from typing import List, Tuple
 import duckdb
 import pandas as pd
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from tools.src.rolling import rolling_stats  # noqa: E402
+
 
 def get_store_glob(store_dir: str) -> str:
     if os.path.isdir(store_dir):
@@ -49,19 +52,14 @@ def national_z_windowed(daily: pd.DataFrame, window: int) -> pd.DataFrame:
     df['day_type'] = pd.to_datetime(df['d']).dt.dayofweek.map(lambda x: 'Sat' if x == 6 else ('Sun' if x == 0 else 'Weekday'))
     df = df.sort_values(['winner', 'day_type', 'd'])
 
-    def add_roll(g: pd.DataFrame):
-        s = g['share']
-        mu = s.rolling(window=window, min_periods=2).mean()
-        sig = s.rolling(window=window, min_periods=2).std(ddof=1)
-        z = (s - mu) / sig
-        g = g.copy()
-        g['mu_roll'] = mu
-        g['sigma_roll'] = sig
-        g['z_roll'] = z
-        return g
-
-    out = df.groupby(['winner', 'day_type'], group_keys=False).apply(add_roll)
-    return out[['d', 'winner', 'share', 'mu_roll', 'sigma_roll', 'z_roll', 'day_type']]
+    # Trailing `window` rows incl. the current one per (winner, day_type), min 2 values
+    stats = rolling_stats(df, ['winner', 'day_type'], 'd', 'share', {window: window - 1},
+                          include_current=True, names=('mu_roll', 'sigma_roll', 'n_roll'))
+    enough = stats['n_roll'] >= 2
+    df['mu_roll'] = stats['mu_roll'].where(enough)
+    df['sigma_roll'] = stats['sigma_roll'].where(enough)
+    df['z_roll'] = (pd.to_numeric(df['share'], errors='coerce') - df['mu_roll']) / df['sigma_roll']
+    return df[['d', 'winner', 'share', 'mu_roll', 'sigma_roll', 'z_roll', 'day_type']]
 
 
 def required_remove_to_z(W: float, T: float, mu: float, sigma: float, z_thresh: float) -> int:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark a full-window pair pull: db.query (pandas) vs db.query_arrow vs
+streaming per-date chunks (metrics.iter_pair_metrics).
+
+Builds a synthetic database per history length and pulls every pair-level
+row of the win cube, once per result format. Each pull runs in a fresh
+spawned process so peak RSS is that pull's own. The Arrow result is checked
+against the DataFrame via db.arrow_to_pandas, and the streamed per-winner
+daily totals against the same groupby on the DataFrame. For "stream",
+result_mb is the largest chunk held at once.
+
+Usage:
+    uv run scripts/bench/bench_arrow_query.py [--days 90 365] [--carriers 60]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing as mp
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_db import build_synthetic_db, load_script  # noqa: E402
+
+from tools import db  # noqa: E402
+from tools.src.metrics import pair_metrics, iter_pair_metrics  # noqa: E402
+
+
+FORMATS = ("pandas", "arrow", "stream")
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak RSS of this process in MB.
+
+    ru_maxrss survives fork+exec, so a spawned worker would report its
+    parent's peak; Linux's VmHWM is reset on exec. Falls back to
+    build_cubes_in_db.peak_rss_mb elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return load_script("scripts/build/build_cubes_in_db.py").peak_rss_mb()
+
+
+def stream_totals(db_path: str, ds: str, start: str, end: str):
+    """Per-(date, winner) wins from streamed daily chunks; also rows seen and largest chunk bytes"""
+    parts, rows, nbytes = [], 0, 0
+    for _, day in iter_pair_metrics(ds, False, start, end, db_path=db_path, by_date=True):
+        rows, nbytes = rows + day.num_rows, max(nbytes, day.nbytes)
+        parts.append(day.group_by(["the_date", "winner"]).aggregate([("pair_wins_current", "sum")]))
+    totals = db.arrow_to_pandas(pa.concat_tables(parts)).rename(columns={"pair_wins_current_sum": "wins"})
+    return totals.sort_values(["the_date", "winner"]).reset_index(drop=True), rows, nbytes
+
+
+def _pull(db_path: str, ds: str, start: str, end: str, fmt: str) -> dict:
+    """One full-window pull in this process"""
+    t0 = time.perf_counter()
+    if fmt == "stream":
+        totals, rows, nbytes = stream_totals(db_path, ds, start, end)
+        return {"seconds": time.perf_counter() - t0, "rows": rows, "mb": nbytes / 2**20,
+                "peak_rss_mb": peak_rss_mb()}
+    result = pair_metrics(ds, False, start, end, db_path=db_path, as_arrow=(fmt == "arrow"))
+    seconds = time.perf_counter() - t0
+    if fmt == "arrow":
+        rows, nbytes = result.num_rows, result.nbytes
+    else:
+        rows, nbytes = len(result), int(result.memory_usage(deep=True).sum())
+    return {"seconds": seconds, "rows": rows, "mb": nbytes / 2**20, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_isolated(db_path: str, ds: str, start: str, end: str, fmt: str) -> dict:
+    """_pull in a fresh spawned process with the result cache off"""
+    os.environ["SUPPRESSION_DB_CACHE_MB"] = "0"  # read by tools.db at import in the child
+    with mp.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_pull, (db_path, ds, start, end, fmt))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pandas vs Arrow query results")
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365])
+    parser.add_argument("--carriers", type=int, default=60)
+    parser.add_argument("--dmas", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic databases")
+    args = parser.parse_args(argv)
+
+    ds = "synthetic"
+    start_date = date(2024, 1, 1)
+    rows = []
+
+    for days in args.days:
+        root = tempfile.mkdtemp(prefix=f"arrow_bench_{days}d_")
+        try:
+            db_path = build_synthetic_db(root, days, carriers=args.carriers, dmas=args.dmas, blocks_per_dma=1, ds=ds)
+            start, end = str(start_date), str(start_date + timedelta(days=days - 1))
+
+            runs = {fmt: run_isolated(db_path, ds, start, end, fmt) for fmt in FORMATS}
+
+            expected = pair_metrics(ds, False, start, end, db_path=db_path)
+            got = db.arrow_to_pandas(pair_metrics(ds, False, start, end, db_path=db_path, as_arrow=True))
+            pd.testing.assert_frame_equal(got, expected)
+            streamed, _, _ = stream_totals(db_path, ds, start, end)
+            grouped = (expected.groupby(["the_date", "winner"], as_index=False)["pair_wins_current"].sum()
+                       .rename(columns={"pair_wins_current": "wins"}))
+            pd.testing.assert_frame_equal(streamed, grouped, check_dtype=False)
+
+            for fmt in FORMATS:
+                rows.append({
+                    "days": days,
+                    "format": fmt,
+                    "rows": runs[fmt]["rows"],
+                    "seconds": round(runs[fmt]["seconds"], 3),
+                    "result_mb": round(runs[fmt]["mb"], 1),
+                    "peak_rss_mb": round(runs[fmt]["peak_rss_mb"], 1),
+                })
+        finally:
+            db.close_pool()
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+
+    print("\nFull-window pair_metrics pull, one process per run (results verified equal)")
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark cube dimension encodings (VARCHAR vs ENUM-keyed carriers/DMAs/states).
+
+Builds one synthetic carrier_data database, then for every encoding
+(build_cubes_in_db.CUBE_ENCODINGS) builds the 4 cubes into a copy of it and
+times the query shapes the detectors run:
+
+  winner_90d   one winner over a 90-day window (graphs, rolling views)
+  date_all     one date across all winners (national outlier scan)
+  h2h_pair     one winner/loser pair over the full history (pair drill-down)
+  h2h_groupby  wins per winner/loser over the full history (H2H matrix)
+  pair_window  14-day rolling mean per pair-DMA (pair outlier baseline)
+
+Reports build time, database size and best-of-N query time per encoding
+and checks every encoding returns the same results (ENUM columns decoded
+as tools.db does).
+
+Usage:
+    uv run scripts/bench/bench_cube_encoding.py [--days 365] [--carriers 60] [--repeat 5]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from datetime import date, timedelta
+
+import duckdb
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_db import build_synthetic_db, load_script  # noqa: E402
+
+
+cubes = load_script("scripts/build/build_cubes_in_db.py")
+
+QUERY_SHAPES = {
+    "winner_90d": """
+        SELECT the_date, SUM(total_wins) AS wins
+        FROM {table}
+        WHERE winner = $winner AND the_date BETWEEN $start AND $end
+        GROUP BY the_date ORDER BY the_date
+    """,
+    "date_all": """
+        SELECT winner, SUM(total_wins) AS wins
+        FROM {table}
+        WHERE the_date = $end
+        GROUP BY winner ORDER BY winner
+    """,
+    "h2h_pair": """
+        SELECT the_date, SUM(total_wins) AS wins
+        FROM {table}
+        WHERE winner = $winner AND loser = $loser
+        GROUP BY the_date ORDER BY the_date
+    """,
+    "h2h_groupby": """
+        SELECT winner, loser, SUM(total_wins) AS wins
+        FROM {table}
+        GROUP BY winner, loser ORDER BY winner, loser
+    """,
+    "pair_window": """
+        SELECT winner, loser, dma_name, the_date,
+            AVG(total_wins) OVER (
+                PARTITION BY winner, loser, dma_name ORDER BY the_date
+                ROWS BETWEEN 14 PRECEDING AND 1 PRECEDING
+            ) AS mu
+        FROM {table}
+        WHERE the_date BETWEEN $start AND $end
+        QUALIFY the_date = $end
+        ORDER BY winner, loser, dma_name
+    """,
+}
+
+
+def build_variant(base_db: str, db_path: str, ds: str, encoding: str) -> float:
+    """Copy the carrier_data-only database and build its cubes; return seconds"""
+    shutil.copyfile(base_db, db_path)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        ok = cubes.build_dataset_cubes(db_path, ds, encoding=encoding)
+    elapsed = time.perf_counter() - t0
+    if not ok:
+        raise RuntimeError(f"Cube build failed for encoding={encoding}")
+    con = duckdb.connect(db_path)
+    try:
+        con.execute("DROP TABLE carrier_data")  # size the cubes, not the source
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+    return elapsed
+
+
+def decoded(df: pd.DataFrame) -> pd.DataFrame:
+    """ENUM (Categorical) columns as plain strings, as tools.db returns them"""
+    for col in df.columns[[isinstance(t, pd.CategoricalDtype) for t in df.dtypes]]:
+        df[col] = df[col].astype(object)
+    return df
+
+
+def time_shapes(db_path: str, table: str, params: dict, repeat: int):
+    """Best-of-`repeat` seconds and last result per query shape"""
+    timings, results = {}, {}
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        for shape, sql in QUERY_SHAPES.items():
+            sql = sql.format(table=table)
+            used = {k: v for k, v in params.items() if f"${k}" in sql}
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                results[shape] = con.execute(sql, used).df()
+                best = min(best, time.perf_counter() - t0)
+            timings[shape] = best
+    finally:
+        con.close()
+    return timings, {shape: decoded(df) for shape, df in results.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cube dimension encodings")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--carriers", type=int, default=60)
+    parser.add_argument("--dmas", type=int, default=10)
+    parser.add_argument("--window", type=int, default=90, help="Winner query window in days (default: 90)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic databases")
+    args = parser.parse_args(argv)
+
+    ds = "synthetic"
+    end = date(2024, 1, 1) + timedelta(days=args.days - 1)
+    params = {
+        "winner": "Carrier 005",
+        "loser": "Carrier 006",
+        "start": end - timedelta(days=args.window - 1),
+        "end": end,
+    }
+    table = f"{ds}_win_non_mover_cube"
+
+    root = tempfile.mkdtemp(prefix="cube_encoding_bench_")
+    rows = []
+    reference = None
+    try:
+        base_db = build_synthetic_db(
+            root, args.days, carriers=args.carriers, dmas=args.dmas, ds=ds, build_cubes=False
+        )
+        for encoding in cubes.CUBE_ENCODINGS:
+            db_path = os.path.join(root, f"{encoding}.db")
+            build_s = build_variant(base_db, db_path, ds, encoding)
+            timings, results = time_shapes(db_path, table, params, args.repeat)
+
+            if reference is None:
+                reference = results
+            for shape, df in results.items():
+                pd.testing.assert_frame_equal(df, reference[shape], check_exact=False, rtol=1e-9)
+
+            row = {
+                "encoding": encoding,
+                "build_s": round(build_s, 2),
+                "size_mb": round(os.path.getsize(db_path) / 1e6, 1),
+            }
+            row.update({f"{shape}_ms": round(t * 1000, 1) for shape, t in timings.items()})
+            rows.append(row)
+    finally:
+        if args.keep:
+            print(f"[INFO] Databases kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"\nCube encoding benchmark: {table}, {args.days} days, {args.carriers} carriers "
+          f"(best of {args.repeat}, results verified equal)")
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
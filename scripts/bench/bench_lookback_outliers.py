@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark outliers.lookback_outliers: grouped rolling engine vs per-date loop.
+
+This is the national outlier scan behind compute_national_outliers in
+carrier_suppression_dashboard.py. Builds one synthetic database, derives the
+daily (d, winner, share) frame the dashboard feeds the scan, then runs both
+engines per lookback length and DOW mode, checks that they return the same
+rows and reports wall time.
+
+Usage:
+    uv run scripts/bench/bench_lookback_outliers.py [--lookbacks 30 90 365] [--days 730]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+from tools import db  # noqa: E402
+from tools.src.outliers import lookback_outliers, LOOKBACK_ENGINES  # noqa: E402
+
+
+def daily_shares(db_path: str, ds: str, winners: int) -> pd.DataFrame:
+    """Daily national share of the top `winners` carriers (compute_national_outliers' input)"""
+    return db.query(f"""
+        WITH win AS (
+            SELECT the_date AS d, winner, SUM(total_wins) AS W
+            FROM {ds}_win_non_mover_cube
+            GROUP BY 1, 2
+        ), tot AS (
+            SELECT d, SUM(W) AS T FROM win GROUP BY 1
+        ), top AS (
+            SELECT winner FROM win GROUP BY 1 ORDER BY SUM(W) DESC LIMIT {int(winners)}
+        )
+        SELECT w.d, w.winner, w.W, t.T, w.W / NULLIF(t.T, 0) AS share
+        FROM win w JOIN tot t USING (d) JOIN top USING (winner)
+        ORDER BY 1, 2
+    """, db_path)
+
+
+def time_engine(daily: pd.DataFrame, lookback: int, same_dow: bool, z: float, engine: str, repeat: int):
+    """Run one engine `repeat` times; return (best seconds, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = lookback_outliers(daily, lookback, same_dow, z, engine=engine)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lookback_outliers engines")
+    parser.add_argument("--lookbacks", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--days", type=int, default=730, help="History length in days (default: 730)")
+    parser.add_argument("--carriers", type=int, default=30)
+    parser.add_argument("--winners", type=int, default=20, help="Carriers scanned (default: 20)")
+    parser.add_argument("--z", type=float, default=1.5)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic database")
+    args = parser.parse_args(argv)
+
+    ds = "synthetic"
+    root = tempfile.mkdtemp(prefix="lookback_bench_")
+    try:
+        db_path = build_synthetic_db(root, args.days, carriers=args.carriers, dmas=4, blocks_per_dma=1, ds=ds)
+        daily = daily_shares(db_path, ds, args.winners)
+    finally:
+        db.close_pool()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    rows = []
+    for lookback in args.lookbacks:
+        for same_dow in (False, True):
+            timings, results = {}, {}
+            for engine in LOOKBACK_ENGINES:
+                timings[engine], results[engine] = time_engine(daily, lookback, same_dow, args.z, engine, args.repeat)
+
+            pd.testing.assert_frame_equal(results["rolling"], results["loop"], check_exact=False, rtol=1e-9)
+
+            rows.append({
+                "lookback_days": lookback,
+                "same_dow": same_dow,
+                "outliers": len(results["rolling"]),
+                "loop_s": round(timings["loop"], 3),
+                "rolling_s": round(timings["rolling"], 3),
+                "speedup": round(timings["loop"] / max(timings["rolling"], 1e-9), 1),
+            })
+
+    print("\nlookback_outliers engine benchmark: %d winners x %d days (best of %d, results verified equal)"
+          % (daily["winner"].nunique(), daily["d"].nunique(), args.repeat))
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared rolling z-score kernel (tools.src.rolling).
+
+Builds a long-form series per group count (one row per group per same-DOW
+week), then computes the 28/14/4 tiers three ways and reports wall time:
+
+- kernel: rolling_stats() + select_tier() in NumPy
+- duckdb: rolling_stats_sql() + tier_sql() over the same frame
+- pandas: groupby().rolling() per window, the pattern the detectors used
+  before the kernel (skipped above --pandas-max groups: it is per group)
+
+Kernel output is checked against DuckDB (and pandas where run).
+
+Usage:
+    uv run scripts/bench/bench_rolling_kernel.py [--groups 50 500 5000 50000 500000] [--weeks 16]
+"""
+import os
+import sys
+import time
+import argparse
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from tools.src.rolling import (  # noqa: E402
+    TIERED_WINDOWS, min_periods_for, min_periods_sql, rolling_stats, rolling_stats_sql, select_tier, tier_sql,
+)
+
+KEYS = ["winner", "day_of_week"]
+WINDOWS = {w: w - 1 for w in TIERED_WINDOWS}
+
+
+def make_series(groups: int, weeks: int, seed: int = 7) -> pd.DataFrame:
+    """`groups` (winner, day_of_week) series of `weeks` rows each, shuffled, ~2% NULL"""
+    rng = np.random.default_rng(seed)
+    g = np.repeat(np.arange(groups), weeks)
+    week = np.tile(np.arange(weeks), groups)
+    dow = g % 7
+    df = pd.DataFrame({
+        "winner": "c" + (g // 7).astype(str),
+        "day_of_week": dow,
+        "the_date": pd.Timestamp("2024-01-07") + pd.to_timedelta(week * 7 + dow, unit="D"),
+        "value": rng.gamma(4.0, 50.0, len(g)).round(),
+    })
+    df.loc[rng.random(len(df)) < 0.02, "value"] = np.nan
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def run_kernel(df: pd.DataFrame) -> pd.DataFrame:
+    stats = rolling_stats(df, KEYS, "the_date", "value", WINDOWS)
+    return select_tier(stats, min_periods_for(df["day_of_week"]))
+
+
+def run_duckdb(df: pd.DataFrame) -> pd.DataFrame:
+    con = duckdb.connect()
+    try:
+        con.register("series", df.assign(rid=np.arange(len(df))))
+        return con.execute(f"""
+            WITH r AS (
+                SELECT rid, day_of_week,
+                    {rolling_stats_sql("value", KEYS, "the_date", WINDOWS)}
+                FROM series
+            )
+            SELECT rid,
+                {tier_sql("avg_{w}d", min_periods_sql())} AS mu,
+                {tier_sql("std_{w}d", min_periods_sql())} AS sigma,
+                {tier_sql("n_{w}d", min_periods_sql())} AS n_periods,
+                {tier_sql("{w}", min_periods_sql())} AS selected_window
+            FROM r
+            ORDER BY rid
+        """).df().drop(columns="rid")
+    finally:
+        con.close()
+
+
+def run_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-window groupby().rolling() with shift(1): one pass per window"""
+    s = df.sort_values(KEYS + ["the_date"])
+    grouped = s.groupby(KEYS, sort=False)["value"]
+    prev = grouped.shift(1)
+    stats = {}
+    for w, preceding in WINDOWS.items():
+        roll = prev.groupby([s[k] for k in KEYS], sort=False).rolling(preceding, min_periods=1)
+        stats[f"avg_{w}d"] = roll.mean().to_numpy()
+        stats[f"std_{w}d"] = roll.std().to_numpy()
+        stats[f"n_{w}d"] = roll.count().to_numpy()
+    stats = pd.DataFrame(stats, index=s.index).reindex(df.index)
+    return select_tier(stats, min_periods_for(df["day_of_week"]))
+
+
+def best_of(fn, df, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def assert_same_tiers(left: pd.DataFrame, right: pd.DataFrame) -> None:
+    exact = ["n_periods", "selected_window"]
+    pd.testing.assert_frame_equal(left[exact].reset_index(drop=True).astype(float),
+                                  right[exact].reset_index(drop=True).astype(float))
+    floats = ["mu", "sigma"]
+    pd.testing.assert_frame_equal(left[floats].reset_index(drop=True), right[floats].reset_index(drop=True),
+                                  check_exact=False, rtol=1e-9, check_dtype=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rolling z-score kernel")
+    parser.add_argument("--groups", type=int, nargs="+", default=[50, 500, 5000, 50000, 500000])
+    parser.add_argument("--weeks", type=int, default=16, help="Rows per group (default: 16)")
+    parser.add_argument("--pandas-max", type=int, default=50000,
+                        help="Largest group count to run the pandas baseline on (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for groups in args.groups:
+        df = make_series(groups, args.weeks)
+        t_kernel, kernel = best_of(run_kernel, df, args.repeat)
+        t_duck, duck = best_of(run_duckdb, df, args.repeat)
+        assert_same_tiers(kernel, duck)
+        row = {
+            "groups": groups,
+            "rows": len(df),
+            "kernel_s": round(t_kernel, 3),
+            "duckdb_s": round(t_duck, 3),
+            "pandas_s": None,
+            "vs_pandas": None,
+        }
+        if groups <= args.pandas_max:
+            t_pandas, pandas_result = best_of(run_pandas, df, 1)
+            assert_same_tiers(kernel, pandas_result)
+            row["pandas_s"] = round(t_pandas, 3)
+            row["vs_pandas"] = round(t_pandas / max(t_kernel, 1e-9), 1)
+        rows.append(row)
+
+    print("\nrolling kernel benchmark (best of %d, results verified equal)" % args.repeat)
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
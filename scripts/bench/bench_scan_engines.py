@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark scan_base_outliers: windowed engine vs legacy self-join.
+
+Builds a synthetic database per history length, runs both engines over the
+trailing graph window (default 90 days), checks that the results agree and
+reports wall time.
+
+Usage:
+    uv run scripts/bench/bench_scan_engines.py [--days 90 365 730] [--repeat 3]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+from tools.src.plan import scan_base_outliers, SCAN_ENGINES  # noqa: E402
+
+
+def time_engine(db_path: str, ds: str, engine: str, start: str, end: str, repeat: int):
+    """Run one engine `repeat` times; return (best seconds, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = scan_base_outliers(
+            ds=ds,
+            mover_ind=False,
+            start_date=start,
+            end_date=end,
+            z_threshold=-1e9,  # return every scored row so both engines do full work
+            egregious_threshold=-10**9,
+            db_path=db_path,
+            engine=engine,
+        )
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def assert_same_scan(left: pd.DataFrame, right: pd.DataFrame) -> None:
+    """
+    Check two scan results agree.
+
+    Keys, windows and counts must match exactly and floats to 1e-9. Neither
+    engine sums same-DOW history in a fixed order (the self-join is not
+    bit-stable across thread counts either), so `impact` may land on the
+    other side of a .5 rounding tie: allow +/-1 there.
+    """
+    keys = ["the_date", "winner"]
+    left = left.sort_values(keys).reset_index(drop=True)
+    right = right.sort_values(keys).reset_index(drop=True)
+    exact = keys + ["n_periods", "selected_window", "day_of_week"]
+    pd.testing.assert_frame_equal(left[exact], right[exact])
+    floats = ["nat_z_score", "nat_total_wins", "nat_mu_wins", "nat_share_current"]
+    pd.testing.assert_frame_equal(left[floats], right[floats], check_exact=False, rtol=1e-9)
+    assert (left["impact"] - right["impact"]).abs().max() <= 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan_base_outliers engines")
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 730])
+    parser.add_argument("--carriers", type=int, default=60)
+    parser.add_argument("--dmas", type=int, default=10)
+    parser.add_argument("--window", type=int, default=90, help="Graph window in days (default: 90)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep synthetic databases")
+    args = parser.parse_args(argv)
+
+    ds = "synthetic"
+    start_date = date(2024, 1, 1)
+    rows = []
+
+    for days in args.days:
+        root = tempfile.mkdtemp(prefix=f"scan_bench_{days}d_")
+        try:
+            db_path = build_synthetic_db(root, days, carriers=args.carriers, dmas=args.dmas, blocks_per_dma=1, ds=ds)
+            end = start_date + timedelta(days=days - 1)
+            start = end - timedelta(days=min(days, args.window) - 1)
+
+            timings = {}
+            results = {}
+            for engine in SCAN_ENGINES:
+                timings[engine], results[engine] = time_engine(
+                    db_path, ds, engine, str(start), str(end), args.repeat
+                )
+
+            assert_same_scan(results["window"], results["self_join"])
+
+            rows.append({
+                "days": days,
+                "carriers": args.carriers,
+                "rows_scored": len(results["window"]),
+                "self_join_s": round(timings["self_join"], 3),
+                "window_s": round(timings["window"], 3),
+                "speedup": round(timings["self_join"] / max(timings["window"], 1e-9), 1),
+            })
+        finally:
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+
+    print("\nscan_base_outliers engine benchmark (best of %d, results verified equal)" % args.repeat)
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Synthetic database builder for benchmarks.
+
+Generates a `carrier_data` table with the same schema as
+build_suppression_db.py (winner/loser/DMA/census block rows per day) entirely
+inside DuckDB, then builds the standard cube tables with build_cubes_in_db.py.
+
+The database is laid out as <root>/data/databases/duck_suppression.db so the
+path assertions in tools.src.plan accept it.
+
+Usage:
+    uv run scripts/bench/synthetic_db.py --days 365 --carriers 60 --root /tmp/bench
+"""
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import tempfile
+
+import duckdb
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def load_script(rel_path: str):
+    """Import a module from scripts/ by path (scripts/ is not a package)"""
+    path = os.path.join(PROJECT_ROOT, rel_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_db_path(root: str) -> str:
+    """Database path under root that satisfies the data/databases/ convention"""
+    return os.path.join(root, "data", "databases", "duck_suppression.db")
+
+
+def create_carrier_data(
+    con,
+    days: int,
+    carriers: int = 60,
+    losers_per_winner: int = 8,
+    dmas: int = 10,
+    blocks_per_dma: int = 4,
+    ds: str = "synthetic",
+    start_date: str = "2024-01-01",
+) -> int:
+    """
+    Create `carrier_data` with deterministic pseudo-random volumes.
+
+    Rows per day ~= carriers * losers_per_winner * dmas * blocks_per_dma * 2
+    (both mover segments). Carrier volume decays with rank so top-N ordering
+    is stable, weekends run lighter and ~0.5% of rows are 8x spikes.
+    """
+    con.execute("DROP TABLE IF EXISTS carrier_data")
+    con.execute(f"""
+    CREATE TABLE carrier_data AS
+    WITH dates AS (
+        SELECT (DATE '{start_date}' + CAST(i AS INTEGER)) AS the_date
+        FROM range({days}) t(i)
+    ),
+    grid AS (
+        SELECT
+            d.the_date,
+            w.w,
+            (w.w + 1 + l.l) % {carriers} AS l,
+            m.m,
+            b.b,
+            mv.mover_ind
+        FROM dates d
+        CROSS JOIN range({carriers}) w(w)
+        CROSS JOIN range({losers_per_winner}) l(l)
+        CROSS JOIN range({dmas}) m(m)
+        CROSS JOIN range({blocks_per_dma}) b(b)
+        CROSS JOIN (VALUES (TRUE), (FALSE)) mv(mover_ind)
+    ),
+    noisy AS (
+        SELECT
+            *,
+            (hash(the_date, w, l, m, b, mover_ind) % 1000000) / 1000000.0 AS u
+        FROM grid
+    )
+    SELECT
+        the_date,
+        '{ds}' AS ds,
+        mover_ind,
+        printf('Carrier %03d', w) AS winner,
+        printf('Carrier %03d', l) AS loser,
+        CAST(500 + m AS VARCHAR) AS dma,
+        printf('DMA %02d', m) AS dma_name,
+        printf('S%d', m % 5) AS state,
+        ROUND(
+            (40.0 / (1 + w)) * (CASE WHEN dayofweek(the_date) IN (0, 6) THEN 0.6 ELSE 1.0 END)
+            * (0.5 + u) * (CASE WHEN u > 0.995 THEN 8 ELSE 1 END),
+            2
+        ) AS adjusted_wins,
+        ROUND((30.0 / (1 + l)) * (0.5 + (1 - u)), 2) AS adjusted_losses,
+        printf('%03d%05d', m, b) AS census_blockid,
+        CAST(strftime('%Y', the_date) AS INTEGER) AS year,
+        CAST(strftime('%m', the_date) AS INTEGER) AS month,
+        CAST(strftime('%d', the_date) AS INTEGER) AS day,
+        CAST(strftime('%w', the_date) AS INTEGER) AS day_of_week
+    FROM noisy
+    WHERE u > 0.05  -- sparse pairs: ~5% of cells missing on any given day
+    """)
+    return con.execute("SELECT COUNT(*) FROM carrier_data").fetchone()[0]
+
+
+def build_synthetic_db(
+    root: str,
+    days: int,
+    carriers: int = 60,
+    losers_per_winner: int = 8,
+    dmas: int = 10,
+    blocks_per_dma: int = 4,
+    ds: str = "synthetic",
+    build_cubes: bool = True,
+) -> str:
+    """
+    Build a synthetic database (carrier_data + cubes) under root.
+
+    Returns:
+        Path to the database file
+    """
+    db_path = synthetic_db_path(root)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    t0 = time.perf_counter()
+    con = duckdb.connect(db_path)
+    try:
+        rows = create_carrier_data(con, days, carriers, losers_per_winner, dmas, blocks_per_dma, ds)
+    finally:
+        con.close()
+    print(f"[INFO] carrier_data: {rows:,} rows ({days} days) in {time.perf_counter() - t0:.1f}s")
+
+    if build_cubes:
+        cubes = load_script("scripts/build/build_cubes_in_db.py")
+        if not cubes.build_all_cube_tables(db_path, ds):
+            raise RuntimeError(f"Failed to build cube tables in {db_path}")
+
+    return db_path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build a synthetic suppression database for benchmarks")
+    parser.add_argument("--root", default=None, help="Root directory (default: new temp dir)")
+    parser.add_argument("--days", type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument("--carriers", type=int, default=60, help="Number of carriers (default: 60)")
+    parser.add_argument("--losers", type=int, default=8, help="Losers per winner (default: 8)")
+    parser.add_argument("--dmas", type=int, default=10, help="Number of DMAs (default: 10)")
+    parser.add_argument("--blocks", type=int, default=4, help="Census blocks per DMA (default: 4)")
+    parser.add_argument("--ds", default="synthetic", help="Dataset name (default: synthetic)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = args.root or tempfile.mkdtemp(prefix="suppression_bench_")
+    db_path = build_synthetic_db(
+        root, args.days, args.carriers, args.losers, args.dmas, args.blocks, args.ds
+    )
+    print(f"[SUCCESS] Synthetic database: {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
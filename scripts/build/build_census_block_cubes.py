@@ -5,6 +5,12 @@ Build census block-level cube tables for granular outlier detection.
 Usage:
     python build_census_block_cubes.py --ds gamoshi
     python build_census_block_cubes.py --all
+    python build_census_block_cubes.py --all --layout winner --no-indexes
+    python build_census_block_cubes.py --summaries-only
+
+Each census cube gets its H2H summary tables (pair x block, pair x date,
+DMA, state and pair totals, see tools.src.census) built right after it, so
+the census dashboard never aggregates the raw cube.
 """
 import argparse
 import duckdb
@@ -12,9 +18,32 @@ import sys
 from pathlib import Path
 import time
 
+# Add project root to path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from tools.src.census import build_summary_tables
+
 DB_PATH = "data/databases/duck_suppression.db"
 PARQUET_STORE = "duckdb_partitioned_store"
 
+# Physical sort order of a census cube (zone maps prune on the leading columns)
+CENSUS_LAYOUTS = {
+    'date': ['the_date', 'state', 'dma_name', 'census_blockid', 'winner', 'loser'],
+    'winner': ['winner', 'the_date', 'loser', 'state', 'dma_name', 'census_blockid'],
+    'none': [],
+}
+
+CENSUS_INDEXES = [
+    ('date', 'the_date'),
+    ('block', 'census_blockid'),
+    ('state', 'state'),
+    ('dma', 'dma_name'),
+    ('winner', 'winner'),
+    ('loser', 'loser'),
+    ('h2h', 'winner, loser'),
+]
+
 
 def get_available_datasets(con):
     """Get list of datasets from partitioned parquet store."""
@@ -31,7 +60,7 @@ def get_available_datasets(con):
     return sorted(datasets)
 
 
-def build_census_block_cube(con, ds, mover_ind, metric_type):
+def build_census_block_cube(con, ds, mover_ind, metric_type, layout='date', create_indexes=True):
     """
     Build census block-level cube for a specific dataset, mover type, and metric.
     
@@ -40,7 +69,12 @@ def build_census_block_cube(con, ds, mover_ind, metric_type):
         ds: Dataset name
         mover_ind: True for movers, False for non-movers
         metric_type: 'win' or 'loss'
+        layout: Sort order of the table (see CENSUS_LAYOUTS)
+        create_indexes: Whether to create the per-column indexes
     """
+    if layout not in CENSUS_LAYOUTS:
+        raise ValueError(f"Unknown census cube layout '{layout}' (expected one of {', '.join(CENSUS_LAYOUTS)})")
+    order_by = ("ORDER BY " + ", ".join(CENSUS_LAYOUTS[layout])) if CENSUS_LAYOUTS[layout] else ""
     mover_str = 'mover' if mover_ind else 'non_mover'
     table_name = f"{ds}_{metric_type}_{mover_str}_census_cube"
     
@@ -78,7 +112,7 @@ def build_census_block_cube(con, ds, mover_ind, metric_type):
         COUNT(*) as record_count
     FROM read_parquet('{parquet_path}')
     GROUP BY the_date, primary_geoid, state, dma_name, winner, loser
-    ORDER BY the_date, state, dma_name, census_blockid, winner, loser
+    {order_by}
     """
     
     print("[INFO] Executing aggregation query...")
@@ -103,17 +137,17 @@ def build_census_block_cube(con, ds, mover_ind, metric_type):
     print(f"[INFO] Created table with {stats[8]:,} rows in {elapsed:.2f}s")
     
     # Create indexes for fast lookups
-    print("[INFO] Creating indexes...")
-    idx_start = time.time()
-    con.execute(f"CREATE INDEX idx_{table_name}_date ON {table_name}(the_date)")
-    con.execute(f"CREATE INDEX idx_{table_name}_block ON {table_name}(census_blockid)")
-    con.execute(f"CREATE INDEX idx_{table_name}_state ON {table_name}(state)")
-    con.execute(f"CREATE INDEX idx_{table_name}_dma ON {table_name}(dma_name)")
-    con.execute(f"CREATE INDEX idx_{table_name}_winner ON {table_name}(winner)")
-    con.execute(f"CREATE INDEX idx_{table_name}_loser ON {table_name}(loser)")
-    con.execute(f"CREATE INDEX idx_{table_name}_h2h ON {table_name}(winner, loser)")
-    idx_elapsed = time.time() - idx_start
-    print(f"[INFO] Indexes created in {idx_elapsed:.2f}s")
+    if create_indexes:
+        print("[INFO] Creating indexes...")
+        idx_start = time.time()
+        for suffix, cols in CENSUS_INDEXES:
+            con.execute(f"CREATE INDEX idx_{table_name}_{suffix} ON {table_name}({cols})")
+        idx_elapsed = time.time() - idx_start
+        print(f"[INFO] Indexes created in {idx_elapsed:.2f}s")
+    else:
+        print(f"[INFO] Skipping indexes (layout: {layout})")
+    
+    build_census_summaries(con, table_name, metric_type)
     
     print(f"[SUCCESS] Table: {table_name}")
     print(f"  Stats:")
@@ -129,7 +163,36 @@ def build_census_block_cube(con, ds, mover_ind, metric_type):
     return True
 
 
-def build_all_census_cubes(ds_list, db_path=DB_PATH):
+def build_census_summaries(con, table_name, metric_type):
+    """(Re)build the H2H summary tables of one census cube."""
+    print("[INFO] Building H2H summary tables...")
+    sum_start = time.time()
+    rows = build_summary_tables(con, table_name, metric_type)
+    print(f"[INFO] Summaries built in {time.time() - sum_start:.2f}s: "
+          + ", ".join(f"{name} ({n:,} rows)" for name, n in rows.items()))
+
+
+def build_existing_summaries(db_path=DB_PATH):
+    """Build summary tables for every census cube already in the database."""
+    con = duckdb.connect(db_path)
+    try:
+        tables = sorted(
+            row[0] for row in con.execute("SELECT table_name FROM information_schema.tables").fetchall()
+            if row[0].endswith('_census_cube')
+        )
+        for table_name in tables:
+            # {ds}_{metric}_{mover|non_mover}_census_cube
+            prefix = table_name[:-len('_census_cube')]
+            prefix = prefix[:-len('_non_mover')] if prefix.endswith('_non_mover') else prefix[:-len('_mover')]
+            metric_type = prefix.rsplit('_', 1)[1]
+            print(f"\n[INFO] Census cube: {table_name}")
+            build_census_summaries(con, table_name, metric_type)
+    finally:
+        con.close()
+    return len(tables)
+
+
+def build_all_census_cubes(ds_list, db_path=DB_PATH, layout='date', create_indexes=True):
     """Build all census block cube combinations for given datasets."""
     print(f"[INFO] Building census block cubes for {len(ds_list)} dataset(s): {', '.join(ds_list)}")
     
@@ -154,7 +217,7 @@ def build_all_census_cubes(ds_list, db_path=DB_PATH):
         
         for mover_ind, metric_type in cubes:
             try:
-                build_census_block_cube(con, ds, mover_ind, metric_type)
+                build_census_block_cube(con, ds, mover_ind, metric_type, layout, create_indexes)
                 success_count += 1
             except Exception as e:
                 print(f"[ERROR] Failed to build cube: {e}")
@@ -183,9 +246,20 @@ def main():
     parser.add_argument('--ds', help='Dataset name (e.g., gamoshi)')
     parser.add_argument('--all', action='store_true', help='Build cubes for all available datasets')
     parser.add_argument('--list', action='store_true', help='List available datasets')
+    parser.add_argument('--layout', choices=list(CENSUS_LAYOUTS), default='date',
+                        help='Physical sort order: date (default) or winner clustering, or none')
+    parser.add_argument('--no-indexes', action='store_true',
+                        help='Skip the per-column indexes and rely on zone maps from --layout')
+    parser.add_argument('--summaries-only', action='store_true',
+                        help='Only (re)build the H2H summary tables of the census cubes already in the database')
     
     args = parser.parse_args()
     
+    if args.summaries_only:
+        n = build_existing_summaries(args.db)
+        print(f"\n[SUCCESS] Summaries built for {n} census cube(s)")
+        return
+    
     # Connect to get available datasets
     con = duckdb.connect(args.db)
     available_datasets = get_available_datasets(con)
@@ -215,7 +289,7 @@ def main():
         sys.exit(1)
     
     # Build cubes
-    success = build_all_census_cubes(datasets, args.db)
+    success = build_all_census_cubes(datasets, args.db, args.layout, not args.no_indexes)
     sys.exit(0 if success else 1)
 
 
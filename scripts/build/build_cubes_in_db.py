@@ -11,76 +11,299 @@ Creates 4 cube tables per dataset (ds):
 Each cube table aggregates on all indexed dimensions and lives inside
 the database - no separate parquet files needed!
 
+Next to each cube, {ds}_{metric}_{mover}_first_seen holds one row per
+(winner, loser, dma_name) with its first and last dates, number of dates
+and the first/most recent FIRST_SEEN_DATES appearance dates, so
+first-appearance and rare-pair checks are lookups instead of history scans.
+
+Rollups of each cube ({ds}_{metric}_{mover}_national and _state, see
+CUBE_ROLLUPS) let national and state queries skip re-aggregating the
+pair x DMA rows; tools.db.cube_source routes queries to them.
+
+With --encoding enum, dim_carrier / dim_dma / dim_state map each carrier,
+DMA and state to an integer id and the cubes store those ids as ENUMs (see
+CUBE_DIMENSIONS). Names still read back as strings, so queries are unchanged.
+
 Usage:
-    uv run build_cubes_in_db.py [--db duck_suppression.db] [--ds gamoshi]
+    uv run build_cubes_in_db.py [--db duck_suppression.db] [--ds gamoshi] [--append]
+                                [--layout date|winner|none] [--no-indexes]
+                                [--encoding varchar|enum]
+
+--append re-aggregates only the dates that build_suppression_db.py --append
+rewrote since each cube was last built (tracked in build_cube_state).
+
+--layout picks the physical sort order so DuckDB's per-row-group min/max
+zone maps can prune scans; --no-indexes skips the ART indexes, which cost
+build time and file size but rarely help range scans
+(see scripts/bench/bench_cube_layouts.py).
 """
 import os
 import sys
+import time
+import shutil
 import argparse
-from typing import Optional
+import tempfile
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Optional
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
-def build_cube_table(
-    db_path: str,
-    ds: str,
-    mover_ind: bool,
-    metric: str,  # 'win' or 'loss'
-) -> bool:
+
+# Written by build_suppression_db.py: one row per build, `dates` = rewritten dates
+BUILD_LOG_TABLE = "build_log"
+
+# Last build_log entry each cube has been brought up to date with
+CUBE_STATE_TABLE = "build_cube_state"
+
+# Physical sort order of a cube table. DuckDB keeps min/max zone maps per row
+# group, so clustering on the leading filter column lets scans skip row groups:
+#   date   - one date across all winners, date-range scans (default)
+#   winner - one winner (or H2H pair) over a date window
+#   none   - no ORDER BY (whatever order the aggregation emits)
+CUBE_LAYOUTS = {
+    "date": ["the_date", "winner", "loser", "dma_name"],
+    "winner": ["winner", "the_date", "loser", "dma_name"],
+    "none": [],
+}
+DEFAULT_LAYOUT = "date"
+
+# Rollup tables kept next to each cube: {ds}_{metric}_{mover}_{rollup} holds
+# the metric summed over every dimension but these. The national rollup also
+# carries the day's market_total. Mirrored by tools.db.CUBE_ROLLUPS.
+CUBE_ROLLUPS = {
+    "national": ["the_date", "day_of_week", "winner"],
+    "state": ["the_date", "day_of_week", "state", "winner", "loser"],
+}
+
+# Appearance dates kept at each end of a pair's history in the first_seen
+# tables (rare-pair checks look at the first 5)
+FIRST_SEEN_DATES = 8
+
+# Storage of the carrier/DMA/state columns: plain VARCHAR, or 'enum' -
+# integer keys into the dimension tables below, stored as DuckDB ENUMs so
+# joins, GROUP BYs and window partitions hash integer codes (1 byte up to 255
+# values, 2 bytes up to 65535) while every query still reads and filters
+# names. It speeds up grouping, not storage: DuckDB already dictionary-
+# compresses VARCHAR, so the file barely shrinks (see
+# scripts/bench/bench_cube_encoding.py)
+CUBE_ENCODINGS = ("varchar", "enum")
+DEFAULT_ENCODING = "varchar"
+
+# dim_{name}({name}_id, {value}) per dimension, built from the listed
+# carrier_data columns. Ids are append-only: the first build ranks values by
+# name and later appends give new values the next id, so existing rows never
+# change. ENUM order (ORDER BY, MIN/MAX, comparisons) is id order - VARCHAR
+# order only among the values of the first build. The ENUM type {name}_key
+# lists the values in id order. Mirrored by tools.db.CUBE_DIMENSIONS.
+CUBE_DIMENSIONS = {
+    "carrier": ("carrier", ["winner", "loser"]),
+    "dma": ("dma_name", ["dma_name"]),
+    "state": ("state", ["state"]),
+}
+
+
+def layout_order_by(layout: str, layouts: dict = CUBE_LAYOUTS) -> str:
+    """ORDER BY clause for a cube layout ("" for layout 'none')"""
+    if layout not in layouts:
+        raise ValueError(f"Unknown cube layout '{layout}' (expected one of {', '.join(layouts)})")
+    cols = layouts[layout]
+    return "ORDER BY " + ", ".join(cols) if cols else ""
+
+
+def _check_encoding(encoding: str) -> None:
+    if encoding not in CUBE_ENCODINGS:
+        raise ValueError(f"Unknown cube encoding '{encoding}' (expected one of {', '.join(CUBE_ENCODINGS)})")
+
+
+def dimension_type(name: str) -> str:
+    """ENUM type holding a dimension's values in id order"""
+    return f"{name}_key"
+
+
+def _column_dimensions() -> dict:
+    """{cube column: dimension name}"""
+    return {col: name for name, (_, cols) in CUBE_DIMENSIONS.items() for col in cols}
+
+
+def encoded_column(column: str, encoding: str = DEFAULT_ENCODING) -> str:
+    """Select-list item for a cube column under an encoding"""
+    _check_encoding(encoding)
+    name = _column_dimensions().get(column)
+    if encoding == "varchar" or name is None:
+        return column
+    return f"CAST({column} AS {dimension_type(name)}) AS {column}"
+
+
+def _encoded_tables(con, columns) -> dict:
+    """{table: [columns]} of base tables holding ENUM-encoded `columns`"""
+    names = ", ".join(f"'{c}'" for c in columns)
+    rows = con.execute(f"""
+        SELECT c.table_name, c.column_name
+        FROM duckdb_columns() c
+        JOIN duckdb_tables() t USING (database_name, schema_name, table_name)
+        WHERE c.database_name = current_database()
+          AND c.column_name IN ({names})
+          AND c.data_type LIKE 'ENUM(%'
+        ORDER BY c.table_name, c.column_index
+    """).fetchall()
+    tables = {}
+    for table_name, column in rows:
+        tables.setdefault(table_name, []).append(column)
+    return tables
+
+
+def _retype_columns(con, tables: dict, type_for: Callable) -> None:
     """
-    Build a single cube table inside the database.
+    ALTER encoded columns to a new ENUM type.
+    
+    Indexes on a table are dropped and recreated around it; run outside an
+    explicit transaction (DuckDB rejects the ALTER otherwise).
+    """
+    for table_name, columns in tables.items():
+        indexes = con.execute(
+            "SELECT index_name, sql FROM duckdb_indexes() "
+            "WHERE database_name = current_database() AND table_name = ?", [table_name]
+        ).fetchall()
+        for index_name, _ in indexes:
+            con.execute(f"DROP INDEX {index_name}")
+        try:
+            for column in columns:
+                con.execute(f"ALTER TABLE {table_name} ALTER {column} TYPE {type_for(column)}")
+        finally:
+            for _, sql in indexes:
+                con.execute(sql)
+
+
+def ensure_dimensions(con, source: str = "carrier_data") -> list[str]:
+    """
+    Create or extend the dimension tables and ENUM types from source.
+    
+    Ids are append-only: a new database ranks the values by name, later
+    values get the next free id and existing ids never change. The ENUM
+    type is then recreated with the new values at the end, so tables
+    already encoded with the old type keep valid codes and are left alone
+    (see extend_encoded_tables for the tables that need the new values).
     
     Args:
-        db_path: Path to DuckDB database
-        ds: Data source filter
-        mover_ind: True for movers, False for non-movers
-        metric: 'win' or 'loss'
+        con: Read-write connection
+        source: Relation with the CUBE_DIMENSIONS columns (default: carrier_data)
         
     Returns:
-        True if successful
+        Names of the dimensions created or extended
     """
-    try:
-        import duckdb
-    except ImportError as e:
-        print(f"[ERROR] Missing dependency: {e}", file=sys.stderr)
-        return False
-    
-    mover_str = "mover" if mover_ind else "non_mover"
-    table_name = f"{ds}_{metric}_{mover_str}_cube"
-    
-    print(f"[INFO] Building {metric} cube table: {table_name}")
+    changed = []
+    for name, (value_col, columns) in CUBE_DIMENSIONS.items():
+        table_name = f"dim_{name}"
+        type_name = dimension_type(name)
+        values_sql = " UNION ".join(
+            f"SELECT CAST({c} AS VARCHAR) AS v FROM {source} WHERE {c} IS NOT NULL" for c in columns
+        )
+        if not _has_table(con, table_name):
+            con.execute(f"""
+                CREATE TABLE {table_name} AS
+                SELECT CAST(ROW_NUMBER() OVER (ORDER BY v) - 1 AS INTEGER) AS {name}_id, v AS {value_col}
+                FROM (SELECT DISTINCT v FROM ({values_sql}))
+                ORDER BY {name}_id
+            """)
+        else:
+            added = con.execute(f"""
+                INSERT INTO {table_name}
+                SELECT CAST((SELECT COALESCE(MAX({name}_id), -1) FROM {table_name})
+                            + ROW_NUMBER() OVER (ORDER BY v) AS INTEGER), v
+                FROM (SELECT DISTINCT v FROM ({values_sql}))
+                WHERE v NOT IN (SELECT {value_col} FROM {table_name})
+            """).fetchone()[0]
+            has_type = con.execute(
+                "SELECT COUNT(*) FROM duckdb_types() WHERE database_name = current_database() AND type_name = ?",
+                [type_name]
+            ).fetchone()[0] > 0
+            if not added and has_type:
+                continue
+        
+        # Encoded columns hold their own copy of the ENUM, so the named type can
+        # be replaced without touching them
+        con.execute(f"DROP TYPE IF EXISTS {type_name}")
+        con.execute(f"CREATE TYPE {type_name} AS ENUM (SELECT {value_col} FROM {table_name} ORDER BY {name}_id)")
+        changed.append(name)
+    return changed
+
+
+def extend_encoded_tables(con, tables: Iterable[str], source: str) -> dict:
+    """
+    Re-type the encoded columns of `tables` that lack codes for source's values.
     
-    # Select the appropriate metric column
-    if metric == "win":
-        metric_col = "adjusted_wins"
-        total_col = "total_wins"
-    else:
-        metric_col = "adjusted_losses"
-        total_col = "total_losses"  # Fixed typo!
+    A column's ENUM is the dimension as it was when the column was written
+    (ids are append-only, so always a prefix of the current type). Only
+    columns about to receive a newer value are ALTERed to the current type;
+    existing codes stay the same. Run ensure_dimensions(con, source) first
+    and, like _retype_columns, outside an explicit transaction.
     
-    con = duckdb.connect(db_path, read_only=False)
-    try:
-        # Drop existing table if it exists
-        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+    Args:
+        con: Read-write connection
+        tables: Tables about to receive rows from source
+        source: Relation with the CUBE_DIMENSIONS columns
         
-        # Create cube table with aggregation
-        create_query = f"""
-        CREATE TABLE {table_name} AS
+    Returns:
+        {table: [columns]} that were re-typed
+    """
+    dimension_of = _column_dimensions()
+    max_ids = {}
+    for column, name in dimension_of.items():
+        value_col = CUBE_DIMENSIONS[name][0]
+        max_ids[column] = con.execute(
+            f"SELECT MAX({name}_id) FROM dim_{name} WHERE {value_col} IN (SELECT {column} FROM {source})"
+        ).fetchone()[0]
+    
+    stale = {}
+    for table_name, columns in _encoded_tables(con, dimension_of).items():
+        if table_name not in tables:
+            continue
+        for column in columns:
+            max_id = max_ids[column]
+            if max_id is None:
+                continue
+            size = con.execute(f"SELECT len(enum_range({column})) FROM {table_name} LIMIT 1").fetchone()
+            if size is None or size[0] <= max_id:
+                stale.setdefault(table_name, []).append(column)
+    _retype_columns(con, stale, lambda column: dimension_type(dimension_of[column]))
+    return stale
+
+
+def cube_select_sql(
+    ds: str,
+    mover_ind: bool,
+    metric: str,
+    date_filter: str = "",
+    layout: str = DEFAULT_LAYOUT,
+    encoding: str = DEFAULT_ENCODING
+) -> str:
+    """Aggregation SELECT behind a cube table (optionally limited by date_filter)"""
+    metric_col = "adjusted_wins" if metric == "win" else "adjusted_losses"
+    total_col = "total_wins" if metric == "win" else "total_losses"
+    enc = lambda column: encoded_column(column, encoding)
+    return f"""
         SELECT
             the_date,
             year,
             month,
             day,
             day_of_week,
-            winner,
-            loser,
+            {enc("winner")},
+            {enc("loser")},
             dma,
-            dma_name,
-            state,
+            {enc("dma_name")},
+            {enc("state")},
             SUM({metric_col}) as {total_col},
             COUNT(*) as record_count
         FROM carrier_data
         WHERE ds = '{ds.replace("'", "''")}'
           AND mover_ind = {str(mover_ind).upper()}
+          {date_filter}
         GROUP BY
             the_date,
             year,
@@ -92,12 +315,352 @@ def build_cube_table(
             dma,
             dma_name,
             state
-        ORDER BY
-            the_date,
+        {layout_order_by(layout)}
+        """
+
+
+def _has_table(con, name: str) -> bool:
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [name]
+    ).fetchone()[0] > 0
+
+
+def pending_cube_dates(con, table_name: str) -> Optional[list]:
+    """
+    Dates a cube must re-aggregate to catch up with carrier_data.
+    
+    Returns:
+        Sorted list of dates (possibly empty), or None when the cube needs a
+        full rebuild (cube or build metadata missing, or a full carrier_data
+        build happened since the cube was built)
+    """
+    if not (_has_table(con, table_name) and _has_table(con, BUILD_LOG_TABLE)
+            and _has_table(con, CUBE_STATE_TABLE)):
+        return None
+    state = con.execute(
+        f"SELECT build_id FROM {CUBE_STATE_TABLE} WHERE cube_table = ?", [table_name]
+    ).fetchone()
+    if state is None:
+        return None
+    
+    builds = con.execute(
+        f"SELECT mode, dates FROM {BUILD_LOG_TABLE} WHERE build_id > ? ORDER BY build_id", [state[0]]
+    ).fetchall()
+    dates = set()
+    for mode, build_dates in builds:
+        if mode == 'full' or build_dates is None:
+            return None
+        dates.update(build_dates)
+    return sorted(dates)
+
+
+def record_cube_state(con, table_name: str) -> None:
+    """Mark the cube as current with the latest build_log entry"""
+    if not _has_table(con, BUILD_LOG_TABLE):
+        return
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_STATE_TABLE} (
+            cube_table VARCHAR PRIMARY KEY,
+            build_id INTEGER,
+            refreshed_at TIMESTAMP
+        )
+    """)
+    con.execute(
+        f"INSERT OR REPLACE INTO {CUBE_STATE_TABLE} "
+        f"SELECT ?, COALESCE(MAX(build_id), 0), now() FROM {BUILD_LOG_TABLE}",
+        [table_name]
+    )
+
+
+def create_cube_indexes(con, table_name: str) -> None:
+    """Create the per-column indexes on a cube table"""
+    print(f"[INFO] Creating indexes...")
+    indexes = [
+        f"idx_{table_name}_date",
+        f"idx_{table_name}_winner",
+        f"idx_{table_name}_loser",
+        f"idx_{table_name}_dma",
+        f"idx_{table_name}_state",
+    ]
+    index_cols = [
+        "the_date",
+        "winner",
+        "loser",
+        "dma_name",
+        "state",
+    ]
+    
+    for idx_name, col in zip(indexes, index_cols):
+        try:
+            con.execute(f"CREATE INDEX {idx_name} ON {table_name}({col})")
+        except Exception as e:
+            print(f"  [WARNING] Failed to create index {idx_name}: {e}", file=sys.stderr)
+
+
+def first_seen_table_name(cube_table: str) -> str:
+    """{ds}_{metric}_{mover}_first_seen table kept next to a cube table"""
+    return cube_table[:-len("_cube")] + "_first_seen"
+
+
+def first_seen_select_sql(cube_table: str, date_filter: str = "") -> str:
+    """Per-pair appearance summary of a cube table (optionally limited by date_filter)"""
+    return f"""
+        WITH pair_dates AS (
+            SELECT DISTINCT winner, loser, dma_name, the_date
+            FROM {cube_table}
+            WHERE 1=1 {date_filter}
+        ), ranked AS (
+            SELECT
+                *,
+                ROW_NUMBER() OVER (PARTITION BY winner, loser, dma_name ORDER BY the_date) AS nth,
+                COUNT(*) OVER (PARTITION BY winner, loser, dma_name) AS pair_dates
+            FROM pair_dates
+        )
+        SELECT
             winner,
             loser,
-            dma_name
+            dma_name,
+            MIN(the_date) AS first_date,
+            MAX(the_date) AS last_date,
+            COUNT(*) AS n_dates,
+            list(the_date ORDER BY the_date) FILTER (WHERE nth <= {FIRST_SEEN_DATES}) AS first_dates,
+            list(the_date ORDER BY the_date) FILTER (WHERE nth > pair_dates - {FIRST_SEEN_DATES}) AS recent_dates
+        FROM ranked
+        GROUP BY winner, loser, dma_name
+        ORDER BY winner, loser, dma_name
+        """
+
+
+def build_first_seen_table(con, cube_table: str) -> int:
+    """(Re)build the first_seen table of a cube from scratch; returns its row count"""
+    table_name = first_seen_table_name(cube_table)
+    con.execute(f"CREATE OR REPLACE TABLE {table_name} AS" + first_seen_select_sql(cube_table))
+    return con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+
+
+def update_first_seen_table(con, cube_table: str, dates: list) -> str:
+    """
+    Bring a cube's first_seen table up to date after dates were re-aggregated.
+    
+    When every rewritten date is past the table's last_date (the usual
+    append of new days), only those dates are summarized and merged into
+    the existing rows. Restated or withdrawn older dates can change any
+    pair's history, so those rebuild the table from the cube.
+    
+    Returns:
+        'merged' or 'rebuilt'
+    """
+    table_name = first_seen_table_name(cube_table)
+    watermark = None
+    if _has_table(con, table_name):
+        watermark = con.execute(f"SELECT MAX(last_date) FROM {table_name}").fetchone()[0]
+    if watermark is None or min(dates) <= watermark:
+        build_first_seen_table(con, cube_table)
+        return 'rebuilt'
+    
+    con.execute(
+        "CREATE OR REPLACE TEMP TABLE _first_seen_dates AS SELECT UNNEST(?::DATE[]) AS the_date",
+        [dates]
+    )
+    fresh = first_seen_select_sql(cube_table, "AND the_date IN (SELECT the_date FROM _first_seen_dates)")
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {table_name} AS
+        WITH fresh AS ({fresh})
+        SELECT
+            COALESCE(o.winner, f.winner) AS winner,
+            COALESCE(o.loser, f.loser) AS loser,
+            COALESCE(o.dma_name, f.dma_name) AS dma_name,
+            COALESCE(o.first_date, f.first_date) AS first_date,
+            COALESCE(f.last_date, o.last_date) AS last_date,
+            COALESCE(o.n_dates, 0) + COALESCE(f.n_dates, 0) AS n_dates,
+            list_slice(
+                list_concat(COALESCE(o.first_dates, []::DATE[]), COALESCE(f.first_dates, []::DATE[])),
+                1, {FIRST_SEEN_DATES}
+            ) AS first_dates,
+            list_slice(
+                list_concat(COALESCE(o.recent_dates, []::DATE[]), COALESCE(f.recent_dates, []::DATE[])),
+                -{FIRST_SEEN_DATES}, -1
+            ) AS recent_dates
+        FROM {table_name} o
+        FULL JOIN fresh f
+          ON o.winner = f.winner AND o.loser = f.loser AND o.dma_name = f.dma_name
+        ORDER BY winner, loser, dma_name
+    """)
+    con.execute("DROP TABLE _first_seen_dates")
+    return 'merged'
+
+
+def rollup_table_name(cube_table: str, rollup: str) -> str:
+    """{ds}_{metric}_{mover}_{rollup} table kept next to a cube table"""
+    return cube_table[:-len("_cube")] + "_" + rollup
+
+
+def rollup_select_sql(cube_table: str, metric: str, rollup: str, date_filter: str = "") -> str:
+    """Aggregation SELECT behind a cube rollup (optionally limited by date_filter)"""
+    total_col = "total_wins" if metric == "win" else "total_losses"
+    dims = ", ".join(CUBE_ROLLUPS[rollup])
+    market = (
+        f",\n            SUM(SUM({total_col})) OVER (PARTITION BY the_date) as market_total"
+        if rollup == "national" else ""
+    )
+    return f"""
+        SELECT
+            {dims},
+            SUM({total_col}) as {total_col},
+            SUM(record_count) as record_count{market}
+        FROM {cube_table}
+        WHERE 1=1 {date_filter}
+        GROUP BY {dims}
+        ORDER BY {dims}
         """
+
+
+def build_rollup_tables(con, cube_table: str, metric: str, date_filter: Optional[str] = None) -> dict:
+    """
+    Build a cube's rollup tables, or refresh the dates matching date_filter.
+    
+    Returns:
+        {rollup_table: row_count}
+    """
+    rows = {}
+    for rollup in CUBE_ROLLUPS:
+        table_name = rollup_table_name(cube_table, rollup)
+        if date_filter is None or not _has_table(con, table_name):
+            con.execute(f"CREATE OR REPLACE TABLE {table_name} AS" + rollup_select_sql(cube_table, metric, rollup))
+        else:
+            con.execute(f"DELETE FROM {table_name} WHERE 1=1 {date_filter}")
+            con.execute(f"INSERT INTO {table_name}" + rollup_select_sql(cube_table, metric, rollup, date_filter))
+        rows[table_name] = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    return rows
+
+
+def print_cube_stats(con, table_name: str, metric: str) -> None:
+    """Print date range, metric total and distinct counts for a cube table"""
+    metric_col = f"total_{metric}s" if metric == "win" else "total_losses"
+    stats = con.execute(f"""
+        SELECT
+            MIN(the_date) as min_date,
+            MAX(the_date) as max_date,
+            SUM({metric_col}) as total_metric_sum,
+            COUNT(DISTINCT winner) as unique_winners,
+            COUNT(DISTINCT loser) as unique_losers,
+            COUNT(DISTINCT dma_name) as unique_dmas
+        FROM {table_name}
+    """).fetchone()
+    
+    print(f"[SUCCESS] Table: {table_name}")
+    print(f"  Stats:")
+    print(f"    - Date range: {stats[0]} to {stats[1]}")
+    metric_label = "wins" if metric == "win" else "losses"
+    print(f"    - Total {metric_label}: {stats[2]:,.0f}")
+    print(f"    - Unique winners: {stats[3]}")
+    print(f"    - Unique losers: {stats[4]}")
+    print(f"    - Unique DMAs: {stats[5]}")
+
+
+def build_cube_table(
+    db_path: str,
+    ds: str,
+    mover_ind: bool,
+    metric: str,  # 'win' or 'loss'
+    append: bool = False,
+    layout: str = DEFAULT_LAYOUT,
+    create_indexes: bool = True,
+    encoding: str = DEFAULT_ENCODING,
+) -> bool:
+    """
+    Build a single cube table inside the database.
+    
+    Args:
+        db_path: Path to DuckDB database
+        ds: Data source filter
+        mover_ind: True for movers, False for non-movers
+        metric: 'win' or 'loss'
+        append: Only delete and re-aggregate the dates rewritten in
+            carrier_data since this cube was built (full build if unknown).
+            Appended rows land at the end of the table, so clustering only
+            holds for dates appended in order - a full build re-sorts.
+        layout: Sort order of the table (see CUBE_LAYOUTS)
+        create_indexes: Whether to create the per-column indexes
+        encoding: Storage of the dimension columns (see CUBE_ENCODINGS);
+            an append keeps the encoding the table was built with
+        
+    Returns:
+        True if successful
+    """
+    _check_encoding(encoding)
+    try:
+        import duckdb
+    except ImportError as e:
+        print(f"[ERROR] Missing dependency: {e}", file=sys.stderr)
+        return False
+    
+    mover_str = "mover" if mover_ind else "non_mover"
+    table_name = f"{ds}_{metric}_{mover_str}_cube"
+    
+    print(f"[INFO] Building {metric} cube table: {table_name}")
+    
+    con = duckdb.connect(db_path, read_only=False)
+    try:
+        if append:
+            dates = pending_cube_dates(con, table_name)
+            if dates is None:
+                print(f"[INFO] No incremental state for {table_name} - full build")
+            elif not dates:
+                print(f"[SKIP] {table_name} is up to date")
+                return True
+            else:
+                print(f"[INFO] Re-aggregating {len(dates)} date(s): {dates[0]} .. {dates[-1]}")
+                con.execute(
+                    "CREATE OR REPLACE TEMP TABLE _cube_dates AS SELECT UNNEST(?::DATE[]) AS the_date",
+                    [dates]
+                )
+                date_filter = "AND the_date IN (SELECT the_date FROM _cube_dates)"
+                encoded = table_name in _encoded_tables(con, _column_dimensions())
+                if encoded:
+                    # New carriers/DMAs in the appended dates get ids first, and only
+                    # this cube's tables are re-typed, only if they receive one
+                    # (outside the transaction: DuckDB can't re-type a column whose
+                    # index was dropped in the same transaction)
+                    ds_sql = ds.replace("'", "''")
+                    source = (f"(SELECT * FROM carrier_data WHERE ds = '{ds_sql}' "
+                              f"AND mover_ind = {str(mover_ind).upper()} {date_filter})")
+                    ensure_dimensions(con, source)
+                    extend_encoded_tables(con, [
+                        table_name, first_seen_table_name(table_name),
+                        *(rollup_table_name(table_name, rollup) for rollup in CUBE_ROLLUPS)
+                    ], source)
+                con.execute("BEGIN TRANSACTION")
+                try:
+                    deleted = con.execute(f"DELETE FROM {table_name} WHERE 1=1 {date_filter}").fetchone()[0]
+                    inserted = con.execute(
+                        f"INSERT INTO {table_name}"
+                        + cube_select_sql(ds, mover_ind, metric, date_filter, layout,
+                                          "enum" if encoded else "varchar")
+                    ).fetchone()[0]
+                    build_rollup_tables(con, table_name, metric, date_filter)
+                    con.execute("DROP TABLE _cube_dates")
+                    first_seen = update_first_seen_table(con, table_name, dates)
+                    record_cube_state(con, table_name)
+                    con.execute("COMMIT")
+                except Exception:
+                    con.execute("ROLLBACK")
+                    raise
+                print(f"[SUCCESS] Table: {table_name} (-{deleted:,} / +{inserted:,} rows, "
+                      f"first_seen {first_seen})")
+                return True
+        
+        # Drop existing table if it exists
+        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        
+        if encoding == "enum":
+            for name in ensure_dimensions(con):
+                print(f"[INFO] dim_{name} rebuilt")
+        
+        # Create cube table with aggregation
+        create_query = f"CREATE TABLE {table_name} AS" + cube_select_sql(
+            ds, mover_ind, metric, layout=layout, encoding=encoding
+        )
         
         print(f"[INFO] Executing aggregation query...")
         con.execute(create_query)
@@ -112,53 +675,19 @@ def build_cube_table(
         print(f"[INFO] Created table with {row_count:,} rows")
         
         # Create indexes on key columns for fast filtering
-        print(f"[INFO] Creating indexes...")
-        indexes = [
-            f"idx_{table_name}_date",
-            f"idx_{table_name}_winner",
-            f"idx_{table_name}_loser",
-            f"idx_{table_name}_dma",
-            f"idx_{table_name}_state",
-        ]
-        index_cols = [
-            "the_date",
-            "winner",
-            "loser",
-            "dma_name",
-            "state",
-        ]
-        
-        for idx_name, col in zip(indexes, index_cols):
-            try:
-                con.execute(f"CREATE INDEX {idx_name} ON {table_name}({col})")
-            except Exception as e:
-                print(f"  [WARNING] Failed to create index {idx_name}: {e}", file=sys.stderr)
+        if create_indexes:
+            create_cube_indexes(con, table_name)
         
         # Analyze for query optimization
         con.execute(f"ANALYZE {table_name}")
         
-        # Show sample stats
-        metric_col = f"total_{metric}s" if metric == "win" else "total_losses"
-        stats = con.execute(f"""
-            SELECT
-                MIN(the_date) as min_date,
-                MAX(the_date) as max_date,
-                SUM({metric_col}) as total_metric_sum,
-                COUNT(DISTINCT winner) as unique_winners,
-                COUNT(DISTINCT loser) as unique_losers,
-                COUNT(DISTINCT dma_name) as unique_dmas
-            FROM {table_name}
-        """).fetchone()
-        
-        print(f"[SUCCESS] Table: {table_name}")
-        print(f"  Stats:")
-        print(f"    - Date range: {stats[0]} to {stats[1]}")
-        metric_label = "wins" if metric == "win" else "losses"
-        print(f"    - Total {metric_label}: {stats[2]:,.0f}")
-        print(f"    - Unique winners: {stats[3]}")
-        print(f"    - Unique losers: {stats[4]}")
-        print(f"    - Unique DMAs: {stats[5]}")
+        pairs = build_first_seen_table(con, table_name)
+        print(f"[INFO] {first_seen_table_name(table_name)}: {pairs:,} pairs")
+        for rollup_table, n in build_rollup_tables(con, table_name, metric).items():
+            print(f"[INFO] {rollup_table}: {n:,} rows")
+        record_cube_state(con, table_name)
         
+        print_cube_stats(con, table_name, metric)
         return True
         
     except Exception as e:
@@ -167,7 +696,7 @@ def build_cube_table(
         traceback.print_exc()
         return False
     finally:
-        pass
+        con.close()
     
     # Build aggregate cubes if requested
     if args.aggregate:
@@ -179,7 +708,11 @@ def build_cube_table(
 def build_all_cube_tables(
     db_path: str,
     ds: str,
-    skip_existing: bool = False
+    skip_existing: bool = False,
+    append: bool = False,
+    layout: str = DEFAULT_LAYOUT,
+    create_indexes: bool = True,
+    encoding: str = DEFAULT_ENCODING
 ) -> bool:
     """
     Build all 4 cube tables for a given dataset.
@@ -188,6 +721,10 @@ def build_all_cube_tables(
         db_path: Path to DuckDB database
         ds: Data source to process
         skip_existing: Skip if table already exists
+        append: Re-aggregate only dates rewritten since each cube was built
+        layout: Sort order of the tables (see CUBE_LAYOUTS)
+        create_indexes: Whether to create the per-column indexes
+        encoding: Storage of the dimension columns (see CUBE_ENCODINGS)
         
     Returns:
         True if all cubes built successfully
@@ -228,7 +765,10 @@ def build_all_cube_tables(
             except Exception:
                 pass
         
-        success = build_cube_table(db_path, ds, mover_ind, metric)
+        success = build_cube_table(
+            db_path, ds, mover_ind, metric, append=append,
+            layout=layout, create_indexes=create_indexes, encoding=encoding
+        )
         results.append(success)
         print()  # Blank line between cubes
     
@@ -242,6 +782,315 @@ def build_all_cube_tables(
     return all(results)
 
 
+# (mover_ind, metric) for the 4 cubes of a dataset
+CUBE_SPECS = [
+    (True, "win"),
+    (False, "win"),
+    (True, "loss"),
+    (False, "loss"),
+]
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process (or its finished children) in MB"""
+    if resource is None:
+        return float("nan")
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def single_pass_cubes(
+    con,
+    ds: str,
+    source: str = "carrier_data",
+    layout: str = DEFAULT_LAYOUT,
+    encoding: str = DEFAULT_ENCODING
+) -> dict:
+    """
+    Build all 4 cube tables for ds from one grouped pass over source.
+    
+    carrier_data is aggregated once, grouped by mover_ind plus the cube
+    dimensions and carrying both adjusted_wins and adjusted_losses, into a
+    temp table that is then split into the win/loss x mover/non_mover
+    cubes. The cubes have the same rows and column layout as
+    build_cube_table() produces. Indexes are not created here.
+    
+    Args:
+        con: Read-write connection; cubes are created in its default schema
+        ds: Data source to process
+        source: carrier_data relation (e.g. an attached "src.carrier_data")
+        layout: Sort order of the cubes (see CUBE_LAYOUTS)
+        encoding: Storage of the dimension columns (see CUBE_ENCODINGS);
+            'enum' needs the dimension types in con's database
+        
+    Returns:
+        {'aggregate_s', 'split_s', 'rows': {table_name: row_count}}
+    """
+    _check_encoding(encoding)
+    enc = lambda column: encoded_column(column, encoding)
+    t0 = time.perf_counter()
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _cube_stage AS
+        SELECT
+            mover_ind,
+            the_date,
+            year,
+            month,
+            day,
+            day_of_week,
+            winner,
+            loser,
+            dma,
+            dma_name,
+            state,
+            SUM(adjusted_wins) as total_wins,
+            SUM(adjusted_losses) as total_losses,
+            COUNT(*) as record_count
+        FROM {source}
+        WHERE ds = '{ds.replace("'", "''")}'
+          AND mover_ind IS NOT NULL
+        GROUP BY
+            mover_ind,
+            the_date,
+            year,
+            month,
+            day,
+            day_of_week,
+            winner,
+            loser,
+            dma,
+            dma_name,
+            state
+    """)
+    t1 = time.perf_counter()
+    
+    rows = {}
+    for mover_ind, metric in CUBE_SPECS:
+        mover_str = "mover" if mover_ind else "non_mover"
+        table_name = f"{ds}_{metric}_{mover_str}_cube"
+        total_col = "total_wins" if metric == "win" else "total_losses"
+        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        con.execute(f"""
+            CREATE TABLE {table_name} AS
+            SELECT
+                the_date, year, month, day, day_of_week,
+                {enc("winner")}, {enc("loser")}, dma, {enc("dma_name")}, {enc("state")},
+                {total_col},
+                record_count
+            FROM _cube_stage
+            WHERE mover_ind = {str(mover_ind).upper()}
+            {layout_order_by(layout)}
+        """)
+        rows[table_name] = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    con.execute("DROP TABLE _cube_stage")
+    
+    return {'aggregate_s': t1 - t0, 'split_s': time.perf_counter() - t1, 'rows': rows}
+
+
+def _finalize_cubes(con, ds: str, create_indexes: bool = True) -> None:
+    """Indexes, ANALYZE, first_seen and rollup tables and build state for a dataset's 4 cubes"""
+    for mover_ind, metric in CUBE_SPECS:
+        mover_str = "mover" if mover_ind else "non_mover"
+        table_name = f"{ds}_{metric}_{mover_str}_cube"
+        if create_indexes:
+            create_cube_indexes(con, table_name)
+        con.execute(f"ANALYZE {table_name}")
+        build_first_seen_table(con, table_name)
+        build_rollup_tables(con, table_name, metric)
+        record_cube_state(con, table_name)
+
+
+def _print_stage_report(rows: list[dict]) -> None:
+    print(f"\n{'Stage':<34}{'Wall (s)':>10}{'Peak RSS (MB)':>16}")
+    print("-" * 60)
+    for r in rows:
+        rss = f"{r['peak_rss_mb']:,.0f}" if r.get('peak_rss_mb') is not None else ""
+        print(f"{r['stage']:<34}{r['wall_s']:>10.2f}{rss:>16}")
+    print()
+
+
+def build_dataset_cubes(
+    db_path: str,
+    ds: str,
+    create_indexes: bool = True,
+    layout: str = DEFAULT_LAYOUT,
+    encoding: str = DEFAULT_ENCODING
+) -> bool:
+    """
+    Build all 4 cube tables for a dataset in one grouped pass (in place).
+    
+    Args:
+        db_path: Path to DuckDB database
+        ds: Data source to process
+        create_indexes: Whether to create the per-column indexes
+        layout: Sort order of the cubes (see CUBE_LAYOUTS)
+        encoding: Storage of the dimension columns (see CUBE_ENCODINGS)
+        
+    Returns:
+        True if all 4 cubes have rows
+    """
+    import duckdb
+    
+    print(f"[INFO] Single-pass cube build for dataset: {ds}")
+    t0 = time.perf_counter()
+    con = duckdb.connect(db_path, read_only=False)
+    try:
+        if encoding == "enum":
+            ensure_dimensions(con)
+        result = single_pass_cubes(con, ds, layout=layout, encoding=encoding)
+        t1 = time.perf_counter()
+        _finalize_cubes(con, ds, create_indexes)
+        t2 = time.perf_counter()
+        for mover_ind, metric in CUBE_SPECS:
+            mover_str = "mover" if mover_ind else "non_mover"
+            print_cube_stats(con, f"{ds}_{metric}_{mover_str}_cube", metric)
+    except Exception as e:
+        print(f"[ERROR] Failed to build cube tables for {ds}: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        con.close()
+    
+    _print_stage_report([
+        {'stage': f"{ds}: aggregate carrier_data", 'wall_s': result['aggregate_s']},
+        {'stage': f"{ds}: split into 4 cubes", 'wall_s': result['split_s']},
+        {'stage': f"{ds}: indexes + analyze", 'wall_s': t2 - t1},
+        {'stage': "total", 'wall_s': time.perf_counter() - t0, 'peak_rss_mb': peak_rss_mb()},
+    ])
+    return all(n > 0 for n in result['rows'].values())
+
+
+def _stage_dataset_cubes(db_path: str, ds: str, stage_path: str, layout: str = DEFAULT_LAYOUT) -> dict:
+    """Process-pool worker: build a dataset's cubes into its own staging database"""
+    import duckdb
+    
+    t0 = time.perf_counter()
+    con = duckdb.connect(stage_path)
+    try:
+        con.execute(f"ATTACH '{db_path}' AS src (READ_ONLY)")
+        result = single_pass_cubes(con, ds, source="src.carrier_data", layout=layout)
+        con.execute("DETACH src")
+    finally:
+        con.close()
+    result.update({
+        'ds': ds,
+        'stage_path': stage_path,
+        'wall_s': time.perf_counter() - t0,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    return result
+
+
+def build_cubes_parallel(
+    db_path: str,
+    datasets: list[str],
+    workers: Optional[int] = None,
+    create_indexes: bool = True,
+    layout: str = DEFAULT_LAYOUT,
+    encoding: str = DEFAULT_ENCODING
+) -> bool:
+    """
+    Build every dataset's cubes in a process pool, then attach them.
+    
+    Each worker opens the database read-only and writes one dataset's 4
+    cubes (see single_pass_cubes) into its own staging database next to
+    db_path. Once all workers finish, the staging databases are attached to
+    the main database one by one and their tables copied in, followed by
+    indexes and ANALYZE. Per-stage wall time and peak memory are printed.
+    
+    Args:
+        db_path: Path to DuckDB database
+        datasets: Datasets to build
+        workers: Process count (default: min(len(datasets), CPU count))
+        create_indexes: Whether to create the per-column indexes
+        layout: Sort order of the cubes (see CUBE_LAYOUTS)
+        encoding: Storage of the dimension columns (see CUBE_ENCODINGS);
+            staged cubes are VARCHAR and encoded while being copied in
+        
+    Returns:
+        True if every dataset produced 4 non-empty cubes
+    """
+    import duckdb
+    
+    _check_encoding(encoding)
+    if not datasets:
+        return True
+    workers = workers or min(len(datasets), os.cpu_count() or 1)
+    
+    # Spawned workers import this module by name: submit the importable copy
+    # of the worker (this file may have been loaded by path)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    worker = importlib.import_module(__name__)._stage_dataset_cubes
+    
+    print(f"[INFO] Staging cubes for {len(datasets)} dataset(s) with {workers} worker(s)")
+    stage_dir = tempfile.mkdtemp(prefix="cube_stage_", dir=os.path.dirname(os.path.abspath(db_path)))
+    report = []
+    ok = True
+    try:
+        t0 = time.perf_counter()
+        ctx = multiprocessing.get_context("spawn")  # DuckDB is not fork-safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(worker, os.path.abspath(db_path), ds,
+                            os.path.join(stage_dir, f"{i:03d}.db"), layout)
+                for i, ds in enumerate(datasets)
+            ]
+            staged = [f.result() for f in futures]
+        t1 = time.perf_counter()
+        
+        for r in staged:
+            report.append({'stage': f"{r['ds']}: aggregate (worker)", 'wall_s': r['aggregate_s']})
+            report.append({'stage': f"{r['ds']}: split (worker)", 'wall_s': r['split_s']})
+            report.append({'stage': f"{r['ds']}: worker total", 'wall_s': r['wall_s'],
+                           'peak_rss_mb': r['peak_rss_mb']})
+            if any(n == 0 for n in r['rows'].values()):
+                print(f"[WARNING] Empty cube table(s) for {r['ds']}: {r['rows']}", file=sys.stderr)
+                ok = False
+        report.append({'stage': "parallel staging", 'wall_s': t1 - t0,
+                       'peak_rss_mb': peak_rss_mb(children=True)})
+        
+        con = duckdb.connect(db_path, read_only=False)
+        try:
+            t_attach = 0.0
+            t_index = 0.0
+            if encoding == "enum":
+                ensure_dimensions(con)
+            for r in staged:
+                ta = time.perf_counter()
+                con.execute(f"ATTACH '{r['stage_path']}' AS stage (READ_ONLY)")
+                for table_name in r['rows']:
+                    con.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    if encoding == "enum":
+                        casts = ", ".join(
+                            f"{encoded_column(c, encoding)}" for c in _column_dimensions()
+                        )
+                        con.execute(f"CREATE TABLE {table_name} AS "
+                                    f"SELECT * REPLACE ({casts}) FROM stage.{table_name}")
+                    else:
+                        con.execute(f"CREATE TABLE {table_name} AS SELECT * FROM stage.{table_name}")
+                con.execute("DETACH stage")
+                tb = time.perf_counter()
+                _finalize_cubes(con, r['ds'], create_indexes)
+                t_attach += tb - ta
+                t_index += time.perf_counter() - tb
+        finally:
+            con.close()
+        report.append({'stage': "attach + copy", 'wall_s': t_attach})
+        report.append({'stage': "indexes + analyze", 'wall_s': t_index})
+        report.append({'stage': "total", 'wall_s': time.perf_counter() - t0,
+                       'peak_rss_mb': peak_rss_mb()})
+    finally:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+    
+    _print_stage_report(report)
+    return ok
+
+
 def get_available_datasets(db_path: str) -> list[str]:
     """Get list of available datasets from the database"""
     try:
@@ -306,6 +1155,18 @@ Examples:
   # Skip existing tables (incremental build)
   uv run build_cubes_in_db.py --skip-existing
   
+  # Re-aggregate only dates loaded by build_suppression_db.py --append
+  uv run build_cubes_in_db.py --all --append
+  
+  # One carrier_data scan per dataset, datasets built in 4 processes
+  uv run build_cubes_in_db.py --all --workers 4
+  
+  # Cluster cubes by winner and skip index creation
+  uv run build_cubes_in_db.py --all --layout winner --no-indexes
+  
+  # Store carriers/DMAs/states as integer keys into dimension tables
+  uv run build_cubes_in_db.py --all --encoding enum
+  
   # Build all datasets + aggregate cubes
   uv run build_cubes_in_db.py --all --aggregate
   
@@ -344,6 +1205,49 @@ Examples:
         help="Skip building tables that already exist"
     )
     
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Only re-aggregate dates rewritten by build_suppression_db.py --append"
+    )
+    
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Build a dataset's 4 cubes from one grouped scan of carrier_data"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="With --all: build datasets in this many processes via staging databases "
+             "(implies --single-pass, so no --append/--skip-existing; default: 1)"
+    )
+    
+    parser.add_argument(
+        "--layout",
+        choices=list(CUBE_LAYOUTS),
+        default=DEFAULT_LAYOUT,
+        help="Physical sort order of the cubes: 'date' clusters on (the_date, winner, ...), "
+             "'winner' on (winner, the_date, ...) for per-carrier scans (default: date)"
+    )
+    
+    parser.add_argument(
+        "--encoding",
+        choices=list(CUBE_ENCODINGS),
+        default=DEFAULT_ENCODING,
+        help="Storage of winner/loser/dma_name/state: 'enum' keeps integer keys into the "
+             "dim_carrier/dim_dma/dim_state tables (faster to group and partition; "
+             "names still read back as strings) (default: varchar)"
+    )
+    
+    parser.add_argument(
+        "--no-indexes",
+        action="store_true",
+        help="Skip the per-column indexes and rely on zone maps from --layout"
+    )
+    
     parser.add_argument(
         "--list",
         action="store_true",
@@ -356,7 +1260,14 @@ Examples:
         help="List available datasets and exit"
     )
     
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if args.single_pass or args.workers > 1:
+        # The single-pass and parallel builds always rebuild every cube
+        for flag, value in (("--append", args.append), ("--skip-existing", args.skip_existing)):
+            if value:
+                mode = "--single-pass" if args.single_pass else "--workers > 1"
+                parser.error(f"{flag} cannot be combined with {mode}")
+    return args
 
 
 def build_aggregate_cube(con, metric: str, mover_ind: bool) -> bool:
@@ -401,6 +1312,7 @@ def build_aggregate_cube(con, metric: str, mover_ind: bool) -> bool:
 def main(argv=None):
     """Main entry point"""
     args = parse_args(argv)
+    create_indexes = not args.no_indexes
     
     # Check database exists
     if not os.path.exists(args.db):
@@ -434,11 +1346,22 @@ def main(argv=None):
         print(f"[INFO] Building cube tables for {len(datasets)} dataset(s): {', '.join(datasets)}\n")
         
         all_success = True
-        for ds in datasets:
-            success = build_all_cube_tables(args.db, ds, args.skip_existing)
-            if not success:
-                all_success = False
-                print(f"[WARNING] Some cube tables failed for dataset: {ds}\n")
+        if args.workers > 1:
+            all_success = build_cubes_parallel(
+                args.db, datasets, args.workers, create_indexes, args.layout, args.encoding
+            )
+        else:
+            for ds in datasets:
+                if args.single_pass:
+                    success = build_dataset_cubes(args.db, ds, create_indexes, args.layout, args.encoding)
+                else:
+                    success = build_all_cube_tables(
+                        args.db, ds, args.skip_existing, args.append, args.layout, create_indexes,
+                        args.encoding
+                    )
+                if not success:
+                    all_success = False
+                    print(f"[WARNING] Some cube tables failed for dataset: {ds}\n")
         
         # Build aggregate cubes if requested
         if args.aggregate:
@@ -469,7 +1392,13 @@ def main(argv=None):
         return 0 if all_success else 1
     else:
         # Build cube tables for single dataset
-        success = build_all_cube_tables(args.db, args.ds, args.skip_existing)
+        if args.single_pass or args.workers > 1:
+            success = build_dataset_cubes(args.db, args.ds, create_indexes, args.layout, args.encoding)
+        else:
+            success = build_all_cube_tables(
+                args.db, args.ds, args.skip_existing, args.append, args.layout, create_indexes,
+                args.encoding
+            )
         
         # Build aggregate cubes if requested
         if args.aggregate:
@@ -11,7 +11,10 @@ SUPPORTS MULTIPLE PRE-AGG VERSIONS:
 - v0.3: 2010 census blocks (census_blockid, ds from path)
 
 Usage:
-    uv run build_suppression_db.py <base_preagg_path> [-o output.db]
+    uv run build_suppression_db.py <base_preagg_path> [-o output.db] [--append]
+
+--append compares the parquet files against the build_manifest table and
+only rewrites the the_date partitions held by new, changed or removed files.
     
 Example:
     uv run build_suppression_db.py /path/to/preagg.parquet -o duck_suppression.db
@@ -181,6 +184,435 @@ def detect_preagg_version(base: str, con) -> Dict[str, any]:
     return metadata
 
 
+def geo_state_select(con, geo_glob: str, version_info: Dict[str, any]) -> str:
+    """
+    Inspect the geo crosswalk and return the state selection for its CTE.
+    
+    Raises:
+        RuntimeError: If the crosswalk lacks the version's join key
+    """
+    # Inspect geo schema to handle alternate column names
+    print("[INFO] Inspecting geo schema...")
+    geo_cols = set()
+    try:
+        df_cols = con.execute(f"DESCRIBE SELECT * FROM parquet_scan('{geo_glob}') LIMIT 0").df()
+        geo_cols = set(df_cols['column_name'].astype(str).tolist())
+    except Exception:
+        geo_cols = set()
+    
+    # Use version-detected crosswalk join key
+    expected_join_key = version_info['crosswalk_join_key']
+    if expected_join_key not in geo_cols:
+        raise RuntimeError(
+            f"Geo parquet missing expected join key '{expected_join_key}' for {version_info['version']}. "
+            f"Found columns: {sorted(geo_cols)}"
+        )
+    
+    state_candidates = [
+        'state_name', 'state', 'state_abbr'
+    ]
+    state_col = next((c for c in state_candidates if c in geo_cols), None)
+    
+    print(f"[INFO] Using crosswalk join key: {expected_join_key}")
+    return f", {state_col} AS state" if state_col else ", NULL::VARCHAR AS state"
+
+
+def carrier_data_select_sql(
+    version_info: Dict[str, any],
+    base_source: str,
+    rules_glob: str,
+    geo_glob: str,
+    state_sel: str,
+    date_filter: str = ""
+) -> str:
+    """
+    SELECT producing enriched carrier_data rows for a pre-agg version.
+    
+    Args:
+        version_info: Output of detect_preagg_version()
+        base_source: Table expression for the pre-agg rows, e.g.
+            parquet_scan('<glob>') or parquet_scan([<files>])
+        rules_glob: Display rules parquet glob
+        geo_glob: Geo crosswalk parquet glob
+        state_sel: State column selection for the geo CTE
+        date_filter: Extra predicate on the_date_clean ("AND ...")
+        
+    Returns:
+        SQL SELECT statement
+    """
+    expected_join_key = version_info['crosswalk_join_key']
+    
+    # ===============================================================
+    # VERSION-SPECIFIC QUERY GENERATION
+    # ===============================================================
+
+    if version_info['version'] == 'v15.0':
+        # v15.0: primary_geoid, ds column exists, date is INT32
+        print("[INFO] Using v15.0 (2020 census blocks) schema...")
+
+        select_query = f"""
+        WITH base AS (
+            SELECT * FROM {base_source}
+        ),
+        rules_w AS (
+            SELECT sp_dim_id AS w_sp_dim_id, sp_reporting_name_group AS winner
+            FROM parquet_scan('{rules_glob}')
+        ),
+        rules_l AS (
+            SELECT sp_dim_id AS l_sp_dim_id, sp_reporting_name_group AS loser
+            FROM parquet_scan('{rules_glob}')
+        ),
+        geo AS (
+            SELECT {expected_join_key} AS census_blockid, dma, dma_name{state_sel}
+            FROM parquet_scan('{geo_glob}')
+        ),
+        enriched AS (
+            SELECT 
+                b.*,
+                w.winner,
+                l.loser,
+                g.dma,
+                g.dma_name,
+                g.state,
+                COALESCE(CAST(b.the_date AS DATE), DATE '1970-01-01') AS the_date_clean,
+                COALESCE(CAST(b.ds AS VARCHAR), 'unknown') AS ds_clean,
+                COALESCE(CAST(b.mover_ind AS BOOLEAN), FALSE) AS mover_ind_clean
+            FROM base b
+            LEFT JOIN rules_w w ON b.primary_sp_group = w.w_sp_dim_id
+            LEFT JOIN rules_l l ON b.secondary_sp_group = l.l_sp_dim_id
+            LEFT JOIN geo g ON b.primary_geoid = g.census_blockid
+        )
+        SELECT 
+            the_date_clean AS the_date,
+            ds_clean AS ds,
+            mover_ind_clean AS mover_ind,
+            winner,
+            loser,
+            dma,
+            dma_name,
+            state,
+            adjusted_wins,
+            adjusted_losses,
+            primary_geoid AS census_blockid,
+            primary_sp_group,
+            secondary_sp_group,
+            CAST(strftime('%Y', the_date_clean) AS INTEGER) AS year,
+            CAST(strftime('%m', the_date_clean) AS INTEGER) AS month,
+            CAST(strftime('%d', the_date_clean) AS INTEGER) AS day,
+            CAST(strftime('%w', the_date_clean) AS INTEGER) AS day_of_week
+        FROM enriched
+        WHERE winner IS NOT NULL 
+          AND loser IS NOT NULL 
+          AND dma_name IS NOT NULL
+          AND the_date_clean IS NOT NULL
+          AND ds_clean IS NOT NULL
+          {date_filter}
+        """
+
+    elif version_info['version'] == 'v0.3':
+        # v0.3: census_blockid, ds from path, date is BYTE_ARRAY
+        print("[INFO] Using v0.3 (2010 census blocks) schema...")
+
+        # Determine ds value
+        ds_value = version_info['ds_from_path'] or 'unknown'
+        if not version_info['has_ds_column']:
+            print(f"[INFO] ⚠️  Injecting ds column with value: '{ds_value}'")
+
+        select_query = f"""
+        WITH base AS (
+            SELECT 
+                *,
+                -- Inject ds column if missing
+                {f"'{ds_value}'" if not version_info['has_ds_column'] else "ds"} AS ds_injected
+            FROM {base_source}
+        ),
+        rules_w AS (
+            SELECT sp_dim_id AS w_sp_dim_id, sp_reporting_name_group AS winner
+            FROM parquet_scan('{rules_glob}')
+        ),
+        rules_l AS (
+            SELECT sp_dim_id AS l_sp_dim_id, sp_reporting_name_group AS loser
+            FROM parquet_scan('{rules_glob}')
+        ),
+        geo AS (
+            SELECT {expected_join_key} AS census_blockid, dma, dma_name{state_sel}
+            FROM parquet_scan('{geo_glob}')
+        ),
+        enriched AS (
+            SELECT 
+                b.*,
+                w.winner,
+                l.loser,
+                g.dma,
+                g.dma_name,
+                g.state,
+                -- v0.3: the_date is BYTE_ARRAY in 'YYYY-MM-DD' format
+                COALESCE(TRY_CAST(b.the_date AS DATE), DATE '1970-01-01') AS the_date_clean,
+                COALESCE(CAST(b.ds_injected AS VARCHAR), 'unknown') AS ds_clean,
+                COALESCE(CAST(b.mover_ind AS BOOLEAN), FALSE) AS mover_ind_clean
+            FROM base b
+            LEFT JOIN rules_w w ON b.primary_sp_group = w.w_sp_dim_id
+            LEFT JOIN rules_l l ON b.secondary_sp_group = l.l_sp_dim_id
+            LEFT JOIN geo g ON b.census_blockid = g.census_blockid
+        )
+        SELECT 
+            the_date_clean AS the_date,
+            ds_clean AS ds,
+            mover_ind_clean AS mover_ind,
+            winner,
+            loser,
+            dma,
+            dma_name,
+            state,
+            adjusted_wins,
+            adjusted_losses,
+            census_blockid,
+            primary_sp_group,
+            secondary_sp_group,
+            CAST(strftime('%Y', the_date_clean) AS INTEGER) AS year,
+            CAST(strftime('%m', the_date_clean) AS INTEGER) AS month,
+            CAST(strftime('%d', the_date_clean) AS INTEGER) AS day,
+            CAST(strftime('%w', the_date_clean) AS INTEGER) AS day_of_week
+        FROM enriched
+        WHERE winner IS NOT NULL 
+          AND loser IS NOT NULL 
+          AND dma_name IS NOT NULL
+          AND the_date_clean IS NOT NULL
+          AND ds_clean IS NOT NULL
+          {date_filter}
+        """
+
+    else:
+        raise RuntimeError(f"Unsupported pre-agg version: {version_info['version']}")
+    
+    return select_query
+
+
+def clean_date_sql(version_info: Dict[str, any]) -> str:
+    """Expression carrier_data.the_date is derived from (see carrier_data_select_sql)"""
+    if version_info['version'] == 'v0.3':
+        return "COALESCE(TRY_CAST(the_date AS DATE), DATE '1970-01-01')"
+    return "COALESCE(CAST(the_date AS DATE), DATE '1970-01-01')"
+
+
+MANIFEST_TABLE = "build_manifest"
+BUILD_LOG_TABLE = "build_log"
+
+
+def ensure_build_metadata(con) -> None:
+    """
+    Create the build-metadata tables if missing.
+    
+    build_manifest: one row per loaded pre-agg file (path, size, mtime,
+        row count, the_date values it holds, build that loaded it)
+    build_log: one row per build; `dates` lists the dates an append
+        rewrote (NULL for a full build). build_cubes_in_db.py --append
+        reads it to know which cube dates to re-aggregate.
+    """
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path VARCHAR PRIMARY KEY,
+            size BIGINT,
+            mtime DOUBLE,
+            row_count BIGINT,
+            dates DATE[],
+            build_id INTEGER,
+            loaded_at TIMESTAMP
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BUILD_LOG_TABLE} (
+            build_id INTEGER PRIMARY KEY,
+            mode VARCHAR,
+            built_at TIMESTAMP,
+            files_added INTEGER,
+            files_changed INTEGER,
+            files_removed INTEGER,
+            rows_inserted BIGINT,
+            dates DATE[]
+        )
+    """)
+
+
+def list_parquet_files(base: str) -> list[str]:
+    """Absolute paths of the parquet files behind a base path"""
+    return sorted(os.path.abspath(f) for f in glob.glob(_parquet_glob(base), recursive=True))
+
+
+def _sql_list(values) -> str:
+    return "[" + ", ".join("'" + str(v).replace("'", "''") + "'" for v in values) + "]"
+
+
+def scan_file_manifest(con, files: list[str], version_info: Dict[str, any]) -> Dict[str, dict]:
+    """
+    Manifest entries for pre-agg files: size, mtime, row count and dates.
+    
+    Only the_date is read from the files, so this is a cheap columnar pass.
+    
+    Returns:
+        {path: {'size', 'mtime', 'row_count', 'dates'}}
+    """
+    manifest = {}
+    for f in files:
+        st = os.stat(f)
+        manifest[f] = {'size': st.st_size, 'mtime': st.st_mtime, 'row_count': 0, 'dates': []}
+    if not files:
+        return manifest
+    
+    rows = con.execute(f"""
+        SELECT filename, COUNT(*) AS row_count, LIST(DISTINCT {clean_date_sql(version_info)}) AS dates
+        FROM parquet_scan({_sql_list(files)}, filename=true)
+        GROUP BY filename
+    """).fetchall()
+    for path, row_count, dates in rows:
+        entry = manifest[os.path.abspath(path)]
+        entry['row_count'] = row_count
+        entry['dates'] = sorted(dates)
+    return manifest
+
+
+def record_build(con, mode: str, manifest: Dict[str, dict], removed: list[str],
+                 files_added: int, files_changed: int, rows_inserted: int,
+                 dates: Optional[list]) -> int:
+    """Upsert manifest entries, drop removed files, append to build_log; returns build_id"""
+    build_id = con.execute(f"SELECT COALESCE(MAX(build_id), 0) + 1 FROM {BUILD_LOG_TABLE}").fetchone()[0]
+    for path in removed:
+        con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE path = ?", [path])
+    for path, entry in manifest.items():
+        con.execute(
+            f"INSERT OR REPLACE INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?, now())",
+            [path, entry['size'], entry['mtime'], entry['row_count'], entry['dates'], build_id]
+        )
+    con.execute(
+        f"INSERT INTO {BUILD_LOG_TABLE} VALUES (?, ?, now(), ?, ?, ?, ?, ?)",
+        [build_id, mode, files_added, files_changed, len(removed), rows_inserted, dates]
+    )
+    return build_id
+
+
+def append_suppression_db(
+    base: str,
+    rules: str,
+    geo: str,
+    output_db: str,
+    version_info: Dict[str, any],
+    optimize: bool = True
+) -> bool:
+    """
+    Incrementally load new or changed pre-agg files into carrier_data.
+    
+    Files are compared to build_manifest by size and mtime. Every the_date
+    held by a new, changed or removed file is rewritten: its carrier_data
+    rows are deleted and re-inserted from all current files holding that
+    date (a date may span several files). The rewritten dates are logged in
+    build_log for build_cubes_in_db.py --append.
+    
+    Args:
+        base: Path to platform pre-agg parquet (dir or file)
+        rules: Path to display rules parquet (dir or file)
+        geo: Path to geo parquet (dir or file)
+        output_db: Existing database built by build_suppression_db()
+        version_info: Output of detect_preagg_version()
+        optimize: Whether to run ANALYZE after loading
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    import duckdb
+    
+    rules_glob = _parquet_glob(rules)
+    geo_glob = _parquet_glob(geo)
+    
+    con = duckdb.connect(output_db)
+    try:
+        ensure_build_metadata(con)
+        known = {
+            path: {'size': size, 'mtime': mtime, 'dates': dates or []}
+            for path, size, mtime, dates in con.execute(
+                f"SELECT path, size, mtime, dates FROM {MANIFEST_TABLE}"
+            ).fetchall()
+        }
+        if not known:
+            print(f"[ERROR] {output_db} has no build manifest - run a full build first", file=sys.stderr)
+            return False
+        
+        files = list_parquet_files(base)
+        current = set(files)
+        added = [f for f in files if f not in known]
+        changed = []
+        for f in files:
+            if f in known:
+                st = os.stat(f)
+                if st.st_size != known[f]['size'] or st.st_mtime != known[f]['mtime']:
+                    changed.append(f)
+        removed = [p for p in known if p not in current]
+        
+        print(f"[INFO] Manifest: {len(files)} files, {len(added)} new, {len(changed)} changed, {len(removed)} removed")
+        if not (added or changed or removed):
+            print("[INFO] ✓ carrier_data is up to date")
+            return True
+        
+        scanned = scan_file_manifest(con, added + changed, version_info)
+        affected = set()
+        for f in added + changed:
+            affected.update(scanned[f]['dates'])
+        for f in changed + removed:
+            affected.update(known[f]['dates'])
+        affected = sorted(affected)
+        
+        # Every current file that holds one of the affected dates
+        sources = [
+            f for f in files
+            if set(scanned[f]['dates'] if f in scanned else known[f]['dates']) & set(affected)
+        ]
+        print(f"[INFO] Rewriting {len(affected)} date(s) from {len(sources)} file(s): "
+              f"{affected[0] if affected else '-'} .. {affected[-1] if affected else '-'}")
+        
+        state_sel = geo_state_select(con, geo_glob, version_info)
+        
+        con.execute("BEGIN TRANSACTION")
+        try:
+            con.execute("CREATE OR REPLACE TEMP TABLE _affected_dates AS SELECT UNNEST(?::DATE[]) AS the_date",
+                        [affected])
+            deleted = con.execute(
+                "DELETE FROM carrier_data WHERE the_date IN (SELECT the_date FROM _affected_dates)"
+            ).fetchone()[0]
+            inserted = 0
+            if sources:
+                inserted = con.execute("INSERT INTO carrier_data" + carrier_data_select_sql(
+                    version_info, f"parquet_scan({_sql_list(sources)})", rules_glob, geo_glob, state_sel,
+                    date_filter="AND the_date_clean IN (SELECT the_date FROM _affected_dates)"
+                )).fetchone()[0]
+            build_id = record_build(
+                con, 'append', scanned, removed,
+                files_added=len(added), files_changed=len(changed),
+                rows_inserted=inserted, dates=affected
+            )
+            con.execute("DROP TABLE _affected_dates")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        
+        print(f"[INFO] Deleted {deleted:,} rows, inserted {inserted:,} rows (build {build_id})")
+        
+        if optimize:
+            print("[INFO] Optimizing database (running ANALYZE)...")
+            con.execute("ANALYZE carrier_data")
+        
+        print(f"\n[SUCCESS] Appended to database: {output_db}")
+        print("[INFO] Refresh cubes with: uv run build_cubes_in_db.py --append")
+        return True
+    
+    except Exception as e:
+        print(f"[ERROR] Failed to append to database: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        con.close()
+
+
 def build_suppression_db(
     base: str,
     rules: str,
@@ -189,12 +621,15 @@ def build_suppression_db(
     overwrite: bool = True,
     create_indexes: bool = True,
     optimize: bool = True,
-    detect_only: bool = False
+    detect_only: bool = False,
+    append: bool = False
 ) -> bool:
     """
     Build a persistent DuckDB database from pre-agg parquet files.
     
     Auto-detects pre-agg version (v15.0 or v0.3) and uses appropriate schema.
+    Records a per-file manifest in build_manifest so later runs can use
+    append mode.
     
     Args:
         base: Path to platform pre-agg parquet (dir or file)
@@ -205,6 +640,9 @@ def build_suppression_db(
         create_indexes: Whether to create indexes on key columns
         optimize: Whether to run ANALYZE after loading
         detect_only: Only detect version and print info, don't build
+        append: Only load new/changed files into an existing database
+            (see append_suppression_db); falls back to a full build when
+            the database does not exist yet
         
     Returns:
         True if successful, False otherwise
@@ -260,6 +698,11 @@ def build_suppression_db(
     if detect_only:
         print("[INFO] Detect-only mode. Exiting.")
         return True
+    
+    if append:
+        if os.path.exists(output_db):
+            return append_suppression_db(base, rules, geo, output_db, version_info, optimize)
+        print(f"[INFO] {output_db} does not exist yet - running a full build")
 
     # Handle existing database
     if os.path.exists(output_db):
@@ -287,174 +730,12 @@ def build_suppression_db(
         con.execute("PRAGMA threads = 4;")  # Adjust based on system
         con.execute("PRAGMA memory_limit = '4GB';")  # Adjust based on system
 
-        # Inspect geo schema to handle alternate column names
-        print("[INFO] Inspecting geo schema...")
-        geo_cols = set()
-        try:
-            df_cols = con.execute(f"DESCRIBE SELECT * FROM parquet_scan('{geo_glob}') LIMIT 0").df()
-            geo_cols = set(df_cols['column_name'].astype(str).tolist())
-        except Exception:
-            geo_cols = set()
-        
-        # Use version-detected crosswalk join key
-        expected_join_key = version_info['crosswalk_join_key']
-        if expected_join_key not in geo_cols:
-            raise RuntimeError(
-                f"Geo parquet missing expected join key '{expected_join_key}' for {version_info['version']}. "
-                f"Found columns: {sorted(geo_cols)}"
-            )
-        
-        state_candidates = [
-            'state_name', 'state', 'state_abbr'
-        ]
-        state_col = next((c for c in state_candidates if c in geo_cols), None)
-        state_sel = f", {state_col} AS state" if state_col else ", NULL::VARCHAR AS state"
-        
-        print(f"[INFO] Using crosswalk join key: {expected_join_key}")
+        state_sel = geo_state_select(con, geo_glob, version_info)
         print("[INFO] Creating carrier_data table with enrichments...")
         
-        # ===============================================================
-        # VERSION-SPECIFIC QUERY GENERATION
-        # ===============================================================
-        
-        if version_info['version'] == 'v15.0':
-            # v15.0: primary_geoid, ds column exists, date is INT32
-            print("[INFO] Using v15.0 (2020 census blocks) schema...")
-            
-            create_table_query = f"""
-            CREATE TABLE carrier_data AS
-            WITH base AS (
-                SELECT * FROM parquet_scan('{base_glob}')
-            ),
-            rules_w AS (
-                SELECT sp_dim_id AS w_sp_dim_id, sp_reporting_name_group AS winner
-                FROM parquet_scan('{rules_glob}')
-            ),
-            rules_l AS (
-                SELECT sp_dim_id AS l_sp_dim_id, sp_reporting_name_group AS loser
-                FROM parquet_scan('{rules_glob}')
-            ),
-            geo AS (
-                SELECT {expected_join_key} AS census_blockid, dma, dma_name{state_sel}
-                FROM parquet_scan('{geo_glob}')
-            ),
-            enriched AS (
-                SELECT 
-                    b.*,
-                    w.winner,
-                    l.loser,
-                    g.dma,
-                    g.dma_name,
-                    g.state,
-                    COALESCE(CAST(b.the_date AS DATE), DATE '1970-01-01') AS the_date_clean,
-                    COALESCE(CAST(b.ds AS VARCHAR), 'unknown') AS ds_clean,
-                    COALESCE(CAST(b.mover_ind AS BOOLEAN), FALSE) AS mover_ind_clean
-                FROM base b
-                LEFT JOIN rules_w w ON b.primary_sp_group = w.w_sp_dim_id
-                LEFT JOIN rules_l l ON b.secondary_sp_group = l.l_sp_dim_id
-                LEFT JOIN geo g ON b.primary_geoid = g.census_blockid
-            )
-            SELECT 
-                the_date_clean AS the_date,
-                ds_clean AS ds,
-                mover_ind_clean AS mover_ind,
-                winner,
-                loser,
-                dma,
-                dma_name,
-                state,
-                adjusted_wins,
-                adjusted_losses,
-                primary_geoid AS census_blockid,
-                primary_sp_group,
-                secondary_sp_group,
-                CAST(strftime('%Y', the_date_clean) AS INTEGER) AS year,
-                CAST(strftime('%m', the_date_clean) AS INTEGER) AS month,
-                CAST(strftime('%d', the_date_clean) AS INTEGER) AS day,
-                CAST(strftime('%w', the_date_clean) AS INTEGER) AS day_of_week
-            FROM enriched
-            WHERE winner IS NOT NULL 
-              AND loser IS NOT NULL 
-              AND dma_name IS NOT NULL
-              AND the_date_clean IS NOT NULL
-              AND ds_clean IS NOT NULL
-            """
-        
-        elif version_info['version'] == 'v0.3':
-            # v0.3: census_blockid, ds from path, date is BYTE_ARRAY
-            print("[INFO] Using v0.3 (2010 census blocks) schema...")
-            
-            # Determine ds value
-            ds_value = version_info['ds_from_path'] or 'unknown'
-            if not version_info['has_ds_column']:
-                print(f"[INFO] ⚠️  Injecting ds column with value: '{ds_value}'")
-            
-            create_table_query = f"""
-            CREATE TABLE carrier_data AS
-            WITH base AS (
-                SELECT 
-                    *,
-                    -- Inject ds column if missing
-                    {f"'{ds_value}'" if not version_info['has_ds_column'] else "ds"} AS ds_injected
-                FROM parquet_scan('{base_glob}')
-            ),
-            rules_w AS (
-                SELECT sp_dim_id AS w_sp_dim_id, sp_reporting_name_group AS winner
-                FROM parquet_scan('{rules_glob}')
-            ),
-            rules_l AS (
-                SELECT sp_dim_id AS l_sp_dim_id, sp_reporting_name_group AS loser
-                FROM parquet_scan('{rules_glob}')
-            ),
-            geo AS (
-                SELECT {expected_join_key} AS census_blockid, dma, dma_name{state_sel}
-                FROM parquet_scan('{geo_glob}')
-            ),
-            enriched AS (
-                SELECT 
-                    b.*,
-                    w.winner,
-                    l.loser,
-                    g.dma,
-                    g.dma_name,
-                    g.state,
-                    -- v0.3: the_date is BYTE_ARRAY in 'YYYY-MM-DD' format
-                    COALESCE(TRY_CAST(b.the_date AS DATE), DATE '1970-01-01') AS the_date_clean,
-                    COALESCE(CAST(b.ds_injected AS VARCHAR), 'unknown') AS ds_clean,
-                    COALESCE(CAST(b.mover_ind AS BOOLEAN), FALSE) AS mover_ind_clean
-                FROM base b
-                LEFT JOIN rules_w w ON b.primary_sp_group = w.w_sp_dim_id
-                LEFT JOIN rules_l l ON b.secondary_sp_group = l.l_sp_dim_id
-                LEFT JOIN geo g ON b.census_blockid = g.census_blockid
-            )
-            SELECT 
-                the_date_clean AS the_date,
-                ds_clean AS ds,
-                mover_ind_clean AS mover_ind,
-                winner,
-                loser,
-                dma,
-                dma_name,
-                state,
-                adjusted_wins,
-                adjusted_losses,
-                census_blockid,
-                primary_sp_group,
-                secondary_sp_group,
-                CAST(strftime('%Y', the_date_clean) AS INTEGER) AS year,
-                CAST(strftime('%m', the_date_clean) AS INTEGER) AS month,
-                CAST(strftime('%d', the_date_clean) AS INTEGER) AS day,
-                CAST(strftime('%w', the_date_clean) AS INTEGER) AS day_of_week
-            FROM enriched
-            WHERE winner IS NOT NULL 
-              AND loser IS NOT NULL 
-              AND dma_name IS NOT NULL
-              AND the_date_clean IS NOT NULL
-              AND ds_clean IS NOT NULL
-            """
-        
-        else:
-            raise RuntimeError(f"Unsupported pre-agg version: {version_info['version']}")
+        create_table_query = "CREATE TABLE carrier_data AS" + carrier_data_select_sql(
+            version_info, f"parquet_scan('{base_glob}')", rules_glob, geo_glob, state_sel
+        )
 
         
         con.execute(create_table_query)
@@ -467,6 +748,14 @@ def build_suppression_db(
             print("[WARNING] No rows loaded. Check your join conditions and source data.", file=sys.stderr)
             return False
 
+        # Record what was loaded so --append can pick up only new files
+        print("[INFO] Recording build manifest...")
+        ensure_build_metadata(con)
+        manifest = scan_file_manifest(con, list_parquet_files(base), version_info)
+        record_build(con, 'full', manifest, [], files_added=len(manifest), files_changed=0,
+                     rows_inserted=row_count, dates=None)
+        print(f"[INFO] ✓ Manifest: {len(manifest)} files")
+
         # Data quality checks
         print("[INFO] Running data quality checks...")
         
@@ -639,6 +928,10 @@ Examples:
   uv run build_suppression_db.py /path/to/preagg.parquet \\
       --rules /custom/rules.parquet \\
       --geo /custom/geo.parquet
+  
+  # Daily drop: load only new/changed files, then refresh cubes
+  uv run build_suppression_db.py /path/to/preagg.parquet --append
+  uv run build_cubes_in_db.py --all --append
         """
     )
     
@@ -688,6 +981,12 @@ Examples:
         help="Skip running ANALYZE optimization"
     )
     
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Only load files that are new or changed since the last build (per build_manifest)"
+    )
+    
     parser.add_argument(
         "--detect-only",
         action="store_true",
@@ -712,6 +1011,7 @@ def main(argv=None):
         create_indexes=not args.no_indexes,
         optimize=not args.no_optimize,
         detect_only=args.detect_only,
+        append=args.append,
     )
     
     sys.exit(0 if ok else 1)
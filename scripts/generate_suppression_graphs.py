@@ -21,8 +21,7 @@ import duckdb
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from tools import db
-from tools.src import metrics
+from tools.src import apply, metrics
 
 DB_PATH = project_root / "data" / "databases" / "duck_suppression.db"
 ANALYSIS_DIR = project_root / "analysis_results" / "suppression"
@@ -50,64 +49,54 @@ def load_json(filename):
         return json.load(f)
 
 
-def get_win_share_data(mover_ind, start_date, end_date):
+def get_win_share_data(mover_ind, start_date, end_date, plan=None):
     """
     Get win share time series data from database.
     
+    With a plan (see pair_outlier_plan), wins come from the suppressed cube
+    (tools.src.apply.suppressed_cube_sql) instead of the base cube.
+    
     Returns DataFrame with columns: the_date, winner, total_wins
     """
-    table_name = f"{DS}_win_{'mover' if mover_ind else 'non_mover'}_cube"
-    
-    sql = f"""
+    sql = """
     SELECT 
         the_date::VARCHAR as the_date,
         winner,
         SUM(total_wins) as total_wins
-    FROM {table_name}
-    WHERE the_date BETWEEN '{start_date}' AND '{end_date}'
+    FROM {suppressed}
     GROUP BY the_date, winner
     ORDER BY the_date, winner
     """
     
-    return db.query(sql, str(DB_PATH))
+    return apply.query_suppressed(
+        sql, DS, mover_ind, plan=plan,
+        start_date=start_date, end_date=end_date, db_path=str(DB_PATH)
+    )
 
 
-def apply_suppressions(df, pair_outlier_data):
+def pair_outlier_plan(pair_outlier_data):
     """
-    Apply suppressions to win share data based on pair outliers.
+    Suppression plan removing the wins of every pair outlier.
     
-    Strategy: For each date-winner-loser-DMA outlier detected, subtract those wins
-    from the carrier's total.
+    Strategy: For each date-winner-loser-DMA outlier detected, remove that
+    pair's wins (so its cube rows drop to zero).
     
-    Returns modified DataFrame with suppressed wins removed.
+    Returns DataFrame with the_date, winner, loser, dma_name, remove_units
+    (None if the outliers are not keyed by pair and DMA).
     """
     if not pair_outlier_data:
-        return df
+        return None
     
-    df_suppressed = df.copy()
+    pairs = pd.DataFrame(pair_outlier_data)
+    missing = [k for k in apply.PLAN_KEYS if k not in pairs.columns]
+    if missing:
+        print(f"[WARNING] Pair outliers have no {missing} fields, cannot suppress")
+        return None
     
-    # Build suppression index for fast lookup
-    # pair_outlier_data is a list of H2H pair outliers with win counts
-    suppressions = {}
-    for pair in pair_outlier_data:
-        date = pair['the_date']
-        winner = pair['winner']
-        # Try different field names for wins
-        wins = pair.get('wins', pair.get('pair_wins_current', pair.get('current_wins', 0)))
-        
-        key = (date, winner)
-        if key not in suppressions:
-            suppressions[key] = 0
-        suppressions[key] += wins
-    
-    # Apply suppressions
-    for idx, row in df_suppressed.iterrows():
-        key = (str(row['the_date']), row['winner'])
-        if key in suppressions:
-            suppressed_wins = suppressions[key]
-            df_suppressed.at[idx, 'total_wins'] = max(0, row['total_wins'] - suppressed_wins)
-    
-    return df_suppressed
+    # Try different field names for wins
+    wins_col = next((c for c in ('wins', 'pair_wins_current', 'current_wins') if c in pairs.columns), None)
+    pairs['remove_units'] = pd.to_numeric(pairs[wins_col], errors='coerce').fillna(0) if wins_col else 0
+    return pairs[apply.PLAN_KEYS + ['remove_units']]
 
 
 def calculate_win_share(df):
@@ -152,7 +141,7 @@ def plot_win_share_overlay(mover_ind):
     df_before = calculate_win_share(df_before)
     
     # Get after data (with suppressions applied based on pair outliers)
-    df_after = apply_suppressions(df_before.copy(), pair_outlier_data)
+    df_after = get_win_share_data(mover_ind, start_date, end_date, plan=pair_outlier_plan(pair_outlier_data))
     df_after = calculate_win_share(df_after)
     
     # Report suppression impact
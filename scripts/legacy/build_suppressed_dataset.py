@@ -1,12 +1,43 @@
 #!/usr/bin/env python3
+"""
+Build the suppressed parquet dataset from suppression plan CSVs.
+
+The store (duckdb_partitioned_store, hive layout
+ds=/p_mover_ind=/year=/month=/day=/the_date=) is processed one the_date
+partition at a time:
+
+  - partitions with no plan rows are hard-linked into the output (copied if
+    the output is on another filesystem, or with --copy)
+  - partitions named in the plan are rewritten by a worker pool, dropping
+    whole rows top-down (largest adjusted_wins first) per
+    (the_date, mover_ind, winner, loser, dma_name) until remove_units is used
+    up - no partial rows
+
+`_manifest.json` in the output directory records per partition the source
+files, the plan digest and row counts / removed units. Re-running only
+redoes partitions whose source files or plan rows changed, and --verify
+checks the output against the manifest.
+
+Usage:
+    python scripts/legacy/build_suppressed_dataset.py [--workers 4] [--full] [--verify]
+"""
 import os
 import glob
+import json
+import hashlib
 import argparse
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import duckdb
 import pandas as pd
 
 
+PARTITION_COLS = ("ds", "p_mover_ind", "year", "month", "day", "the_date")
+MANIFEST_FILE = "_manifest.json"
+
+
 def pick_suppression_files(supp_glob: str, max_files: int = 5) -> list[str]:
     files = [p for p in glob.glob(os.path.expanduser(supp_glob)) if os.path.isfile(p)]
     files = [p for p in files if not os.path.basename(os.path.dirname(p)).lower().startswith('processed')]
@@ -40,78 +71,349 @@ def load_suppressions(files: list[str]) -> pd.DataFrame:
     return sup[['date','winner','mover_ind','loser','dma_name','remove_units']]
 
 
-def build_suppressed(store_glob: str, sup_df: pd.DataFrame, out_dir: str, min_wins: float = 1.0, partition_by: tuple[str, ...] = ("ds","p_mover_ind","year","month","day","the_date")) -> str:
-    os.makedirs(out_dir, exist_ok=True)
+def store_root(store_glob: str) -> str:
+    """Directory part of a store glob before the first wildcard"""
+    head = store_glob
+    for i, ch in enumerate(store_glob):
+        if ch in '*?[':
+            head = store_glob[:i]
+            break
+    return os.path.normpath(head if os.path.isdir(head) else os.path.dirname(head))
+
+
+def scan_partitions(store_glob: str) -> dict:
+    """
+    Leaf partition directories of a hive-partitioned store.
+
+    Only files matching store_glob (a directory means every *.parquet
+    below it) are listed, so other files kept under the store root are
+    not picked up.
+
+    Returns:
+        {dir relative to store_root(store_glob): {'the_date', 'mover_ind',
+        'files', 'source'}} where source is [(file name, size, mtime_ns)]
+        used to detect changes
+    """
+    store_dir = store_root(store_glob)
+    pattern = os.path.join(store_glob, '**', '*.parquet') if os.path.isdir(store_glob) else store_glob
+    by_dir = {}
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        if os.path.isfile(path):
+            by_dir.setdefault(os.path.dirname(path), []).append(os.path.basename(path))
+
+    parts = {}
+    for root, names in sorted(by_dir.items()):
+        rel = os.path.relpath(root, store_dir)
+        values = dict(seg.split('=', 1) for seg in rel.split(os.sep) if '=' in seg)
+        if 'the_date' not in values or 'p_mover_ind' not in values:
+            continue
+        source = []
+        for name in names:
+            st = os.stat(os.path.join(root, name))
+            source.append([name, st.st_size, st.st_mtime_ns])
+        parts[rel] = {
+            'the_date': values['the_date'],
+            'mover_ind': values['p_mover_ind'] == 'True',
+            'files': [os.path.join(root, n) for n in names],
+            'source': source,
+        }
+    return parts
+
+
+def group_plan(sup_df: pd.DataFrame) -> dict:
+    """
+    Split the plan into per-(the_date, mover_ind) units.
+
+    Returns:
+        {(iso date, mover_ind): (rows aggregated by winner/loser/dma_name, digest)}
+    """
+    if sup_df.empty:
+        return {}
+    sup = sup_df.assign(
+        the_date=pd.to_datetime(sup_df['date']).dt.strftime('%Y-%m-%d'),
+        mover_ind=sup_df['mover_ind'].astype(bool),
+        rm=sup_df['remove_units'].astype('int64'),
+    )
+    agg = (
+        sup.groupby(['the_date', 'mover_ind', 'winner', 'loser', 'dma_name'], as_index=False)['rm'].sum()
+        .sort_values(['the_date', 'mover_ind', 'winner', 'loser', 'dma_name'])
+    )
+    units = {}
+    for (the_date, mover_ind), rows in agg.groupby(['the_date', 'mover_ind'], sort=False):
+        rows = rows[['winner', 'loser', 'dma_name', 'rm']].reset_index(drop=True)
+        digest = hashlib.sha1(rows.to_csv(index=False).encode()).hexdigest()
+        units[(the_date, bool(mover_ind))] = (rows, digest)
+    return units
+
+
+def _reset_dir(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def link_partition(part: dict, out_leaf: str, copy_files: bool = False) -> str:
+    """Hard-link (or copy) a partition's files into out_leaf; returns the action taken"""
+    _reset_dir(out_leaf)
+    action = 'copied' if copy_files else 'linked'
+    for src in part['files']:
+        dst = os.path.join(out_leaf, os.path.basename(src))
+        if action == 'linked':
+            try:
+                os.link(src, dst)
+                continue
+            except OSError:
+                action = 'copied'
+        shutil.copy2(src, dst)
+    return action
+
+
+def rewrite_unit(
+    rels: list[str],
+    parts: dict,
+    plan_rows: pd.DataFrame,
+    out_dir: str,
+    min_wins: float,
+    threads: int = 1
+) -> dict:
+    """
+    Rewrite the partitions of one (the_date, mover_ind) unit.
+
+    The top-down running sum spans every ds with that date and mover type
+    (the plan has no ds column), so a unit's partitions are done together.
+
+    Returns:
+        {relative dir: {'rows_in', 'rows_out', 'removed_rows', 'removed_units'}}
+    """
     con = duckdb.connect()
     try:
-        # Speed up
-        try:
-            thr = os.cpu_count() or 4
-            con.execute(f"PRAGMA threads={thr}")
-        except Exception:
-            pass
-        con.register('sup_df', sup_df)
-        q = f"""
-        WITH sup AS (
-          SELECT CAST(date AS DATE) AS d,
-                 winner,
-                 mover_ind::BOOLEAN AS mover_ind,
-                 loser,
-                 dma_name,
-                 CAST(remove_units AS BIGINT) AS rm
-          FROM sup_df
-        ), sup_agg AS (
-          SELECT d, winner, mover_ind, loser, dma_name, SUM(rm) AS rm
-          FROM sup GROUP BY 1,2,3,4,5
-        ), ds AS (
-          SELECT * FROM parquet_scan('{store_glob}')
-        ), cand AS (
-          SELECT ds.element_id,
-                 CAST(ds.the_date AS DATE) AS d,
-                 ds.winner, ds.mover_ind, ds.loser, ds.dma_name,
-                 ds.adjusted_wins::DOUBLE AS adjusted_wins,
-                 s.rm,
-                 SUM(ds.adjusted_wins) OVER (
-                   PARTITION BY CAST(ds.the_date AS DATE), ds.winner, ds.mover_ind, ds.loser, ds.dma_name
-                   ORDER BY ds.adjusted_wins DESC, ds.element_id
-                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-                 ) AS csum
-          FROM ds
-          JOIN sup_agg s
-            ON CAST(ds.the_date AS DATE) = s.d
-           AND ds.winner = s.winner
-           AND ds.mover_ind = s.mover_ind
-           AND ds.loser = s.loser
-           AND ds.dma_name = s.dma_name
-          WHERE ds.adjusted_wins >= {min_wins}
-        ), to_drop AS (
-          SELECT element_id FROM cand WHERE csum <= rm
-        ), result AS (
-          SELECT ds.*,
-                 CAST(strftime('%Y', ds.the_date) AS VARCHAR) AS year,
-                 CAST(strftime('%m', ds.the_date) AS VARCHAR) AS month,
-                 CAST(strftime('%d', ds.the_date) AS VARCHAR) AS day
-          FROM ds
-          LEFT JOIN to_drop t ON t.element_id = ds.element_id
-          WHERE t.element_id IS NULL
-            AND ds.the_date IS NOT NULL
-            AND ds.ds IS NOT NULL
-            AND ds.mover_ind IS NOT NULL
-        )
-        SELECT * FROM result
-        """
-        # Write partitioned by requested columns (default: ds, mover_ind, year, month, day, the_date)
-        inner = q.strip()
-        if inner.endswith(';'):
-            inner = inner[:-1]
-        part_cols = ", ".join(partition_by)
-        # Allow overwriting existing partition files to simplify iterative runs
-        con.execute(f"COPY ({inner}) TO '{out_dir}' (FORMAT PARQUET, PARTITION_BY ({part_cols}), OVERWRITE)" )
+        con.execute(f"PRAGMA threads={max(1, threads)}")
+        con.register('plan_rows', plan_rows)
+        files = [f for rel in rels for f in parts[rel]['files']]
+        con.execute(f"""
+            CREATE TEMP TABLE to_drop AS
+            WITH cand AS (
+              SELECT t.element_id,
+                     t.filename,
+                     t.adjusted_wins::DOUBLE AS adjusted_wins,
+                     s.rm,
+                     SUM(t.adjusted_wins) OVER (
+                       PARTITION BY t.winner, t.loser, t.dma_name
+                       ORDER BY t.adjusted_wins DESC, t.element_id
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                     ) AS csum
+              FROM read_parquet(?, hive_partitioning = false, filename = true) t
+              JOIN plan_rows s
+                ON t.winner = s.winner
+               AND t.loser = s.loser
+               AND t.dma_name = s.dma_name
+              WHERE t.adjusted_wins >= {float(min_wins)}
+            )
+            SELECT element_id, filename, adjusted_wins FROM cand WHERE csum <= rm
+        """, [files])
+
+        stats = {}
+        for rel in rels:
+            part = parts[rel]
+            out_leaf = os.path.join(out_dir, rel)
+            _reset_dir(out_leaf)
+            rows_in = con.execute(
+                "SELECT COALESCE(SUM(num_rows), 0) FROM parquet_file_metadata(?)", [part['files']]
+            ).fetchone()[0]
+            removed_rows, removed_units = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(adjusted_wins), 0) FROM to_drop WHERE filename IN (SELECT UNNEST(?))",
+                [part['files']]
+            ).fetchone()
+            out_file = os.path.join(out_leaf, 'data_0.parquet').replace("'", "''")
+            con.execute(f"""
+                COPY (
+                  SELECT * FROM read_parquet(?, hive_partitioning = false)
+                  WHERE element_id NOT IN (SELECT element_id FROM to_drop)
+                ) TO '{out_file}' (FORMAT PARQUET)
+            """, [part['files']])
+            stats[rel] = {
+                'rows_in': int(rows_in),
+                'rows_out': int(rows_in - removed_rows),
+                'removed_rows': int(removed_rows),
+                'removed_units': float(removed_units),
+            }
+        return stats
     finally:
         con.close()
+
+
+def load_manifest(out_dir: str) -> dict:
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(out_dir: str, manifest: dict) -> None:
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def build_suppressed(
+    store_glob: str,
+    sup_df: pd.DataFrame,
+    out_dir: str,
+    min_wins: float = 1.0,
+    partition_by: tuple[str, ...] = PARTITION_COLS,
+    workers: int | None = None,
+    incremental: bool = True,
+    copy_files: bool = False
+) -> str:
+    """
+    Write the suppressed dataset partition by partition.
+
+    Args:
+        store_glob: Source store glob (or directory)
+        sup_df: Plan rows from load_suppressions()
+        out_dir: Output directory (mirrors the source partition layout)
+        min_wins: Rows below this adjusted_wins are never dropped
+        partition_by: Kept for compatibility - the output mirrors the
+            source layout, which partition_pre_agg_to_duckdb.py writes as
+            PARTITION_COLS
+        workers: Threads rewriting plan partitions (default: CPU count, max 8)
+        incremental: Skip partitions whose source files and plan rows are
+            unchanged since the manifest was written
+        copy_files: Copy untouched partitions instead of hard-linking
+
+    Returns:
+        out_dir
+    """
+    t0 = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    store_dir = store_root(store_glob)
+    parts = scan_partitions(store_glob)
+    units = group_plan(sup_df)
+
+    previous = load_manifest(out_dir) if incremental else {}
+    if previous.get('min_wins') != min_wins or previous.get('store_dir') != os.path.abspath(store_dir):
+        previous = {}
+    prev_parts = previous.get('partitions', {})
+
+    # Outputs whose source partition is gone
+    for rel in set(prev_parts) - set(parts):
+        shutil.rmtree(os.path.join(out_dir, rel), ignore_errors=True)
+
+    def unchanged(rel, part, digest):
+        prev = prev_parts.get(rel)
+        return (prev is not None and prev['source'] == part['source']
+                and prev['plan_digest'] == digest
+                and os.path.isdir(os.path.join(out_dir, rel)))
+
+    entries = {}
+    to_link = []
+    unit_rels = {}
+    for rel, part in parts.items():
+        key = (part['the_date'], part['mover_ind'])
+        digest = units[key][1] if key in units else None
+        if digest is not None:
+            unit_rels.setdefault(key, []).append(rel)
+        elif unchanged(rel, part, None):
+            entries[rel] = dict(prev_parts[rel], action='unchanged')
+        else:
+            to_link.append(rel)
+
+    # A unit is redone if any of its partitions changed (the running sum spans them all)
+    to_rewrite = {}
+    for key, rels in unit_rels.items():
+        if all(unchanged(rel, parts[rel], units[key][1]) for rel in rels):
+            for rel in rels:
+                entries[rel] = dict(prev_parts[rel], action='unchanged')
+        else:
+            to_rewrite[key] = rels
+
+    # Untouched partitions: link/copy, row counts from parquet metadata
+    if to_link:
+        con = duckdb.connect()
+        try:
+            counts = dict(con.execute(
+                "SELECT file_name, num_rows FROM parquet_file_metadata(?)",
+                [[f for rel in to_link for f in parts[rel]['files']]]
+            ).fetchall())
+        finally:
+            con.close()
+        for rel in to_link:
+            part = parts[rel]
+            rows = int(sum(counts.get(f, 0) for f in part['files']))
+            entries[rel] = {
+                'the_date': part['the_date'],
+                'mover_ind': part['mover_ind'],
+                'source': part['source'],
+                'plan_digest': None,
+                'action': link_partition(part, os.path.join(out_dir, rel), copy_files),
+                'rows_in': rows,
+                'rows_out': rows,
+                'removed_rows': 0,
+                'removed_units': 0.0,
+            }
+
+    # Plan partitions: one unit per task
+    if to_rewrite:
+        workers = workers or min(len(to_rewrite), os.cpu_count() or 1, 8)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(rewrite_unit, rels, parts, units[key][0], out_dir, min_wins, threads)
+                for key, rels in to_rewrite.items()
+            }
+            for key, future in futures.items():
+                for rel, stats in future.result().items():
+                    entries[rel] = dict(
+                        stats,
+                        the_date=parts[rel]['the_date'],
+                        mover_ind=parts[rel]['mover_ind'],
+                        source=parts[rel]['source'],
+                        plan_digest=units[key][1],
+                        action='rewritten',
+                    )
+
+    actions = pd.Series([e['action'] for e in entries.values()], dtype=object).value_counts().to_dict()
+    write_manifest(out_dir, {
+        'store_dir': os.path.abspath(store_dir),
+        'min_wins': min_wins,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'totals': {
+            'partitions': len(entries),
+            'rows_in': sum(e['rows_in'] for e in entries.values()),
+            'rows_out': sum(e['rows_out'] for e in entries.values()),
+            'removed_rows': sum(e['removed_rows'] for e in entries.values()),
+            'removed_units': sum(e['removed_units'] for e in entries.values()),
+        },
+        'partitions': entries,
+    })
+    print(f"[INFO] {len(entries)} partition(s) in {time.perf_counter() - t0:.1f}s: "
+          + ", ".join(f"{n} {a}" for a, n in sorted(actions.items())))
     return out_dir
 
 
+def verify_output(out_dir: str) -> list[str]:
+    """Compare output row counts with the manifest; returns problems (empty = OK)"""
+    manifest = load_manifest(out_dir)
+    if not manifest:
+        return [f"No {MANIFEST_FILE} in {out_dir}"]
+    problems = []
+    con = duckdb.connect()
+    try:
+        for rel, entry in sorted(manifest['partitions'].items()):
+            files = sorted(glob.glob(os.path.join(out_dir, rel, '*.parquet')))
+            if not files:
+                problems.append(f"{rel}: missing")
+                continue
+            rows = con.execute("SELECT COALESCE(SUM(num_rows), 0) FROM parquet_file_metadata(?)", [files]).fetchone()[0]
+            if rows != entry['rows_out']:
+                problems.append(f"{rel}: {rows} rows, manifest says {entry['rows_out']}")
+    finally:
+        con.close()
+    return problems
+
+
 def main():
     ap = argparse.ArgumentParser(description='Build suppressed dataset by anti-joining top-down removed rows (no partial rows)')
     here = os.getcwd()
@@ -122,8 +424,19 @@ def main():
     ap.add_argument('--processed-dir', default=os.path.join(here, 'suppressions', 'processed'))
     ap.add_argument('--clean', action='store_true', help='Delete contents of the output directory before writing')
     ap.add_argument('--min-wins', type=float, default=1.0)
+    ap.add_argument('--workers', type=int, default=None, help='Threads rewriting plan partitions (default: CPU count, max 8)')
+    ap.add_argument('--full', action='store_true', help='Ignore the manifest and redo every partition')
+    ap.add_argument('--copy', action='store_true', help='Copy untouched partitions instead of hard-linking them')
+    ap.add_argument('--verify', action='store_true', help='Check the output against its manifest and exit')
     args = ap.parse_args()
 
+    if args.verify:
+        problems = verify_output(args.output_dir)
+        for p in problems:
+            print('[MISMATCH]', p)
+        print('Output matches manifest.' if not problems else f'{len(problems)} problem(s) found.')
+        raise SystemExit(1 if problems else 0)
+
     files = pick_suppression_files(args.suppressions_glob, max_files=args.max_files)
     if not files:
         print('No suppression files found matching glob.')
@@ -135,8 +448,8 @@ def main():
 
     # Clean output directory if requested
     if args.clean and os.path.isdir(args.output_dir):
-        for root, dirs, files in os.walk(args.output_dir, topdown=False):
-            for name in files:
+        for root, dirs, names in os.walk(args.output_dir, topdown=False):
+            for name in names:
                 try:
                     os.remove(os.path.join(root, name))
                 except Exception:
@@ -147,7 +460,10 @@ def main():
                 except Exception:
                     pass
 
-    out_path = build_suppressed(args.store_glob, sup_df, args.output_dir, min_wins=args.min_wins, partition_by=("ds","p_mover_ind","year","month","day","the_date"))
+    out_path = build_suppressed(
+        args.store_glob, sup_df, args.output_dir, min_wins=args.min_wins,
+        workers=args.workers, incremental=not args.full, copy_files=args.copy
+    )
     print('Wrote suppressed dataset to:', out_path)
 
     # Move processed files
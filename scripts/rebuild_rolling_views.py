@@ -14,17 +14,53 @@ DOW Encoding (DuckDB standard):
 Tiered Windows:
 - Weekdays (1-5): Requires 4+ periods minimum, prefers 28d, falls back to 14d, then 4d
 - Weekends (0, 6): Requires 2+ periods minimum (more lenient), same fallback order
+
+Modes (--mode):
+- view:  CREATE VIEW; the window pipeline re-runs on every read
+- table: materialized table sorted by the_date. Re-running refreshes it
+         incrementally: only dates after (watermark - 28 days) are
+         recomputed, and the watermark per table is kept in rolling_watermarks
 """
 
 import duckdb
 import sys
+from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from tools import db as db_tools
+from tools.src.rolling import TIERED_WINDOWS, min_periods_sql, rolling_stats_sql, tier_sql
+
+
+ROLLING_MODES = ('view', 'table')
+
+# Bookkeeping for materialized rolling tables: one row per rolling table
+WATERMARK_TABLE = 'rolling_watermarks'
+
+# Days before the watermark that an incremental refresh recomputes, so
+# late-arriving rows for recent dates are picked up
+FRONTIER_DAYS = 28
+
+# ROWS frames per tier: the N-day tier looks at the N - 1 preceding same-DOW rows
+ROLLING_WINDOWS = {w: w - 1 for w in TIERED_WINDOWS}
+
+# Longest ROWS frame below (28d tier = 27 preceding same-DOW rows)
+CONTEXT_ROWS = max(ROLLING_WINDOWS.values())
+
+TOP_N_CARRIERS = 50
+
+
+def _top_carriers_sql(cube_table: str, metric_col: str, carrier_col: str) -> str:
+    return f"""
+        SELECT {carrier_col}
+        FROM {cube_table}
+        GROUP BY {carrier_col}
+        ORDER BY SUM({metric_col}) DESC
+        LIMIT {TOP_N_CARRIERS}"""
 
 
 def create_rolling_view_sql(ds: str, metric_type: str, mover_type: str) -> str:
@@ -39,20 +75,44 @@ def create_rolling_view_sql(ds: str, metric_type: str, mover_type: str) -> str:
     Returns:
         SQL CREATE OR REPLACE VIEW statement
     """
-    cube_table = f"{ds}_{metric_type}_{mover_type}_cube"
     view_name = f"{ds}_{metric_type}_{mover_type}_rolling"
+    return f"CREATE OR REPLACE VIEW {view_name} AS" + rolling_select_sql(ds, metric_type, mover_type)
+
+
+def rolling_select_sql(
+    ds: str,
+    metric_type: str,
+    mover_type: str,
+    since: Optional[str] = None,
+    history_table: Optional[str] = None
+) -> str:
+    """
+    Generate the SELECT behind the rolling view/table.
+    
+    With `since`, only rows with the_date > since are produced. Their window
+    context (the last CONTEXT_ROWS same-DOW rows of each pair) and
+    appearance rank offset are read back from `history_table`, an already
+    materialized rolling table, instead of re-running the windows over the
+    whole cube.
+    
+    Args:
+        ds: Dataset name (e.g., 'gamoshi')
+        metric_type: 'win' or 'loss'
+        mover_type: 'mover' or 'non_mover'
+        since: Only produce rows after this date (YYYY-MM-DD)
+        history_table: Materialized rolling table holding rows up to `since`
+    
+    Returns:
+        SQL SELECT statement
+    """
+    cube_table = f"{ds}_{metric_type}_{mover_type}_cube"
     metric_col = f"total_{metric_type}s"
     carrier_col = "winner" if metric_type == "win" else "loser"
     
-    sql = f"""
-    CREATE OR REPLACE VIEW {view_name} AS
+    if since is None:
+        daily_sql = f"""
     WITH top_carriers AS (
-        -- Top 50 carriers by total metric across all time
-        SELECT {carrier_col}
-        FROM {cube_table}
-        GROUP BY {carrier_col}
-        ORDER BY SUM({metric_col}) DESC
-        LIMIT 50
+        -- Top 50 carriers by total metric across all time{_top_carriers_sql(cube_table, metric_col, carrier_col)}
     ),
     filtered_cube AS (
         -- Filter to top carriers only
@@ -74,146 +134,99 @@ def create_rolling_view_sql(ds: str, metric_type: str, mover_type: str) -> str:
             SUM(record_count) AS record_count
         FROM filtered_cube
         GROUP BY the_date, day_of_week, winner, loser, dma, dma_name, state
+    ),"""
+        rank_sql = "ROW_NUMBER() OVER (\n                PARTITION BY winner, loser, dma \n                ORDER BY the_date\n            )"
+        final_filter = ""
+    else:
+        if history_table is None:
+            raise ValueError("history_table is required with since")
+        daily_sql = f"""
+    WITH top_carriers AS (
+        -- Top 50 carriers by total metric across all time{_top_carriers_sql(cube_table, metric_col, carrier_col)}
+    ),
+    filtered_cube AS (
+        -- Top carriers, frontier dates only
+        SELECT c.*
+        FROM {cube_table} c
+        INNER JOIN top_carriers tc ON c.{carrier_col} = tc.{carrier_col}
+        WHERE c.the_date > DATE '{since}'
     ),
+    fresh AS (
+        SELECT 
+            the_date,
+            day_of_week,
+            winner,
+            loser,
+            dma,
+            dma_name,
+            state,
+            SUM({metric_col}) AS total_{metric_type}s,
+            SUM(record_count) AS record_count
+        FROM filtered_cube
+        GROUP BY the_date, day_of_week, winner, loser, dma, dma_name, state
+    ),
+    context AS (
+        -- Last {CONTEXT_ROWS} materialized same-DOW rows per pair: all the window frames need
+        SELECT 
+            h.the_date, h.day_of_week, h.winner, h.loser, h.dma, h.dma_name, h.state,
+            h.total_{metric_type}s, h.record_count
+        FROM {history_table} h
+        SEMI JOIN (SELECT DISTINCT winner, loser, dma, day_of_week FROM fresh) f
+            USING (winner, loser, dma, day_of_week)
+        WHERE h.the_date <= DATE '{since}'
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY h.winner, h.loser, h.dma, h.day_of_week
+            ORDER BY h.the_date DESC
+        ) <= {CONTEXT_ROWS}
+    ),
+    prior_rank AS (
+        SELECT winner, loser, dma, MAX(appearance_rank) AS rank_offset
+        FROM {history_table}
+        WHERE the_date <= DATE '{since}'
+        GROUP BY winner, loser, dma
+    ),
+    dma_daily AS (
+        SELECT *, FALSE AS is_new, 0 AS rank_offset
+        FROM context
+        UNION ALL
+        SELECT f.*, TRUE AS is_new, COALESCE(p.rank_offset, 0) AS rank_offset
+        FROM fresh f
+        LEFT JOIN prior_rank p USING (winner, loser, dma)
+    ),"""
+        rank_sql = "rank_offset + ROW_NUMBER() OVER (\n                PARTITION BY winner, loser, dma, is_new \n                ORDER BY the_date\n            )"
+        final_filter = "\n    WHERE is_new"
+    
+    window_sql = rolling_stats_sql(
+        f"total_{metric_type}s",
+        ["winner", "loser", "dma", "day_of_week"],
+        "the_date",
+        ROLLING_WINDOWS,
+        names=(f"avg_{metric_type}s_{{w}}d", f"stddev_{metric_type}s_{{w}}d", "record_count_{w}"),
+    )
+    count = "record_count_{w}"
+    min_periods = min_periods_sql("day_of_week")
+    
+    sql = daily_sql + f"""
     rolling_metrics AS (
-        -- Calculate rolling metrics for 28d, 14d, and 4d windows
+        -- Rolling metrics for the 28d, 14d and 4d tiers (tools.src.rolling)
         SELECT 
             d.*,
-            -- 28-day window (4 weeks = 4 periods of same DOW)
-            AVG(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 27 PRECEDING AND 1 PRECEDING
-            ) AS avg_{metric_type}s_28d,
-            STDDEV(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 27 PRECEDING AND 1 PRECEDING
-            ) AS stddev_{metric_type}s_28d,
-            COUNT(*) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 27 PRECEDING AND 1 PRECEDING
-            ) AS record_count_28,
-            
-            -- 14-day window (2 weeks = 2 periods of same DOW)
-            AVG(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 13 PRECEDING AND 1 PRECEDING
-            ) AS avg_{metric_type}s_14d,
-            STDDEV(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 13 PRECEDING AND 1 PRECEDING
-            ) AS stddev_{metric_type}s_14d,
-            COUNT(*) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 13 PRECEDING AND 1 PRECEDING
-            ) AS record_count_14,
-            
-            -- 4-day window (minimum for weekdays)
-            AVG(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 3 PRECEDING AND 1 PRECEDING
-            ) AS avg_{metric_type}s_4d,
-            STDDEV(total_{metric_type}s) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 3 PRECEDING AND 1 PRECEDING
-            ) AS stddev_{metric_type}s_4d,
-            COUNT(*) OVER (
-                PARTITION BY winner, loser, dma, day_of_week 
-                ORDER BY the_date 
-                ROWS BETWEEN 3 PRECEDING AND 1 PRECEDING
-            ) AS record_count_4,
+            {window_sql},
             
             -- Track first appearance
-            ROW_NUMBER() OVER (
-                PARTITION BY winner, loser, dma 
-                ORDER BY the_date
-            ) AS appearance_rank
+            {rank_sql} AS appearance_rank
         FROM dma_daily d
     ),
     tiered_selection AS (
         -- Select best available window based on DOW and data availability
+        -- (weekdays need 4+ periods, weekends 2+)
         SELECT 
             *,
-            -- Select window tier
-            CASE 
-                -- Weekdays (Monday-Friday = 1-5): Need 4+ periods minimum
-                WHEN day_of_week BETWEEN 1 AND 5 THEN
-                    CASE 
-                        WHEN record_count_28 >= 4 THEN 28
-                        WHEN record_count_14 >= 4 THEN 14
-                        WHEN record_count_4 >= 4 THEN 4
-                        ELSE NULL
-                    END
-                -- Weekends (Sunday=0, Saturday=6): Need 2+ periods minimum (more lenient)
-                ELSE
-                    CASE 
-                        WHEN record_count_28 >= 2 THEN 28
-                        WHEN record_count_14 >= 2 THEN 14
-                        WHEN record_count_4 >= 2 THEN 4
-                        ELSE NULL
-                    END
-            END AS selected_window,
-            
-            -- Select avg metric based on selected window
-            CASE 
-                WHEN day_of_week BETWEEN 1 AND 5 THEN
-                    CASE 
-                        WHEN record_count_28 >= 4 THEN avg_{metric_type}s_28d
-                        WHEN record_count_14 >= 4 THEN avg_{metric_type}s_14d
-                        WHEN record_count_4 >= 4 THEN avg_{metric_type}s_4d
-                        ELSE NULL
-                    END
-                ELSE
-                    CASE 
-                        WHEN record_count_28 >= 2 THEN avg_{metric_type}s_28d
-                        WHEN record_count_14 >= 2 THEN avg_{metric_type}s_14d
-                        WHEN record_count_4 >= 2 THEN avg_{metric_type}s_4d
-                        ELSE NULL
-                    END
-            END AS avg_{metric_type}s,
-            
-            -- Select stddev based on selected window
-            CASE 
-                WHEN day_of_week BETWEEN 1 AND 5 THEN
-                    CASE 
-                        WHEN record_count_28 >= 4 THEN stddev_{metric_type}s_28d
-                        WHEN record_count_14 >= 4 THEN stddev_{metric_type}s_14d
-                        WHEN record_count_4 >= 4 THEN stddev_{metric_type}s_4d
-                        ELSE NULL
-                    END
-                ELSE
-                    CASE 
-                        WHEN record_count_28 >= 2 THEN stddev_{metric_type}s_28d
-                        WHEN record_count_14 >= 2 THEN stddev_{metric_type}s_14d
-                        WHEN record_count_4 >= 2 THEN stddev_{metric_type}s_4d
-                        ELSE NULL
-                    END
-            END AS stddev_{metric_type}s,
-            
+            {tier_sql('{w}', min_periods, count=count)} AS selected_window,
+            {tier_sql(f'avg_{metric_type}s_{{w}}d', min_periods, count=count)} AS avg_{metric_type}s,
+            {tier_sql(f'stddev_{metric_type}s_{{w}}d', min_periods, count=count)} AS stddev_{metric_type}s,
             -- Number of periods used (not days!)
-            CASE 
-                WHEN day_of_week BETWEEN 1 AND 5 THEN
-                    CASE 
-                        WHEN record_count_28 >= 4 THEN record_count_28
-                        WHEN record_count_14 >= 4 THEN record_count_14
-                        WHEN record_count_4 >= 4 THEN record_count_4
-                        ELSE NULL
-                    END
-                ELSE
-                    CASE 
-                        WHEN record_count_28 >= 2 THEN record_count_28
-                        WHEN record_count_14 >= 2 THEN record_count_14
-                        WHEN record_count_4 >= 2 THEN record_count_4
-                        ELSE NULL
-                    END
-            END AS n_periods
+            {tier_sql(count, min_periods, count=count)} AS n_periods
         FROM rolling_metrics
     )
     SELECT 
@@ -253,19 +266,184 @@ def create_rolling_view_sql(ds: str, metric_type: str, mover_type: str) -> str:
         ) AS is_outlier,
         
         appearance_rank
-    FROM tiered_selection
+    FROM tiered_selection{final_filter}
     """
     
     return sql
 
 
-def rebuild_rolling_views(db_path: str, dataset: str = 'gamoshi'):
-    """Rebuild all rolling views for a dataset."""
+def _object_type(con, name: str) -> Optional[str]:
+    """'BASE TABLE', 'VIEW' or None"""
+    row = con.execute(
+        "SELECT table_type FROM information_schema.tables WHERE table_name = ?", [name]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _drop_object(con, name: str) -> None:
+    kind = _object_type(con, name)
+    if kind == 'VIEW':
+        con.execute(f"DROP VIEW {name}")
+    elif kind is not None:
+        con.execute(f"DROP TABLE {name}")
+
+
+def _ensure_watermark_table(con) -> None:
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            rolling_table VARCHAR PRIMARY KEY,
+            cube_table VARCHAR,
+            last_date DATE,
+            top_carriers VARCHAR[],
+            frontier_days INTEGER,
+            refresh_mode VARCHAR,
+            rows_written BIGINT,
+            refreshed_at TIMESTAMP
+        )
+    """)
+
+
+def get_watermark(con, rolling_table: str) -> Optional[dict]:
+    """Watermark row for a materialized rolling table, or None"""
+    if _object_type(con, WATERMARK_TABLE) is None:
+        return None
+    row = con.execute(
+        f"SELECT last_date, top_carriers, refresh_mode, rows_written, refreshed_at "
+        f"FROM {WATERMARK_TABLE} WHERE rolling_table = ?",
+        [rolling_table]
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        'last_date': row[0],
+        'top_carriers': row[1],
+        'refresh_mode': row[2],
+        'rows_written': row[3],
+        'refreshed_at': row[4],
+    }
+
+
+def refresh_rolling_table(
+    con,
+    ds: str,
+    metric_type: str,
+    mover_type: str,
+    full: bool = False,
+    frontier_days: int = FRONTIER_DAYS
+) -> dict:
+    """
+    Materialize or incrementally refresh a rolling table.
+    
+    Rows are derived only from earlier same-DOW rows, so once materialized
+    they stay valid when later days land in the cube. An incremental refresh
+    therefore deletes and recomputes just the dates after
+    (watermark - frontier_days). A full rebuild happens instead when there is
+    no table/watermark yet, when `full` is set, or when the top-50 carrier
+    set has changed (that changes which pairs are in the table).
+    
+    Args:
+        con: Read-write DuckDB connection
+        ds: Dataset name
+        metric_type: 'win' or 'loss'
+        mover_type: 'mover' or 'non_mover'
+        full: Force a full rebuild
+        frontier_days: Trailing days before the watermark to recompute
+    
+    Returns:
+        Dict with mode ('full' or 'incremental'), since, last_date and
+        rows_written
+    """
+    table_name = f"{ds}_{metric_type}_{mover_type}_rolling"
+    cube_table = f"{ds}_{metric_type}_{mover_type}_cube"
+    metric_col = f"total_{metric_type}s"
+    carrier_col = "winner" if metric_type == "win" else "loser"
+    
+    _ensure_watermark_table(con)
+    
+    last_date = con.execute(f"SELECT MAX(the_date) FROM {cube_table}").fetchone()[0]
+    top_carriers = sorted(
+        r[0] for r in con.execute(_top_carriers_sql(cube_table, metric_col, carrier_col)).fetchall()
+    )
+    
+    watermark = get_watermark(con, table_name)
+    incremental = (
+        not full
+        and watermark is not None
+        and watermark['last_date'] is not None
+        and _object_type(con, table_name) == 'BASE TABLE'
+        and sorted(watermark['top_carriers'] or []) == top_carriers
+    )
+    
+    con.execute("BEGIN TRANSACTION")
+    try:
+        if incremental:
+            since = str(watermark['last_date'] - timedelta(days=frontier_days))
+            con.execute(f"DELETE FROM {table_name} WHERE the_date > DATE '{since}'")
+            con.execute(
+                f"INSERT INTO {table_name} "
+                + rolling_select_sql(ds, metric_type, mover_type, since=since, history_table=table_name)
+                + "\n    ORDER BY the_date"
+            )
+            rows_written = con.execute(
+                f"SELECT COUNT(*) FROM {table_name} WHERE the_date > DATE '{since}'"
+            ).fetchone()[0]
+            mode = 'incremental'
+        else:
+            since = None
+            _drop_object(con, table_name)
+            # Sorted by the_date so date-range reads and frontier deletes skip row groups
+            con.execute(
+                f"CREATE TABLE {table_name} AS"
+                + rolling_select_sql(ds, metric_type, mover_type)
+                + "\n    ORDER BY the_date"
+            )
+            rows_written = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            mode = 'full'
+        
+        con.execute(
+            f"INSERT OR REPLACE INTO {WATERMARK_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, now())",
+            [table_name, cube_table, last_date, top_carriers, frontier_days, mode, rows_written]
+        )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    
+    return {
+        'mode': mode,
+        'since': since,
+        'last_date': last_date,
+        'rows_written': rows_written,
+    }
+
+
+def rebuild_rolling_views(
+    db_path: str,
+    dataset: str = 'gamoshi',
+    mode: str = 'view',
+    full: bool = False,
+    frontier_days: int = FRONTIER_DAYS
+):
+    """
+    Rebuild all rolling views for a dataset.
+    
+    Args:
+        db_path: Database path
+        dataset: Dataset name
+        mode: 'view' (recomputed on every read) or 'table' (materialized,
+            incrementally refreshed against the rolling_watermarks table)
+        full: In table mode, rebuild from scratch instead of refreshing
+        frontier_days: In table mode, trailing days before the watermark
+            that are recomputed on refresh
+    """
     assert db_path.endswith('data/databases/duck_suppression.db'), \
         f"❌ CRITICAL ERROR: Wrong database path: {db_path}\n" \
         f"   Expected: data/databases/duck_suppression.db\n" \
         f"   This error exists to prevent accidental database proliferation."
     
+    if mode not in ROLLING_MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {ROLLING_MODES}")
+    
     con = duckdb.connect(db_path)
     
     views_to_create = [
@@ -274,17 +452,30 @@ def rebuild_rolling_views(db_path: str, dataset: str = 'gamoshi'):
         # Add loss views later if needed
     ]
     
-    print(f"🔄 Rebuilding rolling views for dataset: {dataset}")
+    print(f"🔄 Rebuilding rolling {mode}s for dataset: {dataset}")
     print(f"   Database: {db_path}\n")
     
     for metric_type, mover_type in views_to_create:
         view_name = f"{dataset}_{metric_type}_{mover_type}_rolling"
-        print(f"[INFO] Creating view: {view_name}")
-        
-        sql = create_rolling_view_sql(dataset, metric_type, mover_type)
         
         try:
-            con.execute(sql)
+            if mode == 'table':
+                print(f"[INFO] Refreshing table: {view_name}")
+                result = refresh_rolling_table(
+                    con, dataset, metric_type, mover_type, full=full, frontier_days=frontier_days
+                )
+                if result['mode'] == 'incremental':
+                    print(f"   ↻ Incremental: recomputed dates after {result['since']} "
+                          f"({result['rows_written']:,} rows), watermark {result['last_date']}")
+                else:
+                    print(f"   ↻ Full build, watermark {result['last_date']}")
+            else:
+                print(f"[INFO] Creating view: {view_name}")
+                if _object_type(con, view_name) == 'BASE TABLE':
+                    con.execute(f"DROP TABLE {view_name}")
+                if _object_type(con, WATERMARK_TABLE) is not None:
+                    con.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE rolling_table = ?", [view_name])
+                con.execute(create_rolling_view_sql(dataset, metric_type, mover_type))
             
             # Validate view
             stats = con.execute(f"""
@@ -312,7 +503,7 @@ def rebuild_rolling_views(db_path: str, dataset: str = 'gamoshi'):
     
     con.close()
     
-    print("✅ All rolling views rebuilt successfully!")
+    print(f"✅ All rolling {mode}s rebuilt successfully!")
 
 
 if __name__ == "__main__":
@@ -321,9 +512,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Rebuild rolling views with correct DOW logic')
     parser.add_argument('--db', default=None, help='Database path')
     parser.add_argument('--ds', default='gamoshi', help='Dataset name')
+    parser.add_argument('--mode', choices=ROLLING_MODES, default='view',
+                        help='view: recompute on read; table: materialize and refresh incrementally (default: view)')
+    parser.add_argument('--full', action='store_true',
+                        help='Table mode: full rebuild instead of incremental refresh')
+    parser.add_argument('--frontier-days', type=int, default=FRONTIER_DAYS,
+                        help=f'Table mode: trailing days before the watermark to recompute (default: {FRONTIER_DAYS})')
     
     args = parser.parse_args()
     
     db_path = args.db if args.db else db_tools.get_default_db_path()
     
-    rebuild_rolling_views(db_path, args.ds)
+    rebuild_rolling_views(db_path, args.ds, mode=args.mode, full=args.full, frontier_days=args.frontier_days)
@@ -330,12 +330,113 @@ def get_census_block_data(
         END as cb_pct_change
     FROM current_blocks cb
     LEFT JOIN historical_blocks hb ON cb.census_blockid = hb.census_blockid
-    ORDER BY cb_z DESC NULLS LAST
+    ORDER BY cb_z DESC NULLS LAST, cb.cb_wins_current DESC, cb.census_blockid
     """
     
     return db.query(sql, db_path)
 
 
+def get_census_block_data_batch(
+    ds: str,
+    mover_ind: bool,
+    the_date: date,
+    pairs: pd.DataFrame,
+    db_path: str = 'data/databases/duck_suppression.db'
+) -> pd.DataFrame:
+    """
+    get_census_block_data for many pair-DMAs of one date in a single query.
+    
+    `pairs` (winner, loser, state, dma_name) is registered as a relation and
+    joined to the census cube, so the same-DOW block baselines of every pair
+    come from one grouped scan instead of one history scan per pair.
+    
+    Returns the get_census_block_data columns plus pair_idx (row position
+    in `pairs`), ordered by pair_idx and then block priority.
+    """
+    mover_str = 'mover' if mover_ind else 'non_mover'
+    table = f"{ds}_win_{mover_str}_census_cube"
+    
+    dow = the_date.isoweekday() % 7
+    keys = pairs[['winner', 'loser', 'state', 'dma_name']].reset_index(drop=True)
+    keys.insert(0, 'pair_idx', np.arange(len(keys)))
+    
+    sql = f"""
+    WITH block_rows AS (
+        SELECT
+            p.pair_idx,
+            c.the_date,
+            c.winner,
+            c.loser,
+            c.state,
+            c.dma_name,
+            c.census_blockid,
+            c.total_wins,
+            c.record_count
+        FROM {table} c
+        JOIN stage1_pairs p
+          ON c.winner = p.winner
+         AND c.loser = p.loser
+         AND c.state = p.state
+         AND c.dma_name = p.dma_name
+        WHERE c.the_date <= DATE '{the_date}'
+    ),
+    current_blocks AS (
+        SELECT
+            pair_idx,
+            the_date,
+            winner,
+            loser,
+            state,
+            dma_name,
+            census_blockid,
+            total_wins as cb_wins_current,
+            record_count as cb_record_count
+        FROM block_rows
+        WHERE the_date = DATE '{the_date}'
+    ),
+    historical_blocks AS (
+        SELECT
+            pair_idx,
+            census_blockid,
+            AVG(total_wins) as cb_mu_wins,
+            STDDEV_POP(total_wins) as cb_sigma_wins,
+            MIN(the_date) as cb_first_date,
+            COUNT(*) as cb_window
+        FROM block_rows
+        WHERE the_date < DATE '{the_date}'
+          AND EXTRACT(dow FROM the_date) = {dow}
+        GROUP BY pair_idx, census_blockid
+    )
+    SELECT
+        cb.pair_idx,
+        cb.the_date,
+        cb.winner,
+        cb.loser,
+        cb.state,
+        cb.dma_name,
+        cb.census_blockid,
+        cb.cb_wins_current,
+        cb.cb_record_count,
+        COALESCE(hb.cb_mu_wins, 0) as cb_mu_wins,
+        COALESCE(hb.cb_sigma_wins, 0) as cb_sigma_wins,
+        COALESCE(hb.cb_window, 0) as cb_window,
+        COALESCE(hb.cb_first_date, cb.the_date) as cb_first_date,
+        CASE WHEN hb.cb_first_date IS NULL THEN TRUE ELSE FALSE END as cb_is_first_appearance,
+        (cb.cb_wins_current - COALESCE(hb.cb_mu_wins, 0)) / NULLIF(COALESCE(hb.cb_sigma_wins, 1), 0) as cb_z,
+        CASE 
+            WHEN COALESCE(hb.cb_mu_wins, 0) > 0 
+            THEN (cb.cb_wins_current - hb.cb_mu_wins) / hb.cb_mu_wins 
+            ELSE NULL 
+        END as cb_pct_change
+    FROM current_blocks cb
+    LEFT JOIN historical_blocks hb
+      ON cb.pair_idx = hb.pair_idx AND cb.census_blockid = hb.census_blockid
+    ORDER BY cb.pair_idx, cb_z DESC NULLS LAST, cb.cb_wins_current DESC, cb.census_blockid
+    """
+    
+    return db.query(sql, db_path, relations={'stage1_pairs': keys})
+
+
 def stage1_targeted_removal(
     pairs: pd.DataFrame,
     need: int,
@@ -459,73 +560,71 @@ def census_block_surgical_targeting(
     """
     For each pair-DMA in stage1, use census blocks to surgically target removal.
     
-    Returns list of census block level suppression records.
-    """
-    cb_records = []
+    Blocks of every pair come from one get_census_block_data_batch query.
+    Each pair's rm_stage1 budget is spent greedily over its blocks in
+    priority order (highest cb_z first): a block is used while the wins of
+    the blocks before it are below the budget, and gives up
+    min(block wins, budget left). Pairs without census blocks fall back to
+    one pair-DMA level record.
     
-    for _, pair in stage1.iterrows():
-        target_removal = pair['rm_stage1']
-        
-        # Get census blocks for this pair-DMA
-        cbs = get_census_block_data(
-            ds=ds,
-            mover_ind=mover_ind,
-            the_date=the_date,
-            winner=pair['winner'],
-            loser=pair['loser'],
-            state=pair['state'],
-            dma_name=pair['dma_name'],
-            db_path=db_path
-        )
-        
-        if cbs.empty:
-            # Fallback: remove at pair-DMA level
-            cb_records.append({
-                'the_date': str(the_date),
-                'winner': pair['winner'],
-                'loser': pair['loser'],
-                'state': pair['state'],
-                'dma_name': pair['dma_name'],
-                'census_blockid': None,
-                'remove_units': target_removal,
-                'stage': 'stage1_pair_level',
-                'pair_z': pair['pair_z'],
-                'pair_wins_current': pair['pair_wins_current'],
-                'pair_mu_wins': pair['pair_mu_wins'],
-                'is_first_appearance': pair['is_first_appearance']
-            })
-            continue
-        
-        # Sort census blocks by z-score (highest first)
-        cbs = cbs.sort_values('cb_z', ascending=False)
+    Returns list of census block level suppression records (in stage1
+    order, blocks in priority order).
+    """
+    if stage1.empty:
+        return []
+    
+    pairs = stage1.reset_index(drop=True)
+    cbs = get_census_block_data_batch(ds, mover_ind, the_date, pairs, db_path)
+    
+    records = []
+    
+    # Fallback: remove at pair-DMA level
+    fallback = pairs[~pairs.index.isin(cbs['pair_idx'])]
+    if not fallback.empty:
+        fb = pd.DataFrame({
+            'the_date': str(the_date),
+            'winner': fallback['winner'],
+            'loser': fallback['loser'],
+            'state': fallback['state'],
+            'dma_name': fallback['dma_name'],
+            'census_blockid': None,
+            'remove_units': fallback['rm_stage1'],
+            'stage': 'stage1_pair_level',
+            'pair_z': fallback['pair_z'],
+            'pair_wins_current': fallback['pair_wins_current'],
+            'pair_mu_wins': fallback['pair_mu_wins'],
+            'is_first_appearance': fallback['is_first_appearance']
+        })
+        records.extend(zip(fallback.index, fb.to_dict('records')))
+    
+    if not cbs.empty:
+        # Greedy budget cut: wins of the higher-priority blocks of the same pair
+        target = pairs['rm_stage1'].to_numpy()[cbs['pair_idx'].to_numpy()]
+        cum = cbs.groupby('pair_idx')['cb_wins_current'].cumsum()
+        before = cum.groupby(cbs['pair_idx']).shift(fill_value=0).to_numpy()
+        used = before < target
+        cbs = cbs[used]
         
-        removed_so_far = 0
-        for _, cb in cbs.iterrows():
-            if removed_so_far >= target_removal:
-                break
-            
-            # How much to remove from this block
-            cb_removal = min(cb['cb_wins_current'], target_removal - removed_so_far)
-            
-            cb_records.append({
-                'the_date': str(the_date),
-                'winner': pair['winner'],
-                'loser': pair['loser'],
-                'state': pair['state'],
-                'dma_name': pair['dma_name'],
-                'census_blockid': cb['census_blockid'],
-                'remove_units': cb_removal,
-                'stage': 'stage1_census_block',
-                'pair_z': pair['pair_z'],
-                'cb_z': cb['cb_z'],
-                'cb_wins_current': cb['cb_wins_current'],
-                'cb_mu_wins': cb['cb_mu_wins'],
-                'cb_is_first_appearance': cb['cb_is_first_appearance']
-            })
-            
-            removed_so_far += cb_removal
-    
-    return cb_records
+        blocks = pd.DataFrame({
+            'the_date': str(the_date),
+            'winner': cbs['winner'],
+            'loser': cbs['loser'],
+            'state': cbs['state'],
+            'dma_name': cbs['dma_name'],
+            'census_blockid': cbs['census_blockid'],
+            'remove_units': np.minimum(cbs['cb_wins_current'].to_numpy(), target[used] - before[used]),
+            'stage': 'stage1_census_block',
+            'pair_z': pairs['pair_z'].to_numpy()[cbs['pair_idx'].to_numpy()],
+            'cb_z': cbs['cb_z'],
+            'cb_wins_current': cbs['cb_wins_current'],
+            'cb_mu_wins': cbs['cb_mu_wins'],
+            'cb_is_first_appearance': cbs['cb_is_first_appearance']
+        })
+        records.extend(zip(cbs['pair_idx'], blocks.to_dict('records')))
+    
+    # Stable sort keeps block priority within each pair
+    records.sort(key=lambda r: r[0])
+    return [r for _, r in records]
 
 
 def build_suppression_plan(
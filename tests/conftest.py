@@ -0,0 +1,99 @@
+import importlib.util
+import os
+from datetime import date, timedelta
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_script(rel_path: str):
+    """Import a script module (scripts/ is not a package)"""
+    path = os.path.join(PROJECT_ROOT, rel_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_carrier_data(n_days: int = 120, start: date = date(2025, 1, 1), seed: int = 7) -> pd.DataFrame:
+    """Synthetic carrier_data rows with DOW seasonality, sparse pairs and a few spikes"""
+    rng = np.random.default_rng(seed)
+    carriers = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta']
+    dmas = [('501', 'New York, NY', 'NY'), ('803', 'Los Angeles, CA', 'CA'),
+            ('602', 'Chicago, IL', 'IL'), ('623', 'Dallas-Ft. Worth, TX', 'TX')]
+    rows = []
+    for i in range(n_days):
+        d = start + timedelta(days=i)
+        dow = int(d.strftime('%w'))
+        weekend = dow in (0, 6)
+        for wi, w in enumerate(carriers):
+            for li, l in enumerate(carriers):
+                if w == l:
+                    continue
+                for dma, dma_name, state in dmas:
+                    # Sparse pairs: some combinations only show up later
+                    if (wi + li) % 5 == 0 and i < n_days // 3:
+                        continue
+                    if rng.random() < 0.08:
+                        continue
+                    lam = (12 - wi) * (0.6 if weekend else 1.0)
+                    wins = float(rng.poisson(lam))
+                    if rng.random() < 0.01:
+                        wins *= 6
+                    rows.append((
+                        d, 'test', bool(rng.random() < 0.5), w, l, dma, dma_name, state,
+                        wins, float(rng.poisson(lam * 0.8)),
+                        f"{dma}{rng.integers(0, 6):04d}",
+                        d.year, d.month, d.day, dow,
+                    ))
+    return pd.DataFrame(rows, columns=[
+        'the_date', 'ds', 'mover_ind', 'winner', 'loser', 'dma', 'dma_name', 'state',
+        'adjusted_wins', 'adjusted_losses', 'census_blockid',
+        'year', 'month', 'day', 'day_of_week',
+    ])
+
+
+def build_synthetic_db(db_path: str, n_days: int = 120) -> str:
+    """Create carrier_data and the four cube tables for ds='test'"""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    df = make_carrier_data(n_days)
+    con = duckdb.connect(db_path)
+    try:
+        con.register('carrier_df', df)
+        con.execute("""
+            CREATE TABLE carrier_data AS
+            SELECT CAST(the_date AS DATE) AS the_date, ds, mover_ind, winner, loser, dma,
+                   dma_name, state, adjusted_wins, adjusted_losses, census_blockid,
+                   CAST(year AS INTEGER) AS year, CAST(month AS INTEGER) AS month,
+                   CAST(day AS INTEGER) AS day, CAST(day_of_week AS INTEGER) AS day_of_week
+            FROM carrier_df
+        """)
+        con.unregister('carrier_df')
+    finally:
+        con.close()
+
+    cubes = _load_script('scripts/build/build_cubes_in_db.py')
+    assert cubes.build_all_cube_tables(db_path, 'test')
+    return db_path
+
+
+@pytest.fixture(scope='session')
+def synthetic_db(tmp_path_factory):
+    """Path to a small synthetic database laid out like the real one"""
+    root = tmp_path_factory.mktemp('synthetic')
+    return build_synthetic_db(str(root / 'data' / 'databases' / 'duck_suppression.db'))
+
+
+@pytest.fixture(scope='session')
+def rolling_db(tmp_path_factory):
+    """The synthetic database plus the rolling views (rebuild_rolling_views.py, mode='view')"""
+    root = tmp_path_factory.mktemp('rolling')
+    db_path = build_synthetic_db(str(root / 'data' / 'databases' / 'duck_suppression.db'))
+    _load_script('scripts/rebuild_rolling_views.py').rebuild_rolling_views(db_path, 'test', mode='view')
+    return db_path
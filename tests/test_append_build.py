@@ -0,0 +1,213 @@
+import os
+from datetime import date, timedelta
+
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script
+
+
+build_db = _load_script('scripts/build/build_suppression_db.py')
+build_cubes = _load_script('scripts/build/build_cubes_in_db.py')
+
+START = date(2025, 1, 1)
+CUBES = ['test_win_mover_cube', 'test_win_non_mover_cube', 'test_loss_mover_cube', 'test_loss_non_mover_cube']
+FIRST_SEEN = [cube.replace('_cube', '_first_seen') for cube in CUBES]
+ROLLUPS = {cube.replace('_cube', f'_{rollup}'): keys
+           for cube in CUBES for rollup, keys in build_cubes.CUBE_ROLLUPS.items()}
+
+
+def _write_day(base, day: int, seed: int = 0, carriers: int = 4):
+    """One v15.0-shaped pre-agg file for START + day"""
+    d = START + timedelta(days=day)
+    path = os.path.join(base, f"day_{d:%Y%m%d}", "part-0.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    duckdb.sql(f"""
+        SELECT
+            DATE '{d}' AS the_date,
+            'test' AS ds,
+            (i % 2 = 0) AS mover_ind,
+            CAST(1 + i % {carriers} AS INTEGER) AS primary_sp_group,
+            CAST(1 + (i // 4) % 4 AS INTEGER) AS secondary_sp_group,
+            'blk' || CAST(i % 6 AS VARCHAR) AS primary_geoid,
+            CAST(1 + hash(i, {day}, {seed}) % 20 AS DOUBLE) AS adjusted_wins,
+            CAST(1 + hash(i, {day}, {seed} + 1) % 15 AS DOUBLE) AS adjusted_losses
+        FROM range(200) t(i)
+    """).write_parquet(path)
+    return path
+
+
+def _write_reference(root, carriers: int = 4):
+    rules = os.path.join(root, 'rules.parquet')
+    geo = os.path.join(root, 'geo.parquet')
+    duckdb.sql(f"""
+        SELECT CAST(i AS INTEGER) AS sp_dim_id, 'Carrier ' || CAST(i AS VARCHAR) AS sp_reporting_name_group
+        FROM range(1, {carriers + 1}) t(i)
+    """).write_parquet(rules)
+    duckdb.sql("""
+        SELECT 'blk' || CAST(i AS VARCHAR) AS census_blockid,
+               CAST(500 + i % 3 AS VARCHAR) AS dma,
+               'DMA ' || CAST(i % 3 AS VARCHAR) AS dma_name,
+               'S' || CAST(i % 3 AS VARCHAR) AS state
+        FROM range(6) t(i)
+    """).write_parquet(geo)
+    return rules, geo
+
+
+def _build(base, rules, geo, db_path, append=False, encoding='varchar'):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    assert build_db.build_suppression_db(base, rules, geo, db_path, append=append)
+    assert build_cubes.build_all_cube_tables(db_path, 'test', append=append, encoding=encoding)
+
+
+def _table(db_path, name, keys):
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        df = con.execute(f"SELECT * FROM {name}").df()
+    finally:
+        con.close()
+    for col in df.columns[[isinstance(t, pd.CategoricalDtype) for t in df.dtypes]]:
+        df[col] = df[col].astype(object)
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    base = str(tmp_path / 'preagg')
+    for day in range(10):
+        _write_day(base, day)
+    rules, geo = _write_reference(str(tmp_path))
+    return base, rules, geo
+
+
+def test_append_matches_full_rebuild(tmp_path, sources):
+    base, rules, geo = sources
+    incremental = str(tmp_path / 'inc' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, incremental)
+
+    # Next drop: two new days, day 5 restated, day 2 withdrawn
+    for day in (10, 11):
+        _write_day(base, day)
+    restated = _write_day(base, 5, seed=1)
+    st = os.stat(restated)
+    os.utime(restated, (st.st_atime, st.st_mtime + 10))
+    os.remove(os.path.join(base, f"day_{START + timedelta(days=2):%Y%m%d}", "part-0.parquet"))
+
+    _build(base, rules, geo, incremental, append=True)
+
+    con = duckdb.connect(incremental, read_only=True)
+    try:
+        mode, dates = con.execute(
+            "SELECT mode, dates FROM build_log ORDER BY build_id DESC LIMIT 1"
+        ).fetchone()
+        manifest_files = con.execute("SELECT COUNT(*) FROM build_manifest").fetchone()[0]
+        cube_builds = con.execute("SELECT DISTINCT build_id FROM build_cube_state").fetchall()
+    finally:
+        con.close()
+    assert mode == 'append'
+    assert dates == [START + timedelta(days=d) for d in (2, 5, 10, 11)]
+    assert manifest_files == 11
+    assert cube_builds == [(2,)]
+
+    full = str(tmp_path / 'full' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, full)
+
+    carrier_keys = ['the_date', 'mover_ind', 'winner', 'loser', 'census_blockid', 'adjusted_wins']
+    pd.testing.assert_frame_equal(
+        _table(incremental, 'carrier_data', carrier_keys), _table(full, 'carrier_data', carrier_keys)
+    )
+    cube_keys = ['the_date', 'winner', 'loser', 'dma', 'state']
+    for cube in CUBES:
+        pd.testing.assert_frame_equal(
+            _table(incremental, cube, cube_keys), _table(full, cube, cube_keys),
+            check_exact=False, rtol=1e-12
+        )
+    for table in FIRST_SEEN:
+        pd.testing.assert_frame_equal(
+            _table(incremental, table, ['winner', 'loser', 'dma_name']),
+            _table(full, table, ['winner', 'loser', 'dma_name'])
+        )
+    for table, keys in ROLLUPS.items():
+        pd.testing.assert_frame_equal(
+            _table(incremental, table, keys), _table(full, table, keys),
+            check_exact=False, rtol=1e-12
+        )
+
+
+def test_append_new_days_merges_first_seen(tmp_path, sources):
+    base, rules, geo = sources
+    incremental = str(tmp_path / 'inc' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, incremental)
+    for day in range(10, 14):
+        _write_day(base, day)
+    _build(base, rules, geo, incremental, append=True)
+
+    full = str(tmp_path / 'full' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, full)
+
+    for table in FIRST_SEEN:
+        inc = _table(incremental, table, ['winner', 'loser', 'dma_name'])
+        pd.testing.assert_frame_equal(inc, _table(full, table, ['winner', 'loser', 'dma_name']))
+        assert (inc['n_dates'] > build_cubes.FIRST_SEEN_DATES).any()
+
+
+def test_append_without_changes_is_noop(tmp_path, sources):
+    base, rules, geo = sources
+    db_path = str(tmp_path / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, db_path)
+    before = {cube: _table(db_path, cube, ['the_date', 'winner', 'loser', 'dma', 'state']) for cube in CUBES}
+
+    _build(base, rules, geo, db_path, append=True)
+
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        assert con.execute("SELECT COUNT(*) FROM build_log").fetchone()[0] == 1
+        for cube in CUBES:
+            assert build_cubes.pending_cube_dates(con, cube) == []
+    finally:
+        con.close()
+    for cube, df in before.items():
+        pd.testing.assert_frame_equal(_table(db_path, cube, ['the_date', 'winner', 'loser', 'dma', 'state']), df)
+
+
+def test_append_extends_encoded_dimensions(tmp_path, sources):
+    base, rules, geo = sources
+    incremental = str(tmp_path / 'inc' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, incremental, encoding='enum')
+
+    # A carrier first seen in the appended days has no ENUM code yet
+    rules, geo = _write_reference(str(tmp_path), carriers=5)
+    for day in (10, 11):
+        _write_day(base, day, carriers=5)
+    _build(base, rules, geo, incremental, append=True)
+
+    con = duckdb.connect(incremental, read_only=True)
+    try:
+        carriers = [r[0] for r in con.execute("SELECT carrier FROM dim_carrier ORDER BY carrier_id").fetchall()]
+        types = dict(con.execute(
+            "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?", [CUBES[0]]
+        ).fetchall())
+        indexes = con.execute(
+            "SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name = ?", [CUBES[0]]
+        ).fetchone()[0]
+    finally:
+        con.close()
+    assert carriers == [f'Carrier {i}' for i in range(1, 6)]
+    assert types['winner'].startswith('ENUM') and "'Carrier 5'" in types['winner']
+    # Losers are still Carriers 1-4: that column keeps its type, no rewrite
+    assert types['loser'].startswith('ENUM') and "'Carrier 5'" not in types['loser']
+    assert indexes > 0
+
+    full = str(tmp_path / 'full' / 'data' / 'databases' / 'duck_suppression.db')
+    _build(base, rules, geo, full)
+    cube_keys = ['the_date', 'winner', 'loser', 'dma', 'state']
+    for cube in CUBES:
+        inc = _table(incremental, cube, cube_keys)
+        assert (inc['winner'] == 'Carrier 5').any()
+        pd.testing.assert_frame_equal(inc, _table(full, cube, cube_keys), check_exact=False, rtol=1e-12)
+    for table, keys in ROLLUPS.items():
+        pd.testing.assert_frame_equal(
+            _table(incremental, table, keys), _table(full, table, keys),
+            check_exact=False, rtol=1e-12
+        )
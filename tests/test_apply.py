@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from tools import db
+from tools.src import apply
+from tools.src.plan import base_national_series
+
+
+WINNERS = ['Alpha', 'Beta', 'Gamma', 'Delta']
+START, END = '2025-03-01', '2025-03-31'
+
+
+def _plan(db_path):
+    """Plan rows on real cube cells: partial, over-removal, duplicates, outside the window"""
+    cells = db.query(f"""
+        SELECT the_date, winner, loser, dma_name, total_wins
+        FROM test_win_non_mover_cube
+        WHERE the_date BETWEEN '{START}' AND '{END}' AND total_wins > 2
+        ORDER BY ALL
+        LIMIT 40
+    """, db_path)
+    plan = cells.rename(columns={'the_date': 'date'})[['date', 'winner', 'loser', 'dma_name']]
+    plan['remove_units'] = np.where(np.arange(len(plan)) % 3 == 0, cells['total_wins'] + 5, 2)
+    plan['date'] = plan['date'].dt.strftime('%Y-%m-%d')
+    extra = plan.head(5).assign(remove_units=1)
+    outside = plan.head(2).assign(date='2025-04-15')
+    return pd.concat([plan, extra, outside], ignore_index=True)
+
+
+def _reference(db_path, plan):
+    """The pandas merge/subtract/regroup the preview used to do"""
+    suppressions = plan.groupby(['date', 'winner', 'loser', 'dma_name'])['remove_units'].sum().reset_index()
+    suppressions['date'] = pd.to_datetime(suppressions['date'])
+    pair_data = db.query(f"""
+        SELECT the_date, winner, loser, dma_name, total_wins
+        FROM test_win_non_mover_cube
+        WHERE the_date BETWEEN '{START}' AND '{END}'
+            AND winner IN ({','.join(f"'{w}'" for w in WINNERS)})
+    """, db_path)
+    pair_data['the_date'] = pd.to_datetime(pair_data['the_date'])
+    merged = pair_data.merge(suppressions.rename(columns={'date': 'the_date'}),
+                             on=['the_date', 'winner', 'loser', 'dma_name'], how='left')
+    merged['suppressed_wins'] = np.maximum(0, merged['total_wins'] - merged['remove_units'].fillna(0))
+    agg = merged.groupby(['the_date', 'winner'])['suppressed_wins'].sum().reset_index()
+    agg['market_total'] = agg.groupby('the_date')['suppressed_wins'].transform('sum')
+    agg['win_share'] = agg['suppressed_wins'] / agg['market_total']
+    return agg.rename(columns={'suppressed_wins': 'total_wins'})
+
+
+def test_preview_matches_pandas_reference(synthetic_db):
+    plan = _plan(synthetic_db)
+    base, suppressed = apply.preview_series('test', False, WINNERS, START, END, plan, synthetic_db)
+
+    expected_base = base_national_series('test', False, WINNERS, START, END, synthetic_db)
+    pd.testing.assert_frame_equal(base, expected_base)
+
+    expected = _reference(synthetic_db, plan)
+    keys = ['the_date', 'winner']
+    got = suppressed.sort_values(keys).reset_index(drop=True)
+    expected = expected.sort_values(keys).reset_index(drop=True)[got.columns]
+    pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-9, check_dtype=False)
+    assert (got['total_wins'] < base.sort_values(keys)['total_wins'].values).any()
+
+
+def test_plan_outside_winners_or_window_is_noop(synthetic_db):
+    plan = _plan(synthetic_db)
+    plan = plan[~plan['winner'].isin(WINNERS[:2])]
+    base, suppressed = apply.preview_series('test', False, WINNERS[:2], START, END, plan, synthetic_db)
+    pd.testing.assert_frame_equal(suppressed, base[suppressed.columns], check_dtype=False)
+
+
+def _cube_reference(db_path, removals, keys=apply.PLAN_KEYS):
+    """Cube rows in the window with summed removals subtracted in pandas"""
+    cube = db.query(f"""
+        SELECT * FROM test_win_non_mover_cube
+        WHERE the_date BETWEEN '{START}' AND '{END}'
+            AND winner IN ({','.join(f"'{w}'" for w in WINNERS)})
+    """, db_path)
+    removals = removals.rename(columns={'date': 'the_date'})
+    removals = removals.assign(the_date=pd.to_datetime(removals['the_date']))
+    removals = removals.groupby(list(keys), as_index=False)['remove_units'].sum()
+    merged = cube.merge(removals, on=list(keys), how='left')
+    merged['total_wins'] = np.maximum(0, merged['total_wins'] - merged.pop('remove_units').fillna(0))
+    return merged
+
+
+def _rows(df):
+    order = ['the_date', 'winner', 'loser', 'state', 'dma_name']
+    return df.sort_values(order).reset_index(drop=True)
+
+
+def test_suppressed_cube_matches_reference(synthetic_db):
+    plan = _plan(synthetic_db)
+    got = apply.query_suppressed("SELECT * FROM {suppressed}", 'test', False, plan=plan,
+                                 start_date=START, end_date=END, winners=WINNERS, db_path=synthetic_db)
+    expected = _cube_reference(synthetic_db, plan)
+    assert list(got.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(_rows(got), _rows(expected)[got.columns], check_dtype=False)
+
+    # National totals agree with the preview built from deltas
+    _, suppressed = apply.preview_series('test', False, WINNERS, START, END, plan, synthetic_db)
+    national = got.groupby(['the_date', 'winner'], as_index=False)['total_wins'].sum()
+    pd.testing.assert_frame_equal(
+        national.sort_values(['the_date', 'winner']).reset_index(drop=True),
+        suppressed[['the_date', 'winner', 'total_wins']].sort_values(['the_date', 'winner']).reset_index(drop=True),
+        check_dtype=False)
+
+
+def test_suppressed_cube_stacks_plans_and_keys(synthetic_db):
+    plan = _plan(synthetic_db)
+    first, second = plan.iloc[::2], plan.iloc[1::2]
+    # Applying both plans at once is the same as one after the other
+    once = apply.query_suppressed("SELECT * FROM {suppressed}", 'test', False, plan=pd.concat([first, second]),
+                                  start_date=START, end_date=END, winners=WINNERS, db_path=synthetic_db)
+    step = _cube_reference(synthetic_db, first)
+    step = step.merge(apply.plan_removals(second).assign(the_date=lambda d: pd.to_datetime(d['the_date'])),
+                      on=apply.PLAN_KEYS, how='left')
+    step['total_wins'] = np.maximum(0, step['total_wins'] - step.pop('remove_units').fillna(0))
+    pd.testing.assert_frame_equal(_rows(once), _rows(step)[once.columns], check_dtype=False)
+
+    # Plans keyed on state as well
+    cells = db.query(f"""
+        SELECT the_date, winner, loser, dma_name, state, 1.5 AS remove_units
+        FROM test_win_non_mover_cube
+        WHERE the_date BETWEEN '{START}' AND '{END}' AND winner = 'Alpha'
+        LIMIT 10
+    """, synthetic_db)
+    keys = apply.PLAN_KEYS + ['state']
+    got = apply.query_suppressed("SELECT * FROM {suppressed}", 'test', False, plan=cells, keys=keys,
+                                 start_date=START, end_date=END, winners=WINNERS, db_path=synthetic_db)
+    pd.testing.assert_frame_equal(_rows(got), _rows(_cube_reference(synthetic_db, cells, keys))[got.columns],
+                                  check_dtype=False)
+
+
+def test_suppressed_cube_without_plan_is_the_cube(synthetic_db):
+    got = apply.query_suppressed("SELECT COUNT(*) AS n, SUM(total_wins) AS wins FROM {suppressed}", 'test', False,
+                                 start_date=START, end_date=END, winners=WINNERS, db_path=synthetic_db)
+    expected = _cube_reference(synthetic_db, _plan(synthetic_db).iloc[:0])
+    assert got['n'].iloc[0] == len(expected)
+    assert got['wins'].iloc[0] == expected['total_wins'].sum()
@@ -0,0 +1,151 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import _load_script, build_synthetic_db
+from tools import db
+from tools.src import census
+
+
+build = _load_script('scripts/build/build_census_block_cubes.py')
+
+CUBE = 'test_win_non_mover_census_cube'
+
+
+def _census_db(root, summaries):
+    db_path = build_synthetic_db(str(root / 'data' / 'databases' / 'duck_suppression.db'))
+    con = duckdb.connect(db_path)
+    try:
+        con.execute(f"""
+            CREATE TABLE {CUBE} AS
+            SELECT the_date, census_blockid, state, dma_name, winner, loser,
+                   SUM(adjusted_wins) AS total_wins,
+                   SUM(adjusted_losses) AS opposite_metric,
+                   COUNT(*) AS record_count
+            FROM carrier_data
+            WHERE NOT mover_ind
+            GROUP BY the_date, census_blockid, state, dma_name, winner, loser
+        """)
+        if summaries:
+            build.build_census_summaries(con, CUBE, 'win')
+    finally:
+        con.close()
+    return db_path
+
+
+@pytest.fixture(scope='module', params=[True, False], ids=['summaries', 'raw_cube'])
+def census_db(request, tmp_path_factory):
+    db_path = _census_db(tmp_path_factory.mktemp('census_summaries'), request.param)
+    yield db_path
+    db.close_pool(db_path)
+
+
+def _pair(db_path):
+    return db.query(f"""
+        SELECT winner, loser FROM {CUBE}
+        GROUP BY ALL ORDER BY COUNT(DISTINCT census_blockid) DESC, winner, loser LIMIT 1
+    """, db_path).iloc[0].tolist()
+
+
+def _assert_same(actual, expected):
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_exact=False, rtol=1e-9)
+
+
+def test_summary_tables_built(census_db):
+    for summary in census.CENSUS_SUMMARIES:
+        table_name = census.summary_table_name(CUBE, summary)
+        assert db.table_exists(table_name, census_db) == (census.summary_source(
+            'test', False, 'win', summary, census_db) == table_name)
+
+
+def test_h2h_summary_matches_cube(census_db):
+    expected = db.query(f"""
+        SELECT winner, loser,
+               COUNT(DISTINCT census_blockid) AS unique_blocks,
+               COUNT(DISTINCT state) AS unique_states,
+               COUNT(DISTINCT dma_name) AS unique_dmas,
+               SUM(total_wins) AS total_metric,
+               AVG(total_wins) AS avg_metric,
+               STDDEV(total_wins) AS stddev_metric,
+               MAX(total_wins) AS max_metric,
+               MIN(total_wins) AS min_metric,
+               COUNT(*) AS total_records
+        FROM {CUBE}
+        GROUP BY winner, loser
+        ORDER BY total_metric DESC, winner, loser
+    """, census_db)
+    _assert_same(census.h2h_summary('test', False, 'win', census_db), expected)
+
+
+def test_breakdowns_match_cube(census_db):
+    winner, loser = _pair(census_db)
+    args = ('test', False, 'win', winner, loser)
+    moments = """SUM(total_wins) AS total_metric, AVG(total_wins) AS avg_metric,
+                 STDDEV(total_wins) AS stddev_metric, MAX(total_wins) AS max_metric,
+                 MIN(total_wins) AS min_metric, COUNT(*) AS record_count"""
+    pair = [winner, loser]
+
+    expected = db.query(f"""
+        SELECT the_date, SUM(total_wins) AS total_metric,
+               COUNT(DISTINCT census_blockid) AS unique_blocks, COUNT(*) AS record_count
+        FROM {CUBE} WHERE winner = ? AND loser = ? GROUP BY the_date ORDER BY the_date
+    """, census_db, params=pair)
+    _assert_same(census.h2h_timeseries(*args, db_path=census_db), expected)
+
+    expected = db.query(f"""
+        SELECT state, COUNT(DISTINCT census_blockid) AS unique_blocks,
+               COUNT(DISTINCT dma_name) AS unique_dmas, {moments}
+        FROM {CUBE} WHERE winner = ? AND loser = ? GROUP BY state ORDER BY total_metric DESC, state
+    """, census_db, params=pair)
+    _assert_same(census.state_breakdown(*args, db_path=census_db), expected)
+
+    state = expected['state'].iloc[0]
+    expected = db.query(f"""
+        SELECT dma_name, state, COUNT(DISTINCT census_blockid) AS unique_blocks, {moments}
+        FROM {CUBE} WHERE winner = ? AND loser = ? AND state = ?
+        GROUP BY dma_name, state ORDER BY total_metric DESC, dma_name, state
+    """, census_db, params=pair + [state])
+    _assert_same(census.dma_breakdown(*args, state=state, db_path=census_db), expected)
+
+
+@pytest.mark.parametrize('page_size', [7, 1000])
+def test_block_pages_cover_all_blocks(census_db, page_size):
+    winner, loser = _pair(census_db)
+    expected = db.query(f"""
+        SELECT census_blockid, state, dma_name, SUM(total_wins) AS total_metric,
+               COUNT(DISTINCT the_date) AS days_active, COUNT(*) AS record_count,
+               AVG(total_wins) AS avg_metric, MAX(total_wins) AS max_metric
+        FROM {CUBE} WHERE winner = ? AND loser = ?
+        GROUP BY census_blockid, state, dma_name
+        ORDER BY total_metric DESC, census_blockid
+    """, census_db, params=[winner, loser])
+    assert len(expected) > 7
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = census.block_page('test', False, 'win', winner, loser, after=cursor,
+                                         page_size=page_size, db_path=census_db)
+        assert len(page) <= page_size
+        pages.append(page)
+        if cursor is None:
+            break
+    assert list(pages[0].columns) == census.BLOCK_COLUMNS
+    assert all(len(p) == page_size for p in pages[:-1])
+    _assert_same(pd.concat(pages), expected)
+
+
+def test_block_outliers_match_cube(census_db):
+    winner, loser = _pair(census_db)
+    blocks = db.query(f"""
+        SELECT census_blockid, SUM(total_wins) AS total_metric
+        FROM {CUBE} WHERE winner = ? AND loser = ?
+        GROUP BY census_blockid, state, dma_name
+    """, census_db, params=[winner, loser])
+    z = (blocks['total_metric'] - blocks['total_metric'].mean()) / blocks['total_metric'].std()
+    threshold = 1.5
+    outliers = census.block_outliers('test', False, 'win', winner, loser, threshold, census_db)
+    assert sorted(outliers['census_blockid']) == sorted(blocks.loc[z.abs() > threshold, 'census_blockid'])
+    np.testing.assert_allclose(outliers['z_score'].abs().to_numpy(),
+                               np.sort(z[z.abs() > threshold].abs().to_numpy())[::-1])
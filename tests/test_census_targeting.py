@@ -0,0 +1,81 @@
+from datetime import date
+
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script, build_synthetic_db
+
+
+zds = _load_script('scripts/zscore_distribution_suppression.py')
+
+
+@pytest.fixture(scope='module')
+def census_db(tmp_path_factory):
+    root = tmp_path_factory.mktemp('census')
+    db_path = build_synthetic_db(str(root / 'data' / 'databases' / 'duck_suppression.db'))
+    con = duckdb.connect(db_path)
+    try:
+        con.execute("""
+            CREATE TABLE test_win_non_mover_census_cube AS
+            SELECT the_date, census_blockid, state, dma_name, winner, loser,
+                   SUM(adjusted_wins) AS total_wins,
+                   SUM(adjusted_losses) AS opposite_metric,
+                   COUNT(*) AS record_count
+            FROM carrier_data
+            WHERE NOT mover_ind
+            GROUP BY the_date, census_blockid, state, dma_name, winner, loser
+        """)
+    finally:
+        con.close()
+    return db_path
+
+
+def _per_pair(stage1, the_date, db_path):
+    """One get_census_block_data query and block loop per stage-1 pair"""
+    records = []
+    for _, pair in stage1.iterrows():
+        target_removal = pair['rm_stage1']
+        cbs = zds.get_census_block_data('test', False, the_date, pair['winner'], pair['loser'],
+                                        pair['state'], pair['dma_name'], db_path)
+        if cbs.empty:
+            records.append({'the_date': str(the_date), 'winner': pair['winner'], 'loser': pair['loser'],
+                            'state': pair['state'], 'dma_name': pair['dma_name'], 'census_blockid': None,
+                            'remove_units': target_removal, 'stage': 'stage1_pair_level'})
+            continue
+        removed_so_far = 0
+        for _, cb in cbs.sort_values('cb_z', ascending=False, kind='stable').iterrows():
+            if removed_so_far >= target_removal:
+                break
+            cb_removal = min(cb['cb_wins_current'], target_removal - removed_so_far)
+            records.append({'the_date': str(the_date), 'winner': pair['winner'], 'loser': pair['loser'],
+                            'state': pair['state'], 'dma_name': pair['dma_name'],
+                            'census_blockid': cb['census_blockid'], 'remove_units': cb_removal,
+                            'stage': 'stage1_census_block', 'cb_z': cb['cb_z']})
+            removed_so_far += cb_removal
+    return pd.DataFrame(records)
+
+
+@pytest.mark.parametrize('the_date,winner,need', [
+    (date(2025, 3, 12), 'Alpha', 10**6),  # every pair spends its full budget
+    (date(2025, 4, 5), 'Beta', 100),      # budget runs out part-way through stage 1
+    (date(2025, 1, 2), 'Gamma', 10**6),   # little same-DOW history
+])
+def test_batched_targeting_matches_per_pair(census_db, the_date, winner, need):
+    pairs = zds.get_pair_level_data('test', False, the_date, winner, census_db)
+    stage1, _ = zds.stage1_targeted_removal(pairs, need, z_thresh=-100, min_volume=0)
+    # A pair with no census blocks falls back to pair level
+    ghost = stage1.head(1).assign(state='ZZ')
+    stage1 = pd.concat([stage1.head(3), ghost, stage1.iloc[3:]])
+    assert len(stage1) > 4
+
+    expected = _per_pair(stage1, the_date, census_db)
+    got = pd.DataFrame(zds.census_block_surgical_targeting(stage1, 'test', False, the_date, census_db))
+
+    assert (got['stage'] == 'stage1_pair_level').sum() == 1
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+    assert got['remove_units'].sum() <= stage1['rm_stage1'].sum()
+
+
+def test_empty_stage1(census_db):
+    assert zds.census_block_surgical_targeting(pd.DataFrame(), 'test', False, date(2025, 3, 12), census_db) == []
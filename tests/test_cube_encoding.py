@@ -0,0 +1,142 @@
+import os
+
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script, make_carrier_data
+from tools import db
+from tools.src import plan, suppress
+
+
+cubes = _load_script('scripts/build/build_cubes_in_db.py')
+
+START, END = '2025-04-01', '2025-04-30'
+SCAN = dict(z_threshold=1.0, top_n=4, min_share_pct=0.0, egregious_threshold=5)
+
+
+@pytest.fixture(scope='module')
+def enum_db(tmp_path_factory):
+    """The synthetic database with its cubes built with --encoding enum"""
+    path = str(tmp_path_factory.mktemp('enum') / 'data' / 'databases' / 'duck_suppression.db')
+    os.makedirs(os.path.dirname(path))
+    con = duckdb.connect(path)
+    try:
+        con.register('carrier_df', make_carrier_data())
+        con.execute("""
+            CREATE TABLE carrier_data AS
+            SELECT CAST(the_date AS DATE) AS the_date, * EXCLUDE (the_date) FROM carrier_df
+        """)
+    finally:
+        con.close()
+    assert cubes.build_all_cube_tables(path, 'test', encoding='enum')
+    return path
+
+
+def _column_types(db_path, table):
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        return dict(con.execute(
+            "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?", [table]
+        ).fetchall())
+    finally:
+        con.close()
+
+
+def test_encoded_columns(synthetic_db, enum_db):
+    for table in ('test_win_non_mover_cube', 'test_loss_mover_national', 'test_win_non_mover_first_seen'):
+        types = _column_types(enum_db, table)
+        assert types['winner'].startswith('ENUM')
+        assert types.get('the_date', 'DATE') == 'DATE'
+    cube = _column_types(enum_db, 'test_win_non_mover_cube')
+    assert all(cube[col].startswith('ENUM') for col in ('loser', 'dma_name', 'state'))
+
+    carriers = db.dimension('carrier', enum_db)
+    assert list(carriers['carrier']) == ['Alpha', 'Beta', 'Delta', 'Epsilon', 'Gamma', 'Zeta']
+    assert list(carriers['carrier_id']) == list(range(6))
+    assert db.dimension('carrier', synthetic_db).empty
+    with pytest.raises(ValueError):
+        db.dimension('winner', enum_db)
+
+
+def test_query_output_matches_varchar(synthetic_db, enum_db):
+    sql = """
+        SELECT winner, loser, state, SUM(total_wins) AS wins
+        FROM test_win_non_mover_cube
+        WHERE winner IN ('Alpha', 'Omega') AND the_date BETWEEN DATE '2025-03-01' AND DATE '2025-03-31'
+        GROUP BY ALL ORDER BY ALL
+    """
+    encoded = db.query(sql, enum_db)
+    assert encoded['winner'].dtype == object
+    pd.testing.assert_frame_equal(encoded, db.query(sql, synthetic_db))
+
+
+def test_detectors_match_varchar(synthetic_db, enum_db):
+    for metric in plan.METRICS:
+        assert (plan.get_top_n_carriers('test', False, 4, db_path=enum_db, metric=metric)
+                == plan.get_top_n_carriers('test', False, 4, db_path=synthetic_db, metric=metric))
+        pd.testing.assert_frame_equal(
+            plan.scan_base_outliers('test', True, START, END, db_path=enum_db, metric=metric, **SCAN),
+            plan.scan_base_outliers('test', True, START, END, db_path=synthetic_db, metric=metric, **SCAN),
+        )
+
+    pd.testing.assert_frame_equal(
+        db.national_outliers_from_cube('test', False, START, END, db_path=enum_db),
+        db.national_outliers_from_cube('test', False, START, END, db_path=synthetic_db),
+    )
+    pd.testing.assert_frame_equal(
+        db.pair_outliers_from_cube('test', False, START, END, db_path=enum_db),
+        db.pair_outliers_from_cube('test', False, START, END, db_path=synthetic_db),
+    )
+    pd.testing.assert_frame_equal(
+        suppress.get_pair_dma_details(enum_db, 'test', False, '2025-04-20', 'Beta'),
+        suppress.get_pair_dma_details(synthetic_db, 'test', False, '2025-04-20', 'Beta'),
+    )
+    keys = ['winner', 'loser', 'dma_name']
+    pd.testing.assert_frame_equal(
+        suppress.detect_first_appearances(enum_db, 'test', False, '2025-02-20', 'Beta')
+        .sort_values(keys, ignore_index=True),
+        suppress.detect_first_appearances(synthetic_db, 'test', False, '2025-02-20', 'Beta')
+        .sort_values(keys, ignore_index=True),
+    )
+
+
+def test_new_values_get_next_id():
+    con = duckdb.connect()
+    try:
+        con.execute("""
+            CREATE TABLE carrier_data AS
+            SELECT * FROM (VALUES ('Beta', 'Delta', 'DMA 1', 'S1'), ('Delta', 'Beta', 'DMA 1', 'S1'))
+                t(winner, loser, dma_name, state)
+        """)
+        assert cubes.ensure_dimensions(con) == ['carrier', 'dma', 'state']
+        assert con.execute("SELECT * FROM dim_dma").fetchall() == [(0, 'DMA 1')]
+        con.execute(f"""
+            CREATE TABLE cube AS SELECT * REPLACE (
+                {', '.join(cubes.encoded_column(c, 'enum') for c in cubes._column_dimensions())}
+            ) FROM carrier_data
+        """)
+        codes = con.execute("SELECT winner, enum_code(winner) FROM cube ORDER BY 1").fetchall()
+
+        # 'Alpha' sorts first but must not shift existing ids or re-type the cube
+        con.execute("INSERT INTO carrier_data VALUES ('Alpha', 'Beta', 'DMA 1', 'S1')")
+        assert cubes.ensure_dimensions(con) == ['carrier']
+        assert con.execute("SELECT carrier, carrier_id FROM dim_carrier ORDER BY carrier_id").fetchall() == [
+            ('Beta', 0), ('Delta', 1), ('Alpha', 2)
+        ]
+        assert "'Alpha'" not in _types(con, 'cube')['winner']
+
+        source = "(SELECT * FROM carrier_data WHERE winner = 'Alpha')"
+        assert cubes.extend_encoded_tables(con, ['cube'], source) == {'cube': ['winner']}
+        assert "'Alpha'" in _types(con, 'cube')['winner']
+        assert "'Alpha'" not in _types(con, 'cube')['loser']
+        assert con.execute("SELECT winner, enum_code(winner) FROM cube ORDER BY 1").fetchall() == codes
+        assert cubes.extend_encoded_tables(con, ['cube'], source) == {}
+    finally:
+        con.close()
+
+
+def _types(con, table):
+    return dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?", [table]
+    ).fetchall())
@@ -0,0 +1,113 @@
+import shutil
+
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script
+from tools import db
+
+
+cubes = _load_script('scripts/build/build_cubes_in_db.py')
+
+
+START, END = '2025-04-07', '2025-04-13'
+
+
+@pytest.fixture(scope='module')
+def sparse_db(synthetic_db, tmp_path_factory):
+    """Synthetic cubes with Zeta missing from most days"""
+    path = str(tmp_path_factory.mktemp('sparse') / 'duck_suppression.db')
+    shutil.copy(synthetic_db, path)
+    con = duckdb.connect(path)
+    try:
+        con.execute("DELETE FROM test_win_non_mover_cube WHERE winner = 'Zeta' AND day % 3 <> 0")
+        # national_outliers_from_cube reads the rollups, so they must see the gaps too
+        cubes.build_rollup_tables(con, 'test_win_non_mover_cube', 'win')
+    finally:
+        con.close()
+    return path
+
+
+def _in_range(df):
+    dates = pd.to_datetime(df['the_date'])
+    return df[(dates >= START) & (dates <= END)].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('window', [4, 8])
+@pytest.mark.parametrize('cube_type,metric', [('win', 'share'), ('win', 'volume'), ('loss', 'share')])
+def test_national_pushdown_matches_full_history(synthetic_db, window, cube_type, metric):
+    kwargs = dict(ds='test', mover_ind=False, window=window, metric=metric, cube_type=cube_type, db_path=synthetic_db)
+    pruned = db.national_outliers_from_cube(start_date=START, end_date=END, **kwargs)
+    full = _in_range(db.national_outliers_from_cube(**kwargs))
+
+    assert len(pruned) == 7 * 6
+    pd.testing.assert_frame_equal(pruned, full)
+
+
+@pytest.mark.parametrize('metric', ['share', 'volume'])
+def test_national_pushdown_sparse_series(sparse_db, metric):
+    kwargs = dict(ds='test', mover_ind=False, window=4, metric=metric, db_path=sparse_db)
+    pruned = db.national_outliers_from_cube(start_date=START, end_date=END, **kwargs)
+    full = _in_range(db.national_outliers_from_cube(**kwargs))
+
+    assert (pruned['winner'] == 'Zeta').any()
+    pd.testing.assert_frame_equal(pruned, full)
+    zeta_days = db.query(
+        "SELECT COUNT(DISTINCT the_date) AS n FROM test_win_non_mover_national WHERE winner = 'Zeta'", sparse_db
+    )['n'][0]
+    assert zeta_days < 120 / 2  # the sparse series is what was scanned
+
+
+@pytest.mark.parametrize('window', [4, 8])
+@pytest.mark.parametrize('only_outliers', [False, True])
+def test_pair_pushdown_matches_full_history(synthetic_db, window, only_outliers):
+    kwargs = dict(ds='test', mover_ind=True, window=window, only_outliers=only_outliers, db_path=synthetic_db)
+    pruned = db.pair_outliers_from_cube(start_date=START, end_date=END, **kwargs)
+    full = _in_range(db.pair_outliers_from_cube(**kwargs))
+
+    assert not pruned.empty
+    pd.testing.assert_frame_equal(pruned, full)
+    if not only_outliers:
+        # Sparse pairs whose frame reaches past the look-back span
+        assert (pruned['hist_count'] == window).any() and (pruned['hist_count'] < window).any()
+
+
+def _truncated(db_path, cube, before, tmp_path):
+    """Copy of the database with the cube (and its rollups) emptied before `before`"""
+    path = str(tmp_path / 'truncated.db')
+    shutil.copy(db_path, path)
+    con = duckdb.connect(path)
+    try:
+        con.execute(f"DELETE FROM {cube} WHERE the_date < DATE '{before}'")
+        cubes.build_rollup_tables(con, cube, 'win')
+    finally:
+        con.close()
+    return path
+
+
+def test_national_context_scan_is_bounded(sparse_db, tmp_path, monkeypatch):
+    kwargs = dict(ds='test', mover_ind=False, start_date=START, end_date=END, window=4)
+    uncapped = db.national_outliers_from_cube(db_path=sparse_db, **kwargs)
+    monkeypatch.setattr(db, 'CONTEXT_LOOKBACK_DAYS', 14)
+    lookback_start, context_start, _ = db._cube_scan_bounds(START, END, 4)
+    assert (lookback_start, context_start) == ('2025-03-10', '2025-02-24')
+
+    capped = db.national_outliers_from_cube(db_path=sparse_db, **kwargs)
+    # Nothing before context_start is read: same as if those rows did not exist
+    truncated = _truncated(sparse_db, 'test_win_non_mover_cube', context_start, tmp_path)
+    pd.testing.assert_frame_equal(capped, db.national_outliers_from_cube(db_path=truncated, **kwargs))
+    # ... and the sparse Zeta series did need older rows
+    assert not capped.equals(uncapped)
+
+
+def test_pair_context_scan_is_bounded(synthetic_db, tmp_path, monkeypatch):
+    kwargs = dict(ds='test', mover_ind=True, start_date=START, end_date=END, window=8, only_outliers=False)
+    uncapped = db.pair_outliers_from_cube(db_path=synthetic_db, **kwargs)
+    monkeypatch.setattr(db, 'CONTEXT_LOOKBACK_DAYS', 14)
+    _, context_start, _ = db._cube_scan_bounds(START, END, 8)
+
+    capped = db.pair_outliers_from_cube(db_path=synthetic_db, **kwargs)
+    truncated = _truncated(synthetic_db, 'test_win_mover_cube', context_start, tmp_path)
+    pd.testing.assert_frame_equal(capped, db.pair_outliers_from_cube(db_path=truncated, **kwargs))
+    assert not capped.equals(uncapped)
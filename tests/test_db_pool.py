@@ -0,0 +1,182 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import build_synthetic_db
+from tools import db
+
+
+WRITER = """
+import sys, duckdb
+con = duckdb.connect(sys.argv[1])
+con.execute("CREATE TABLE written_by_builder AS SELECT 42 AS x")
+con.close()
+"""
+
+
+def _write_in_other_process(db_path):
+    return subprocess.run([sys.executable, '-c', WRITER, db_path], capture_output=True, text=True)
+
+
+def _wait_until_idle_closed(timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while db.stats()['pooled_databases'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return db.stats()['pooled_databases'] == 0
+
+
+@pytest.fixture
+def pool(synthetic_db):
+    db.close_pool()
+    db.reset_stats()
+    db.clear_cache()
+    yield synthetic_db
+    db.close_pool()
+
+
+def test_pool_reuses_connection(pool):
+    """Back-to-back helpers share one connection and one cursor per thread"""
+    assert db.table_exists('test_win_mover_cube', db_path=pool)
+    cubes = db.list_cube_tables(pool)
+    stats_ = db.get_table_stats('carrier_data', db_path=pool)
+    db.query("SELECT COUNT(*) AS n FROM test_win_mover_cube", pool)
+
+    assert 'test_win_mover_cube' in cubes
+    assert stats_['row_count'] > 0
+
+    s = db.stats()
+    assert s['connections_opened'] == 1
+    assert s['cursors_opened'] == 1
+    assert s['checkouts'] == 6
+    assert s['reuse_rate'] == pytest.approx(5 / 6)
+    assert s['connect_seconds'] > 0
+
+
+def test_statement_cache_with_params(pool):
+    sql = "SELECT COUNT(*) AS n FROM test_win_mover_cube WHERE winner = $winner"
+    a = db.query(sql, pool, params={'winner': 'Alpha'})
+    b = db.query(sql, pool, params={'winner': 'Beta'})
+
+    s = db.stats()
+    assert s['statement_cache_misses'] == 1
+    assert s['statement_cache_hits'] == 1
+    assert a['n'][0] > 0 and b['n'][0] > 0
+
+
+def test_per_thread_cursors(pool):
+    results = {}
+
+    def worker(name):
+        results[name] = db.query(
+            "SELECT winner, SUM(total_wins) AS w FROM test_win_mover_cube GROUP BY winner ORDER BY winner",
+            pool,
+        )
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for df in results.values():
+        pd.testing.assert_frame_equal(df, results[0])
+    s = db.stats()
+    assert s['connections_opened'] == 1
+    assert s['cursors_opened'] == 4
+
+
+def test_pool_matches_unpooled(pool, monkeypatch):
+    sql = "SELECT the_date, winner, SUM(total_wins) AS w FROM test_win_non_mover_cube GROUP BY ALL ORDER BY ALL"
+    pooled = db.query(sql, pool)
+    monkeypatch.setattr(db, 'POOL_ENABLED', False)
+    fresh = db.query(sql, pool, cache=False)
+    pd.testing.assert_frame_equal(pooled, fresh)
+
+
+def test_close_pool_releases_connections(pool):
+    db.query("SELECT 1 AS x", pool)
+    assert db.stats()['pooled_databases'] == 1
+    db.close_pool(pool)
+    assert db.stats()['pooled_databases'] == 0
+    assert db.query("SELECT 1 AS x", pool)['x'][0] == 1
+
+
+def test_close_pool_waits_for_other_threads(pool):
+    """close_pool lets a stream on another thread finish instead of closing it underneath"""
+    started, rows, errors = threading.Event(), [], []
+
+    def reader():
+        try:
+            stream = db.iter_batches("SELECT * FROM test_win_mover_cube", pool, batch_size=100)
+            rows.append(next(stream).num_rows)
+            started.set()
+            time.sleep(0.3)
+            rows.extend(b.num_rows for b in stream)
+        except Exception as e:
+            errors.append(e)
+            started.set()
+
+    t = threading.Thread(target=reader)
+    t.start()
+    started.wait()
+    t0 = time.monotonic()
+    db.close_pool(pool)
+    waited = time.monotonic() - t0
+    t.join()
+
+    assert not errors
+    assert waited >= 0.25  # held back until the stream was done
+    assert sum(rows) == db.query("SELECT COUNT(*) AS n FROM test_win_mover_cube", pool)['n'][0]
+    with db.pooled_connection(pool):
+        with pytest.raises(RuntimeError):
+            db.close_pool(pool)
+
+
+def test_unclosed_stream_times_out_close_pool(pool, monkeypatch):
+    """A stream left open on another thread fails close_pool instead of blocking it forever"""
+    monkeypatch.setattr(db, 'WRITE_LOCK_TIMEOUT', 0.2)
+    opened = []
+    t = threading.Thread(target=lambda: opened.append(next(stream)))
+    stream = db.iter_batches("SELECT * FROM test_win_mover_cube", pool, batch_size=100)
+    t.start()
+    t.join()
+    assert opened and db.stats()['active_leases'] == 1
+
+    with pytest.raises(TimeoutError):
+        db.close_pool(pool)
+    assert db.query("SELECT 1 AS x", pool, cache=False)['x'][0] == 1  # readers not left blocked
+
+    stream.close()  # from another thread than the one that opened it
+    assert db.stats()['active_leases'] == 0
+    db.close_pool(pool)
+    assert db.stats()['pooled_databases'] == 0
+
+
+def test_idle_pool_releases_lock_for_other_process(tmp_path, monkeypatch):
+    """A build in another process can write once the pool has gone idle"""
+    monkeypatch.setattr(db, 'POOL_IDLE_SECONDS', 0.2)
+    db_path = build_synthetic_db(str(tmp_path / 'data' / 'databases' / 'duck_suppression.db'), n_days=14)
+    db.close_pool()
+    db.reset_stats()
+    try:
+        assert db.query("SELECT COUNT(*) AS n FROM test_win_mover_cube", db_path, cache=False)['n'][0] > 0
+
+        # While a query holds the connection the file stays locked
+        with db.pooled_connection(db_path):
+            time.sleep(0.4)
+            assert db.stats()['pooled_databases'] == 1
+            assert _write_in_other_process(db_path).returncode != 0
+
+        assert _wait_until_idle_closed()
+        assert db.stats()['idle_closes'] >= 1
+        writer = _write_in_other_process(db_path)
+        assert writer.returncode == 0, writer.stderr
+
+        # The next query reopens the file and sees the new table
+        assert db.query("SELECT x FROM written_by_builder", db_path, cache=False)['x'][0] == 42
+    finally:
+        db.close_pool()
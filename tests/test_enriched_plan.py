@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.src import suppress
+from tools.src.plan import build_enriched_cube, scan_base_outliers
+
+
+START, END = '2025-03-01', '2025-04-30'
+
+
+@pytest.fixture(scope='module')
+def enriched_outliers(rolling_db):
+    """build_enriched_cube() rows for the scanned outliers, as "Build Plan" merges them"""
+    outliers = scan_base_outliers('test', False, START, END, z_threshold=1.0, top_n=6,
+                                  egregious_threshold=5, db_path=rolling_db)
+    keys = outliers[['the_date', 'winner']].drop_duplicates()
+    keys['the_date'] = pd.to_datetime(keys['the_date'])
+    enriched = build_enriched_cube('test', False, START, END, db_path=rolling_db)
+    enriched['the_date'] = pd.to_datetime(enriched['the_date'])
+    return enriched.merge(keys, on=['the_date', 'winner'], how='inner')
+
+
+def _loop_plan(enriched_outliers, mover_ind, auto_min_wins, distributed_min_wins):
+    """The per-group "Build Plan" loop that build_enriched_plan replaced"""
+    plan_rows, insufficient = [], []
+    for (the_date, winner), sub in enriched_outliers.groupby(['the_date', 'winner']):
+        nat_info = sub.iloc[0]
+        W, T = float(nat_info['nat_total_wins']), float(nat_info['nat_market_wins'])
+        mu_share = float(nat_info['nat_mu_share'])
+        need = int(np.ceil(max((W - mu_share * T) / max(1e-12, (1 - mu_share)), 0)))
+        if need <= 0:
+            continue
+        dma_totals = sub.groupby('dma_name')['pair_wins_current'].sum().to_dict()
+        dma_mu_totals = sub.groupby('dma_name')['pair_mu_wins'].sum().to_dict()
+
+        is_rare_eligible = (sub['rare_pair'] == True) & (sub['pair_z'] > 1.5) & (sub['impact'].abs() > 15)
+        auto = sub[(sub['pair_outlier_pos'] == True) | (sub['pct_outlier_pos'] == True) |
+                   is_rare_eligible | (sub['new_pair'] == True)].copy()
+        auto = auto[auto['pair_wins_current'] >= auto_min_wins]
+        auto_removed = 0
+        if not auto.empty:
+            pw = pd.to_numeric(auto['pair_wins_current'], errors='coerce').fillna(0.0)
+            mu_eff = pd.to_numeric(auto['pair_mu_wins'], errors='coerce').fillna(0.0)
+            auto['rm_pair'] = np.ceil(np.maximum(0.0, pw - mu_eff)).astype(int)
+            auto = auto.sort_values(['pair_z', 'pair_wins_current'], ascending=[False, False])
+            auto['cum_remove'] = auto['rm_pair'].cumsum()
+            auto['rm_final'] = np.where(
+                auto['cum_remove'] <= need, auto['rm_pair'],
+                np.maximum(0, need - auto['cum_remove'].shift(fill_value=0))
+            ).astype(int)
+            auto = auto[auto['rm_final'] > 0]
+            auto_removed = int(auto['rm_final'].sum())
+
+        need_remaining = max(0, need - auto_removed)
+        distributed = pd.DataFrame()
+        if need_remaining > 0:
+            auto_pairs = {(r['loser'], r['dma_name']) for _, r in auto.iterrows()}
+            eligible = sub[(~sub.apply(lambda r: (r['loser'], r['dma_name']) in auto_pairs, axis=1)) &
+                           (sub['pair_wins_current'] >= distributed_min_wins)].copy()
+            if len(eligible) == 0:
+                insufficient.append({
+                    'date': pd.to_datetime(the_date).date(), 'winner': winner,
+                    'need_remaining': need_remaining, 'auto_removed': auto_removed,
+                    'min_wins_required': distributed_min_wins,
+                    'reason': f'All remaining pairs have < {distributed_min_wins} wins'
+                })
+            else:
+                capacity = pd.to_numeric(eligible['pair_wins_current'], errors='coerce').fillna(0.0)
+                if capacity.sum() > 0:
+                    eligible['rm_final'] = (capacity / capacity.sum() * need_remaining).round().astype(int)
+                    distributed = eligible[eligible['rm_final'] > 0]
+
+        for stage, rows in (('auto', auto), ('distributed', distributed)):
+            for _, r in rows.iterrows():
+                dma_total = dma_totals.get(r['dma_name'], 0)
+                dma_mu_total = dma_mu_totals.get(r['dma_name'], 0)
+                plan_rows.append({
+                    'date': pd.to_datetime(the_date).date(), 'winner': winner, 'loser': r['loser'],
+                    'dma_name': r['dma_name'], 'state': r['state'], 'mover_ind': mover_ind,
+                    'remove_units': int(r['rm_final']), 'stage': stage,
+                    'pair_wins_current': r['pair_wins_current'], 'pair_mu_wins': r['pair_mu_wins'],
+                    'pair_sigma_wins': r['pair_sigma_wins'], 'pair_z': r['pair_z'],
+                    'pair_pct_change': r['pair_pct_change'], 'dma_wins': dma_total,
+                    'pair_share': (r['pair_wins_current'] / dma_total) if dma_total > 0 else None,
+                    'pair_share_mu': (r['pair_mu_wins'] / dma_mu_total) if dma_mu_total > 0 else None,
+                    'nat_total_wins': nat_info['nat_total_wins'],
+                    'nat_share_current': nat_info['nat_share_current'],
+                    'nat_mu_share': nat_info['nat_mu_share'], 'nat_z_score': nat_info['nat_z_score'],
+                    'impact': int(r['rm_final'])
+                })
+    return pd.DataFrame(plan_rows), pd.DataFrame(insufficient, columns=suppress.INSUFFICIENT_COLUMNS)
+
+
+@pytest.mark.parametrize('auto_min_wins, distributed_min_wins', [(2, 1), (1, 5), (5, 10)])
+def test_matches_loop(enriched_outliers, auto_min_wins, distributed_min_wins):
+    expected, expected_report = _loop_plan(enriched_outliers, False, auto_min_wins, distributed_min_wins)
+    plan, report = suppress.build_enriched_plan(enriched_outliers, False, auto_min_wins, distributed_min_wins)
+
+    assert not expected.empty and set(expected['stage']) == {'auto', 'distributed'}
+    pd.testing.assert_frame_equal(plan, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(report, expected_report, check_dtype=False)
+
+
+def test_insufficient_report(enriched_outliers):
+    _, expected = _loop_plan(enriched_outliers, False, 2, 10 ** 6)
+    plan, report = suppress.build_enriched_plan(enriched_outliers, False, 2, 10 ** 6)
+    assert not report.empty
+    assert set(plan['stage']) <= {'auto'}
+    pd.testing.assert_frame_equal(report, expected, check_dtype=False)
+
+
+def test_empty(enriched_outliers):
+    plan, report = suppress.build_enriched_plan(enriched_outliers.iloc[:0], False)
+    assert plan.empty and list(plan.columns) == suppress.ENRICHED_PLAN_COLUMNS
+    assert report.empty and list(report.columns) == suppress.INSUFFICIENT_COLUMNS
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from tools import db
+from tools.src import suppress
+
+
+CASES = [
+    ('2025-01-03', 'Alpha'),   # within the first appearances
+    ('2025-02-20', 'Beta'),    # between first and recent: falls back to the cube
+    ('2025-04-27', 'Gamma'),   # within the recent appearances
+    ('2025-04-30', 'Zeta'),
+]
+
+
+def _scan(db_path, the_date, winner, lookback_days):
+    """first_appearance straight from the cube's lookback window"""
+    return db.query(f"""
+        SELECT c.winner, c.loser, c.dma_name,
+               NOT EXISTS (
+                   SELECT 1 FROM test_win_non_mover_cube h
+                   WHERE h.winner = c.winner AND h.loser = c.loser AND h.dma_name = c.dma_name
+                     AND h.the_date BETWEEN DATE '{the_date}' - INTERVAL '{lookback_days} days'
+                                        AND DATE '{the_date}' - INTERVAL '1 day'
+               ) AS first_appearance
+        FROM (SELECT DISTINCT winner, loser, dma_name FROM test_win_non_mover_cube
+              WHERE the_date = DATE '{the_date}' AND winner = '{winner}') c
+        ORDER BY ALL
+    """, db_path, cache=False)
+
+
+def test_first_seen_matches_cube(synthetic_db):
+    fs = db.query("SELECT * FROM test_win_non_mover_first_seen", synthetic_db)
+    dates = db.query("""
+        SELECT DISTINCT winner, loser, dma_name, the_date FROM test_win_non_mover_cube
+    """, synthetic_db).sort_values('the_date')
+    expected = dates.groupby(['winner', 'loser', 'dma_name'])['the_date'].agg(list)
+
+    assert len(fs) == len(expected)
+    for row in fs.itertuples():
+        history = list(expected[(row.winner, row.loser, row.dma_name)])
+        assert row.first_date == history[0] and row.last_date == history[-1]
+        assert row.n_dates == len(history)
+        assert list(pd.to_datetime(row.first_dates)) == history[:8]
+        assert list(pd.to_datetime(row.recent_dates)) == history[-8:]
+
+
+@pytest.mark.parametrize('lookback_days', [90, 7])
+@pytest.mark.parametrize('the_date,winner', CASES)
+def test_first_appearance_lookup_matches_scan(synthetic_db, the_date, winner, lookback_days):
+    got = suppress.detect_first_appearances(synthetic_db, 'test', False, the_date, winner, lookback_days)
+    got = got.sort_values(['winner', 'loser', 'dma_name']).reset_index(drop=True)
+    expected = _scan(synthetic_db, the_date, winner, lookback_days)
+    assert not got.empty
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
@@ -0,0 +1,69 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import db
+from tools.src import iterative, rounds
+
+
+START, END = '2025-02-15', '2025-04-30'
+
+
+def _sorted(log):
+    keys = ['round', 'the_date', 'winner', 'loser', 'dma']
+    return log.sort_values(keys).reset_index(drop=True)
+
+
+def test_series_stats_match_rolling_view(rolling_db):
+    rows = iterative.load_rolling_rows('test', False, END, rolling_db)
+    stats = iterative.series_stats(rows)
+    pd.testing.assert_frame_equal(stats, rows[stats.columns].astype(float), check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('mover_ind', [False, True])
+def test_incremental_matches_full_recompute(rolling_db, mover_ind):
+    args = ('test', mover_ind, START, END)
+    log, summary = iterative.run_iterative_suppression(*args, min_wins=5, db_path=rolling_db)
+    full_log, full_summary = iterative.run_iterative_suppression(
+        *args, min_wins=5, db_path=rolling_db, incremental=False)
+
+    # Converges well before max_rounds, re-checking far fewer rows than a full pass
+    assert 2 < len(summary) < 10
+    pd.testing.assert_frame_equal(_sorted(log), _sorted(full_log))
+    assert summary['suppressed'].tolist() == full_summary['suppressed'].tolist()
+    assert (summary['rechecked'] < full_summary['rechecked']).all()
+
+    assert list(log.columns) == iterative.LOG_COLUMNS
+    assert not log.duplicated(['the_date', 'winner', 'loser', 'dma']).any()
+    dates = pd.to_datetime(log['the_date'])
+    assert dates.between(START, END).all()
+    assert (log['total_wins'] >= 5).all()
+
+
+def test_later_rounds_use_suppressed_baselines(rolling_db):
+    log, _ = iterative.run_iterative_suppression('test', False, START, END, min_wins=5, db_path=rolling_db)
+    rows = iterative.load_rolling_rows('test', False, END, rolling_db)
+    keys = ['the_date', 'winner', 'loser', 'dma']
+    # Rows suppressed after round 1 were not outliers against the original baselines
+    orig = log.loc[log['round'] > 1, keys].merge(rows, on=keys)
+    assert len(orig) == (log['round'] > 1).sum() > 0
+    assert iterative.outlier_reason(orig, min_wins=5).isna().all()
+
+
+def test_log_saved_as_round(rolling_db, tmp_path):
+    path = tmp_path / 'data' / 'databases' / 'duck_suppression.db'
+    path.parent.mkdir(parents=True)
+    shutil.copy(rolling_db, path)
+    store = str(path)
+    try:
+        for _ in range(2):  # re-running replaces the round
+            log, _ = iterative.run_iterative_suppression('test', False, START, END, min_wins=5,
+                                                         db_path=store, round_name='iterative')
+        saved = rounds.load_round(int(rounds.list_rounds(store)['round_id'].iloc[0]), store)
+        assert len(saved) == len(log)
+        assert saved['stage'].tolist() == ('iteration_' + log['round'].astype(str)).tolist()
+        assert saved['remove_units'].tolist() == np.ceil(log['total_wins']).astype(int).tolist()
+    finally:
+        db.close_pool(store)
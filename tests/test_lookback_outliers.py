@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_carrier_data
+from tools.src.outliers import lookback_outliers
+
+
+@pytest.fixture(scope='module')
+def daily():
+    """compute_national_outliers' daily frame, with a missing day and a NULL share"""
+    rows = make_carrier_data()
+    rows = rows[~rows['mover_ind']]
+    w = rows.groupby(['the_date', 'winner'], as_index=False)['adjusted_wins'].sum()
+    w['T'] = w.groupby('the_date')['adjusted_wins'].transform('sum')
+    w['share'] = w['adjusted_wins'] / w['T']
+    w = w.rename(columns={'the_date': 'd', 'adjusted_wins': 'W'})
+    w['d'] = pd.to_datetime(w['d']).astype('datetime64[us]')
+    w = w[~((w['winner'] == 'Beta') & (w['d'] == '2025-03-03'))].reset_index(drop=True)
+    w.loc[w.index[(w['winner'] == 'Gamma') & (w['d'] == '2025-02-10')], 'share'] = np.nan
+    return w
+
+
+@pytest.mark.parametrize('lookback', [21, 60])
+@pytest.mark.parametrize('same_dow', [False, True])
+def test_rolling_matches_loop(daily, lookback, same_dow):
+    expected = lookback_outliers(daily, lookback, same_dow, 0.5, engine='loop')
+    got = lookback_outliers(daily, lookback, same_dow, 0.5)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-9)
+
+
+def test_no_outliers(daily):
+    for engine in ['rolling', 'loop']:
+        out = lookback_outliers(daily, 30, False, 1e9, engine=engine)
+        assert out.empty and list(out.columns) == ['the_date', 'winner', 'share', 'mu', 'sigma', 'z']
+
+
+def test_unknown_engine(daily):
+    with pytest.raises(ValueError):
+        lookback_outliers(daily, 30, False, 2.0, engine='nope')
@@ -0,0 +1,105 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script, build_synthetic_db
+
+
+cubes = _load_script('scripts/build/build_cubes_in_db.py')
+
+KEYS = ['the_date', 'winner', 'loser', 'dma', 'state']
+
+
+def _cube_tables(db_path, ds):
+    names = [f"{ds}_{metric}_{'mover' if mover else 'non_mover'}_cube" for mover, metric in cubes.CUBE_SPECS]
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        return {n: con.execute(f"SELECT * FROM {n}").df().sort_values(KEYS).reset_index(drop=True) for n in names}
+    finally:
+        con.close()
+
+
+@pytest.fixture
+def two_dataset_db(tmp_path):
+    db_path = build_synthetic_db(str(tmp_path / 'data' / 'databases' / 'duck_suppression.db'))
+    con = duckdb.connect(db_path)
+    try:
+        con.execute("""
+            INSERT INTO carrier_data
+            SELECT * REPLACE ('other' AS ds, adjusted_wins * 2 AS adjusted_wins)
+            FROM carrier_data WHERE the_date < DATE '2025-03-01'
+        """)
+    finally:
+        con.close()
+    assert cubes.build_all_cube_tables(db_path, 'other')
+    return db_path
+
+
+def _assert_same_cubes(expected, actual):
+    assert list(actual) == list(expected)
+    for name in expected:
+        assert list(actual[name].columns) == list(expected[name].columns)
+        pd.testing.assert_frame_equal(actual[name], expected[name], check_exact=False, rtol=1e-12)
+
+
+def test_single_pass_matches_per_cube_build(two_dataset_db):
+    expected = _cube_tables(two_dataset_db, 'test')
+    assert cubes.build_dataset_cubes(two_dataset_db, 'test')
+    _assert_same_cubes(expected, _cube_tables(two_dataset_db, 'test'))
+
+
+def test_parallel_staged_build(two_dataset_db):
+    expected = {ds: _cube_tables(two_dataset_db, ds) for ds in ('test', 'other')}
+    assert cubes.build_cubes_parallel(two_dataset_db, ['test', 'other'], workers=2)
+    for ds in ('test', 'other'):
+        _assert_same_cubes(expected[ds], _cube_tables(two_dataset_db, ds))
+
+    con = duckdb.connect(two_dataset_db, read_only=True)
+    try:
+        indexes = con.execute(
+            "SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name = 'other_win_mover_cube'"
+        ).fetchone()[0]
+    finally:
+        con.close()
+    assert indexes == 5
+
+
+@pytest.mark.parametrize('layout', ['winner', 'none'])
+def test_layout_without_indexes(two_dataset_db, layout):
+    expected = _cube_tables(two_dataset_db, 'test')
+    assert cubes.build_all_cube_tables(two_dataset_db, 'test', layout=layout, create_indexes=False)
+    _assert_same_cubes(expected, _cube_tables(two_dataset_db, 'test'))
+
+    con = duckdb.connect(two_dataset_db, read_only=True)
+    try:
+        indexes = con.execute(
+            "SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name LIKE 'test_%_cube'"
+        ).fetchone()[0]
+        stored = con.execute("SELECT winner, the_date FROM test_loss_mover_cube").df()
+    finally:
+        con.close()
+    assert indexes == 0
+    if layout == 'winner':
+        assert stored.equals(stored.sort_values(['winner', 'the_date']).reset_index(drop=True))
+
+
+def test_unknown_layout():
+    with pytest.raises(ValueError):
+        cubes.cube_select_sql('test', True, 'win', layout='dma')
+
+
+@pytest.mark.parametrize('argv', [
+    ['--all', '--workers', '4', '--append'],
+    ['--single-pass', '--append'],
+    ['--all', '--workers', '2', '--skip-existing'],
+    ['--single-pass', '--skip-existing'],
+])
+def test_incremental_flags_rejected_with_single_pass(argv, capsys):
+    with pytest.raises(SystemExit):
+        cubes.parse_args(argv)
+    assert 'cannot be combined' in capsys.readouterr().err
+
+
+def test_incremental_flags_allowed_per_cube():
+    args = cubes.parse_args(['--all', '--append', '--skip-existing'])
+    assert args.append and args.skip_existing
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from tools.src.plan import scan_base_outliers
+
+
+def _scan(db_path, engine, mover_ind, start_date='2025-01-01'):
+    return scan_base_outliers(
+        ds='test',
+        mover_ind=mover_ind,
+        start_date=start_date,
+        end_date='2025-04-30',
+        z_threshold=-1e9,  # keep every row with a valid baseline
+        egregious_threshold=-10**9,
+        db_path=db_path,
+        engine=engine,
+    )
+
+
+@pytest.mark.parametrize('mover_ind', [False, True])
+@pytest.mark.parametrize('start_date', ['2025-01-01', '2025-03-10'])
+def test_window_engine_matches_self_join(synthetic_db, mover_ind, start_date):
+    """RANGE-window engine returns the same tiered baselines as the self-join"""
+    legacy = _scan(synthetic_db, 'self_join', mover_ind, start_date)
+    windowed = _scan(synthetic_db, 'window', mover_ind, start_date)
+
+    assert not legacy.empty
+    assert list(windowed.columns) == list(legacy.columns)
+    assert len(windowed) == len(legacy)
+
+    keys = ['the_date', 'winner']
+    legacy = legacy.sort_values(keys).reset_index(drop=True)
+    windowed = windowed.sort_values(keys).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(windowed, legacy, check_exact=False, rtol=1e-12)
+
+
+def test_unknown_engine_rejected(synthetic_db):
+    with pytest.raises(ValueError):
+        _scan(synthetic_db, 'bogus', False)
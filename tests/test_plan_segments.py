@@ -0,0 +1,67 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from tools.src.plan import (
+    base_national_series, list_segments, scan_all_segments, scan_base_outliers, segment_summary,
+)
+
+
+SCAN = dict(z_threshold=1.0, top_n=4, min_share_pct=0.0, egregious_threshold=5)
+
+
+def test_list_segments(synthetic_db):
+    segments = list_segments(synthetic_db)
+    assert segments == [
+        {'ds': 'test', 'mover_ind': False, 'metric': 'win'},
+        {'ds': 'test', 'mover_ind': True, 'metric': 'win'},
+        {'ds': 'test', 'mover_ind': False, 'metric': 'loss'},
+        {'ds': 'test', 'mover_ind': True, 'metric': 'loss'},
+    ]
+    assert list_segments(synthetic_db, datasets=['other']) == []
+
+
+def test_scan_all_matches_sequential(synthetic_db):
+    segments = list_segments(synthetic_db) + [{'ds': 'missing', 'mover_ind': False, 'metric': 'win'}]
+    results = list(scan_all_segments('2025-03-01', '2025-04-30', segments, db_path=synthetic_db,
+                                     max_workers=4, **SCAN))
+    assert len(results) == len(segments)
+
+    by_key = {(r['ds'], r['mover_ind'], r['metric']): r for r in results}
+    assert by_key[('missing', False, 'win')]['error'].startswith('CatalogException')
+
+    for seg in segments[:-1]:
+        got = by_key[(seg['ds'], seg['mover_ind'], seg['metric'])]
+        assert got['error'] is None
+        expected = scan_base_outliers(seg['ds'], seg['mover_ind'], '2025-03-01', '2025-04-30',
+                                      db_path=synthetic_db, metric=seg['metric'], **SCAN)
+        assert not expected.empty
+        pd.testing.assert_frame_equal(got['outliers'], expected)
+        assert len(got['top_carriers']) == 4
+        assert set(got['series']['winner']) == set(got['top_carriers'])
+
+    summary = segment_summary(results)
+    assert list(summary[['ds', 'metric', 'mover_ind']].itertuples(index=False, name=None)) == [
+        ('missing', 'win', False),
+        ('test', 'win', False), ('test', 'win', True), ('test', 'loss', False), ('test', 'loss', True),
+    ]
+    ok = summary[summary['error'].isna()]
+    assert (ok['outliers'] == [len(by_key[('test', m, x)]['outliers'])
+                               for x, m in [('win', False), ('win', True), ('loss', False), ('loss', True)]]).all()
+
+
+def test_loss_metric_reads_loss_cube(synthetic_db):
+    series = base_national_series('test', False, ['Alpha'], '2025-02-03', '2025-02-03',
+                                  synthetic_db, metric='loss')
+    con = duckdb.connect(synthetic_db, read_only=True)
+    try:
+        losses = con.execute("""
+            SELECT SUM(total_losses) FROM test_loss_non_mover_cube
+            WHERE winner = 'Alpha' AND the_date = DATE '2025-02-03'
+        """).fetchone()[0]
+    finally:
+        con.close()
+    assert series['total_wins'].iloc[0] == pytest.approx(losses)
+
+    with pytest.raises(ValueError):
+        base_national_series('test', False, ['Alpha'], '2025-02-03', '2025-02-03', synthetic_db, metric='share')
@@ -0,0 +1,55 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from tools import db
+from tools.src.metrics import pair_metrics
+from tools.src.plan import build_enriched_cube
+
+
+SQL = """
+    SELECT the_date, winner, loser, dma_name, total_wins
+    FROM test_win_non_mover_cube
+    WHERE the_date BETWEEN DATE '2025-02-01' AND DATE '2025-03-31'
+    ORDER BY ALL
+"""
+
+
+@pytest.fixture
+def cache(synthetic_db):
+    db.clear_cache()
+    yield synthetic_db
+    db.clear_cache()
+
+
+def test_matches_query(cache):
+    table = db.query_arrow(SQL, cache)
+    for name in ['winner', 'loser', 'dma_name']:
+        assert pa.types.is_dictionary(table.schema.field(name).type)
+    assert pa.types.is_date(table.schema.field('the_date').type)
+    pd.testing.assert_frame_equal(db.arrow_to_pandas(table), db.query(SQL, cache))
+
+
+def test_cached_separately_from_pandas(cache):
+    frame = db.query(SQL, cache)
+    first = db.query_arrow(SQL, cache)
+    assert db.query_arrow(SQL, cache) is first  # immutable, shared as-is
+    assert (db.cache_stats()['hits'], db.cache_stats()['misses']) == (1, 2)
+    assert isinstance(db.query(SQL, cache), pd.DataFrame) and frame.equals(db.query(SQL, cache))
+
+
+def test_categorical(cache):
+    frame = db.arrow_to_pandas(db.query_arrow(SQL, cache), categorical=True)
+    assert isinstance(frame['winner'].dtype, pd.CategoricalDtype)
+    assert frame['winner'].astype(str).tolist() == db.query(SQL, cache)['winner'].tolist()
+
+
+def test_as_arrow_opt_ins(rolling_db):
+    args = ('test', False, '2025-01-01', '2025-04-30')
+    pd.testing.assert_frame_equal(
+        db.arrow_to_pandas(pair_metrics(*args, db_path=rolling_db, as_arrow=True)),
+        pair_metrics(*args, db_path=rolling_db),
+    )
+    enriched = build_enriched_cube(*args, db_path=rolling_db, as_arrow=True)
+    assert enriched.num_rows > 0
+    pd.testing.assert_frame_equal(db.arrow_to_pandas(enriched), build_enriched_cube(*args, db_path=rolling_db))
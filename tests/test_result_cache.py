@@ -0,0 +1,88 @@
+import os
+
+import duckdb
+import pytest
+
+from conftest import build_synthetic_db
+from tools import db
+
+
+SQL = "SELECT winner, SUM(total_wins) AS w FROM test_win_mover_cube GROUP BY winner ORDER BY winner"
+
+
+@pytest.fixture
+def cache(synthetic_db):
+    db.close_pool()
+    db.clear_cache()
+    yield synthetic_db
+    db.clear_cache()
+
+
+def test_repeat_queries_hit(cache):
+    first = db.query(SQL, cache)
+    checkouts = db.stats()['checkouts']
+    second = db.query(SQL, cache)
+
+    assert db.stats()['checkouts'] == checkouts  # served without touching the database
+    s = db.cache_stats()
+    assert (s['hits'], s['misses']) == (1, 1)
+    assert s['bytes'] > 0
+    assert second.equals(first)
+
+
+def test_params_normalized(cache):
+    sql = "SELECT COUNT(*) AS n FROM test_win_mover_cube WHERE winner = $w AND dma = $d"
+    a = db.query(sql, cache, params={'w': 'Alpha', 'd': '501'})
+    b = db.query(sql, cache, params={'d': '501', 'w': 'Alpha'})
+    c = db.query(sql, cache, params={'w': 'Beta', 'd': '501'})
+
+    s = db.cache_stats()
+    assert (s['hits'], s['misses']) == (1, 2)
+    assert a.equals(b)
+    assert not a.equals(c)
+
+
+def test_results_are_copies(cache):
+    df = db.query(SQL, cache)
+    df['w'] = -1
+    assert (db.query(SQL, cache)['w'] > 0).all()
+
+
+def test_rebuild_invalidates(tmp_path):
+    """A rebuild that replaces the file is picked up while the pool holds the old one open"""
+    db_path = build_synthetic_db(str(tmp_path / 'data' / 'databases' / 'duck_suppression.db'), n_days=30)
+    db.clear_cache()
+    before = db.query(SQL, db_path)
+    assert db.stats()['pooled_databases'] >= 1
+
+    rebuilt = build_synthetic_db(str(tmp_path / 'rebuild' / 'duck_suppression.db'), n_days=30)
+    con = duckdb.connect(rebuilt)
+    try:
+        con.execute("UPDATE test_win_mover_cube SET total_wins = total_wins * 2")
+    finally:
+        con.close()
+    os.replace(rebuilt, db_path)
+
+    reopened = db.stats()['reopened']
+    after = db.query(SQL, db_path)
+    assert db.stats()['reopened'] == reopened + 1
+    assert db.cache_stats()['invalidations'] == 1
+    assert (after['w'] == before['w'] * 2).all()
+    assert db.query(SQL, db_path).equals(after)  # cached under the new generation
+    db.close_pool(db_path)
+
+
+def test_byte_budget_evicts_lru(cache, monkeypatch):
+    size = db.query(SQL, cache).memory_usage(index=True, deep=True).sum()
+    small = db._ResultCache(int(size * 2.5))
+    monkeypatch.setattr(db, '_result_cache', small)
+
+    for limit in (1, 2, 3):
+        db.query(SQL + f" LIMIT 100 OFFSET {limit - 1}", cache)
+    s = db.cache_stats()
+    assert s['entries'] == 2
+    assert s['evictions'] == 1
+    assert s['bytes'] <= s['max_bytes']
+
+    db.query(SQL + " LIMIT 100 OFFSET 0", cache)  # the evicted one
+    assert db.cache_stats()['misses'] == 4
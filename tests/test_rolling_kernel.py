@@ -0,0 +1,69 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import _load_script
+from tools.src import rolling
+
+
+@pytest.fixture(scope='module')
+def series():
+    """Gappy long-form series with NULLs, ties and constant stretches"""
+    rng = np.random.default_rng(11)
+    rows = []
+    for g in range(40):
+        days = np.sort(rng.choice(120, size=rng.integers(1, 60), replace=False))
+        for d in days:
+            v = float(rng.integers(0, 5)) if g % 3 else rng.random()
+            rows.append((f'k{g // 4}', g % 4, pd.Timestamp('2025-01-01') + pd.Timedelta(days=int(d)), v))
+    df = pd.DataFrame(rows, columns=['a', 'b', 'the_date', 'v'])
+    df.loc[df.sample(frac=0.05, random_state=1).index, 'v'] = np.nan
+    df.loc[(df['a'] == 'k0') & (df['b'] == 3), 'v'] = 2.0
+    return df.sample(frac=1, random_state=2).reset_index(drop=True)
+
+
+def _sql(df, frame, include_current, windows):
+    con = duckdb.connect()
+    try:
+        con.register('s', df)
+        order = "DATEDIFF('day', DATE '2025-01-01', the_date)" if frame == 'range' else 'the_date'
+        items = rolling.rolling_stats_sql('v', ['a', 'b'], order, windows, include_current, frame)
+        return con.execute(f"SELECT i, {items} FROM (SELECT *, ROW_NUMBER() OVER () - 1 AS i FROM s) ORDER BY i").df()
+    finally:
+        con.close()
+
+
+@pytest.mark.parametrize('frame', ['rows', 'range'])
+@pytest.mark.parametrize('include_current', [False, True])
+def test_kernel_matches_duckdb(series, frame, include_current):
+    windows = {28: 27, 14: 13, 4: 3} if frame == 'rows' else {28: 28, 7: 7, 0: 0}
+    got = rolling.rolling_stats(series, ['a', 'b'], 'the_date', 'v', windows, include_current, frame)
+    expected = _sql(series, frame, include_current, windows).drop(columns='i')
+    assert list(got.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False, check_exact=False, rtol=1e-9, atol=1e-12)
+    constant = (series['a'] == 'k0') & (series['b'] == 3)
+    assert (got.filter(like='std_')[constant].dropna() == 0).all().all()
+
+
+def test_tiers_match_rolling_view(synthetic_db):
+    """Kernel + select_tier reproduce the SQL rolling view's tiered baseline"""
+    views = _load_script('scripts/rebuild_rolling_views.py')
+    con = duckdb.connect(synthetic_db, read_only=True)
+    try:
+        view = con.execute(views.rolling_select_sql('test', 'win', 'mover')).df()
+    finally:
+        con.close()
+
+    stats = rolling.rolling_stats(view, ['winner', 'loser', 'dma', 'day_of_week'], 'the_date', 'total_wins',
+                                  views.ROLLING_WINDOWS)
+    tiers = rolling.select_tier(stats, rolling.min_periods_for(view['day_of_week']))
+    expected = view[['avg_wins', 'stddev_wins', 'n_periods', 'selected_window']].set_axis(
+        ['mu', 'sigma', 'n_periods', 'selected_window'], axis=1)
+    pd.testing.assert_frame_equal(tiers, expected, check_dtype=False, check_exact=False, rtol=1e-9)
+    assert tiers['selected_window'].notna().any() and tiers['selected_window'].isna().any()
+
+
+def test_empty():
+    out = rolling.rolling_stats(pd.DataFrame(columns=['k', 'd', 'v']), ['k'], 'd', 'v', [3])
+    assert out.empty and list(out.columns) == ['avg_3d', 'std_3d', 'n_3d']
@@ -0,0 +1,81 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script, build_synthetic_db
+
+
+rolling = _load_script('scripts/rebuild_rolling_views.py')
+
+KEYS = ['the_date', 'winner', 'loser', 'dma', 'state']
+CUTOFF = '2025-04-10'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return build_synthetic_db(str(tmp_path / 'data' / 'databases' / 'duck_suppression.db'))
+
+
+def _hold_back(con, cube, cutoff):
+    """Move rows after cutoff out of the cube (they 'land' later)"""
+    con.execute(f"CREATE TABLE held AS SELECT * FROM {cube} WHERE the_date > DATE '{cutoff}'")
+    con.execute(f"DELETE FROM {cube} WHERE the_date > DATE '{cutoff}'")
+
+
+def _land(con, cube):
+    con.execute(f"INSERT INTO {cube} SELECT * FROM held")
+    con.execute("DROP TABLE held")
+
+
+def _sorted(df):
+    return df.sort_values(KEYS).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('mover_type', ['mover', 'non_mover'])
+def test_incremental_refresh_matches_full_view(db_path, mover_type):
+    con = duckdb.connect(db_path)
+    try:
+        cube = f'test_win_{mover_type}_cube'
+        table = f'test_win_{mover_type}_rolling'
+
+        _hold_back(con, cube, CUTOFF)
+        first = rolling.refresh_rolling_table(con, 'test', 'win', mover_type)
+        assert first['mode'] == 'full'
+        assert str(first['last_date']) == CUTOFF
+
+        _land(con, cube)
+        second = rolling.refresh_rolling_table(con, 'test', 'win', mover_type)
+        assert second['mode'] == 'incremental'
+        assert second['since'] == '2025-03-13'
+        assert str(rolling.get_watermark(con, table)['last_date']) == '2025-04-30'
+
+        expected = _sorted(con.execute(rolling.rolling_select_sql('test', 'win', mover_type)).df())
+        actual = _sorted(con.execute(f"SELECT * FROM {table}").df())
+    finally:
+        con.close()
+
+    assert len(actual) == len(expected)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
+
+
+def test_switching_modes(db_path):
+    rolling.rebuild_rolling_views(db_path, 'test', mode='table')
+    rolling.rebuild_rolling_views(db_path, 'test', mode='table')  # incremental no-op refresh
+    con = duckdb.connect(db_path)
+    try:
+        assert rolling._object_type(con, 'test_win_mover_rolling') == 'BASE TABLE'
+        assert rolling.get_watermark(con, 'test_win_mover_rolling')['refresh_mode'] == 'incremental'
+        materialized = _sorted(con.execute("SELECT * FROM test_win_mover_rolling").df())
+    finally:
+        con.close()
+
+    rolling.rebuild_rolling_views(db_path, 'test', mode='view')
+    con = duckdb.connect(db_path)
+    try:
+        assert rolling._object_type(con, 'test_win_mover_rolling') == 'VIEW'
+        assert rolling.get_watermark(con, 'test_win_mover_rolling') is None
+        view = _sorted(con.execute("SELECT * FROM test_win_mover_rolling").df())
+    finally:
+        con.close()
+
+    pd.testing.assert_frame_equal(materialized, view, check_exact=False, rtol=1e-9)
@@ -0,0 +1,79 @@
+import shutil
+
+import duckdb
+import pandas as pd
+import pytest
+
+from tools import db
+from tools.src import metrics, plan
+
+
+START, END = '2025-03-01', '2025-04-15'
+ROLLUPS = [f"test_{metric}_{mover}_{rollup}"
+           for metric in ('win', 'loss') for mover in ('mover', 'non_mover') for rollup in ('national', 'state')]
+
+
+@pytest.fixture(scope='module')
+def cube_only_db(synthetic_db, tmp_path_factory):
+    """The synthetic database without its rollup tables"""
+    path = tmp_path_factory.mktemp('cube_only') / 'data' / 'databases' / 'duck_suppression.db'
+    path.parent.mkdir(parents=True)
+    shutil.copy(synthetic_db, path)
+    con = duckdb.connect(str(path))
+    try:
+        for table in ROLLUPS:
+            con.execute(f"DROP TABLE {table}")
+    finally:
+        con.close()
+    return str(path)
+
+
+def test_cube_source_routing(synthetic_db, cube_only_db):
+    assert db.cube_source('test', 'win', False, ['winner'], synthetic_db) == 'test_win_non_mover_national'
+    assert db.cube_source('test', 'loss', True, ['the_date', 'loser'], synthetic_db) == 'test_loss_mover_state'
+    assert db.cube_source('test', 'win', False, ['the_date', 'state', 'winner'], synthetic_db) == 'test_win_non_mover_state'
+    assert db.cube_source('test', 'win', False, ['the_date', 'dma_name'], synthetic_db) == 'test_win_non_mover_cube'
+    assert db.cube_source('test', 'win', False, ['winner'], cube_only_db) == 'test_win_non_mover_cube'
+
+
+def test_national_rollup_contents(synthetic_db):
+    nat = db.query("SELECT * FROM test_win_non_mover_national ORDER BY the_date, winner", synthetic_db)
+    expected = db.query("""
+        SELECT the_date, day_of_week, winner, SUM(total_wins) AS total_wins, SUM(record_count) AS record_count,
+               SUM(SUM(total_wins)) OVER (PARTITION BY the_date) AS market_total
+        FROM test_win_non_mover_cube
+        GROUP BY the_date, day_of_week, winner
+        ORDER BY the_date, winner
+    """, synthetic_db)
+    pd.testing.assert_frame_equal(nat, expected, check_dtype=False)
+
+
+def _same(fn, synthetic_db, cube_only_db, **kwargs):
+    got = fn(db_path=synthetic_db, **kwargs)
+    expected = fn(db_path=cube_only_db, **kwargs)
+    assert len(got) > 0
+    if isinstance(got, list):
+        assert got == expected
+    else:
+        pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('fn,kwargs', [
+    (metrics.national_timeseries, dict(start_date=START, end_date=END)),
+    (metrics.national_timeseries, dict(start_date=START, end_date=END, state='CA')),
+    (metrics.national_timeseries, dict(start_date=START, end_date=END, dma_name='Chicago, IL')),
+    (plan.base_national_series, dict(winners=['Alpha', 'Gamma', 'Zeta'], start_date=START, end_date=END)),
+    (plan.get_top_n_carriers, dict(n=4)),
+    (plan.get_top_n_carriers, dict(n=4, min_share_pct=10.0)),
+    (plan.scan_base_outliers, dict(start_date=START, end_date=END, z_threshold=1.0, top_n=3, egregious_threshold=5)),
+    (db.national_outliers_from_cube, dict(start_date=START, end_date=END, window=4)),
+    (db.national_outliers_from_cube, dict(start_date=START, end_date=END, window=4, cube_type='loss')),
+], ids=['ts', 'ts-state', 'ts-dma', 'base-series', 'top-n', 'top-n-share', 'scan', 'nat-win', 'nat-loss'])
+def test_rollups_match_base_cube(synthetic_db, cube_only_db, fn, kwargs):
+    _same(fn, synthetic_db, cube_only_db, ds='test', mover_ind=False, **kwargs)
+
+
+def test_national_from_cube_matches(synthetic_db, cube_only_db):
+    for metric in ('win', 'loss'):
+        _same(db.get_national_from_cube, synthetic_db, cube_only_db,
+              ds='test', metric=metric, mover_ind=True, start_date=START, end_date=END)
@@ -0,0 +1,135 @@
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import db
+from tools.src import apply, rounds
+
+
+WINNERS = ['Alpha', 'Beta', 'Gamma', 'Delta']
+START, END = '2025-03-01', '2025-03-31'
+
+
+def _plan(db_path):
+    """Plan rows on real cube cells, with a duplicate pair"""
+    plan = db.query(f"""
+        SELECT strftime(the_date, '%Y-%m-%d') AS date, winner, loser, dma_name
+        FROM test_win_non_mover_cube
+        WHERE the_date BETWEEN '{START}' AND '{END}' AND total_wins > 2
+        ORDER BY ALL
+        LIMIT 30
+    """, db_path)
+    plan['remove_units'] = np.arange(len(plan)) % 4 + 1
+    return pd.concat([plan, plan.head(3)], ignore_index=True)
+
+
+@pytest.fixture
+def store_db(synthetic_db, tmp_path):
+    """Writable copy of the synthetic database"""
+    path = tmp_path / 'data' / 'databases' / 'duck_suppression.db'
+    path.parent.mkdir(parents=True)
+    shutil.copy(synthetic_db, path)
+    yield str(path)
+    db.close_pool(str(path))
+
+
+def test_save_and_load(store_db):
+    assert rounds.list_rounds(store_db).empty
+    plan = _plan(store_db).assign(mover_ind='False', stage='auto')
+    plan.loc[plan.index[:3], 'mover_ind'] = '1'
+    round_id = rounds.save_round(plan, 'round_a', ds='test', db_path=store_db)
+
+    listed = rounds.list_rounds(store_db)
+    assert listed[['round_id', 'round_name', 'ds', 'n_rows']].values.tolist() == [[round_id, 'round_a', 'test', len(plan)]]
+    assert listed['remove_units'].iloc[0] == plan['remove_units'].sum()
+
+    loaded = rounds.load_round(round_id, store_db)
+    assert list(loaded.columns[:4]) == ['date', 'winner', 'loser', 'dma_name']
+    assert loaded['date'].tolist() == pd.to_datetime(plan['date']).dt.date.tolist()
+    assert loaded['mover_ind'].tolist() == [True] * 3 + [False] * (len(plan) - 3)
+    assert loaded['remove_units'].tolist() == plan['remove_units'].tolist()
+    assert loaded['pair_z'].isna().all()
+
+
+def test_overwrite_and_append(store_db):
+    plan = _plan(store_db)
+    round_id = rounds.save_round(plan, 'round_a', db_path=store_db)
+    with pytest.raises(rounds.RoundExistsError):
+        rounds.save_round(plan, 'round_a', db_path=store_db)
+
+    assert rounds.save_round(plan.head(4), 'round_a', db_path=store_db, append=True) == round_id
+    assert len(rounds.load_round(round_id, store_db)) == len(plan) + 4
+    assert rounds.save_round(plan.head(2), 'round_a', db_path=store_db, overwrite=True) == round_id
+    assert rounds.list_rounds(store_db)['n_rows'].tolist() == [2]
+
+    other = rounds.save_round(plan.head(1), 'round_b', db_path=store_db)
+    both = rounds.load_rounds([round_id, other], store_db)
+    assert both['round_id'].tolist() == [round_id, round_id, other]
+
+    rounds.delete_round(round_id, store_db)
+    assert rounds.list_rounds(store_db)['round_name'].tolist() == ['round_b']
+    assert rounds.load_round(round_id, store_db).empty
+
+
+def test_round_preview_matches_plan(store_db):
+    plan = _plan(store_db)
+    round_id = rounds.save_round(plan, 'round_a', db_path=store_db)
+    args = ('test', False, WINNERS, START, END)
+    base, expected = apply.preview_series(*args, plan=plan, db_path=store_db)
+    base_r, suppressed = apply.preview_series(*args, plan=None, db_path=store_db, round_id=round_id)
+    pd.testing.assert_frame_equal(base_r, base)
+    pd.testing.assert_frame_equal(suppressed, expected)
+
+
+def test_import_csv_rounds(store_db, tmp_path):
+    csv_dir = tmp_path / 'rounds'
+    csv_dir.mkdir()
+    _plan(store_db).to_csv(csv_dir / 'csv_round.csv', index=False)
+    ids = rounds.import_csv_rounds(str(csv_dir), store_db)
+    assert rounds.list_rounds(store_db)['round_name'].tolist() == ['csv_round']
+    assert rounds.import_csv_rounds(str(csv_dir), store_db) == []
+    assert len(rounds.load_round(ids[0], store_db)) == len(_plan(store_db))
+
+
+def test_suppressed_cube_over_rounds(store_db):
+    plan = _plan(store_db)
+    first, second = plan.iloc[::2], plan.iloc[1::2]
+    ids = [rounds.save_round(first, 'round_a', db_path=store_db),
+           rounds.save_round(second, 'round_b', db_path=store_db)]
+    sql = "SELECT * FROM {suppressed} ORDER BY the_date, winner, loser, state, dma_name"
+    kwargs = dict(start_date=START, end_date=END, winners=WINNERS, db_path=store_db)
+    expected = apply.query_suppressed(sql, 'test', False, plan=plan, **kwargs)
+    pd.testing.assert_frame_equal(apply.query_suppressed(sql, 'test', False, round_ids=ids, **kwargs), expected)
+    pd.testing.assert_frame_equal(
+        apply.query_suppressed(sql, 'test', False, plan=second, round_ids=ids[:1], **kwargs), expected)
+
+
+def test_save_alongside_readers_on_other_threads(store_db):
+    """Saves drain in-flight pooled reads instead of closing their cursors"""
+    plan = _plan(store_db)
+    stop, errors, reads = threading.Event(), [], []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                reads.append(db.query("SELECT COUNT(*) AS n FROM test_win_non_mover_cube", store_db, cache=False))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        round_ids = [rounds.save_round(plan, f'round_{i}', db_path=store_db) for i in range(5)]
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert not errors
+    assert reads and all(r['n'][0] == reads[0]['n'][0] for r in reads)
+    assert [len(rounds.load_round(r, store_db)) for r in round_ids] == [len(plan)] * 5
@@ -0,0 +1,98 @@
+import pandas as pd
+import pyarrow as pa
+
+from tools import db
+from tools.src import metrics
+from tools.src.metrics import iter_pair_metrics, pair_eligibility, pair_metrics
+
+
+ARGS = ('test', False, '2025-01-01', '2025-04-30')
+
+
+def _frame(chunks):
+    return db.arrow_to_pandas(pa.Table.from_batches(chunks) if isinstance(chunks[0], pa.RecordBatch)
+                              else pa.concat_tables(chunks))
+
+
+def test_batches_match_query(synthetic_db):
+    batches = list(iter_pair_metrics(*ARGS, db_path=synthetic_db, batch_size=500))
+    assert len(batches) > 1
+    assert max(b.num_rows for b in batches) <= 500
+    pd.testing.assert_frame_equal(_frame(batches), pair_metrics(*ARGS, db_path=synthetic_db))
+
+
+def test_date_chunks(synthetic_db):
+    # Odd batch size so batches straddle date boundaries
+    chunks = list(iter_pair_metrics(*ARGS, db_path=synthetic_db, by_date=True, batch_size=37))
+    dates = [d for d, _ in chunks]
+    assert len(dates) == 120 and dates == sorted(set(dates))
+    for the_date, day in chunks:
+        assert set(day.column('the_date').to_pylist()) == {the_date}
+    pd.testing.assert_frame_equal(_frame([t for _, t in chunks]), pair_metrics(*ARGS, db_path=synthetic_db))
+
+
+def test_pair_eligibility_matches_groupby(synthetic_db):
+    got = pair_eligibility(*ARGS, thresholds=(10, 5), winners=['Alpha', 'Gamma'], db_path=synthetic_db)
+
+    pairs = pair_metrics(*ARGS, db_path=synthetic_db)
+    pairs = pairs[pairs['winner'].isin(['Alpha', 'Gamma'])]
+    expected = []
+    for t in (5, 10):
+        frame = pairs.assign(
+            min_wins=t,
+            eligible_pairs=(pairs['pair_wins_current'] >= t).astype('int64'),
+            eligible_wins=pairs['pair_wins_current'].where(pairs['pair_wins_current'] >= t, 0),
+        )
+        expected.append(frame.groupby(['the_date', 'winner', 'min_wins'], as_index=False).agg(
+            total_wins=('pair_wins_current', 'sum'),
+            eligible_pairs=('eligible_pairs', 'sum'),
+            eligible_wins=('eligible_wins', 'sum'),
+        ))
+    expected = (pd.concat(expected).sort_values(['the_date', 'winner', 'min_wins']).reset_index(drop=True)
+                [list(got.columns)])
+
+    assert set(got['winner']) == {'Alpha', 'Gamma'}
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_query_cube(synthetic_db):
+    where = "winner = 'Alpha' AND state = 'CA'"
+    expected = db.query_cube('test', 'win', True, where, synthetic_db)
+    got = _frame(list(db.iter_query_cube('test', 'win', True, where, synthetic_db, batch_size=100)))
+    keys = ['the_date', 'loser', 'dma_name']
+    pd.testing.assert_frame_equal(got.sort_values(keys).reset_index(drop=True),
+                                  expected.sort_values(keys).reset_index(drop=True))
+
+    days = dict(db.iter_query_cube('test', 'win', True, where, synthetic_db, by_date=True))
+    assert sum(t.num_rows for t in days.values()) == len(expected)
+
+
+def test_other_queries_while_streaming(synthetic_db):
+    stream = db.iter_batches("SELECT * FROM test_win_mover_cube", synthetic_db, batch_size=100)
+    first = next(stream)
+    n = db.query("SELECT COUNT(*) AS n FROM test_win_mover_cube", synthetic_db, cache=False)['n'][0]
+    rest = sum(b.num_rows for b in stream)
+    assert first.num_rows + rest == n
+
+    stream = db.iter_batches("SELECT * FROM test_win_mover_cube", synthetic_db, batch_size=100)
+    next(stream)
+    stream.close()  # abandoning a stream releases its cursor
+    assert db.query("SELECT 1 AS x", synthetic_db, cache=False)['x'][0] == 1
+
+
+def test_pair_eligibility_filters_winners_in_sql(synthetic_db):
+    sql = metrics._pair_metrics_sql(*ARGS, winners=['Alpha', "O'Brien"])
+    assert "winner IN ('Alpha','O''Brien')" in sql
+    assert pair_eligibility(*ARGS, winners=[], db_path=synthetic_db).empty
+
+
+def test_with_block_releases_stream(synthetic_db):
+    with iter_pair_metrics(*ARGS, db_path=synthetic_db, by_date=True, batch_size=37) as days:
+        next(days)
+        assert db.stats()['active_leases'] == 1
+    assert db.stats()['active_leases'] == 0
+
+    # Exhausting a stream releases it without a with block
+    for _ in db.iter_batches("SELECT 1 AS x", synthetic_db):
+        pass
+    assert db.stats()['active_leases'] == 0
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from tools.src import suppress
+
+
+TARGETS = [
+    ('2025-03-03', 'Alpha', 3),      # fully covered by stage 1
+    ('2025-03-08', 'Beta', 60),      # weekend, spills into stage 2
+    ('2025-04-01', 'Gamma', 400),    # more than the pairs can give
+    ('2025-04-01', 'Alpha', 25),
+    ('2025-02-10', 'Zeta', 0),       # nothing to remove
+    ('2025-01-05', 'Delta', 30),     # little history, many first appearances
+    ('2025-04-20', "O'Brien", 10),   # unknown winner
+]
+
+
+def _per_row(db_path, mover_ind, targets, **kwargs):
+    plans = []
+    for i, (the_date, winner, removal_target) in enumerate(targets):
+        plan = suppress.build_suppression_plan(
+            db_path, 'test', mover_ind, the_date, winner, removal_target, **kwargs
+        )
+        if not plan.empty:
+            plan['target_idx'] = i
+            plans.append(plan)
+    return pd.concat(plans, ignore_index=True)
+
+
+@pytest.mark.parametrize('mover_ind', [False, True])
+@pytest.mark.parametrize('kwargs', [
+    {'min_volume': 1.0},
+    {'min_volume': 5.0, 'z_thresh': 1.0, 'pct_thresh': 0.1, 'rare_thresh': 8.0, 'window': 4},
+])
+def test_batched_plans_match_per_row(synthetic_db, mover_ind, kwargs):
+    """One set-based pass yields exactly the per-outlier plans, in order"""
+    expected = _per_row(synthetic_db, mover_ind, TARGETS, **kwargs)
+    targets = pd.DataFrame(TARGETS, columns=['the_date', 'winner', 'removal_target'])
+    batched = suppress.build_suppression_plans(synthetic_db, 'test', mover_ind, targets, **kwargs)
+
+    assert set(expected['stage']) == {'auto', 'distributed'}
+    pd.testing.assert_frame_equal(batched, expected[batched.columns], check_exact=False, rtol=1e-9)
+
+
+def test_batched_plans_empty_targets(synthetic_db):
+    targets = pd.DataFrame(columns=['the_date', 'winner', 'removal_target'])
+    assert suppress.build_suppression_plans(synthetic_db, 'test', False, targets).empty
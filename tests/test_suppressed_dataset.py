@@ -0,0 +1,165 @@
+import json
+import os
+
+import duckdb
+import pandas as pd
+import pytest
+
+from conftest import _load_script
+
+
+builder = _load_script('scripts/legacy/build_suppressed_dataset.py')
+
+
+def _write_store(root):
+    """Store laid out like partition_pre_agg_to_duckdb.py: 2 ds x 2 movers x 4 days"""
+    duckdb.sql("""
+        SELECT
+            i AS element_id,
+            CASE WHEN i % 2 = 0 THEN 'alpha' ELSE 'beta' END AS ds,
+            (i // 2) % 2 = 0 AS mover_ind,
+            CASE WHEN (i // 2) % 2 = 0 THEN 'True' ELSE 'False' END AS p_mover_ind,
+            DATE '2025-06-01' + CAST((i // 4) % 4 AS INTEGER) AS the_date,
+            'W' || CAST((i // 16) % 2 AS VARCHAR) AS winner,
+            'L' || CAST((i // 32) % 2 AS VARCHAR) AS loser,
+            'DMA ' || CAST((i // 64) % 2 AS VARCHAR) AS dma_name,
+            CAST(1 + hash(i) % 9 AS DOUBLE) AS adjusted_wins
+        FROM range(1024) t(i)
+    """).create_view('src')
+    duckdb.sql(f"""
+        COPY (
+            SELECT *,
+                   strftime(the_date, '%Y') AS year,
+                   strftime(the_date, '%m') AS month,
+                   strftime(the_date, '%d') AS day
+            FROM src
+        ) TO '{root}' (FORMAT PARQUET, PARTITION_BY (ds, p_mover_ind, year, month, day, the_date), OVERWRITE)
+    """)
+    return os.path.join(root, '**', '*.parquet')
+
+
+def _plan(rows):
+    """Plan rows shaped like load_suppressions() output"""
+    sup = pd.DataFrame(rows, columns=['date', 'winner', 'mover_ind', 'loser', 'dma_name', 'remove_units'])
+    sup['date'] = pd.to_datetime(sup['date']).dt.date
+    return sup
+
+
+PLAN = [
+    ('2025-06-01', 'W0', True, 'L0', 'DMA 0', 12),
+    ('2025-06-01', 'W1', True, 'L1', 'DMA 1', 5),
+    ('2025-06-01', 'W1', True, 'L1', 'DMA 1', 4),    # duplicate key, summed
+    ('2025-06-02', 'W0', False, 'L1', 'DMA 0', 100),  # more than the cell holds
+    ('2025-06-09', 'W0', False, 'L0', 'DMA 0', 3),    # no such partition
+]
+
+
+def _expected_ids(store_glob, sup_df, min_wins=1.0):
+    """Remaining element_ids per the single-statement anti-join over the whole store"""
+    con = duckdb.connect()
+    try:
+        con.register('sup_df', sup_df)
+        return {r[0] for r in con.execute(f"""
+            WITH sup AS (
+              SELECT CAST(date AS DATE) AS d, winner, mover_ind::BOOLEAN AS mover_ind, loser, dma_name,
+                     SUM(remove_units) AS rm
+              FROM sup_df GROUP BY ALL
+            ), cand AS (
+              SELECT s.element_id, r.rm,
+                     SUM(s.adjusted_wins) OVER (
+                       PARTITION BY s.the_date, s.winner, s.mover_ind, s.loser, s.dma_name
+                       ORDER BY s.adjusted_wins DESC, s.element_id
+                       ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS csum
+              FROM read_parquet('{store_glob}', hive_partitioning = true) s
+              JOIN sup r ON CAST(s.the_date AS DATE) = r.d AND s.winner = r.winner
+                        AND s.mover_ind = r.mover_ind AND s.loser = r.loser AND s.dma_name = r.dma_name
+              WHERE s.adjusted_wins >= {min_wins}
+            )
+            SELECT element_id FROM read_parquet('{store_glob}')
+            WHERE element_id NOT IN (SELECT element_id FROM cand WHERE csum <= rm)
+        """).fetchall()}
+    finally:
+        con.close()
+
+
+def _output(out_dir):
+    return duckdb.sql(
+        f"SELECT * FROM read_parquet('{out_dir}/**/*.parquet', hive_partitioning = true)"
+    ).df()
+
+
+def _actions(out_dir):
+    with open(os.path.join(out_dir, builder.MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    return pd.Series({rel: e['action'] for rel, e in manifest['partitions'].items()}), manifest
+
+
+@pytest.fixture
+def store(tmp_path):
+    return _write_store(str(tmp_path / 'store'))
+
+
+def test_matches_single_statement_build(tmp_path, store):
+    sup = _plan(PLAN)
+    out_dir = str(tmp_path / 'out')
+    builder.build_suppressed(store, sup, out_dir, workers=2)
+
+    out = _output(out_dir)
+    assert set(out['element_id']) == _expected_ids(store, sup)
+    assert list(out.columns) == list(_output(os.path.dirname(os.path.dirname(store))).columns)
+
+    actions, manifest = _actions(out_dir)
+    assert len(actions) == 2 * 2 * 4
+    assert set(actions[actions == 'rewritten'].index.str.extract(r'the_date=([\d-]+)')[0]) == {'2025-06-01', '2025-06-02'}
+    assert set(actions[actions != 'rewritten']) == {'linked'}
+    assert manifest['totals']['rows_in'] - manifest['totals']['rows_out'] == 1024 - len(out)
+    assert manifest['totals']['removed_rows'] > 0
+    assert builder.verify_output(out_dir) == []
+
+    # Untouched partitions share the source files
+    rel = actions[actions == 'linked'].index[0]
+    src = os.path.join(os.path.dirname(os.path.dirname(store)), rel, 'data_0.parquet')
+    assert os.stat(src).st_ino == os.stat(os.path.join(out_dir, rel, 'data_0.parquet')).st_ino
+
+
+def test_store_glob_limits_partitions(tmp_path, store):
+    """Only partitions matching the glob are read, not everything under the store root"""
+    root = os.path.dirname(os.path.dirname(store))
+    movers = os.path.join(root, '*', 'p_mover_ind=True', '**', '*.parquet')
+    sup = _plan(PLAN)
+    out_dir = str(tmp_path / 'out')
+    builder.build_suppressed(movers, sup, out_dir, workers=2)
+
+    actions, _ = _actions(out_dir)
+    assert len(actions) == 2 * 4
+    assert actions.index.str.contains('p_mover_ind=True').all()
+    assert set(_output(out_dir)['element_id']) == _expected_ids(movers, sup)
+
+
+def test_incremental_rerun(tmp_path, store):
+    out_dir = str(tmp_path / 'out')
+    builder.build_suppressed(store, _plan(PLAN), out_dir)
+
+    builder.build_suppressed(store, _plan(PLAN), out_dir)
+    actions, _ = _actions(out_dir)
+    assert set(actions) == {'unchanged'}
+
+    # Change one plan unit: only that date/mover's partitions are rewritten
+    plan = PLAN[:3] + [('2025-06-02', 'W0', False, 'L1', 'DMA 0', 3)]
+    builder.build_suppressed(store, _plan(plan), out_dir)
+    actions, _ = _actions(out_dir)
+    changed = actions[actions != 'unchanged']
+    assert len(changed) == 2 and set(changed) == {'rewritten'}
+    assert changed.index.str.contains('p_mover_ind=False').all()
+    assert changed.index.str.contains('the_date=2025-06-02').all()
+    assert set(_output(out_dir)['element_id']) == _expected_ids(store, _plan(plan))
+    assert builder.verify_output(out_dir) == []
+
+
+def test_verify_detects_tampering(tmp_path, store):
+    out_dir = str(tmp_path / 'out')
+    builder.build_suppressed(store, _plan(PLAN), out_dir, copy_files=True)
+    actions, _ = _actions(out_dir)
+    rel = actions[actions == 'copied'].index[0]
+    os.remove(os.path.join(out_dir, rel, 'data_0.parquet'))
+    assert builder.verify_output(out_dir) == [f"{rel}: missing"]
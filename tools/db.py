@@ -2,14 +2,23 @@
 DuckDB database utilities for carrier suppression analysis.
 
 Provides convenient access to the persistent duck_suppression.db database
-with connection pooling, read-only access, and common query patterns.
+with connection pooling, read-only access, a shared query result cache and
+common query patterns. query() returns pandas DataFrames; query_arrow()
+returns pyarrow Tables with dictionary-encoded strings for large pulls;
+iter_batches() streams results too big to hold at once.
 """
 import os
+import time
 import atexit
-from typing import Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
 import duckdb
 import pandas as pd
 
+from tools.src.rolling import rolling_stats_sql
+
 
 # Default database path
 DEFAULT_DB_PATH = os.path.join(os.getcwd(), "data/databases/duck_suppression.db")
@@ -23,6 +32,30 @@ assert "data/databases/duck_suppression.db" in DEFAULT_DB_PATH, \
 # Track temporary database files for cleanup
 _temp_files = []
 
+# Set SUPPRESSION_DB_POOL=0 to open a fresh connection per query (old behaviour)
+POOL_ENABLED = os.environ.get("SUPPRESSION_DB_POOL", "1") != "0"
+
+# Seconds a pooled connection may sit unused before it is closed and the
+# database file lock released for builds in other processes. Long enough that
+# a dashboard session keeps its connection between clicks; writes from this
+# process do not wait for it (see write_connection).
+# SUPPRESSION_DB_POOL_IDLE_SECONDS=0 keeps connections open until close_pool().
+POOL_IDLE_SECONDS = float(os.environ.get("SUPPRESSION_DB_POOL_IDLE_SECONDS", "600"))
+
+# Seconds write_connection() and close_pool() wait for other threads' queries
+# and streams to finish, and write_connection() keeps retrying while another
+# process holds the file lock
+WRITE_LOCK_TIMEOUT = 30.0
+
+# Max number of parsed statements kept in the statement cache
+STATEMENT_CACHE_SIZE = 256
+
+# Memory budget of the shared query() result cache (SUPPRESSION_DB_CACHE_MB=0 disables it)
+RESULT_CACHE_BYTES = int(float(os.environ.get("SUPPRESSION_DB_CACHE_MB", "256")) * 1024 * 1024)
+
+# Rows per Arrow record batch yielded by iter_batches()
+STREAM_BATCH_ROWS = 100_000
+
 
 def get_default_db_path() -> str:
     """Get the default database path"""
@@ -57,14 +90,654 @@ def connect(db_path: Optional[str] = None, read_only: bool = True) -> duckdb.Duc
     return duckdb.connect(db_path, read_only=read_only)
 
 
-def query(sql: str, db_path: Optional[str] = None, params: Optional[dict] = None) -> pd.DataFrame:
+class _ConnectionPool:
+    """
+    Process-wide pool of read-only DuckDB connections keyed by db_path.
+    
+    One root connection is opened per database file and shared by all
+    threads. Each thread gets its own cursor off that root (DuckDB
+    connections must not be shared across threads), and cursors belonging to
+    threads that have exited are closed the next time a cursor is created.
+    
+    Cursors are handed out as leases (see lease()), so the pool knows when a
+    database is in use. A root that has had no lease for POOL_IDLE_SECONDS
+    (minutes, not seconds - reopening a large database reloads its catalog)
+    is closed by a background reaper, which releases DuckDB's file lock:
+    builds and other writers can run while a dashboard sits idle, and the
+    next query simply reopens the file. Writers in this process do not wait
+    for the reaper (see exclusive()). A root is also reopened when the
+    file's database_generation() no longer matches the one it was opened
+    at (e.g. a rebuild replaced the file), once its in-flight leases finish,
+    so reads never come from a stale file.
+    
+    Parsed statements are cached by SQL text so repeated queries skip the
+    parser. DuckDB's Python API re-binds parameters on every execute, so the
+    cache is keyed on SQL only and parameters are passed at execution time.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._roots: dict = {}      # db_path -> root connection
+        self._cursors: dict = {}    # db_path -> {thread ident: cursor}
+        self._active: dict = {}     # db_path -> {thread ident: leases in progress}
+        self._opened_at: dict = {}  # db_path -> database_generation() the root was opened at
+        self._last_used: dict = {}  # db_path -> time.monotonic() of the last release
+        self._writers: set = set()  # db_paths being written or closed (new leases wait)
+        self._reaper: Optional[threading.Thread] = None
+        self._statements: OrderedDict = OrderedDict()
+        self._stats = self._empty_stats()
+    
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {
+            'connections_opened': 0,
+            'connect_seconds': 0.0,
+            'cursors_opened': 0,
+            'checkouts': 0,
+            'reused': 0,
+            'idle_closes': 0,
+            'reopened': 0,
+            'statement_cache_hits': 0,
+            'statement_cache_misses': 0,
+        }
+    
+    @contextmanager
+    def lease(self, db_path: str) -> Iterator[duckdb.DuckDBPyConnection]:
+        """The calling thread's cursor for db_path, held open until the block exits"""
+        # The lease belongs to the acquiring thread even if a suspended
+        # generator releases it from another one
+        ident = threading.get_ident()
+        cur = self._acquire(db_path)
+        try:
+            yield cur
+        finally:
+            self._release(db_path, ident)
+    
+    def _acquire(self, db_path: str) -> duckdb.DuckDBPyConnection:
+        ident = threading.get_ident()
+        generation = database_generation(db_path)
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._wait_until_readable(db_path, generation, ident)
+            cursors = self._cursors.setdefault(db_path, {})
+            cur = cursors.get(ident)
+            if cur is not None:
+                self._stats['reused'] += 1
+            else:
+                root = self._roots.get(db_path)
+                if root is None:
+                    root = self._open(db_path, generation)
+                self._prune_dead_threads(cursors)
+                cur = root.cursor()
+                self._stats['cursors_opened'] += 1
+                cursors[ident] = cur
+            leases = self._active.setdefault(db_path, {})
+            leases[ident] = leases.get(ident, 0) + 1
+            return cur
+    
+    def _release(self, db_path: str, ident: int) -> None:
+        with self._cond:
+            leases = self._active[db_path]
+            leases[ident] -= 1
+            if not leases[ident]:
+                del leases[ident]
+            self._last_used[db_path] = time.monotonic()
+            self._cond.notify_all()
+    
+    def _wait_until_readable(self, db_path: str, generation: Optional[tuple], ident: int) -> None:
+        # Caller holds the lock. Waits out write_connection() blocks and
+        # closes a stale root once its leases finish. A thread already
+        # holding a lease keeps its cursor (closing it would break the
+        # caller's open result).
+        while True:
+            if self._active.get(db_path, {}).get(ident):
+                return
+            if db_path in self._writers:
+                self._cond.wait()
+                continue
+            if db_path not in self._roots or self._opened_at.get(db_path) == generation:
+                return
+            if self._active.get(db_path):
+                self._cond.wait()
+                continue
+            self._close_path(db_path)
+            self._stats['reopened'] += 1
+    
+    def _open(self, db_path: str, generation: Optional[tuple]) -> duckdb.DuckDBPyConnection:
+        # Caller holds the lock
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(
+                f"Database not found: {db_path}\n"
+                f"Run: uv run build_suppression_db.py <preagg_path> to create it"
+            )
+        t0 = time.perf_counter()
+        root = duckdb.connect(db_path, read_only=True)
+        self._stats['connect_seconds'] += time.perf_counter() - t0
+        self._stats['connections_opened'] += 1
+        self._roots[db_path] = root
+        self._opened_at[db_path] = generation
+        self._last_used[db_path] = time.monotonic()
+        if POOL_IDLE_SECONDS > 0 and self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, name='duckdb-pool-reaper', daemon=True)
+            self._reaper.start()
+        return root
+    
+    def _reap(self) -> None:
+        """Close roots that have been idle for POOL_IDLE_SECONDS; exits when none are open"""
+        with self._cond:
+            while self._roots:
+                now = time.monotonic()
+                deadline = None
+                for path in list(self._roots):
+                    if self._active.get(path):
+                        continue
+                    expires = self._last_used[path] + POOL_IDLE_SECONDS
+                    if expires <= now:
+                        self._close_path(path)
+                        self._stats['idle_closes'] += 1
+                    else:
+                        deadline = expires if deadline is None else min(deadline, expires)
+                if self._roots:
+                    # Woken early by every release, which may change the deadline
+                    self._cond.wait(None if deadline is None else deadline - now)
+            self._reaper = None
+    
+    @contextmanager
+    def exclusive(self, db_path: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Keep readers off db_path while the block runs.
+        
+        New leases wait, leases in progress on other threads are allowed to
+        finish (TimeoutError after timeout seconds), then the root is closed
+        so a read-write connection can open in this process. Readers resume
+        (and reopen) when the block exits.
+        """
+        with self._cond:
+            self._drain(db_path, 'write to', timeout)
+            self._close_path(db_path)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writers.discard(db_path)
+                self._cond.notify_all()
+    
+    def _drain(self, db_path: str, action: str, timeout: Optional[float] = None) -> None:
+        # Caller holds the lock. Marks db_path so new leases wait, then waits
+        # for other threads' leases to finish; the caller discards the mark.
+        # On timeout the mark is removed here and TimeoutError raised.
+        if self._active.get(db_path, {}).get(threading.get_ident()):
+            raise RuntimeError(
+                f"Cannot {action} {db_path} while this thread is reading it "
+                f"(finish or close the open query/stream first)"
+            )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while db_path in self._writers:
+            self._wait(deadline, db_path, action)
+        self._writers.add(db_path)
+        try:
+            while self._active.get(db_path):
+                self._wait(deadline, db_path, action)
+        except TimeoutError:
+            self._writers.discard(db_path)
+            self._cond.notify_all()
+            raise
+    
+    def _wait(self, deadline: Optional[float], db_path: str, action: str) -> None:
+        # Caller holds the lock
+        if deadline is None:
+            self._cond.wait()
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f"Timed out waiting to {action} {db_path}: another thread still has a query "
+                f"or stream open on it (close unfinished iter_batches() streams)"
+            )
+        self._cond.wait(remaining)
+    
+    @staticmethod
+    def _prune_dead_threads(cursors: dict) -> None:
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in cursors if i not in alive]:
+            try:
+                cursors.pop(ident).close()
+            except Exception:
+                pass
+    
+    def statement(self, cur: duckdb.DuckDBPyConnection, sql: str):
+        """Parsed statement for sql (cached), or the raw text for multi-statement SQL"""
+        with self._lock:
+            stmt = self._statements.get(sql)
+            if stmt is not None:
+                self._statements.move_to_end(sql)
+                self._stats['statement_cache_hits'] += 1
+                return stmt
+            self._stats['statement_cache_misses'] += 1
+        
+        parsed = cur.extract_statements(sql)
+        stmt = parsed[0] if len(parsed) == 1 else sql
+        
+        with self._lock:
+            self._statements[sql] = stmt
+            while len(self._statements) > STATEMENT_CACHE_SIZE:
+                self._statements.popitem(last=False)
+        return stmt
+    
+    def _close_path(self, path: str) -> None:
+        # Caller holds the lock
+        for cur in self._cursors.pop(path, {}).values():
+            try:
+                cur.close()
+            except Exception:
+                pass
+        root = self._roots.pop(path, None)
+        if root is not None:
+            try:
+                root.close()
+            except Exception:
+                pass
+        self._last_used.pop(path, None)
+        self._opened_at.pop(path, None)
+    
+    def close(self, db_path: Optional[str] = None, wait: bool = True) -> None:
+        """
+        Close pooled connections (all databases, or just db_path).
+        
+        Queries and streams other threads are running on a database finish
+        first (new ones wait; TimeoutError after WRITE_LOCK_TIMEOUT);
+        wait=False closes them underneath their readers, for interpreter
+        exit only.
+        """
+        with self._cond:
+            paths = [db_path] if db_path else list(self._roots)
+            for path in paths:
+                if not wait:
+                    self._close_path(path)
+                    continue
+                self._drain(path, 'close', WRITE_LOCK_TIMEOUT)
+                try:
+                    self._close_path(path)
+                finally:
+                    self._writers.discard(path)
+            self._cond.notify_all()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out['pooled_databases'] = len(self._roots)
+            out['open_cursors'] = sum(len(c) for c in self._cursors.values())
+            out['active_leases'] = sum(n for leases in self._active.values() for n in leases.values())
+            out['cached_statements'] = len(self._statements)
+        checkouts = out['checkouts']
+        lookups = out['statement_cache_hits'] + out['statement_cache_misses']
+        out['reuse_rate'] = out['reused'] / checkouts if checkouts else 0.0
+        out['statement_hit_rate'] = out['statement_cache_hits'] / lookups if lookups else 0.0
+        return out
+    
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = self._empty_stats()
+
+
+_pool = _ConnectionPool()
+
+
+def database_generation(db_path: str) -> Optional[tuple]:
+    """
+    Stamp that changes whenever a database file is written.
+    
+    (inode, mtime_ns, size) of the database file and (mtime_ns, size) of its
+    write-ahead log: a commit grows the .wal, a checkpoint rewrites the file
+    and a rebuild replaces it. None if the database does not exist.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    try:
+        wal = os.stat(db_path + ".wal")
+        wal_stamp = (wal.st_mtime_ns, wal.st_size)
+    except OSError:
+        wal_stamp = None
+    return (st.st_ino, st.st_mtime_ns, st.st_size, wal_stamp)
+
+
+def _freeze(value: Any):
+    """Hashable, order-normalized form of query parameters"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        return value.item()  # numpy scalar
+    hash(value)
+    return value
+
+
+def _result_nbytes(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return result.nbytes  # pyarrow.Table
+
+
+def _result_copy(result):
+    # Arrow tables are immutable and can be shared as-is
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+
+class _ResultCache:
+    """
+    Process-wide LRU of query() / query_arrow() results with a byte budget.
+    
+    Entries are keyed by (db_path, SQL text, frozen parameters, result
+    format) and tagged with the database generation they were read at.
+    Seeing a new generation for a database drops all of its entries, so
+    rebuilding a cube (or any other write) invalidates cached results
+    without TTLs. Callers get a copy of a cached DataFrame and may modify it
+    freely; Arrow tables are immutable and shared.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # key -> (frame, nbytes)
+        self._generations: dict = {}  # db_path -> generation
+        self._bytes = 0
+        self._stats = self._empty_stats()
+    
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'uncacheable': 0,
+        }
+    
+    def _check_generation(self, db_path: str, generation: tuple) -> None:
+        # Caller holds the lock
+        if self._generations.get(db_path) == generation:
+            return
+        if db_path in self._generations:
+            self._stats['invalidations'] += 1
+            self._drop(db_path)
+        self._generations[db_path] = generation
+    
+    def _drop(self, db_path: Optional[str] = None) -> None:
+        # Caller holds the lock
+        for key in [k for k in self._entries if db_path is None or k[0] == db_path]:
+            self._bytes -= self._entries.pop(key)[1]
+    
+    def get(self, key: tuple, generation: tuple):
+        with self._lock:
+            self._check_generation(key[0], generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return _result_copy(entry[0])
+    
+    def put(self, key: tuple, generation: tuple, frame) -> None:
+        nbytes = _result_nbytes(frame)
+        if nbytes > self.max_bytes:
+            with self._lock:
+                self._stats['uncacheable'] += 1
+            return
+        with self._lock:
+            self._check_generation(key[0], generation)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (frame, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats['evictions'] += 1
+    
+    def clear(self, db_path: Optional[str] = None) -> None:
+        with self._lock:
+            self._drop(db_path)
+            if db_path is None:
+                self._generations.clear()
+            else:
+                self._generations.pop(db_path, None)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out['entries'] = len(self._entries)
+            out['bytes'] = self._bytes
+            out['max_bytes'] = self.max_bytes
+        lookups = out['hits'] + out['misses']
+        out['hit_rate'] = out['hits'] / lookups if lookups else 0.0
+        return out
+    
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = self._empty_stats()
+
+
+_result_cache = _ResultCache(RESULT_CACHE_BYTES)
+
+
+def _resolve_db_path(db_path: Optional[str]) -> str:
+    return os.path.abspath(db_path if db_path is not None else DEFAULT_DB_PATH)
+
+
+@contextmanager
+def pooled_connection(db_path: Optional[str] = None) -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Borrow the calling thread's pooled read-only connection.
+    
+    The connection is owned by the pool - do NOT close it, and do not keep it
+    past the with block: once no block is using a database, the pool may
+    close it after POOL_IDLE_SECONDS. Use connect() when you need a private
+    (or writable) connection.
+    
+    Args:
+        db_path: Path to database file (default: ./duck_suppression.db)
+        
+    Yields:
+        DuckDB cursor bound to the calling thread
+        
+    Example:
+        with pooled_connection() as con:
+            rows = con.execute("SELECT COUNT(*) FROM carrier_data").fetchone()
+    """
+    with _pool.lease(_resolve_db_path(db_path)) as cur:
+        yield cur
+
+
+def _fetch_pandas(result) -> pd.DataFrame:
+    """
+    Fetch a DuckDB result as a DataFrame, decoding ENUM columns to strings.
+    
+    Cubes built with --encoding enum store winner/loser/dma_name/state as
+    ENUM keys (see CUBE_DIMENSIONS), which .df() turns into pandas
+    Categoricals; decoding here keeps query() output identical across
+    encodings (and groupby free of unobserved category combinations).
+    """
+    frame = result.df()
+    for col in frame.columns[[isinstance(t, pd.CategoricalDtype) for t in frame.dtypes]]:
+        frame[col] = frame[col].astype(object).where(frame[col].notna(), None)
+    return frame
+
+
+def _run(
+    sql: str,
+    db_path: Optional[str] = None,
+    params: Optional[Any] = None,
+    fetch: Callable = _fetch_pandas,
+    relations: Optional[dict] = None
+):
+    """
+    Execute read-only SQL on the pool (or a one-off connection) and fetch.
+    
+    `relations` maps view names to DataFrames that are registered on the
+    connection for the duration of the query only.
+    """
+    if not POOL_ENABLED:
+        con = connect(db_path, read_only=True)
+        try:
+            for name, frame in (relations or {}).items():
+                con.register(name, frame)
+            return fetch(con.execute(sql, params) if params else con.execute(sql))
+        finally:
+            con.close()
+    
+    with pooled_connection(db_path) as cur:
+        stmt = _pool.statement(cur, sql)
+        if not relations:
+            return fetch(cur.execute(stmt, params) if params else cur.execute(stmt))
+        
+        for name, frame in relations.items():
+            cur.register(name, frame)
+        try:
+            return fetch(cur.execute(stmt, params) if params else cur.execute(stmt))
+        finally:
+            for name in relations:
+                cur.unregister(name)
+
+
+def stats() -> dict:
+    """
+    Connection pool statistics.
+    
+    Returns:
+        Dictionary with connections_opened, connect_seconds (time spent
+        opening database files), cursors_opened, checkouts, reused,
+        reuse_rate, idle_closes (connections closed after POOL_IDLE_SECONDS),
+        reopened (connections reopened because the database file changed),
+        statement cache hits/misses/hit rate, pooled_databases, open_cursors
+        and active_leases
+    """
+    return _pool.stats()
+
+
+def reset_stats() -> None:
+    """Reset pool counters (open connections are kept)"""
+    _pool.reset_stats()
+
+
+@contextmanager
+def write_connection(
+    db_path: Optional[str] = None,
+    lock_timeout: float = WRITE_LOCK_TIMEOUT
+) -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Open a read-write connection without disturbing other threads' queries.
+    
+    Pooled reads of the database in this process are drained first (queries
+    and streams in progress finish, new ones wait until the block exits),
+    then the pooled connection is closed so DuckDB accepts the read-write
+    one. If another process holds the file lock (e.g. a dashboard
+    mid-query), the connect is retried until lock_timeout; a process holds
+    the lock until its pool has been idle for POOL_IDLE_SECONDS or it calls
+    close_pool().
+    
+    Args:
+        db_path: Path to database file (default: ./duck_suppression.db)
+        lock_timeout: Seconds to wait for other threads' reads, then to keep
+            retrying while another process holds the lock
+    
+    Raises:
+        TimeoutError: Another thread kept a query or stream open past lock_timeout
+        
+    Yields:
+        Read-write DuckDB connection (closed when the block exits)
+        
+    Example:
+        with write_connection() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS notes (note VARCHAR)")
+    """
+    path = _resolve_db_path(db_path)
+    with _pool.exclusive(path, lock_timeout):
+        deadline = time.monotonic() + lock_timeout
+        while True:
+            try:
+                con = connect(path, read_only=False)
+                break
+            except duckdb.IOException as e:
+                if 'lock' not in str(e).lower() or time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.25)
+        try:
+            yield con
+        finally:
+            con.close()
+
+
+def close_pool(db_path: Optional[str] = None) -> None:
+    """
+    Close pooled connections.
+    
+    Idle connections are closed on their own after POOL_IDLE_SECONDS; call
+    this to release the database file lock right away (e.g. before a
+    rebuild in another process). Queries and streams other threads have
+    open are allowed to finish first (TimeoutError if one is still open
+    after WRITE_LOCK_TIMEOUT); closing from a thread that is itself
+    reading the database raises RuntimeError.
+    
+    Args:
+        db_path: Only close connections to this database (default: all)
+    """
+    _pool.close(_resolve_db_path(db_path) if db_path else None)
+
+
+atexit.register(_pool.close, wait=False)
+
+
+def cache_stats() -> dict:
+    """
+    Result cache statistics.
+    
+    Returns:
+        Dictionary with hits, misses, hit_rate, evictions (LRU, over the
+        byte budget), invalidations (database rewritten), uncacheable
+        (results larger than the budget), entries, bytes and max_bytes
+    """
+    return _result_cache.stats()
+
+
+def clear_cache(db_path: Optional[str] = None) -> None:
+    """
+    Drop cached query() results (all databases, or just db_path).
+    
+    Not needed after rebuilding a database - writes change its generation
+    stamp and invalidate its entries automatically.
+    """
+    _result_cache.clear(_resolve_db_path(db_path) if db_path else None)
+    _result_cache.reset_stats()
+
+
+def query(
+    sql: str,
+    db_path: Optional[str] = None,
+    params: Optional[dict] = None,
+    relations: Optional[dict] = None,
+    cache: bool = True
+) -> pd.DataFrame:
     """
     Execute a query and return results as a pandas DataFrame.
     
+    Results are memoized process-wide by SQL text, parameters and the
+    database's generation stamp (see database_generation), so dashboards
+    and tools.src.* functions share hits and a rebuilt database is never
+    served stale results. Queries with `relations` are not cached.
+    
     Args:
         sql: SQL query string
         db_path: Path to database file (default: ./duck_suppression.db)
         params: Optional parameters for parameterized queries
+        relations: Optional {view_name: DataFrame} made visible to the query
+            (registered on the connection, dropped again afterwards)
+        cache: Use the shared result cache (default: True)
         
     Returns:
         Query results as pandas DataFrame
@@ -73,38 +746,272 @@ def query(sql: str, db_path: Optional[str] = None, params: Optional[dict] = None
         df = query("SELECT DISTINCT winner FROM carrier_data ORDER BY winner")
         df = query("SELECT * FROM carrier_data WHERE ds = $ds LIMIT 10", 
                    params={'ds': 'gamoshi'})
+        df = query("SELECT c.* FROM carrier_data c JOIN keys USING (winner)",
+                   relations={'keys': keys_df})
     """
-    con = connect(db_path, read_only=True)
+    return _cached_run(sql, db_path, params, relations, cache, 'pandas', _fetch_pandas)
+
+
+def _cached_run(
+    sql: str,
+    db_path: Optional[str],
+    params: Optional[Any],
+    relations: Optional[dict],
+    cache: bool,
+    fmt: str,
+    fetch: Callable
+):
+    """_run() through the shared result cache (see query)"""
+    if not cache or relations or _result_cache.max_bytes <= 0:
+        return _run(sql, db_path, params, fetch=fetch, relations=relations)
+    
+    path = _resolve_db_path(db_path)
+    generation = database_generation(path)
     try:
-        if params:
-            result = con.execute(sql, params).df()
-        else:
-            result = con.execute(sql).df()
-        return result
-    finally:
-        con.close()
+        key = (path, sql, _freeze(params), fmt)
+    except TypeError:
+        key = None
+    if generation is None or key is None:
+        return _run(sql, db_path, params, fetch=fetch)
+    
+    cached = _result_cache.get(key, generation)
+    if cached is not None:
+        return cached
+    result = _run(sql, db_path, params, fetch=fetch)
+    _result_cache.put(key, generation, result)
+    return _result_copy(result)
+
+
+def _fetch_arrow(result):
+    """Fetch a DuckDB result as a pyarrow Table with dictionary-encoded strings"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    table = result.fetch_arrow_table()
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+    return table
+
+
+def query_arrow(
+    sql: str,
+    db_path: Optional[str] = None,
+    params: Optional[dict] = None,
+    relations: Optional[dict] = None,
+    cache: bool = True
+):
+    """
+    Execute a query and return results as a pyarrow Table.
+    
+    Same arguments and caching as query(), but rows never go through pandas
+    object columns: string columns (winner, loser, dma_name, ...) come back
+    dictionary-encoded, so a large pair-level pull takes a fraction of the
+    memory of its DataFrame and converts faster. Filter it with
+    pyarrow.compute and hand only what is left to arrow_to_pandas().
+    Requires pyarrow.
+    
+    Args:
+        sql: SQL query string
+        db_path: Path to database file (default: ./duck_suppression.db)
+        params: Optional parameters for parameterized queries
+        relations: Optional {view_name: DataFrame} made visible to the query
+        cache: Use the shared result cache (default: True)
+        
+    Returns:
+        pyarrow.Table (shared when served from the cache - Arrow tables are
+        immutable)
+    """
+    return _cached_run(sql, db_path, params, relations, cache, 'arrow', _fetch_arrow)
+
+
+def arrow_to_pandas(table, categorical: bool = False) -> pd.DataFrame:
+    """
+    Convert a query_arrow() Table to a DataFrame shaped like query() output.
+    
+    Dates become datetime64 columns, decimals floats and integer columns
+    holding NULLs nullable Int columns, as in DuckDB's .df(). Dictionary columns
+    are decoded to plain strings unless categorical=True (pandas
+    Categoricals are smaller, but groupby on them needs observed=True).
+    
+    Args:
+        table: pyarrow Table (e.g. from query_arrow)
+        categorical: Keep dictionary columns as pandas Categoricals
+        
+    Returns:
+        pandas DataFrame
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type):
+            table = table.set_column(i, field.name, pc.cast(table.column(i), pa.timestamp('us')))
+        elif pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, pc.cast(table.column(i), pa.float64()))
+        elif pa.types.is_dictionary(field.type) and not categorical:
+            table = table.set_column(i, field.name, pc.cast(table.column(i), field.type.value_type))
+    frame = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_integer(field.type) and table.column(field.name).null_count:
+            prefix = 'Int' if pa.types.is_signed_integer(field.type) else 'UInt'
+            frame[field.name] = frame[field.name].astype(f"{prefix}{field.type.bit_width}")
+    return frame
 
 
-def table_exists(table_name: str, db_path: Optional[str] = None) -> bool:
+class _Stream:
+    """
+    Iterator returned by iter_batches() / iter_date_chunks().
+    
+    Releases its source (pooled connection lease, cursor) as soon as it is
+    exhausted, closed or its with block exits - not when it is garbage
+    collected - so write_connection() and close_pool() are never left
+    waiting on a stream nobody is reading.
+    """
+    
+    def __init__(self, items: Iterator, on_close: Optional[Callable] = None):
+        self._items = items
+        self._on_close = on_close
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        try:
+            return next(self._items)
+        except StopIteration:
+            self.close()
+            raise
+    
+    def close(self) -> None:
+        on_close, self._on_close = self._on_close, None
+        try:
+            self._items.close()
+        finally:
+            if on_close is not None:
+                on_close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_batches(
+    sql: str,
+    db_path: Optional[str] = None,
+    params: Optional[dict] = None,
+    batch_size: int = STREAM_BATCH_ROWS
+) -> Iterator:
+    """
+    Stream a query's result as pyarrow RecordBatches of up to batch_size rows.
+    
+    Only the batch being consumed is held in Python, so results far larger
+    than memory can be aggregated incrementally. The stream runs on its own
+    cursor off the pooled connection, so other queries can run while it is
+    open. Results are not cached. Requires pyarrow.
+    
+    From the first batch until the stream is exhausted or closed it holds a
+    lease on the pooled connection: write_connection() and close_pool()
+    wait for it (TimeoutError after WRITE_LOCK_TIMEOUT). Read it in a with
+    block whenever the loop may stop early.
+    
+    Args:
+        sql: SQL query string
+        db_path: Path to database file (default: ./duck_suppression.db)
+        params: Optional parameters for parameterized queries
+        batch_size: Rows per batch
+        
+    Returns:
+        Iterator of pyarrow.RecordBatch with close() and context-manager support
+        
+    Example:
+        totals = Counter()
+        with iter_batches("SELECT winner, total_wins FROM gamoshi_win_mover_cube") as batches:
+            for batch in batches:
+                frame = batch.to_pandas()
+                totals.update(frame.groupby('winner')['total_wins'].sum().to_dict())
+    """
+    return _Stream(_record_batches(sql, db_path, params, batch_size))
+
+
+def _record_batches(sql: str, db_path: Optional[str], params: Optional[dict], batch_size: int) -> Iterator:
+    if not POOL_ENABLED:
+        con = connect(db_path, read_only=True)
+        try:
+            result = con.execute(sql, params) if params else con.execute(sql)
+            yield from result.fetch_record_batch(batch_size)
+        finally:
+            con.close()
+        return
+    
+    with pooled_connection(db_path) as cur:
+        con = cur.cursor()
+        try:
+            result = con.execute(sql, params) if params else con.execute(sql)
+            yield from result.fetch_record_batch(batch_size)
+        finally:
+            con.close()
+
+
+def iter_date_chunks(batches: Iterable, date_col: str = "the_date") -> Iterator[tuple]:
+    """
+    Regroup a batch stream ordered by date_col into one Table per date.
+    
+    Batch boundaries fall anywhere, so rows of a date are carried over until
+    the next date starts. Memory is bounded by the largest single date.
+    Closing the returned iterator closes batches too (see iter_batches).
+    
+    Args:
+        batches: RecordBatches (e.g. from iter_batches) sorted by date_col
+        date_col: Column to split on
+        
+    Returns:
+        Iterator of (date, pyarrow.Table) for each date, in stream order
+    """
+    return _Stream(_date_chunks(batches, date_col), getattr(batches, 'close', None))
+
+
+def _date_chunks(batches: Iterable, date_col: str) -> Iterator[tuple]:
+    import numpy as np
+    import pyarrow as pa
+    
+    pending, current = [], None
+    for batch in batches:
+        if batch.num_rows == 0:
+            continue
+        values = batch.column(date_col).to_numpy(zero_copy_only=False)
+        starts = np.concatenate([[0], np.flatnonzero(values[1:] != values[:-1]) + 1, [len(values)]])
+        for lo, hi in zip(starts[:-1], starts[1:]):
+            value = batch.column(date_col)[int(lo)].as_py()
+            if pending and value != current:
+                yield current, pa.Table.from_batches(pending)
+                pending = []
+            current = value
+            pending.append(batch.slice(lo, hi - lo))
+    if pending:
+        yield current, pa.Table.from_batches(pending)
+
+
+def table_exists(table_name: str, db_path: Optional[str] = None, schema: Optional[str] = None) -> bool:
     """
     Check if a table exists in the database.
     
     Args:
         table_name: Name of the table to check
         db_path: Path to database file
+        schema: Only look in this schema (default: any)
         
     Returns:
         True if table exists, False otherwise
     """
-    con = connect(db_path, read_only=True)
-    try:
-        result = con.execute(
-            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
-            [table_name]
-        ).fetchone()
-        return result[0] > 0
-    finally:
-        con.close()
+    result = _run(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ? "
+        "AND (? IS NULL OR table_schema = ?)",
+        db_path, [table_name, schema, schema], fetch=lambda r: r.fetchone()
+    )
+    return result[0] > 0
 
 
 def get_table_info(table_name: str = "carrier_data", db_path: Optional[str] = None) -> pd.DataFrame:
@@ -118,11 +1025,7 @@ def get_table_info(table_name: str = "carrier_data", db_path: Optional[str] = No
     Returns:
         DataFrame with column information
     """
-    con = connect(db_path, read_only=True)
-    try:
-        return con.execute(f"DESCRIBE {table_name}").df()
-    finally:
-        con.close()
+    return _run(f"DESCRIBE {table_name}", db_path)
 
 
 def get_table_stats(table_name: str = "carrier_data", db_path: Optional[str] = None) -> dict:
@@ -136,15 +1039,15 @@ def get_table_stats(table_name: str = "carrier_data", db_path: Optional[str] = N
     Returns:
         Dictionary with table statistics
     """
-    con = connect(db_path, read_only=True)
-    try:
-        row_count = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-        
-        date_range = con.execute(
-            f"SELECT MIN(the_date) as min_date, MAX(the_date) as max_date FROM {table_name}"
-        ).fetchone()
-        
-        distinct_counts = con.execute(f"""
+    fetchone = lambda r: r.fetchone()
+    row_count = _run(f"SELECT COUNT(*) FROM {table_name}", db_path, fetch=fetchone)[0]
+    
+    date_range = _run(
+        f"SELECT MIN(the_date) as min_date, MAX(the_date) as max_date FROM {table_name}",
+        db_path, fetch=fetchone
+    )
+    
+    distinct_counts = _run(f"""
             SELECT
                 COUNT(DISTINCT ds) as ds_count,
                 COUNT(DISTINCT winner) as winner_count,
@@ -152,20 +1055,18 @@ def get_table_stats(table_name: str = "carrier_data", db_path: Optional[str] = N
                 COUNT(DISTINCT dma_name) as dma_count,
                 COUNT(DISTINCT state) as state_count
             FROM {table_name}
-        """).fetchone()
-        
-        return {
-            'row_count': row_count,
-            'min_date': date_range[0],
-            'max_date': date_range[1],
-            'distinct_ds': distinct_counts[0],
-            'distinct_winners': distinct_counts[1],
-            'distinct_losers': distinct_counts[2],
-            'distinct_dmas': distinct_counts[3],
-            'distinct_states': distinct_counts[4],
-        }
-    finally:
-        con.close()
+        """, db_path, fetch=fetchone)
+    
+    return {
+        'row_count': row_count,
+        'min_date': date_range[0],
+        'max_date': date_range[1],
+        'distinct_ds': distinct_counts[0],
+        'distinct_winners': distinct_counts[1],
+        'distinct_losers': distinct_counts[2],
+        'distinct_dmas': distinct_counts[3],
+        'distinct_states': distinct_counts[4],
+    }
 
 
 def get_distinct_values(column: str, table_name: str = "carrier_data", 
@@ -186,14 +1087,10 @@ def get_distinct_values(column: str, table_name: str = "carrier_data",
         carriers = get_distinct_values('winner')
         dmas = get_distinct_values('dma_name', where="state = 'CA'")
     """
-    con = connect(db_path, read_only=True)
-    try:
-        where_clause = f"WHERE {where}" if where else ""
-        sql = f"SELECT DISTINCT {column} FROM {table_name} {where_clause} WHERE {column} IS NOT NULL ORDER BY {column}"
-        result = con.execute(sql).df()
-        return result[column].tolist()
-    finally:
-        con.close()
+    where_clause = f"WHERE {where}" if where else ""
+    sql = f"SELECT DISTINCT {column} FROM {table_name} {where_clause} WHERE {column} IS NOT NULL ORDER BY {column}"
+    result = query(sql, db_path)
+    return result[column].tolist()
 
 
 def create_temp_db(suffix: str = '.db', prefix: str = 'duck_temp_') -> str:
@@ -378,6 +1275,87 @@ def get_db_size(db_path: Optional[str] = None) -> dict:
 
 # Cube table query helpers
 
+# Rollups kept next to each {ds}_{metric}_{mover}_cube by
+# scripts/build/build_cubes_in_db.py (CUBE_ROLLUPS there), smallest first,
+# with the cube columns each one keeps
+CUBE_ROLLUPS = (
+    ("national", ("the_date", "day_of_week", "winner")),
+    ("state", ("the_date", "day_of_week", "state", "winner", "loser")),
+)
+
+
+# Dimension tables written by scripts/build/build_cubes_in_db.py --encoding enum
+# (CUBE_DIMENSIONS there): dim_{name}({name}_id, value column), ids append-only
+CUBE_DIMENSIONS = {
+    "carrier": ("carrier", ["winner", "loser"]),
+    "dma": ("dma_name", ["dma_name"]),
+    "state": ("state", ["state"]),
+}
+
+
+def dimension(name: str, db_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Id -> name mapping of a cube dimension ('carrier', 'dma' or 'state').
+    
+    Encoded cube columns already read back as names; use this to decode ids
+    that left the database some other way (enum_code(), exported keys) or
+    to encode names for an external integer-keyed join.
+    
+    Args:
+        name: Dimension name (see CUBE_DIMENSIONS)
+        db_path: Path to database file
+        
+    Returns:
+        DataFrame with columns {name}_id, value column (empty if the
+        database was built without --encoding enum)
+    """
+    if name not in CUBE_DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {name!r} (expected one of {', '.join(CUBE_DIMENSIONS)})")
+    value_col = CUBE_DIMENSIONS[name][0]
+    if not table_exists(f"dim_{name}", db_path):
+        return pd.DataFrame({f"{name}_id": pd.Series(dtype="int32"), value_col: pd.Series(dtype=object)})
+    return query(f"SELECT {name}_id, {value_col} FROM dim_{name} ORDER BY {name}_id", db_path)
+
+
+def cube_source(
+    ds: str,
+    metric: str,  # 'win' or 'loss'
+    mover_ind: bool,
+    columns: Iterable[str],
+    db_path: Optional[str] = None
+) -> str:
+    """
+    Smallest table that answers a cube query touching `columns`.
+    
+    The metric (total_wins/total_losses) and record_count are in every
+    rollup. Falls back to the base cube when no rollup keeps all of
+    `columns` (e.g. a dma_name filter) or the rollups were never built.
+    
+    Args:
+        ds: Dataset name
+        metric: 'win' or 'loss'
+        mover_ind: True for movers, False for non-movers
+        columns: Cube dimensions grouped on or filtered by
+        db_path: Path to database file
+        
+    Returns:
+        Table name: a rollup or {ds}_{metric}_{mover}_cube
+    """
+    mover_str = "mover" if mover_ind else "non_mover"
+    prefix = f"{ds}_{metric}_{mover_str}"
+    needed = set(columns)
+    candidates = [f"{prefix}_{name}" for name, dims in CUBE_ROLLUPS if needed <= set(dims)]
+    if candidates:
+        names = ", ".join(f"'{t}'" for t in candidates)
+        existing = set(query(
+            f"SELECT table_name FROM information_schema.tables WHERE table_name IN ({names})", db_path
+        )['table_name'])
+        for table_name in candidates:
+            if table_name in existing:
+                return table_name
+    return f"{prefix}_cube"
+
+
 def query_cube(
     ds: str,
     metric: str,  # 'win' or 'loss'
@@ -412,6 +1390,47 @@ def query_cube(
     return query(sql, db_path)
 
 
+def iter_query_cube(
+    ds: str,
+    metric: str,  # 'win' or 'loss'
+    mover_ind: bool,
+    sql_filter: Optional[str] = None,
+    db_path: Optional[str] = None,
+    by_date: bool = False,
+    batch_size: int = STREAM_BATCH_ROWS
+) -> Iterator:
+    """
+    Streaming query_cube(): yield the rows in Arrow batches (see iter_batches).
+    
+    Args:
+        ds: Dataset name (e.g., 'gamoshi')
+        metric: 'win' or 'loss'
+        mover_ind: True for movers, False for non-movers
+        sql_filter: Optional WHERE clause (without WHERE keyword)
+        db_path: Path to database file
+        by_date: Yield (the_date, pyarrow.Table) per date instead of
+            fixed-size batches (rows are ordered by the_date)
+        batch_size: Rows per batch fetched from DuckDB
+        
+    Yields:
+        pyarrow.RecordBatch, or (date, pyarrow.Table) when by_date
+        
+    Example:
+        with iter_query_cube('gamoshi', 'win', False, by_date=True) as days:
+            for the_date, day in days:
+                daily_max[the_date] = pc.max(day['total_wins']).as_py()
+    """
+    mover_str = "mover" if mover_ind else "non_mover"
+    table_name = f"{ds}_{metric}_{mover_str}_cube"
+    
+    where_clause = f"WHERE {sql_filter}" if sql_filter else ""
+    order_clause = "ORDER BY the_date" if by_date else ""
+    sql = f"SELECT * FROM {table_name} {where_clause} {order_clause}"
+    
+    batches = iter_batches(sql, db_path, batch_size=batch_size)
+    return iter_date_chunks(batches) if by_date else batches
+
+
 def get_national_from_cube(
     ds: str,
     metric: str,  # 'win' or 'loss'
@@ -421,7 +1440,7 @@ def get_national_from_cube(
     db_path: Optional[str] = None
 ) -> pd.DataFrame:
     """
-    Get national daily aggregates from cube table.
+    Get national daily aggregates from cube table (or its national rollup).
     
     Args:
         ds: Dataset name
@@ -434,8 +1453,7 @@ def get_national_from_cube(
     Returns:
         DataFrame with national daily aggregates by carrier
     """
-    mover_str = "mover" if mover_ind else "non_mover"
-    table_name = f"{ds}_{metric}_{mover_str}_cube"
+    table_name = cube_source(ds, metric, mover_ind, ["the_date", "winner"], db_path)
     
     filters = []
     if start_date:
@@ -445,11 +1463,12 @@ def get_national_from_cube(
     
     where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
     
+    total_col = 'total_wins' if metric == 'win' else 'total_losses'
     sql = f"""
     SELECT 
         the_date,
         winner,
-        SUM(total_{metric}s) as total_{metric}s
+        SUM({total_col}) as {total_col}
     FROM {table_name}
     {where_clause}
     GROUP BY the_date, winner
@@ -469,20 +1488,59 @@ def list_cube_tables(db_path: Optional[str] = None) -> list[str]:
     Returns:
         List of cube table names
     """
-    con = connect(db_path, read_only=True)
-    try:
-        result = con.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_name LIKE '%_cube'
-            ORDER BY table_name
-        """).fetchall()
-        return [row[0] for row in result]
-    finally:
-        con.close()
+    result = _run("""
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_name LIKE '%_cube'
+        ORDER BY table_name
+    """, db_path, fetch=lambda r: r.fetchall())
+    return [row[0] for row in result]
 
 
 # Cube-based outlier detection (50-200x faster than parquet scans!)
+#
+# The rolling baselines are ROWS frames over the previous `window` rows of the
+# same day type (Weekday/Sat/Sun), so a row on start_date needs at most
+# window * 7 days of dense history. Scans are bounded to that span (and to
+# end_date); series too sparse to fill their frame inside it get their last
+# `window` older rows from a context scan reaching CONTEXT_LOOKBACK_DAYS
+# further back. Results match a full-history run except for series with fewer
+# than `window` rows of a day type in that whole stretch, whose baselines use
+# only the rows inside it.
+CONTEXT_LOOKBACK_DAYS = 365
+
+def _day_type_sql(day_of_week: str = "day_of_week") -> str:
+    return f"""CASE 
+                WHEN {day_of_week} = 6 THEN 'Sat'
+                WHEN {day_of_week} = 0 THEN 'Sun'
+                ELSE 'Weekday'
+            END"""
+
+
+def _cube_scan_bounds(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    window: int
+) -> tuple[Optional[str], Optional[str], str]:
+    """
+    Look-back and context starts for a windowed cube query, and the scan filter.
+    
+    Returns:
+        (lookback_start or None, context_start or None,
+         "AND the_date ..." filter for the cube scan)
+    """
+    lookback_start = None
+    context_start = None
+    scan_filter = ""
+    if start_date:
+        lookback = pd.Timestamp(start_date) - pd.Timedelta(days=window * 7)
+        lookback_start = lookback.strftime('%Y-%m-%d')
+        context_start = (lookback - pd.Timedelta(days=CONTEXT_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        scan_filter += f" AND the_date >= DATE '{lookback_start}'"
+    if end_date:
+        scan_filter += f" AND the_date <= DATE '{end_date}'"
+    return lookback_start, context_start, scan_filter
+
 
 def national_outliers_from_cube(
     ds: str = 'gamoshi',
@@ -498,7 +1556,10 @@ def national_outliers_from_cube(
     """
     Detect national-level outliers using cube table.
     
-    ~50-100x faster than scanning raw parquet files!
+    ~50-100x faster than scanning raw parquet files! Reads the smallest
+    rollup keeping the entity (see cube_source), and with start_date set
+    only window * 7 days of look-back are scanned, plus up to
+    CONTEXT_LOOKBACK_DAYS more for entities too sparse to fill it (see above).
     
     Args:
         ds: Dataset name (e.g., 'gamoshi')
@@ -527,9 +1588,6 @@ def national_outliers_from_cube(
             cube_type='loss'  # Look at losses instead of wins
         )
     """
-    mover_str = "mover" if mover_ind else "non_mover"
-    cube_table = f"{ds}_{cube_type}_{mover_str}_cube"
-    
     # Column names differ between win and loss cubes
     if cube_type == 'loss':
         total_col = 'total_losses'
@@ -556,6 +1614,47 @@ def national_outliers_from_cube(
     
     # For loss cubes, use 'loser' instead of 'winner'
     entity_col = 'loser' if cube_type == 'loss' else 'winner'
+    cube_table = cube_source(ds, cube_type, mover_ind, ["the_date", "day_of_week", entity_col], db_path)
+    
+    lookback_start, context_start, scan_filter = _cube_scan_bounds(start_date, end_date, window)
+    day_type = _day_type_sql()
+    
+    context_sql = ""
+    context_union = ""
+    context_market = ""
+    if lookback_start:
+        context_sql = f"""
+    short_series AS (
+        -- Entity/day-type series with fewer than {window} rows before start_date in the span
+        SELECT {entity_col}, {day_type} as day_type
+        FROM daily_totals
+        GROUP BY ALL
+        HAVING COUNT(*) FILTER (WHERE the_date < DATE '{start_date}') < {window}
+    ),
+    context_daily AS (
+        SELECT 
+            c.the_date,
+            c.{entity_col},
+            c.day_of_week,
+            SUM(c.{total_col}) as {volume_col}
+        FROM {cube_table} c
+        SEMI JOIN short_series s
+            ON c.{entity_col} = s.{entity_col}
+            AND {_day_type_sql('c.day_of_week')} = s.day_type
+        WHERE c.the_date >= DATE '{context_start}' AND c.the_date < DATE '{lookback_start}'
+        GROUP BY c.the_date, c.{entity_col}, c.day_of_week
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY c.{entity_col}, {_day_type_sql('c.day_of_week')}
+            ORDER BY c.the_date DESC
+        ) <= {window}
+    ),"""
+        context_union = "UNION ALL\n        SELECT * FROM context_daily"
+        context_market = f"""UNION ALL
+        SELECT the_date, SUM({total_col}) as market_total
+        FROM {cube_table}
+        WHERE the_date >= DATE '{context_start}' AND the_date < DATE '{lookback_start}'
+          AND the_date IN (SELECT DISTINCT the_date FROM context_daily)
+        GROUP BY the_date"""
     
     sql = f"""
     WITH daily_totals AS (
@@ -565,12 +1664,18 @@ def national_outliers_from_cube(
             day_of_week,
             SUM({total_col}) as {volume_col}
         FROM {cube_table}
+        WHERE 1=1 {scan_filter}
         GROUP BY the_date, {entity_col}, day_of_week
+    ),{context_sql}
+    all_daily AS (
+        SELECT * FROM daily_totals
+        {context_union}
     ),
     market_totals AS (
         SELECT the_date, SUM({volume_col}) as market_total
         FROM daily_totals
         GROUP BY the_date
+        {context_market}
     ),
     with_share AS (
         SELECT 
@@ -579,12 +1684,8 @@ def national_outliers_from_cube(
             d.{volume_col},
             m.market_total,
             d.{volume_col} / NULLIF(m.market_total, 0) as {share_col},
-            CASE 
-                WHEN d.day_of_week = 6 THEN 'Sat'
-                WHEN d.day_of_week = 0 THEN 'Sun'
-                ELSE 'Weekday'
-            END as day_type
-        FROM daily_totals d
+            {day_type} as day_type
+        FROM all_daily d
         JOIN market_totals m USING (the_date)
     ),
     with_stats AS (
@@ -595,16 +1696,8 @@ def national_outliers_from_cube(
             market_total,
             {share_col},
             day_type,
-            AVG({metric_col}) OVER (
-                PARTITION BY entity, day_type 
-                ORDER BY the_date 
-                ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
-            ) as mu,
-            STDDEV_SAMP({metric_col}) OVER (
-                PARTITION BY entity, day_type 
-                ORDER BY the_date 
-                ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
-            ) as sigma
+            {rolling_stats_sql(metric_col, ['entity', 'day_type'], 'the_date', [window],
+                               names=('mu', 'sigma', 'hist_count'))}
         FROM with_share
     )
     SELECT 
@@ -658,6 +1751,10 @@ def pair_outliers_from_cube(
     - New pair: No historical data
     - Rare pair: Baseline < 2.0 wins/day
     
+    With start_date set, only window * 7 days of look-back are scanned,
+    plus the last `window` older rows (within CONTEXT_LOOKBACK_DAYS) of
+    pairs too sparse to fill it.
+    
     Args:
         ds: Dataset name (e.g., 'gamoshi')
         mover_ind: True for movers, False for non-movers
@@ -701,8 +1798,45 @@ def pair_outliers_from_cube(
     )
     """ if only_outliers else ""
     
+    lookback_start, context_start, scan_filter = _cube_scan_bounds(start_date, end_date, window)
+    
+    context_sql = ""
+    context_union = ""
+    if lookback_start:
+        context_sql = f"""
+    short_series AS (
+        -- Pair/day-type series with fewer than {window} rows before start_date in the span
+        SELECT winner, loser, dma_name, day_type
+        FROM recent_daily
+        GROUP BY ALL
+        HAVING COUNT(*) FILTER (WHERE the_date < DATE '{start_date}') < {window}
+    ),
+    context_daily AS (
+        SELECT 
+            c.the_date,
+            c.winner,
+            c.loser,
+            c.dma_name,
+            c.state,
+            c.day_of_week,
+            c.total_wins,
+            {_day_type_sql('c.day_of_week')} as day_type
+        FROM {cube_table} c
+        SEMI JOIN short_series s
+            ON c.winner = s.winner
+            AND c.loser = s.loser
+            AND c.dma_name = s.dma_name
+            AND {_day_type_sql('c.day_of_week')} = s.day_type
+        WHERE c.the_date >= DATE '{context_start}' AND c.the_date < DATE '{lookback_start}'
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY c.winner, c.loser, c.dma_name, {_day_type_sql('c.day_of_week')}
+            ORDER BY c.the_date DESC
+        ) <= {window}
+    ),"""
+        context_union = "UNION ALL\n        SELECT * FROM context_daily"
+    
     sql = f"""
-    WITH pair_daily AS (
+    WITH recent_daily AS (
         SELECT 
             the_date,
             winner,
@@ -711,12 +1845,13 @@ def pair_outliers_from_cube(
             state,
             day_of_week,
             total_wins,
-            CASE 
-                WHEN day_of_week = 6 THEN 'Sat'
-                WHEN day_of_week = 0 THEN 'Sun'
-                ELSE 'Weekday'
-            END as day_type
+            {_day_type_sql()} as day_type
         FROM {cube_table}
+        WHERE 1=1 {scan_filter}
+    ),{context_sql}
+    pair_daily AS (
+        SELECT * FROM recent_daily
+        {context_union}
     ),
     with_stats AS (
         SELECT 
@@ -727,21 +1862,8 @@ def pair_outliers_from_cube(
             state,
             total_wins,
             day_type,
-            AVG(total_wins) OVER (
-                PARTITION BY winner, loser, dma_name, day_type
-                ORDER BY the_date
-                ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
-            ) as mu,
-            STDDEV_SAMP(total_wins) OVER (
-                PARTITION BY winner, loser, dma_name, day_type
-                ORDER BY the_date
-                ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
-            ) as sigma,
-            COUNT(*) OVER (
-                PARTITION BY winner, loser, dma_name, day_type
-                ORDER BY the_date
-                ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
-            ) as hist_count
+            {rolling_stats_sql('total_wins', ['winner', 'loser', 'dma_name', 'day_type'], 'the_date', [window],
+                               names=('mu', 'sigma', 'hist_count'))}
         FROM pair_daily
     )
     SELECT 
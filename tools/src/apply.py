@@ -0,0 +1,307 @@
+"""
+Apply suppression plans to cube data (before/after preview).
+
+The plan is joined to the win cube inside DuckDB and only the removed wins
+per (date, winner) come back. The base national series comes from
+plan.base_national_series, whose result is memoized by tools.db.query per
+(ds, mover_ind, window, winners) and invalidated when the cube is rebuilt,
+so editing the plan or switching display modes only re-runs the small delta
+query. Plans saved as rounds (tools.src.rounds) are joined straight from
+suppressions.plans by round id, with nothing registered from pandas.
+
+suppressed_cube_sql() is the same join as a relation: the cube with plan
+removals applied, for any query that needs suppressed rows rather than the
+preview deltas (query_suppressed() runs one). The date/winner window is
+pushed into both the cube scan and the plan side, and no copy of the cube
+is written per round.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from tools import db
+from tools.src.plan import base_national_series
+from tools.src import rounds
+
+
+PLAN_KEYS = ['the_date', 'winner', 'loser', 'dma_name']
+
+
+def plan_removals(
+    plan: pd.DataFrame,
+    winners: Optional[List[str]] = None,
+    keys: Sequence[str] = PLAN_KEYS
+) -> pd.DataFrame:
+    """
+    Normalize a suppression plan to one row per pair-DMA-date.
+
+    Args:
+        plan: Plan rows with date (or the_date), winner, loser, dma_name and
+            remove_units (as built by tools.src.suppress)
+        winners: Only keep rows for these winners (default: all)
+        keys: Cube columns the plan rows are keyed on (default: PLAN_KEYS)
+
+    Returns:
+        DataFrame with the keys and remove_units
+    """
+    keys = list(keys)
+    if plan is None or plan.empty:
+        return pd.DataFrame(columns=keys + ['remove_units'])
+
+    removals = plan.rename(columns={'date': 'the_date'})
+    if winners is not None:
+        removals = removals[removals['winner'].isin(winners)]
+    removals = removals.assign(the_date=pd.to_datetime(removals['the_date']).dt.date)
+    return removals.groupby(keys, as_index=False)['remove_units'].sum()
+
+
+def _in_list(values: Iterable) -> str:
+    """SQL literal list for IN (...) ("NULL" when empty, so nothing matches)"""
+    return ", ".join("'" + str(v).replace("'", "''") + "'" for v in values) or "NULL"
+
+
+def _window_filters(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    winners: Optional[List[str]],
+    alias: str = ''
+) -> List[str]:
+    """Date/winner predicates, applied to both the cube and the plan side"""
+    filters = []
+    if start_date is not None:
+        filters.append(f"{alias}the_date >= DATE '{start_date}'")
+    if end_date is not None:
+        filters.append(f"{alias}the_date <= DATE '{end_date}'")
+    if winners is not None:
+        filters.append(f"{alias}winner IN ({_in_list(winners)})")
+    return filters
+
+
+def removals_sql(
+    round_ids: Sequence[int] = (),
+    plan_relation: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    winners: Optional[List[str]] = None,
+    keys: Sequence[str] = PLAN_KEYS
+) -> str:
+    """
+    Subquery of summed removals per key, for joining to a cube.
+
+    Removals come from saved rounds (suppressions.plans, by round id) and/or
+    a relation registered with tools.db.query (e.g. plan_removals() of an
+    unsaved plan); rows for the same key are summed across all of them.
+    The date/winner window is applied before the sum.
+
+    Returns:
+        Parenthesized subquery with the keys and remove_units
+    """
+    keys = list(keys)
+    others = ', '.join(k for k in keys if k != 'the_date')
+    columns = 'CAST(the_date AS DATE) AS the_date' + (f', {others}' if others else '')
+    filters = _window_filters(start_date, end_date, winners)
+
+    sources = []
+    if round_ids:
+        sources.append((rounds.PLANS_TABLE, [f"round_id IN ({', '.join(str(int(r)) for r in round_ids)})"]))
+    if plan_relation is not None:
+        sources.append((plan_relation, []))
+    if not sources:
+        raise ValueError("removals_sql needs round_ids or a plan_relation")
+
+    parts = [
+        f"SELECT {columns}, remove_units FROM {source} WHERE {' AND '.join(where + filters) or 'TRUE'}"
+        for source, where in sources
+    ]
+    return f"""(
+            SELECT {', '.join(keys)}, SUM(remove_units) AS remove_units
+            FROM ({' UNION ALL '.join(parts)})
+            GROUP BY {', '.join(keys)}
+        )"""
+
+
+def suppressed_cube_sql(
+    ds: str,
+    mover_ind: bool,
+    round_ids: Sequence[int] = (),
+    plan_relation: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    winners: Optional[List[str]] = None,
+    keys: Sequence[str] = PLAN_KEYS
+) -> str:
+    """
+    The win cube with plan removals applied, as a lazy relation.
+
+    Each cube row loses the summed remove_units of its plan rows (from the
+    rounds and/or plan_relation, see removals_sql) and never goes below
+    zero; summing rounds first is the same as applying them one after
+    another. Nothing is materialized: the date/winner window filters both
+    the cube scan and the plan side, so a query over the relation reads
+    only the cube rows it needs.
+
+    Args:
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        round_ids: Saved rounds to apply (see tools.src.rounds)
+        plan_relation: Name of a relation with the keys and remove_units,
+            registered with the query (e.g. via query_suppressed)
+        start_date: Start date (YYYY-MM-DD, default: unbounded)
+        end_date: End date (YYYY-MM-DD, default: unbounded)
+        winners: Only these winners (default: all)
+        keys: Cube columns the plan rows are keyed on (default: PLAN_KEYS)
+
+    Returns:
+        Parenthesized subquery with the cube's columns; total_wins is the
+        suppressed value
+    """
+    cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
+    where = ' AND '.join(_window_filters(start_date, end_date, winners, alias='c.')) or 'TRUE'
+    if not round_ids and plan_relation is None:
+        return f"(SELECT c.* FROM {cube_table} c WHERE {where})"
+
+    source = removals_sql(round_ids, plan_relation, start_date, end_date, winners, keys)
+    on = ' AND '.join(f"c.{k} = p.{k}" for k in keys)
+    return f"""(
+        SELECT c.* REPLACE (GREATEST(0, c.total_wins - COALESCE(p.remove_units, 0)) AS total_wins)
+        FROM {cube_table} c
+        LEFT JOIN {source} p ON {on}
+        WHERE {where}
+    )"""
+
+
+def query_suppressed(
+    sql: str,
+    ds: str,
+    mover_ind: bool,
+    plan: Optional[pd.DataFrame] = None,
+    round_ids: Sequence[int] = (),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    winners: Optional[List[str]] = None,
+    keys: Sequence[str] = PLAN_KEYS,
+    db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Run a query over the suppressed cube.
+
+    Every {suppressed} in sql is replaced by suppressed_cube_sql() for the
+    plan (registered as a relation, see plan_removals) and/or round_ids.
+
+    Example:
+        query_suppressed(
+            "SELECT the_date, SUM(total_wins) AS wins FROM {suppressed} GROUP BY 1",
+            'gamoshi', False, plan=plan, start_date='2025-06-01', end_date='2025-06-30')
+    """
+    relations = None
+    if plan is not None:
+        relations = {'plan_removals': plan_removals(plan, winners, keys)}
+    relation = suppressed_cube_sql(
+        ds, mover_ind, round_ids, 'plan_removals' if relations else None,
+        start_date, end_date, winners, keys
+    )
+    return db.query(sql.replace('{suppressed}', relation), db_path, relations=relations)
+
+
+def suppression_deltas(
+    ds: str,
+    mover_ind: bool,
+    plan: pd.DataFrame,
+    start_date: str,
+    end_date: str,
+    winners: Optional[List[str]] = None,
+    db_path: Optional[str] = None,
+    round_id: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Wins removed per (date, winner) when the plan is applied to the win cube.
+
+    Each matched cube row loses min(total_wins, remove_units) (wins never
+    go below zero), as in suppressed_cube_sql.
+
+    Args:
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        plan: Suppression plan (see plan_removals); ignored with round_id
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        winners: Only apply plan rows for these winners (default: all)
+        db_path: Path to database
+        round_id: Apply a saved round (see tools.src.rounds) instead of plan
+
+    Returns:
+        DataFrame with columns: the_date, winner, removed_wins
+    """
+    if round_id is not None:
+        source = removals_sql([round_id], None, start_date, end_date, winners)
+        relations = None
+    else:
+        removals = plan_removals(plan, winners)
+        if removals.empty:
+            return pd.DataFrame(columns=['the_date', 'winner', 'removed_wins'])
+        source = removals_sql((), 'plan_removals', start_date, end_date, winners)
+        relations = {'plan_removals': removals}
+
+    cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
+    on = ' AND '.join(f"c.{k} = p.{k}" for k in PLAN_KEYS)
+    where = ' AND '.join(_window_filters(start_date, end_date, winners, alias='c.'))
+    sql = f"""
+        SELECT
+            c.the_date,
+            c.winner,
+            SUM(c.total_wins - GREATEST(0, c.total_wins - p.remove_units)) AS removed_wins
+        FROM {cube_table} c
+        JOIN {source} p ON {on}
+        WHERE {where}
+        GROUP BY c.the_date, c.winner
+        ORDER BY c.the_date, c.winner
+    """
+    return db.query(sql, db_path, relations=relations)
+
+
+def preview_series(
+    ds: str,
+    mover_ind: bool,
+    winners: List[str],
+    start_date: str,
+    end_date: str,
+    plan: pd.DataFrame,
+    db_path: Optional[str] = None,
+    round_id: Optional[int] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Base and suppressed national win share series for the preview chart.
+
+    Suppressed wins are the base wins minus suppression_deltas; the market
+    total (over `winners`) and shares are recomputed from those.
+
+    Args:
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        winners: Carriers to chart (the market is their total)
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        plan: Suppression plan (see plan_removals); ignored with round_id
+        db_path: Path to database
+        round_id: Preview a saved round (see tools.src.rounds) instead of plan
+
+    Returns:
+        (base, suppressed) DataFrames, both with columns: the_date, winner,
+        total_wins, market_total, win_share
+    """
+    base = base_national_series(ds, mover_ind, winners, start_date, end_date, db_path)
+    if base.empty:
+        return base, base.copy()
+
+    deltas = suppression_deltas(ds, mover_ind, plan, start_date, end_date, winners, db_path, round_id)
+    suppressed = base[['the_date', 'winner', 'total_wins']].copy()
+    if not deltas.empty:
+        deltas['the_date'] = pd.to_datetime(deltas['the_date']).astype(suppressed['the_date'].dtype)
+        suppressed = suppressed.merge(deltas, on=['the_date', 'winner'], how='left')
+        suppressed['total_wins'] = suppressed['total_wins'] - suppressed.pop('removed_wins').fillna(0)
+
+    suppressed['market_total'] = suppressed.groupby('the_date')['total_wins'].transform('sum')
+    suppressed['win_share'] = suppressed['total_wins'] / suppressed['market_total']
+    return base, suppressed
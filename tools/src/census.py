@@ -0,0 +1,343 @@
+"""
+Census block cube summaries and block listings.
+
+A census cube ({ds}_{metric}_{mover}_census_cube, built by
+scripts/build/build_census_block_cubes.py) has one row per date x census
+block x pair x DMA. Distinct block/state/DMA counts per pair over it are the
+most expensive queries the census dashboard runs, so the build keeps
+summary tables next to each census cube (CENSUS_SUMMARIES):
+
+- _census_h2h_blocks: one row per pair x census block (state, dma_name) with
+  the moments of the metric over its rows (record_count, total_metric,
+  sum_sq_metric, min/max) and days_active
+- _census_h2h_daily: per pair and date: total_metric, unique_blocks, record_count
+- _census_h2h_dma, _census_h2h_state, _census_h2h: distinct counts and
+  summed moments rolled up from the blocks table
+
+Averages and standard deviations are derived from the moments (moments_sql),
+so they match AVG/STDDEV over the census cube rows. Readers here use the
+summary tables when they exist and otherwise run the same aggregation over
+the census cube (older databases keep working, just slower).
+
+Block listings are keyset-paginated: block_page() returns one page ordered
+by (total_metric DESC, census_blockid) and the cursor of its last row; the
+next page starts strictly after that cursor, so every page is an index-range
+read instead of an OFFSET scan.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from tools import db
+
+
+# Summary tables kept next to each census cube: {name: group-by columns}.
+# 'blocks' and 'daily' aggregate the census cube; the rest roll up 'blocks'.
+CENSUS_SUMMARIES = {
+    'blocks': ['winner', 'loser', 'state', 'dma_name', 'census_blockid'],
+    'daily': ['winner', 'loser', 'the_date'],
+    'dma': ['winner', 'loser', 'state', 'dma_name'],
+    'state': ['winner', 'loser', 'state'],
+    'h2h': ['winner', 'loser'],
+}
+
+# Distinct counts kept by each rollup of the blocks table
+_DISTINCT = {
+    'dma': ['census_blockid'],
+    'state': ['census_blockid', 'dma_name'],
+    'h2h': ['census_blockid', 'state', 'dma_name'],
+}
+_DISTINCT_NAMES = {'census_blockid': 'unique_blocks', 'state': 'unique_states', 'dma_name': 'unique_dmas'}
+
+# Block listing order (and keyset cursor): biggest blocks first
+BLOCK_ORDER = 'total_metric DESC, census_blockid'
+
+BLOCK_COLUMNS = [
+    'census_blockid', 'state', 'dma_name', 'total_metric', 'days_active', 'record_count',
+    'avg_metric', 'max_metric',
+]
+
+Cursor = Tuple[float, str]
+
+
+def census_table(ds: str, mover_ind: bool, metric: str) -> str:
+    """{ds}_{metric}_{mover}_census_cube"""
+    return f"{ds}_{metric}_{'mover' if mover_ind else 'non_mover'}_census_cube"
+
+
+def summary_table_name(cube_table: str, summary: str) -> str:
+    """{ds}_{metric}_{mover}_census_h2h[_{summary}] table kept next to a census cube"""
+    base = cube_table[:-len('_cube')] + '_h2h'
+    return base if summary == 'h2h' else f"{base}_{summary}"
+
+
+def summary_select_sql(cube_table: str, metric: str, summary: str, blocks: Optional[str] = None) -> str:
+    """
+    Aggregation SELECT behind a census summary table.
+
+    Args:
+        cube_table: Census cube table
+        metric: 'win' or 'loss'
+        summary: Key of CENSUS_SUMMARIES
+        blocks: Relation holding the blocks summary, for the rollups
+            (default: the blocks table next to cube_table)
+    """
+    dims = ', '.join(CENSUS_SUMMARIES[summary])
+    value = f"total_{metric}s"
+    if summary == 'blocks':
+        return f"""
+        SELECT
+            {dims},
+            COUNT(*) AS record_count,
+            SUM({value}) AS total_metric,
+            SUM({value} * {value}) AS sum_sq_metric,
+            MIN({value}) AS min_metric,
+            MAX({value}) AS max_metric,
+            COUNT(DISTINCT the_date) AS days_active
+        FROM {cube_table}
+        GROUP BY {dims}
+        ORDER BY winner, loser, {BLOCK_ORDER}
+        """
+    if summary == 'daily':
+        return f"""
+        SELECT
+            {dims},
+            SUM({value}) AS total_metric,
+            COUNT(DISTINCT census_blockid) AS unique_blocks,
+            COUNT(*) AS record_count
+        FROM {cube_table}
+        GROUP BY {dims}
+        ORDER BY {dims}
+        """
+    distinct = ''.join(
+        f"\n            COUNT(DISTINCT {col}) AS {_DISTINCT_NAMES[col]}," for col in _DISTINCT[summary]
+    )
+    return f"""
+        SELECT
+            {dims},{distinct}
+            SUM(record_count) AS record_count,
+            SUM(total_metric) AS total_metric,
+            SUM(sum_sq_metric) AS sum_sq_metric,
+            MIN(min_metric) AS min_metric,
+            MAX(max_metric) AS max_metric
+        FROM {blocks or summary_table_name(cube_table, 'blocks')}
+        GROUP BY {dims}
+        ORDER BY {dims}
+        """
+
+
+def build_summary_tables(con, cube_table: str, metric: str) -> Dict[str, int]:
+    """
+    (Re)build the summary tables of a census cube.
+
+    Args:
+        con: Read-write DuckDB connection
+        cube_table: Census cube table
+        metric: 'win' or 'loss'
+
+    Returns:
+        {summary_table: row_count}
+    """
+    rows = {}
+    for summary in CENSUS_SUMMARIES:
+        table_name = summary_table_name(cube_table, summary)
+        con.execute(f"CREATE OR REPLACE TABLE {table_name} AS" + summary_select_sql(cube_table, metric, summary))
+        rows[table_name] = con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    return rows
+
+
+def summary_source(ds: str, mover_ind: bool, metric: str, summary: str, db_path: Optional[str] = None) -> str:
+    """
+    Summary table to read, or the same aggregation over the census cube as a
+    subquery when the summaries were never built.
+    """
+    cube_table = census_table(ds, mover_ind, metric)
+    table_name = summary_table_name(cube_table, summary)
+    if db.table_exists(table_name, db_path):
+        return table_name
+    blocks = None
+    if summary not in ('blocks', 'daily'):
+        blocks = f"({summary_select_sql(cube_table, metric, 'blocks')})"
+    return f"({summary_select_sql(cube_table, metric, summary, blocks)})"
+
+
+def moments_sql() -> str:
+    """total/avg/stddev/max/min and record_count select items from summed moments"""
+    return """total_metric,
+            total_metric / NULLIF(record_count, 0) AS avg_metric,
+            CASE WHEN record_count > 1 THEN SQRT(GREATEST(0,
+                (sum_sq_metric - total_metric * total_metric / record_count) / (record_count - 1)
+            )) END AS stddev_metric,
+            max_metric,
+            min_metric,
+            record_count"""
+
+
+def _pair_filter(winner: str, loser: str, state: Optional[str] = None, dma: Optional[str] = None):
+    """WHERE clause and params for a pair (optionally one state / DMA)"""
+    where = "winner = ? AND loser = ?"
+    params = [winner, loser]
+    if state:
+        where += " AND state = ?"
+        params.append(state)
+    if dma:
+        where += " AND dma_name = ?"
+        params.append(dma)
+    return where, params
+
+
+def h2h_summary(ds: str, mover_ind: bool, metric: str, db_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    One row per pair, biggest first.
+
+    Returns:
+        DataFrame with winner, loser, unique_blocks, unique_states,
+        unique_dmas, total_metric, avg_metric, stddev_metric, max_metric,
+        min_metric, total_records
+    """
+    source = summary_source(ds, mover_ind, metric, 'h2h', db_path)
+    return db.query(f"""
+        SELECT
+            winner,
+            loser,
+            unique_blocks,
+            unique_states,
+            unique_dmas,
+            {moments_sql()} AS total_records
+        FROM {source}
+        ORDER BY total_metric DESC, winner, loser
+    """, db_path)
+
+
+def h2h_timeseries(
+    ds: str, mover_ind: bool, metric: str, winner: str, loser: str, db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """Per date: total_metric, unique_blocks, record_count for one pair"""
+    source = summary_source(ds, mover_ind, metric, 'daily', db_path)
+    return db.query(f"""
+        SELECT the_date, total_metric, unique_blocks, record_count
+        FROM {source}
+        WHERE winner = ? AND loser = ?
+        ORDER BY the_date
+    """, db_path, params=[winner, loser])
+
+
+def state_breakdown(
+    ds: str, mover_ind: bool, metric: str, winner: str, loser: str, db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """Per state: unique_blocks, unique_dmas and metric moments for one pair"""
+    source = summary_source(ds, mover_ind, metric, 'state', db_path)
+    return db.query(f"""
+        SELECT state, unique_blocks, unique_dmas, {moments_sql()}
+        FROM {source}
+        WHERE winner = ? AND loser = ?
+        ORDER BY total_metric DESC, state
+    """, db_path, params=[winner, loser])
+
+
+def dma_breakdown(
+    ds: str, mover_ind: bool, metric: str, winner: str, loser: str,
+    state: Optional[str] = None, db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """Per DMA: unique_blocks and metric moments for one pair (optionally one state)"""
+    source = summary_source(ds, mover_ind, metric, 'dma', db_path)
+    where, params = _pair_filter(winner, loser, state)
+    return db.query(f"""
+        SELECT dma_name, state, unique_blocks, {moments_sql()}
+        FROM {source}
+        WHERE {where}
+        ORDER BY total_metric DESC, dma_name, state
+    """, db_path, params=params)
+
+
+def block_page(
+    ds: str,
+    mover_ind: bool,
+    metric: str,
+    winner: str,
+    loser: str,
+    state: Optional[str] = None,
+    dma: Optional[str] = None,
+    after: Optional[Cursor] = None,
+    page_size: int = 100,
+    db_path: Optional[str] = None
+) -> Tuple[pd.DataFrame, Optional[Cursor]]:
+    """
+    One page of a pair's census blocks, biggest first (keyset pagination).
+
+    Args:
+        ds, mover_ind, metric: Census cube
+        winner, loser: Pair
+        state, dma: Optional filters
+        after: Cursor returned with the previous page (None: first page)
+        page_size: Blocks per page
+        db_path: Path to database
+
+    Returns:
+        (page, next_cursor): page has BLOCK_COLUMNS; next_cursor is the
+        (total_metric, census_blockid) of its last row, None on the last page
+    """
+    source = summary_source(ds, mover_ind, metric, 'blocks', db_path)
+    where, params = _pair_filter(winner, loser, state, dma)
+    if after is not None:
+        where += " AND (total_metric < ? OR (total_metric = ? AND census_blockid > ?))"
+        params += [after[0], after[0], after[1]]
+    page = db.query(f"""
+        SELECT
+            census_blockid, state, dma_name, total_metric, days_active, record_count,
+            total_metric / record_count AS avg_metric, max_metric
+        FROM {source}
+        WHERE {where}
+        ORDER BY {BLOCK_ORDER}
+        LIMIT {int(page_size) + 1}
+    """, db_path, params=params)
+    if len(page) <= page_size:
+        return page, None
+    page = page.iloc[:page_size]
+    last = page.iloc[-1]
+    return page, (float(last['total_metric']), str(last['census_blockid']))
+
+
+def block_outliers(
+    ds: str, mover_ind: bool, metric: str, winner: str, loser: str,
+    threshold_std: float = 3.0, db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    A pair's census blocks whose total is more than threshold_std standard
+    deviations from the mean block total, most extreme first.
+
+    Returns:
+        DataFrame with census_blockid, state, dma_name, total_metric,
+        record_count, days_active, mean_metric, stddev_metric, z_score,
+        avg_daily_metric
+    """
+    source = summary_source(ds, mover_ind, metric, 'blocks', db_path)
+    return db.query(f"""
+        WITH block_stats AS (
+            SELECT census_blockid, state, dma_name, total_metric, record_count, days_active
+            FROM {source}
+            WHERE winner = ? AND loser = ?
+        ),
+        global_stats AS (
+            SELECT
+                AVG(total_metric) AS mean_metric,
+                STDDEV(total_metric) AS stddev_metric
+            FROM block_stats
+        ),
+        scored AS (
+            SELECT
+                b.*,
+                g.mean_metric,
+                g.stddev_metric,
+                (b.total_metric - g.mean_metric) / NULLIF(g.stddev_metric, 0) AS z_score,
+                b.total_metric / NULLIF(b.days_active, 0) AS avg_daily_metric
+            FROM block_stats b
+            CROSS JOIN global_stats g
+        )
+        SELECT *
+        FROM scored
+        WHERE ABS(z_score) > ?
+        ORDER BY ABS(z_score) DESC, census_blockid
+    """, db_path, params=[winner, loser, threshold_std])
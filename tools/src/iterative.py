@@ -0,0 +1,270 @@
+"""
+Iterative DMA-level suppression: detect, suppress, re-detect until stable.
+
+Rows are the pair-DMA-days of the rolling view ({ds}_win_{mover}_rolling,
+see scripts/rebuild_rolling_views.py): each is judged against the earlier
+same-DOW rows of its series (winner, loser, dma, day_of_week). Suppressing a
+row takes it out of its series, so the baselines of the rows after it
+change and outliers it was masking can surface in the next round.
+
+Only round 1 is a full pass (one read of the rolling view). A suppressed
+row only enters the frames of the next CONTEXT_ROWS rows of its own series,
+so every later round re-examines just those rows: their series are
+recomputed in memory with the shared kernel (tools.src.rolling) and only
+they are re-flagged. Each round's suppressions are appended to one log
+(and, with round_name, to one saved round, see tools.src.rounds); rounds
+stop when nothing new is flagged.
+
+Appearance ranks (first-appearance flags) stay those of the original data:
+a suppressed row still counts as the pair having shown up.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools import db
+from tools.src import rounds
+from tools.src.rolling import TIERED_WINDOWS, min_periods_for, rolling_stats, select_tier
+
+
+# Series the rolling view's windows run over
+SERIES_KEYS = ['winner', 'loser', 'dma', 'day_of_week']
+
+# ROWS frames per tier, as in the rolling view (N-day tier = N - 1 preceding rows)
+ROLLING_WINDOWS = {w: w - 1 for w in TIERED_WINDOWS}
+
+# Rows after a suppressed row whose frames held it
+CONTEXT_ROWS = max(ROLLING_WINDOWS.values())
+
+ROW_COLUMNS = [
+    'the_date', 'day_of_week', 'winner', 'loser', 'dma', 'dma_name', 'state', 'total_wins',
+    'avg_wins', 'stddev_wins', 'n_periods', 'zscore', 'pct_change', 'is_first_appearance',
+]
+
+LOG_COLUMNS = ['round'] + ROW_COLUMNS + ['impact', 'reason']
+
+
+def load_rolling_rows(
+    ds: str,
+    mover_ind: bool,
+    end_date: str,
+    db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Rolling view rows up to end_date (the whole history: earlier rows are
+    the frames of the analysis window).
+
+    Returns:
+        DataFrame with ROW_COLUMNS, sorted by series then date
+    """
+    view = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_rolling"
+    rows = db.query(f"""
+        SELECT {', '.join(ROW_COLUMNS)}
+        FROM {view}
+        WHERE the_date <= DATE '{end_date}'
+        ORDER BY {', '.join(SERIES_KEYS)}, the_date
+    """, db_path)
+    return rows.reset_index(drop=True)
+
+
+def series_stats(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    The rolling view's tiered baseline for rows (whole series), in memory.
+
+    Returns:
+        DataFrame aligned to rows.index with avg_wins, stddev_wins,
+        n_periods, zscore and pct_change (NULL rules as in the view)
+    """
+    stats = rolling_stats(rows, SERIES_KEYS, 'the_date', 'total_wins', ROLLING_WINDOWS)
+    tier = select_tier(stats, min_periods_for(rows['day_of_week']))
+    x = rows['total_wins'].to_numpy(dtype=np.float64)
+    mu, sigma = tier['mu'].to_numpy(), tier['sigma'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zscore = np.where(np.isnan(sigma) | (sigma == 0), np.nan, (x - mu) / sigma)
+        pct_change = np.where(np.isnan(mu) | (mu == 0), np.nan, (x - mu) / mu * 100)
+    return pd.DataFrame({
+        'avg_wins': mu,
+        'stddev_wins': sigma,
+        'n_periods': tier['n_periods'].to_numpy(),
+        'zscore': zscore,
+        'pct_change': pct_change,
+    }, index=rows.index)
+
+
+def outlier_reason(
+    rows: pd.DataFrame,
+    z_threshold: float = 1.5,
+    pct_threshold: float = 30.0,
+    min_wins: float = 10
+) -> pd.Series:
+    """
+    Why each row is an outlier ('first_appearance', 'zscore', 'pct_change'),
+    None if it is not (rows need at least min_wins).
+    """
+    big = rows['total_wins'] >= min_wins
+    reason = pd.Series(None, index=rows.index, dtype=object)
+    # Later rules take precedence: first_appearance, then zscore, then pct_change
+    for name, hit in (
+        ('pct_change', rows['pct_change'] > pct_threshold),
+        ('zscore', rows['zscore'] > z_threshold),
+        ('first_appearance', rows['is_first_appearance'].fillna(False).astype(bool)),
+    ):
+        reason[big & hit] = name
+    return reason
+
+
+def frames_touched(rows: pd.DataFrame, series: np.ndarray, suppressed: np.ndarray) -> np.ndarray:
+    """
+    Rows whose frames held a row of `suppressed`.
+
+    Args:
+        rows: Rows still in their series when the round started (suppressed included)
+        series: Series code per row
+        suppressed: Rows suppressed this round
+
+    Returns:
+        Boolean mask over rows (suppressed rows themselves excluded)
+    """
+    frame = pd.DataFrame({'series': series, 'the_date': rows['the_date'].to_numpy(),
+                          'hit': suppressed.astype(np.float64)}, index=rows.index)
+    held = rolling_stats(frame, ['series'], 'the_date', 'hit', {CONTEXT_ROWS: CONTEXT_ROWS},
+                         names=('hit_avg', 'hit_std', 'hit_n'))
+    return (held['hit_avg'].to_numpy() > 0) & ~suppressed
+
+
+def iter_suppression_rounds(
+    ds: str,
+    mover_ind: bool,
+    start_date: str,
+    end_date: str,
+    max_rounds: int = 10,
+    z_threshold: float = 1.5,
+    pct_threshold: float = 30.0,
+    min_wins: float = 10,
+    db_path: Optional[str] = None,
+    round_name: Optional[str] = None,
+    incremental: bool = True
+) -> Iterator[Dict]:
+    """
+    Run suppression rounds until nothing new is flagged (or max_rounds).
+
+    Every flagged row in [start_date, end_date] is suppressed (taken out of
+    its series). Round 1 flags from the rolling view; later rounds recompute
+    and re-flag only the rows whose frames held a row suppressed in the
+    round before.
+
+    Args:
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        start_date: First date that can be suppressed (YYYY-MM-DD)
+        end_date: Last date (YYYY-MM-DD)
+        max_rounds: Stop after this many rounds
+        z_threshold: Flag rows with zscore above this
+        pct_threshold: Flag rows with pct_change (percent) above this
+        min_wins: Only flag rows with at least this many wins
+        db_path: Path to database
+        round_name: Also append each round's rows to this saved round
+            (replaced when round 1 is written)
+        incremental: False recomputes and re-flags every row each round
+            (same result, for checking and benchmarks)
+
+    Yields:
+        Dict per round that suppressed something: round, suppressed
+        (DataFrame with LOG_COLUMNS) and rechecked (rows whose baselines
+        were recomputed, i.e. the candidates of the next round)
+    """
+    rows = load_rolling_rows(ds, mover_ind, end_date, db_path)
+    series = rows.groupby(SERIES_KEYS, sort=False, dropna=False).ngroup().to_numpy()
+    dates = pd.to_datetime(rows['the_date'])
+    in_window = ((dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))).to_numpy()
+    remaining = np.ones(len(rows), dtype=bool)
+    candidates = in_window.copy()
+
+    for round_num in range(1, max_rounds + 1):
+        reason = outlier_reason(rows[candidates], z_threshold, pct_threshold, min_wins)
+        flagged = reason.index[reason.notna()]
+        if len(flagged) == 0:
+            return
+
+        suppressed = rows.loc[flagged].assign(
+            round=round_num,
+            impact=lambda d: d['total_wins'] - d['avg_wins'].where(d['avg_wins'] > 0, 0),
+            reason=reason.loc[flagged]
+        )[LOG_COLUMNS].reset_index(drop=True)
+        if round_name is not None:
+            _save_round(suppressed, round_name, ds, mover_ind, db_path, first=round_num == 1)
+
+        new = np.zeros(len(rows), dtype=bool)
+        new[flagged] = True
+        if incremental:
+            # Series that lost a row; rows outside them keep their baselines
+            touched = np.isin(series, np.unique(series[new])) & remaining
+            before = np.flatnonzero(touched)
+            hit = frames_touched(rows.iloc[before], series[before], new[before])
+            recheck = np.zeros(len(rows), dtype=bool)
+            recheck[before[hit]] = True
+            recompute = touched & ~new
+        else:
+            recompute = remaining & ~new
+            recheck = recompute.copy()
+        remaining &= ~new
+
+        stats = series_stats(rows[recompute])
+        keep = recheck[recompute]
+        rows.loc[stats.index[keep], stats.columns] = stats[keep].to_numpy()
+        candidates = recheck & in_window
+
+        yield {'round': round_num, 'suppressed': suppressed, 'rechecked': int(recheck.sum())}
+
+
+def _save_round(suppressed: pd.DataFrame, round_name: str, ds: str, mover_ind: bool,
+                db_path: Optional[str], first: bool) -> None:
+    """Append a round's rows to the saved round (as plan rows removing all their wins)"""
+    plan = pd.DataFrame({
+        'date': suppressed['the_date'],
+        'winner': suppressed['winner'],
+        'loser': suppressed['loser'],
+        'dma_name': suppressed['dma_name'],
+        'state': suppressed['state'],
+        'mover_ind': mover_ind,
+        'remove_units': np.ceil(suppressed['total_wins']),
+        'stage': 'iteration_' + suppressed['round'].astype(str),
+        'reason': suppressed['reason'],
+        'impact': suppressed['impact'].round(),
+        'pair_wins_current': suppressed['total_wins'],
+        'pair_mu_wins': suppressed['avg_wins'],
+        'pair_sigma_wins': suppressed['stddev_wins'],
+        'pair_z': suppressed['zscore'],
+        'pair_pct_change': suppressed['pct_change'],
+    })
+    rounds.save_round(plan, round_name, ds=ds, db_path=db_path, overwrite=first, append=not first)
+
+
+def run_iterative_suppression(
+    ds: str,
+    mover_ind: bool,
+    start_date: str,
+    end_date: str,
+    **kwargs
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    All rounds of iter_suppression_rounds() (same keyword arguments).
+
+    Returns:
+        (log, summary): every suppressed row with its round (LOG_COLUMNS),
+        and one row per round with round, suppressed, removed_wins, rechecked
+    """
+    logs, summary = [], []
+    for result in iter_suppression_rounds(ds, mover_ind, start_date, end_date, **kwargs):
+        logs.append(result['suppressed'])
+        summary.append({
+            'round': result['round'],
+            'suppressed': len(result['suppressed']),
+            'removed_wins': float(result['suppressed']['total_wins'].sum()),
+            'rechecked': result['rechecked'],
+        })
+    log = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame(columns=LOG_COLUMNS)
+    return log, pd.DataFrame(summary, columns=['round', 'suppressed', 'removed_wins', 'rechecked'])
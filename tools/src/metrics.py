@@ -49,18 +49,25 @@ def national_timeseries(
     Get national daily timeseries from cube table.
     
     Returns win_share, loss_share, wins_per_loss for each carrier per day.
-    Uses cube tables - much faster than parquet scanning!
+    Uses cube tables - much faster than parquet scanning! Reads the national
+    or state rollups when the filters allow (see db.cube_source).
     """
     # Normalize mover_ind
     if isinstance(mover_ind, str):
         mover_ind = (mover_ind == 'True')
     
-    mover_str = "mover" if mover_ind else "non_mover"
-    cube_table = f"{ds}_win_{mover_str}_cube"
-    
     # Build filter clauses
     extra_filters = _build_extra_filters(state, dma_name)
-    where_extra = f"AND {extra_filters}" if extra_filters else ""
+    where_extra = extra_filters  # already starts with " AND " (or is empty)
+    
+    # Smallest rollup keeping the filtered columns (base cube for a DMA filter)
+    columns = ["the_date", "winner"]
+    if _build_extra_filters(state, None):
+        columns.append("state")
+    if _build_extra_filters(None, dma_name):
+        columns.append("dma_name")
+    win_table = db.cube_source(ds, "win", mover_ind, columns, db_path)
+    loss_table = db.cube_source(ds, "loss", mover_ind, columns, db_path)
     
     sql = f"""
     WITH daily_totals AS (
@@ -68,7 +75,7 @@ def national_timeseries(
             the_date,
             winner,
             SUM(total_wins) as carrier_wins
-        FROM {cube_table}
+        FROM {win_table}
         WHERE the_date BETWEEN DATE '{start_date}' AND DATE '{end_date}'
         {where_extra}
         GROUP BY the_date, winner
@@ -85,7 +92,7 @@ def national_timeseries(
             the_date,
             winner,
             SUM(total_losses) as carrier_losses
-        FROM {ds}_loss_{mover_str}_cube
+        FROM {loss_table}
         WHERE the_date BETWEEN DATE '{start_date}' AND DATE '{end_date}'
         {where_extra}
         GROUP BY the_date, winner
@@ -115,20 +122,16 @@ def national_timeseries(
     return db.query(sql, db_path)
 
 
-def pair_metrics(
+def _pair_metrics_sql(
     ds: str,
     mover_ind: bool | str,
     start_date: str,
     end_date: str,
     state: str | None = None,
     dma_name: str | None = None,
-    db_path: Optional[str] = None
-) -> pd.DataFrame:
-    """
-    Get pair-level (winner-loser-DMA) daily metrics from cube table.
-    
-    Uses cube tables - much faster than parquet scanning!
-    """
+    winners: Iterable[str] | None = None
+) -> str:
+    """SQL shared by pair_metrics and iter_pair_metrics (ordered by the_date)"""
     # Normalize mover_ind
     if isinstance(mover_ind, str):
         mover_ind = (mover_ind == 'True')
@@ -138,9 +141,13 @@ def pair_metrics(
     
     # Build filter clauses
     extra_filters = _build_extra_filters(state, dma_name)
-    where_extra = f"AND {extra_filters}" if extra_filters else ""
+    where_extra = extra_filters  # already starts with " AND " (or is empty)
+    if winners is not None:
+        escaped_winners = [str(w).replace("'", "''") for w in winners]
+        winner_list = ','.join([f"'{w}'" for w in escaped_winners])
+        where_extra += f" AND winner IN ({winner_list})" if winner_list else " AND FALSE"
     
-    sql = f"""
+    return f"""
     SELECT 
         the_date,
         winner,
@@ -160,10 +167,122 @@ def pair_metrics(
       {where_extra}
     ORDER BY the_date, winner, loser, dma_name
     """
+
+
+def pair_metrics(
+    ds: str,
+    mover_ind: bool | str,
+    start_date: str,
+    end_date: str,
+    state: str | None = None,
+    dma_name: str | None = None,
+    db_path: Optional[str] = None,
+    as_arrow: bool = False
+):
+    """
+    Get pair-level (winner-loser-DMA) daily metrics from cube table.
     
+    Uses cube tables - much faster than parquet scanning! as_arrow=True
+    returns a pyarrow Table with dictionary-encoded strings instead of a
+    DataFrame (see db.query_arrow) for long windows; iter_pair_metrics
+    streams the same rows when even that is too big.
+    """
+    sql = _pair_metrics_sql(ds, mover_ind, start_date, end_date, state, dma_name)
+    
+    if as_arrow:
+        return db.query_arrow(sql, db_path)
     return db.query(sql, db_path)
 
 
+def iter_pair_metrics(
+    ds: str,
+    mover_ind: bool | str,
+    start_date: str,
+    end_date: str,
+    state: str | None = None,
+    dma_name: str | None = None,
+    db_path: Optional[str] = None,
+    by_date: bool = False,
+    batch_size: int = db.STREAM_BATCH_ROWS,
+    winners: Iterable[str] | None = None
+):
+    """
+    Stream pair_metrics rows instead of materializing the whole window.
+    
+    Yields pyarrow RecordBatches of up to batch_size rows, or with
+    by_date=True one (the_date, pyarrow.Table) per day, in date order,
+    optionally only for `winners`. Memory stays bounded by one batch (or
+    one day), so quarter-long non-mover pulls can be aggregated
+    incrementally. The stream holds a pooled connection until it is
+    exhausted or closed (see db.iter_batches):
+    
+        with iter_pair_metrics('gamoshi', False, start, end, by_date=True) as days:
+            for the_date, day in days:
+                frame = db.arrow_to_pandas(day)
+                ...
+    """
+    sql = _pair_metrics_sql(ds, mover_ind, start_date, end_date, state, dma_name, winners)
+    batches = db.iter_batches(sql, db_path, batch_size=batch_size)
+    return db.iter_date_chunks(batches) if by_date else batches
+
+
+def pair_eligibility(
+    ds: str,
+    mover_ind: bool | str,
+    start_date: str,
+    end_date: str,
+    thresholds: Iterable[int] = (5, 10, 15, 20, 25),
+    winners: Iterable[str] | None = None,
+    state: str | None = None,
+    dma_name: str | None = None,
+    db_path: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    How much of each winner's day could be distributed across its pairs.
+    
+    For every (the_date, winner) and min_wins threshold, counts the
+    pair-level rows (winner-loser-DMA) with at least min_wins wins and sums
+    their wins. Aggregated day by day over iter_pair_metrics(by_date=True),
+    so a quarter of non-mover pairs never has to fit in memory.
+    
+    Returns:
+        DataFrame with the_date, winner, total_wins, min_wins,
+        eligible_pairs and eligible_wins, ordered by the_date, winner, min_wins
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    thresholds = sorted(int(t) for t in thresholds)
+    winners = sorted(set(winners)) if winners is not None else None
+    parts = []
+    with iter_pair_metrics(ds, mover_ind, start_date, end_date, state, dma_name,
+                           db_path=db_path, by_date=True, winners=winners) as days:
+        for _, day in days:
+            wins = day['pair_wins_current']
+            columns = {'the_date': day['the_date'], 'winner': day['winner'], 'total_wins': wins}
+            for t in thresholds:
+                eligible = pc.greater_equal(wins, t)
+                columns[f'pairs_{t}'] = pc.cast(eligible, pa.int64())
+                columns[f'wins_{t}'] = pc.if_else(eligible, wins, 0)
+            parts.append(pa.table(columns).group_by(['the_date', 'winner']).aggregate(
+                [(name, 'sum') for name in columns if name not in ('the_date', 'winner')]
+            ))
+    
+    out_columns = ['the_date', 'winner', 'total_wins', 'min_wins', 'eligible_pairs', 'eligible_wins']
+    if not parts:
+        return pd.DataFrame(columns=out_columns)
+    daily = db.arrow_to_pandas(pa.concat_tables(parts))
+    daily.columns = [c.removesuffix('_sum') for c in daily.columns]
+    frames = [
+        daily[['the_date', 'winner', 'total_wins']].assign(
+            min_wins=t, eligible_pairs=daily[f'pairs_{t}'], eligible_wins=daily[f'wins_{t}']
+        )
+        for t in thresholds
+    ]
+    out = pd.concat(frames, ignore_index=True)
+    return out.sort_values(['the_date', 'winner', 'min_wins']).reset_index(drop=True)[out_columns]
+
+
 def competitor_view(
     ds: str,
     mover_ind: bool | str,
@@ -198,7 +317,7 @@ def competitor_view(
     
     # Build filter clauses
     extra_filters = _build_extra_filters(state, dma_name)
-    where_extra = f"AND {extra_filters}" if extra_filters else ""
+    where_extra = extra_filters  # already starts with " AND " (or is empty)
     
     sql = f"""
     WITH h2h_wins AS (
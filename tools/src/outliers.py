@@ -1,7 +1,8 @@
 """Shared outlier helpers - Database/Cube based.
 
 National outlier days and pair outlier detection via cube tables.
-Much faster than parquet scanning!
+Much faster than parquet scanning! lookback_outliers() scores a daily share
+frame in memory for the legacy parquet dashboard.
 """
 from __future__ import annotations
 
@@ -201,3 +202,99 @@ def cube_outliers(
     })
     
     return result
+
+
+LOOKBACK_ENGINES = ('rolling', 'loop')
+LOOKBACK_COLUMNS = ['the_date', 'winner', 'share', 'mu', 'sigma', 'z']
+
+
+def _lookback_outliers_loop(df: pd.DataFrame, lookback_days: int, same_dow: bool, z_thresh: float) -> pd.DataFrame:
+    """Reference engine: re-slice each winner's history per date (O(winners x dates x history))"""
+    out_rows = []
+    for winner in sorted(set(df['winner'])):
+        wdf = df[df['winner']==winner].copy()
+        for d in sorted(set(wdf['d'])):
+            end = pd.Timestamp(d)
+            start = end - pd.Timedelta(days=int(lookback_days))
+            base = wdf[(wdf['d']>=start) & (wdf['d']<end)].copy()
+            if same_dow:
+                base = base[pd.to_datetime(base['d']).dt.dayofweek == end.dayofweek]
+            mu = base['share'].mean() if not base.empty else 0.0
+            sigma = base['share'].std(ddof=1) if len(base)>=3 else 0.0
+            s = float(wdf[wdf['d']==d]['share'].iloc[0])
+            z = (s - mu) / sigma if sigma and sigma>0 else float('nan')
+            if not pd.isna(z) and z >= z_thresh:
+                out_rows.append({'the_date': pd.to_datetime(d), 'winner': winner, 'share': s, 'mu': mu, 'sigma': sigma, 'z': z})
+    if not out_rows:
+        return pd.DataFrame(columns=LOOKBACK_COLUMNS)
+    return pd.DataFrame(out_rows).sort_values(['the_date','winner'])
+
+
+def _lookback_outliers_rolling(df: pd.DataFrame, lookback_days: int, same_dow: bool, z_thresh: float) -> pd.DataFrame:
+    """Vectorized engine: one grouped, time-based rolling pass over [d - lookback, d)"""
+    df = df[['d', 'winner', 'share']].copy()
+    df['d'] = pd.to_datetime(df['d'])
+    df['one'] = 1.0
+    keys = ['winner']
+    if same_dow:
+        df['dow'] = df['d'].dt.dayofweek
+        keys.append('dow')
+    # Groups contiguous and date-ordered, so the rolling output lines up by position
+    df = df.sort_values(keys + ['d'], kind='stable').reset_index(drop=True)
+
+    # closed='left' keeps [d - lookback, d): history only, never the day itself
+    window = df.groupby(keys, sort=False).rolling(f"{int(lookback_days)}D", on='d', closed='left')
+    stats = pd.DataFrame({
+        'n': window['one'].sum().to_numpy(),
+        'mean': window['share'].mean().to_numpy(),
+        'std': window['share'].std(ddof=1).to_numpy(),
+    })
+
+    n = stats['n'].fillna(0)
+    mu = stats['mean'].where(n > 0, 0.0)
+    sigma = stats['std'].where(n >= 3, 0.0)
+    z = (df['share'] - mu) / sigma.where(sigma > 0)
+    hit = z >= z_thresh
+    if not hit.any():
+        return pd.DataFrame(columns=LOOKBACK_COLUMNS)
+    out = pd.DataFrame({
+        'the_date': df['d'].astype('datetime64[ns]'), 'winner': df['winner'], 'share': df['share'].astype(float),
+        'mu': mu, 'sigma': sigma, 'z': z,
+    })[hit].sort_values(['winner', 'the_date'], kind='stable').reset_index(drop=True)
+    return out.sort_values(['the_date', 'winner'])
+
+
+def lookback_outliers(
+    daily: pd.DataFrame,
+    lookback_days: int,
+    same_dow: bool,
+    z_thresh: float,
+    engine: str = 'rolling'
+) -> pd.DataFrame:
+    """
+    Flag winner-days whose share sits z_thresh sigmas above a calendar lookback.
+    
+    The baseline for (winner, d) is that winner's shares on the dates in
+    [d - lookback_days, d), restricted to d's weekday when same_dow. mu is
+    0 for an empty baseline and sigma is 0 below 3 baseline days (never
+    flagged). Used by the legacy parquet dashboard.
+    
+    Args:
+        daily: One row per (d, winner) with columns d, winner, share
+        lookback_days: Calendar days of history before each date
+        same_dow: Only compare against the same day of week
+        z_thresh: Minimum z-score to flag
+        engine: 'rolling' (grouped time-based rolling, default) or 'loop'
+            (per-winner, per-date re-slicing; reference implementation)
+        
+    Returns:
+        DataFrame with the_date, winner, share, mu, sigma, z sorted by
+        the_date, winner
+    """
+    if engine not in LOOKBACK_ENGINES:
+        raise ValueError(f"Unknown lookback engine: {engine!r} (expected one of {LOOKBACK_ENGINES})")
+    if daily is None or daily.empty or int(lookback_days) <= 0:
+        return pd.DataFrame(columns=LOOKBACK_COLUMNS)
+    if engine == 'loop':
+        return _lookback_outliers_loop(daily, lookback_days, same_dow, z_thresh)
+    return _lookback_outliers_rolling(daily, lookback_days, same_dow, z_thresh)
@@ -1,10 +1,24 @@
 """Plan building and outlier detection using database cubes."""
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import pandas as pd
 import os
+import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 import tools.db as db
+from tools.src.rolling import TIERED_WINDOWS, min_periods_sql, rolling_stats_sql, tier_sql
+
+
+METRICS = ('win', 'loss')
+
+
+def _metric_col(metric: str) -> str:
+    """Cube measure for a metric: total_wins or total_losses"""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric!r} (expected one of {METRICS})")
+    return 'total_wins' if metric == 'win' else 'total_losses'
 
 
 def get_top_n_carriers(
@@ -12,7 +26,8 @@ def get_top_n_carriers(
     mover_ind: bool, 
     n: int = 50,
     min_share_pct: float = 0.0,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    metric: str = 'win'
 ) -> List[str]:
     """Get top N carriers by total wins over entire time series.
     
@@ -22,6 +37,7 @@ def get_top_n_carriers(
         n: Number of top carriers to return
         min_share_pct: Minimum overall share % (0.0 = no filter)
         db_path: Path to database (uses default if None)
+        metric: 'win' (default) or 'loss' to rank by total losses
         
     Returns:
         List of carrier names
@@ -33,7 +49,8 @@ def get_top_n_carriers(
     assert db_path.endswith('data/databases/duck_suppression.db'), \
         f"ERROR: Wrong database path: {db_path}. Must use data/databases/duck_suppression.db"
     
-    cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
+    total_col = _metric_col(metric)
+    cube_table = db.cube_source(ds, metric, mover_ind, ['winner'], db_path)
     
     # Apply share filter if specified
     if min_share_pct > 0:
@@ -41,7 +58,7 @@ def get_top_n_carriers(
             WITH total_wins AS (
                 SELECT 
                     winner,
-                    SUM(total_wins) as total
+                    SUM({total_col}) as total
                 FROM {cube_table}
                 GROUP BY winner
             ),
@@ -65,7 +82,7 @@ def get_top_n_carriers(
         """
     else:
         sql = f"""
-            SELECT winner, SUM(total_wins) as total
+            SELECT winner, SUM({total_col}) as total
             FROM {cube_table}
             GROUP BY winner
             ORDER BY total DESC
@@ -81,7 +98,8 @@ def base_national_series(
     winners: List[str],
     start_date: str,
     end_date: str,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    metric: str = 'win'
 ) -> pd.DataFrame:
     """Get national win share time series from database cubes.
     
@@ -92,6 +110,8 @@ def base_national_series(
         start_date: Start date (YYYY-MM-DD)
         end_date: End date (YYYY-MM-DD)
         db_path: Path to database
+        metric: 'win' (default) or 'loss'; column names stay the same so
+            callers can treat both alike (total_wins holds losses)
         
     Returns:
         DataFrame with columns: the_date, winner, total_wins, market_total, win_share
@@ -103,7 +123,8 @@ def base_national_series(
     assert db_path.endswith('data/databases/duck_suppression.db'), \
         f"ERROR: Wrong database path: {db_path}. Must use data/databases/duck_suppression.db"
     
-    cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
+    total_col = _metric_col(metric)
+    cube_table = db.cube_source(ds, metric, mover_ind, ['the_date', 'winner'], db_path)
     
     # Build winner filter
     winners_str = ','.join([f"'{w}'" for w in winners]) if winners else "''"
@@ -113,7 +134,7 @@ def base_national_series(
             SELECT 
                 the_date,
                 winner,
-                SUM(total_wins) as total_wins
+                SUM({total_col}) as total_wins
             FROM {cube_table}
             WHERE the_date BETWEEN '{start_date}' AND '{end_date}'
                 AND winner IN ({winners_str})
@@ -139,6 +160,90 @@ def base_national_series(
     return db.query(sql, db_path)
 
 
+SCAN_ENGINES = ('window', 'self_join')
+
+
+def _tiered_rolling_sql(engine: str = 'window') -> str:
+    """Render the `with_rolling` CTE(s) for scan_base_outliers.
+
+    Both engines read `national_daily` (the_date, dow, winner, nat_total_wins,
+    nat_market_wins) and emit avg/std/n for every tier in TIERED_WINDOWS over
+    prior same-DOW days within the lookback.
+
+    - 'window': RANGE frames over a per-DOW week sequence, one pass
+    - 'self_join': legacy LEFT JOIN of national_daily to itself (quadratic)
+    """
+    if engine == 'window':
+        # Rows in one (winner, dow) partition are whole weeks apart, so a
+        # d-day lookback is exactly the previous d // 7 same-DOW weeks
+        # (none for a sub-week tier).
+        metrics = rolling_stats_sql(
+            "nat_total_wins",
+            ["winner", "dow"],
+            "dow_seq",
+            {d: d // 7 for d in TIERED_WINDOWS},
+            frame="range",
+        )
+        return f"""
+        -- Windowed approach: per-DOW week sequence + RANGE frames (one pass)
+        with_seq AS (
+            SELECT
+                *,
+                DATEDIFF('day', DATE '1970-01-01', the_date) // 7 as dow_seq
+            FROM national_daily
+        ),
+        with_rolling AS (
+            SELECT
+                the_date,
+                dow,
+                winner,
+                nat_total_wins,
+                nat_market_wins,
+            {metrics}
+            FROM with_seq
+        ),"""
+
+    if engine == 'self_join':
+        metrics = ",\n".join(
+            f"""
+                AVG(CASE WHEN days_back <= {d} THEN hist_wins END) as avg_{d}d,
+                STDDEV(CASE WHEN days_back <= {d} THEN hist_wins END) as std_{d}d,
+                COUNT(CASE WHEN days_back <= {d} THEN 1 END) as n_{d}d"""
+            for d in TIERED_WINDOWS
+        )
+        return f"""
+        -- Self-join approach for DOW-partitioned rolling windows
+        with_history AS (
+            SELECT
+                curr.the_date,
+                curr.dow,
+                curr.winner,
+                curr.nat_total_wins,
+                curr.nat_market_wins,
+                hist.the_date as hist_date,
+                hist.nat_total_wins as hist_wins,
+                DATEDIFF('day', hist.the_date, curr.the_date) as days_back
+            FROM national_daily curr
+            LEFT JOIN national_daily hist
+                ON curr.winner = hist.winner
+                AND curr.dow = hist.dow
+                AND hist.the_date < curr.the_date
+        ),
+        -- Calculate 28d, 14d, and 4d rolling metrics
+        with_rolling AS (
+            SELECT
+                the_date,
+                dow,
+                winner,
+                nat_total_wins,
+                nat_market_wins,{metrics}
+            FROM with_history
+            GROUP BY the_date, dow, winner, nat_total_wins, nat_market_wins
+        ),"""
+
+    raise ValueError(f"Unknown scan engine: {engine!r} (expected one of {SCAN_ENGINES})")
+
+
 def scan_base_outliers(
     ds: str,
     mover_ind: bool,
@@ -148,7 +253,9 @@ def scan_base_outliers(
     top_n: int = 50,
     min_share_pct: float = 0.0,
     egregious_threshold: int = 40,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    engine: str = 'window',
+    metric: str = 'win'
 ) -> pd.DataFrame:
     """Scan for national-level outliers using tiered rolling windows.
     
@@ -170,6 +277,10 @@ def scan_base_outliers(
         min_share_pct: Minimum overall share % (0.0 = no filter)
         egregious_threshold: Impact threshold for non-top-N carriers
         db_path: Path to database
+        engine: 'window' (RANGE-framed window functions, default) or
+            'self_join' (legacy quadratic self-join, kept for benchmarking)
+        metric: 'win' (default) or 'loss' to scan national losses; output
+            columns keep their *_wins names
         
     Returns:
         DataFrame with columns: the_date, winner, nat_z_score, impact, selected_window
@@ -181,11 +292,24 @@ def scan_base_outliers(
     assert db_path.endswith('data/databases/duck_suppression.db'), \
         f"ERROR: Wrong database path: {db_path}. Must use data/databases/duck_suppression.db"
     
+    total_col = _metric_col(metric)
+    rolling_sql = _tiered_rolling_sql(engine)
+    min_periods = min_periods_sql("dow")
+    
+    # The window engine never looks further back than the widest tier, so only
+    # that much history ahead of the graph window has to be aggregated
+    history_filter = ""
+    if engine == 'window':
+        history_filter = (
+            f"WHERE the_date BETWEEN DATE '{start_date}' - {max(TIERED_WINDOWS)} "
+            f"AND DATE '{end_date}'"
+        )
+    
     # Get top N carriers (with optional share filter)
-    top_carriers = get_top_n_carriers(ds, mover_ind, top_n, min_share_pct, db_path)
+    top_carriers = get_top_n_carriers(ds, mover_ind, top_n, min_share_pct, db_path, metric)
     top_carriers_str = ','.join([f"'{c}'" for c in top_carriers])
     
-    cube_table = f"{ds}_win_{'mover' if mover_ind else 'non_mover'}_cube"
+    cube_table = db.cube_source(ds, metric, mover_ind, ['the_date', 'winner'], db_path)
     
     # National aggregation with tiered rolling windows
     # Key insight: Calculate rolling metrics over ENTIRE series, then filter to window at the end
@@ -193,57 +317,17 @@ def scan_base_outliers(
         WITH national_daily AS (
             SELECT 
                 the_date,
-                DAYOFWEEK(the_date) as dow,  -- 1=Sunday, 7=Saturday
+                DAYOFWEEK(the_date) as dow,  -- 0=Sunday, 6=Saturday
                 winner,
-                SUM(total_wins) as nat_total_wins,
-                SUM(SUM(total_wins)) OVER (PARTITION BY the_date) as nat_market_wins
+                SUM({total_col}) as nat_total_wins,
+                SUM(SUM({total_col})) OVER (PARTITION BY the_date) as nat_market_wins
             FROM {cube_table}
+            {history_filter}
             GROUP BY the_date, winner
         ),
-        -- Self-join approach for DOW-partitioned rolling windows
-        with_history AS (
-            SELECT 
-                curr.the_date,
-                curr.dow,
-                curr.winner,
-                curr.nat_total_wins,
-                curr.nat_market_wins,
-                hist.the_date as hist_date,
-                hist.nat_total_wins as hist_wins,
-                DATEDIFF('day', hist.the_date, curr.the_date) as days_back
-            FROM national_daily curr
-            LEFT JOIN national_daily hist
-                ON curr.winner = hist.winner
-                AND curr.dow = hist.dow
-                AND hist.the_date < curr.the_date
-        ),
-        -- Calculate 28d, 14d, and 4d rolling metrics
-        with_rolling AS (
-            SELECT 
-                the_date,
-                dow,
-                winner,
-                nat_total_wins,
-                nat_market_wins,
-                
-                -- 28-day window metrics
-                AVG(CASE WHEN days_back <= 28 THEN hist_wins END) as avg_28d,
-                STDDEV(CASE WHEN days_back <= 28 THEN hist_wins END) as std_28d,
-                COUNT(CASE WHEN days_back <= 28 THEN 1 END) as n_28d,
-                
-                -- 14-day window metrics
-                AVG(CASE WHEN days_back <= 14 THEN hist_wins END) as avg_14d,
-                STDDEV(CASE WHEN days_back <= 14 THEN hist_wins END) as std_14d,
-                COUNT(CASE WHEN days_back <= 14 THEN 1 END) as n_14d,
-                
-                -- 4-day window metrics
-                AVG(CASE WHEN days_back <= 4 THEN hist_wins END) as avg_4d,
-                STDDEV(CASE WHEN days_back <= 4 THEN hist_wins END) as std_4d,
-                COUNT(CASE WHEN days_back <= 4 THEN 1 END) as n_4d
-            FROM with_history
-            GROUP BY the_date, dow, winner, nat_total_wins, nat_market_wins
-        ),
-        -- Tiered selection: Choose best available window based on DOW and sample count
+        {rolling_sql}
+        -- Tiered selection: widest window with enough same-DOW samples
+        -- (weekday needs 4+, weekend 2+; see tools.src.rolling)
         tiered_metrics AS (
             SELECT 
                 the_date,
@@ -251,46 +335,10 @@ def scan_base_outliers(
                 winner,
                 nat_total_wins,
                 nat_market_wins,
-                -- Weekday needs 4+ samples, weekend needs 2+
-                CASE 
-                    -- Try 28d first
-                    WHEN dow IN (1, 7) AND n_28d >= 2 THEN avg_28d  -- Weekend
-                    WHEN dow NOT IN (1, 7) AND n_28d >= 4 THEN avg_28d  -- Weekday
-                    -- Fall back to 14d
-                    WHEN dow IN (1, 7) AND n_14d >= 2 THEN avg_14d
-                    WHEN dow NOT IN (1, 7) AND n_14d >= 4 THEN avg_14d
-                    -- Fall back to 4d
-                    WHEN dow IN (1, 7) AND n_4d >= 2 THEN avg_4d
-                    WHEN dow NOT IN (1, 7) AND n_4d >= 4 THEN avg_4d
-                    ELSE NULL
-                END as nat_mu_wins,
-                CASE 
-                    WHEN dow IN (1, 7) AND n_28d >= 2 THEN std_28d
-                    WHEN dow NOT IN (1, 7) AND n_28d >= 4 THEN std_28d
-                    WHEN dow IN (1, 7) AND n_14d >= 2 THEN std_14d
-                    WHEN dow NOT IN (1, 7) AND n_14d >= 4 THEN std_14d
-                    WHEN dow IN (1, 7) AND n_4d >= 2 THEN std_4d
-                    WHEN dow NOT IN (1, 7) AND n_4d >= 4 THEN std_4d
-                    ELSE NULL
-                END as nat_sigma_wins,
-                CASE 
-                    WHEN dow IN (1, 7) AND n_28d >= 2 THEN n_28d
-                    WHEN dow NOT IN (1, 7) AND n_28d >= 4 THEN n_28d
-                    WHEN dow IN (1, 7) AND n_14d >= 2 THEN n_14d
-                    WHEN dow NOT IN (1, 7) AND n_14d >= 4 THEN n_14d
-                    WHEN dow IN (1, 7) AND n_4d >= 2 THEN n_4d
-                    WHEN dow NOT IN (1, 7) AND n_4d >= 4 THEN n_4d
-                    ELSE NULL
-                END as n_periods,
-                CASE 
-                    WHEN dow IN (1, 7) AND n_28d >= 2 THEN 28
-                    WHEN dow NOT IN (1, 7) AND n_28d >= 4 THEN 28
-                    WHEN dow IN (1, 7) AND n_14d >= 2 THEN 14
-                    WHEN dow NOT IN (1, 7) AND n_14d >= 4 THEN 14
-                    WHEN dow IN (1, 7) AND n_4d >= 2 THEN 4
-                    WHEN dow NOT IN (1, 7) AND n_4d >= 4 THEN 4
-                    ELSE NULL
-                END as selected_window
+                {tier_sql('avg_{w}d', min_periods)} as nat_mu_wins,
+                {tier_sql('std_{w}d', min_periods)} as nat_sigma_wins,
+                {tier_sql('n_{w}d', min_periods)} as n_periods,
+                {tier_sql('{w}', min_periods)} as selected_window
             FROM with_rolling
         ),
         with_zscore AS (
@@ -344,6 +392,162 @@ def scan_base_outliers(
     return db.query(sql, db_path)
 
 
+# {ds}_{metric}_{mover}_cube; ds names may themselves contain underscores
+_CUBE_TABLE = re.compile(r'^(?P<ds>.+)_(?P<metric>win|loss)_(?P<mover>non_mover|mover)_cube$')
+
+
+def list_segments(
+    db_path: Optional[str] = None,
+    datasets: Optional[Iterable[str]] = None
+) -> List[Dict]:
+    """List the (ds, mover_ind, metric) segments that have a cube table.
+
+    Args:
+        db_path: Path to database
+        datasets: Only these datasets (default: every ds with a cube)
+
+    Returns:
+        List of {'ds', 'mover_ind', 'metric'} dicts ordered by ds, metric, mover
+    """
+    wanted = set(datasets) if datasets is not None else None
+    segments = []
+    for table_name in db.list_cube_tables(db_path):
+        m = _CUBE_TABLE.match(table_name)
+        if m is None or (wanted is not None and m['ds'] not in wanted):
+            continue
+        segments.append({'ds': m['ds'], 'mover_ind': m['mover'] == 'mover', 'metric': m['metric']})
+    return sorted(segments, key=lambda s: (s['ds'], METRICS.index(s['metric']), s['mover_ind']))
+
+
+def _scan_segment(
+    segment: Dict,
+    start_date: str,
+    end_date: str,
+    z_threshold: float,
+    top_n: int,
+    min_share_pct: float,
+    egregious_threshold: int,
+    db_path: str
+) -> Dict:
+    """scan_base_outliers + top carriers + national series for one segment"""
+    result = dict(segment, top_carriers=[], outliers=pd.DataFrame(), series=pd.DataFrame(), error=None)
+    t0 = time.perf_counter()
+    try:
+        ds, mover_ind, metric = segment['ds'], segment['mover_ind'], segment['metric']
+        result['outliers'] = scan_base_outliers(
+            ds=ds,
+            mover_ind=mover_ind,
+            start_date=start_date,
+            end_date=end_date,
+            z_threshold=z_threshold,
+            top_n=top_n,
+            min_share_pct=min_share_pct,
+            egregious_threshold=egregious_threshold,
+            db_path=db_path,
+            metric=metric
+        )
+        # Served from the result cache: scan_base_outliers just ran it
+        result['top_carriers'] = get_top_n_carriers(ds, mover_ind, top_n, min_share_pct, db_path, metric)
+        result['series'] = base_national_series(
+            ds, mover_ind, result['top_carriers'], start_date, end_date, db_path, metric
+        )
+    except Exception as e:
+        # One missing or broken cube must not sink the rest of the sweep
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - t0
+    return result
+
+
+def scan_all_segments(
+    start_date: str,
+    end_date: str,
+    segments: Optional[List[Dict]] = None,
+    z_threshold: float = 2.5,
+    top_n: int = 50,
+    min_share_pct: float = 0.0,
+    egregious_threshold: int = 40,
+    db_path: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> Iterator[Dict]:
+    """Scan every (ds, mover, win/loss) segment concurrently.
+
+    Each segment's queries are independent reads, so they run on a thread
+    pool; every worker thread queries through its own pooled read-only
+    cursor (see db.pooled_connection). Results are yielded as segments
+    finish, not in input order, so a UI can render each one immediately.
+
+    Args:
+        start_date: Start date for graph window
+        end_date: End date for graph window
+        segments: {'ds', 'mover_ind', 'metric'} dicts (default: list_segments())
+        z_threshold, top_n, min_share_pct, egregious_threshold: As for
+            scan_base_outliers, applied to every segment
+        db_path: Path to database
+        max_workers: Worker threads (default: one per segment, up to the CPU count)
+
+    Yields:
+        Dict per segment: ds, mover_ind, metric, top_carriers, outliers
+        (scan_base_outliers output), series (base_national_series output),
+        seconds, and error (None, or the message if the segment failed)
+    """
+    if db_path is None:
+        db_path = db.get_default_db_path()
+
+    # Assert correct database path
+    assert db_path.endswith('data/databases/duck_suppression.db'), \
+        f"ERROR: Wrong database path: {db_path}. Must use data/databases/duck_suppression.db"
+
+    if segments is None:
+        segments = list_segments(db_path)
+    if not segments:
+        return
+    if max_workers is None:
+        max_workers = min(len(segments), os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_scan_segment, segment, start_date, end_date, z_threshold,
+                        top_n, min_share_pct, egregious_threshold, db_path)
+            for segment in segments
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def segment_summary(results: Iterable[Dict]) -> pd.DataFrame:
+    """One row per scan_all_segments() result, ordered by ds, metric, mover.
+
+    Returns:
+        DataFrame with columns: ds, mover_ind, metric, outliers, dates,
+        carriers, total_impact, max_z, seconds, error
+    """
+    rows = []
+    for r in results:
+        out = r['outliers']
+        rows.append({
+            'ds': r['ds'],
+            'mover_ind': r['mover_ind'],
+            'metric': r['metric'],
+            'outliers': len(out),
+            'dates': out['the_date'].nunique() if not out.empty else 0,
+            'carriers': out['winner'].nunique() if not out.empty else 0,
+            'total_impact': int(out['impact'].sum()) if not out.empty else 0,
+            'max_z': float(out['nat_z_score'].max()) if not out.empty else None,
+            'seconds': round(r['seconds'], 2),
+            'error': r['error'],
+        })
+    columns = ['ds', 'mover_ind', 'metric', 'outliers', 'dates', 'carriers',
+               'total_impact', 'max_z', 'seconds', 'error']
+    summary = pd.DataFrame(rows, columns=columns)
+    if summary.empty:
+        return summary
+    order = summary['metric'].map(METRICS.index)
+    return (summary.assign(_order=order)
+            .sort_values(['ds', '_order', 'mover_ind'])
+            .drop(columns='_order')
+            .reset_index(drop=True))
+
+
 def build_enriched_cube(
     ds: str,
     mover_ind: bool,
@@ -352,8 +556,9 @@ def build_enriched_cube(
     dma_z_threshold: float = 1.5,
     dma_pct_threshold: float = 30.0,
     rare_pair_impact_threshold: int = 15,
-    db_path: Optional[str] = None
-) -> pd.DataFrame:
+    db_path: Optional[str] = None,
+    as_arrow: bool = False
+):
     """Build enriched cube with all metrics needed for UI plan building.
     
     Returns pair-level data with national context for specified date range.
@@ -368,9 +573,11 @@ def build_enriched_cube(
         dma_pct_threshold: Percent change threshold for DMA-level outliers (default: 30.0)
         rare_pair_impact_threshold: Impact threshold for rare pairs (default: 15)
         db_path: Path to database
+        as_arrow: Return a pyarrow Table with dictionary-encoded strings
+            (see db.query_arrow) instead of a DataFrame
         
     Returns:
-        DataFrame with all pair-level and national-level metrics
+        DataFrame (or pyarrow Table) with all pair-level and national-level metrics
     """
     if db_path is None:
         db_path = db.get_default_db_path()
@@ -504,5 +711,7 @@ def build_enriched_cube(
         WHERE the_date BETWEEN '{start_date}' AND '{end_date}'
         ORDER BY the_date, winner, dma_name, loser
     """
+    if as_arrow:
+        return db.query_arrow(sql, db_path)
     return db.query(sql, db_path)
 
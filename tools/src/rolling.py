@@ -0,0 +1,286 @@
+"""
+Rolling z-score kernel shared by the outlier detectors.
+
+Every detector compares a value with the mean/stddev of earlier values of
+the same series (a winner, a pair-DMA, ... on the same day of week or day
+type) over one or more trailing windows; the tiered detectors then take the
+widest window with enough history. This module is the one definition of
+both steps:
+
+- rolling_stats(): NumPy kernel for in-memory frames. Rows are sorted once
+  into contiguous groups and every requested window is read off shared
+  prefix sums, so the cost is O(rows log rows) whatever the number of
+  groups or windows.
+- select_tier(): tiered window selection over rolling_stats() output.
+- rolling_stats_sql() / tier_sql(): the same frames and selection rendered
+  as DuckDB window expressions, for detectors that run inside the database
+  (cube scans, rolling views) where pulling rows into Python would cost
+  more than it saves.
+
+Frames follow SQL: a window of `p` preceding covers the p rows (frame='rows')
+or order values (frame='range') before the current row, plus the current
+row only with include_current=True. NULL/NaN values are skipped and `n`
+counts the non-null values in the frame, as AVG/STDDEV_SAMP/COUNT(x) do.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Tiered lookback windows (days), widest first
+TIERED_WINDOWS = (28, 14, 4)
+
+# Minimum periods for a tier to be usable
+WEEKDAY_MIN_PERIODS = 4
+WEEKEND_MIN_PERIODS = 2
+
+FRAMES = ('rows', 'range')
+
+Windows = Union[Dict[int, int], Iterable[int]]
+
+
+def _window_map(windows: Windows) -> Dict[int, int]:
+    """{label: preceding} from a mapping or a list of preceding counts"""
+    if isinstance(windows, dict):
+        return {int(k): int(v) for k, v in windows.items()}
+    return {int(w): int(w) for w in windows}
+
+
+def _order_values(order: pd.Series) -> np.ndarray:
+    """Order column as int64 (dates as day numbers)"""
+    if pd.api.types.is_datetime64_any_dtype(order):
+        return order.to_numpy().astype('datetime64[D]').astype(np.int64)
+    if order.dtype == object:
+        return pd.to_datetime(order).to_numpy().astype('datetime64[D]').astype(np.int64)
+    return order.to_numpy().astype(np.int64)
+
+
+def min_periods_for(day_of_week) -> np.ndarray:
+    """Per-row tier minimum: WEEKEND_MIN_PERIODS on Sat/Sun (DuckDB 0=Sunday..6=Saturday)"""
+    dow = np.asarray(day_of_week)
+    return np.where(np.isin(dow, (0, 6)), WEEKEND_MIN_PERIODS, WEEKDAY_MIN_PERIODS)
+
+
+def rolling_stats(
+    df: pd.DataFrame,
+    keys: Sequence[str],
+    order: str,
+    value: str,
+    windows: Windows = TIERED_WINDOWS,
+    include_current: bool = False,
+    frame: str = 'rows',
+    names: Sequence[str] = ('avg_{w}d', 'std_{w}d', 'n_{w}d')
+) -> pd.DataFrame:
+    """
+    Trailing mean, sample stddev and count per group for several windows.
+
+    Args:
+        df: Long-form series, any row order
+        keys: Group columns (e.g. ['winner', 'day_of_week'])
+        order: Ordering column within a group (dates or integers); with
+            frame='range' the window is measured in its units (days for dates)
+        value: Value column
+        windows: {label: preceding} or preceding counts (label = count)
+        include_current: Include the current row in its own window
+        frame: 'rows' or 'range'
+        names: Output column templates for mean, stddev and count ({w} is
+            the window label)
+
+    Returns:
+        DataFrame aligned to df.index with one mean/stddev/count column per
+        window. The mean is NaN without values, the stddev with fewer than 2;
+        a window of identical values has stddev exactly 0.
+    """
+    if frame not in FRAMES:
+        raise ValueError(f"Unknown frame: {frame!r} (expected one of {FRAMES})")
+    wins = _window_map(windows)
+    avg_name, std_name, n_name = names
+    n_rows = len(df)
+    columns = {}
+    if n_rows == 0:
+        for w in wins:
+            columns[avg_name.format(w=w)] = np.empty(0)
+            columns[std_name.format(w=w)] = np.empty(0)
+            columns[n_name.format(w=w)] = np.empty(0, dtype=np.int64)
+        return pd.DataFrame(columns, index=df.index)
+
+    codes = df.groupby(list(keys), sort=False, dropna=False).ngroup().to_numpy().astype(np.int64)
+    ords = _order_values(df[order])
+    # One int64 sort key (group, order): far cheaper than lexsort, and range
+    # frames search it directly. The span leaves room for every window's reach.
+    omin = ords.min()
+    span = int(ords.max() - omin) + 2 * max(wins.values(), default=0) + 2
+    key = codes * span + (ords - omin)
+    idx = np.argsort(key, kind='stable')
+    g, composite = codes[idx], key[idx]
+    x = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)[idx]
+
+    first = np.r_[True, g[1:] != g[:-1]]
+    starts = np.flatnonzero(first)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, n_rows]))
+    pos = np.arange(n_rows)
+
+    # Centre each group on its first non-null value and accumulate in extended
+    # precision: integer volumes stay exact, and small spreads late in a long
+    # float series (shares) don't cancel away
+    valid = ~np.isnan(x)
+    first_valid = pd.Series(np.where(valid, x, np.nan)).groupby(g).transform('first').to_numpy()
+    centre = np.nan_to_num(first_valid)
+    xc = np.where(valid, x - centre, 0.0).astype(np.longdouble)
+    p1 = np.r_[np.longdouble(0), np.cumsum(xc)]
+    p2 = np.r_[np.longdouble(0), np.cumsum(xc * xc)]
+    pn = np.r_[0, np.cumsum(valid)]
+    # Value changes between neighbours: none inside a frame means a constant frame
+    changed = ~first & ((x != np.r_[np.nan, x[:-1]]) | ~valid | ~np.r_[False, valid[:-1]])
+    pc = np.r_[0, np.cumsum(changed)]
+
+    for w, preceding in wins.items():
+        if frame == 'rows':
+            lo = np.maximum(group_start, pos - preceding)
+            hi = pos + 1 if include_current else pos
+        else:
+            lo = np.searchsorted(composite, composite - preceding, side='left')
+            hi = np.searchsorted(composite, composite if include_current else composite - 1, side='right')
+        hi = np.maximum(hi, lo)
+
+        n = pn[hi] - pn[lo]
+        s1 = p1[hi] - p1[lo]
+        s2 = p2[hi] - p2[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, centre + (s1 / n).astype(np.float64), np.nan)
+            var = np.where(n > 1, ((s2 - s1 * s1 / n) / (n - 1)).astype(np.float64), np.nan)
+        var = np.where(var < 0, 0.0, var)
+        # A frame of one repeated value: exact mean, zero spread
+        same = (n > 0) & (hi - lo == n) & (pc[hi] - pc[np.minimum(lo + 1, hi)] == 0)
+        mean = np.where(same, x[np.minimum(lo, n_rows - 1)], mean)
+        var = np.where(same & (n > 1), 0.0, var)
+
+        out_mean = np.empty(n_rows)
+        out_std = np.empty(n_rows)
+        out_n = np.empty(n_rows, dtype=np.int64)
+        out_mean[idx] = mean
+        out_std[idx] = np.sqrt(var)
+        out_n[idx] = n
+        columns[avg_name.format(w=w)] = out_mean
+        columns[std_name.format(w=w)] = out_std
+        columns[n_name.format(w=w)] = out_n
+    return pd.DataFrame(columns, index=df.index)
+
+
+def select_tier(
+    stats: pd.DataFrame,
+    min_periods,
+    windows: Sequence[int] = TIERED_WINDOWS,
+    names: Sequence[str] = ('avg_{w}d', 'std_{w}d', 'n_{w}d')
+) -> pd.DataFrame:
+    """
+    Pick the first window (in `windows` order) with at least min_periods values.
+
+    Args:
+        stats: rolling_stats() output
+        min_periods: Scalar or per-row minimum (see min_periods_for)
+        windows: Window labels, preferred first
+        names: Column templates used for stats
+
+    Returns:
+        DataFrame aligned to stats.index with mu, sigma, n_periods and
+        selected_window (all NaN where no window qualifies)
+    """
+    avg_name, std_name, n_name = names
+    minp = np.broadcast_to(np.asarray(min_periods), (len(stats),))
+    ok = [stats[n_name.format(w=w)].to_numpy() >= minp for w in windows]
+    pick = lambda tmpl: np.select(ok, [stats[tmpl.format(w=w)].to_numpy(dtype=np.float64) for w in windows], np.nan)
+    return pd.DataFrame({
+        'mu': pick(avg_name),
+        'sigma': pick(std_name),
+        'n_periods': pick(n_name),
+        'selected_window': np.select(ok, [float(w) for w in windows], np.nan),
+    }, index=stats.index)
+
+
+def window_sql(
+    agg: str,
+    expr: str,
+    partition_by: Sequence[str],
+    order_by: str,
+    preceding: int,
+    include_current: bool = False,
+    frame: str = 'rows'
+) -> str:
+    """One `AGG(expr) OVER (...)` with the rolling_stats() frame for `preceding`"""
+    if frame not in FRAMES:
+        raise ValueError(f"Unknown frame: {frame!r} (expected one of {FRAMES})")
+    if preceding == 0 and not include_current:
+        # Empty frame
+        return "0::BIGINT" if agg.upper() == 'COUNT' else "NULL::DOUBLE"
+    end = "CURRENT ROW" if include_current else "1 PRECEDING"
+    return f"""{agg}({expr}) OVER (
+                PARTITION BY {', '.join(partition_by)}
+                ORDER BY {order_by}
+                {frame.upper()} BETWEEN {preceding} PRECEDING AND {end}
+            )"""
+
+
+def rolling_stats_sql(
+    expr: str,
+    partition_by: Sequence[str],
+    order_by: str,
+    windows: Windows = TIERED_WINDOWS,
+    include_current: bool = False,
+    frame: str = 'rows',
+    names: Sequence[str] = ('avg_{w}d', 'std_{w}d', 'n_{w}d')
+) -> str:
+    """
+    Select-list items computing rolling_stats() inside DuckDB.
+
+    Same arguments as rolling_stats(), with SQL expressions for the value,
+    partition and order. For frame='range' the order expression must be
+    numeric in the units of `preceding`.
+
+    Returns:
+        Comma-separated `expr AS name` items, mean/stddev/count per window
+    """
+    items = []
+    for w, preceding in _window_map(windows).items():
+        for agg, tmpl in zip(('AVG', 'STDDEV_SAMP', 'COUNT'), names):
+            sql = window_sql(agg, expr, partition_by, order_by, preceding, include_current, frame)
+            items.append(f"{sql} AS {tmpl.format(w=w)}")
+    return ",\n            ".join(items)
+
+
+def min_periods_sql(day_of_week: str = "day_of_week") -> str:
+    """SQL twin of min_periods_for()"""
+    return (f"(CASE WHEN {day_of_week} IN (0, 6) THEN {WEEKEND_MIN_PERIODS} "
+            f"ELSE {WEEKDAY_MIN_PERIODS} END)")
+
+
+def tier_sql(
+    column: str,
+    min_periods: str,
+    windows: Sequence[int] = TIERED_WINDOWS,
+    count: str = 'n_{w}d'
+) -> str:
+    """
+    SQL twin of select_tier() for one output column.
+
+    Args:
+        column: Template of the per-window column to pick (e.g. 'avg_{w}d';
+            '{w}' alone yields the window label itself)
+        min_periods: SQL expression for the per-row minimum
+        windows: Window labels, preferred first
+        count: Template of the per-window count column
+
+    Returns:
+        CASE expression (NULL where no window qualifies)
+    """
+    whens = "\n".join(
+        f"                WHEN {count.format(w=w)} >= {min_periods} THEN {column.format(w=w)}"
+        for w in windows
+    )
+    return f"""CASE
+{whens}
+                ELSE NULL
+            END"""
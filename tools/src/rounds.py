@@ -0,0 +1,278 @@
+"""
+Suppression round store (the `suppressions` schema of the database).
+
+A round is a named, saved suppression plan. Rounds live in two tables:
+
+- suppressions.rounds: one row per round (round_id, round_name, ds,
+  row/unit totals, timestamps)
+- suppressions.plans: the plan rows, typed (the_date DATE, mover_ind
+  BOOLEAN, remove_units INTEGER, ...) and indexed by (round_id, the_date,
+  winner)
+
+save_round() creates, replaces or appends to a round; reads go through the
+pooled tools.db.query (and its result cache), so dashboards load plans by
+round id without re-parsing files, and SQL can join suppressions.plans to
+the cubes directly (see tools.src.apply.suppressed_cube_sql).
+"""
+from __future__ import annotations
+
+import glob
+import os
+from contextlib import contextmanager
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+from tools import db
+
+
+SCHEMA = 'suppressions'
+ROUNDS_TABLE = f'{SCHEMA}.rounds'
+PLANS_TABLE = f'{SCHEMA}.plans'
+
+# Stored plan columns and their types (anything else in a plan is dropped)
+PLAN_COLUMNS = {
+    'the_date': 'DATE NOT NULL',
+    'winner': 'VARCHAR NOT NULL',
+    'loser': 'VARCHAR',
+    'dma_name': 'VARCHAR',
+    'state': 'VARCHAR',
+    'mover_ind': 'BOOLEAN',
+    'remove_units': 'INTEGER NOT NULL',
+    'stage': 'VARCHAR',
+    'reason': 'VARCHAR',
+    'impact': 'INTEGER',
+    'pair_wins_current': 'DOUBLE',
+    'pair_mu_wins': 'DOUBLE',
+    'pair_sigma_wins': 'DOUBLE',
+    'pair_z': 'DOUBLE',
+    'pair_pct_change': 'DOUBLE',
+    'dma_wins': 'DOUBLE',
+    'pair_share': 'DOUBLE',
+    'pair_share_mu': 'DOUBLE',
+    'nat_total_wins': 'DOUBLE',
+    'nat_share_current': 'DOUBLE',
+    'nat_mu_share': 'DOUBLE',
+    'nat_z_score': 'DOUBLE',
+}
+
+ROUND_COLUMNS = ['round_id', 'round_name', 'ds', 'n_rows', 'remove_units', 'created_at', 'updated_at']
+
+class RoundExistsError(ValueError):
+    """save_round() was asked to create a round whose name is already taken"""
+
+
+_BOOLS = {'true': True, '1': True, '1.0': True, 'false': False, '0': False, '0.0': False}
+
+
+def ensure_schema(con) -> None:
+    """Create the suppressions schema, tables and index if missing"""
+    columns = ",\n            ".join(f"{name} {sql_type}" for name, sql_type in PLAN_COLUMNS.items())
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+    con.execute(f"CREATE SEQUENCE IF NOT EXISTS {SCHEMA}.round_id_seq START 1")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROUNDS_TABLE} (
+            round_id INTEGER PRIMARY KEY DEFAULT nextval('{SCHEMA}.round_id_seq'),
+            round_name VARCHAR NOT NULL UNIQUE,
+            ds VARCHAR,
+            n_rows BIGINT,
+            remove_units BIGINT,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PLANS_TABLE} (
+            round_id INTEGER NOT NULL,
+            {columns}
+        )
+    """)
+    con.execute(f"CREATE INDEX IF NOT EXISTS plans_round_idx ON {PLANS_TABLE} (round_id, the_date, winner)")
+
+
+@contextmanager
+def _writer(db_path: Optional[str]):
+    """
+    Read-write connection with the schema in place.
+
+    Goes through db.write_connection, which lets other threads' pooled
+    queries finish and holds new ones back until the write is done; the
+    write invalidates cached results of the database.
+    """
+    with db.write_connection(db_path) as con:
+        ensure_schema(con)
+        yield con
+
+
+def normalize_plan(plan: pd.DataFrame) -> pd.DataFrame:
+    """
+    Plan rows in the stored layout (PLAN_COLUMNS order and types).
+
+    Accepts the plans built by tools.src.suppress and hand-written CSVs:
+    'date' or 'the_date', pct_change or pair_pct_change, mover_ind as bools
+    or 'True'/'0'-style strings.
+    Rows without a date or winner are dropped.
+    """
+    out = plan.rename(columns={'date': 'the_date'}) if 'the_date' not in plan.columns else plan
+    if 'pair_pct_change' not in out.columns:
+        out = out.rename(columns={'pct_change': 'pair_pct_change'})
+    out = out.reindex(columns=list(PLAN_COLUMNS))
+    out['the_date'] = pd.to_datetime(out['the_date'], errors='coerce').dt.date
+    out = out.dropna(subset=['the_date', 'winner'])
+    out['mover_ind'] = out['mover_ind'].astype(str).str.strip().str.lower().map(_BOOLS).astype(object)
+    out['mover_ind'] = out['mover_ind'].where(out['mover_ind'].notna(), None)
+    out['remove_units'] = pd.to_numeric(out['remove_units'], errors='coerce').fillna(0).astype('int64')
+    for name, sql_type in PLAN_COLUMNS.items():
+        if sql_type.startswith(('DOUBLE', 'INTEGER')) and name != 'remove_units':
+            out[name] = pd.to_numeric(out[name], errors='coerce')
+    return out.reset_index(drop=True)
+
+
+def save_round(
+    plan: pd.DataFrame,
+    round_name: str,
+    ds: Optional[str] = None,
+    db_path: Optional[str] = None,
+    overwrite: bool = False,
+    append: bool = False
+) -> int:
+    """
+    Save a suppression plan as a round.
+
+    Args:
+        plan: Plan rows (see normalize_plan)
+        round_name: Unique round name
+        ds: Dataset the plan was built on (kept on the round; default: the
+            plan's ds column when it has one value)
+        db_path: Path to database
+        overwrite: Replace the rows of an existing round
+        append: Add the rows to an existing round (created if missing)
+
+    Returns:
+        round_id
+
+    Raises:
+        RoundExistsError: The round exists and neither overwrite nor append is set
+    """
+    rows = normalize_plan(plan)
+    if ds is None and 'ds' in plan.columns and plan['ds'].nunique() == 1:
+        ds = str(plan['ds'].iloc[0])
+    with _writer(db_path) as con:
+        con.execute("BEGIN TRANSACTION")
+        try:
+            existing = con.execute(
+                f"SELECT round_id FROM {ROUNDS_TABLE} WHERE round_name = ?", [round_name]
+            ).fetchone()
+            if existing is not None and not (overwrite or append):
+                raise RoundExistsError(f"Round {round_name!r} already exists (round_id={existing[0]})")
+            if existing is None:
+                round_id = con.execute(f"""
+                    INSERT INTO {ROUNDS_TABLE} (round_name, ds, created_at)
+                    VALUES (?, ?, now()::TIMESTAMP) RETURNING round_id
+                """, [round_name, ds]).fetchone()[0]
+            else:
+                round_id = existing[0]
+                if overwrite:
+                    con.execute(f"DELETE FROM {PLANS_TABLE} WHERE round_id = ?", [round_id])
+
+            con.register('round_rows', rows)
+            con.execute(f"INSERT INTO {PLANS_TABLE} BY NAME SELECT {int(round_id)} AS round_id, * FROM round_rows")
+            con.unregister('round_rows')
+            con.execute(f"""
+                UPDATE {ROUNDS_TABLE} SET
+                    ds = COALESCE(CAST($ds AS VARCHAR), ds),
+                    n_rows = t.n_rows,
+                    remove_units = t.remove_units,
+                    updated_at = now()::TIMESTAMP
+                FROM (
+                    SELECT COUNT(*) AS n_rows, COALESCE(SUM(remove_units), 0) AS remove_units
+                    FROM {PLANS_TABLE} WHERE round_id = $round_id
+                ) t
+                WHERE round_id = $round_id
+            """, {'ds': ds, 'round_id': round_id})
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+    return int(round_id)
+
+
+def delete_round(round_id: int, db_path: Optional[str] = None) -> None:
+    """Remove a round and its plan rows"""
+    with _writer(db_path) as con:
+        con.execute("BEGIN TRANSACTION")
+        try:
+            con.execute(f"DELETE FROM {PLANS_TABLE} WHERE round_id = ?", [round_id])
+            con.execute(f"DELETE FROM {ROUNDS_TABLE} WHERE round_id = ?", [round_id])
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+
+def list_rounds(db_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Saved rounds, newest first.
+
+    Returns:
+        DataFrame with ROUND_COLUMNS (empty if nothing was saved yet)
+    """
+    if not db.table_exists('rounds', db_path, schema=SCHEMA):
+        return pd.DataFrame(columns=ROUND_COLUMNS)
+    return db.query(
+        f"SELECT {', '.join(ROUND_COLUMNS)} FROM {ROUNDS_TABLE} ORDER BY round_id DESC", db_path
+    )
+
+
+def load_rounds(round_ids: Sequence[int], db_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Plan rows of one or more rounds.
+
+    Args:
+        round_ids: Round ids (see list_rounds)
+        db_path: Path to database
+
+    Returns:
+        DataFrame with round_id, date and the other PLAN_COLUMNS, in round
+        then insertion order (the column layout of tools.src.suppress plans)
+    """
+    columns = ['round_id', 'date'] + [c for c in PLAN_COLUMNS if c != 'the_date']
+    ids = [int(r) for r in round_ids]
+    if not ids or not db.table_exists('plans', db_path, schema=SCHEMA):
+        return pd.DataFrame(columns=columns)
+    plan = db.query(f"""
+        SELECT round_id, the_date AS date, * EXCLUDE (round_id, the_date)
+        FROM {PLANS_TABLE}
+        WHERE round_id IN ({', '.join(map(str, ids))})
+        ORDER BY round_id, rowid
+    """, db_path)
+    plan['date'] = plan['date'].dt.date
+    return plan[columns]
+
+
+def load_round(round_id: int, db_path: Optional[str] = None) -> pd.DataFrame:
+    """Plan rows of one round (load_rounds without the round_id column)"""
+    return load_rounds([round_id], db_path).drop(columns='round_id')
+
+
+def import_csv_rounds(
+    csv_dir: str,
+    db_path: Optional[str] = None,
+    overwrite: bool = False
+) -> List[int]:
+    """
+    Save every {round_name}.csv in csv_dir (e.g. suppressions/rounds) as a round.
+
+    Rounds that already exist are skipped unless overwrite is set.
+
+    Returns:
+        round_ids saved
+    """
+    existing = set(list_rounds(db_path)['round_name'])
+    saved = []
+    for path in sorted(glob.glob(os.path.join(csv_dir, '*.csv'))):
+        round_name = os.path.splitext(os.path.basename(path))[0]
+        if round_name in existing and not overwrite:
+            continue
+        saved.append(save_round(pd.read_csv(path), round_name, db_path=db_path, overwrite=overwrite))
+    return saved
@@ -55,6 +55,44 @@ def calculate_suppression_need(
     return int(np.ceil(max(0, need)))
 
 
+def _first_seen_lookup(
+    first_seen: str,
+    date_expr: str,
+    lookback_days: int,
+    db_path: Optional[str] = None
+) -> tuple[str, str]:
+    """
+    First-appearance lookup against a {ds}_{metric}_{mover}_first_seen table
+    (see scripts/build/build_cubes_in_db.py) for current pairs aliased `c`.
+    
+    The expression is TRUE/FALSE when the pair's first and most recent
+    appearance dates settle whether it was seen in
+    [date - lookback_days, date - 1], and NULL when they leave a gap that
+    may hold the answer (or there is no first_seen row) - those pairs are
+    checked against the cube.
+    
+    Returns:
+        (expression, LEFT JOIN clause); a NULL expression and no join when
+        the table is missing
+    """
+    if not db.table_exists(first_seen, db_path):
+        return "CAST(NULL AS BOOLEAN)", ""
+    lo = f"{date_expr} - INTERVAL '{lookback_days} days'"
+    hi = f"{date_expr} - INTERVAL '1 day'"
+    expr = f"""CASE
+            WHEN f.first_date IS NULL THEN NULL
+            WHEN f.first_date >= {date_expr} THEN TRUE
+            WHEN len(list_filter(list_concat(f.first_dates, f.recent_dates),
+                                 lambda x: x BETWEEN {lo} AND {hi})) > 0 THEN FALSE
+            WHEN f.n_dates = len(f.first_dates) OR list_min(f.recent_dates) < {date_expr} THEN TRUE
+        END"""
+    join = f"""LEFT JOIN {first_seen} f
+            ON c.winner = f.winner
+            AND c.loser = f.loser
+            AND c.dma_name = f.dma_name"""
+    return expr, join
+
+
 def detect_first_appearances(
     db_path: str,
     ds: str,
@@ -66,6 +104,10 @@ def detect_first_appearances(
     """
     Detect pair-DMA combinations that have never appeared before (or very recently).
     
+    Uses the cube's first_seen table when it exists: its first and most
+    recent appearance dates settle almost every pair, and only the rest
+    are checked against the cube's lookback window.
+    
     Args:
         db_path: Path to database
         ds: Dataset name
@@ -79,30 +121,44 @@ def detect_first_appearances(
     """
     table_suffix = "mover" if mover_ind else "non_mover"
     table_name = f"{ds}_win_{table_suffix}_cube"
+    winner_sql = winner.replace("'", "''")
+    lookup_expr, lookup_join = _first_seen_lookup(
+        f"{ds}_win_{table_suffix}_first_seen", f"DATE '{the_date}'", lookback_days, db_path
+    )
     
     sql = f"""
     WITH current_pairs AS (
         SELECT DISTINCT winner, loser, dma_name
         FROM {table_name}
         WHERE the_date = DATE '{the_date}'
-          AND winner = '{winner.replace("'", "''")}'
+          AND winner = '{winner_sql}'
+    ), lookup AS (
+        SELECT c.winner, c.loser, c.dma_name, {lookup_expr} AS first_appearance
+        FROM current_pairs c
+        {lookup_join}
     ), historical_pairs AS (
-        SELECT DISTINCT winner, loser, dma_name
-        FROM {table_name}
-        WHERE the_date BETWEEN DATE '{the_date}' - INTERVAL '{lookback_days} days'
-                          AND DATE '{the_date}' - INTERVAL '1 day'
-          AND winner = '{winner.replace("'", "''")}'
+        -- Only the pairs the first_seen lookup could not settle
+        SELECT DISTINCT h.winner, h.loser, h.dma_name
+        FROM {table_name} h
+        JOIN lookup l
+            ON h.winner = l.winner
+            AND h.loser = l.loser
+            AND h.dma_name = l.dma_name
+            AND l.first_appearance IS NULL
+        WHERE h.the_date BETWEEN DATE '{the_date}' - INTERVAL '{lookback_days} days'
+                            AND DATE '{the_date}' - INTERVAL '1 day'
+          AND h.winner = '{winner_sql}'
     )
     SELECT 
-        c.winner,
-        c.loser,
-        c.dma_name,
-        CASE WHEN h.winner IS NULL THEN TRUE ELSE FALSE END AS first_appearance
-    FROM current_pairs c
+        l.winner,
+        l.loser,
+        l.dma_name,
+        COALESCE(l.first_appearance, h.winner IS NULL) AS first_appearance
+    FROM lookup l
     LEFT JOIN historical_pairs h 
-        ON c.winner = h.winner 
-        AND c.loser = h.loser 
-        AND c.dma_name = h.dma_name
+        ON l.winner = h.winner 
+        AND l.loser = h.loser 
+        AND l.dma_name = h.dma_name
     """
     
     return db.query(sql, db_path)
@@ -201,6 +257,7 @@ def get_pair_dma_details(
         ON c.winner = h.winner 
         AND c.loser = h.loser 
         AND c.dma_name = h.dma_name
+    ORDER BY c.loser, c.dma_name, c.state
     """
     
     return db.query(sql, db_path)
@@ -421,6 +478,484 @@ def build_suppression_plan(
         return pd.DataFrame()
 
 
+def get_pair_dma_details_batch(
+    db_path: str,
+    ds: str,
+    mover_ind: bool,
+    keys: pd.DataFrame,
+    window: int = 14,
+    lookback_days: int = 90
+) -> pd.DataFrame:
+    """
+    Pair-DMA statistics and first-appearance flags for many winner/dates at once.
+
+    Set-based equivalent of calling get_pair_dma_details() and
+    detect_first_appearances() for every (the_date, winner) in keys: the keys
+    are registered as a relation and the cube is scanned once.
+
+    Args:
+        db_path: Path to database
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        keys: DataFrame with the_date and winner columns
+        window: Lookback window for statistics
+        lookback_days: Days to look back for first appearance detection
+
+    Returns:
+        DataFrame with the_date plus the get_pair_dma_details() columns and
+        first_appearance, ordered by the_date, winner, loser, dma_name, state
+    """
+    table_suffix = "mover" if mover_ind else "non_mover"
+    table_name = f"{ds}_win_{table_suffix}_cube"
+
+    outlier_keys = pd.DataFrame({
+        'the_date': pd.to_datetime(keys['the_date']).dt.normalize(),
+        'winner': keys['winner'].astype(str),
+    }).drop_duplicates()
+    lookup_expr, lookup_join = _first_seen_lookup(
+        f"{ds}_win_{table_suffix}_first_seen", "c.the_date", lookback_days, db_path
+    )
+
+    sql = f"""
+    WITH keys AS (
+        SELECT DISTINCT CAST(the_date AS DATE) AS the_date, winner
+        FROM outlier_keys
+    ), base AS (
+        SELECT
+            the_date,
+            winner,
+            loser,
+            dma_name,
+            state,
+            total_wins AS pair_wins_current,
+            CASE
+                WHEN strftime('%w', the_date) IN ('0', '6') THEN 'Weekend'
+                ELSE 'Weekday'
+            END AS day_type
+        FROM {table_name}
+        WHERE winner IN (SELECT winner FROM keys)
+          AND the_date <= (SELECT MAX(the_date) FROM keys)
+    ), current AS (
+        SELECT b.*
+        FROM base b
+        JOIN keys k ON b.the_date = k.the_date AND b.winner = k.winner
+    ), historical AS (
+        SELECT
+            c.the_date,
+            c.winner,
+            c.loser,
+            c.dma_name,
+            AVG(h.pair_wins_current) AS pair_mu_wins,
+            STDDEV_SAMP(h.pair_wins_current) AS pair_sigma_wins,
+            COUNT(*) AS pair_mu_window
+        FROM current c
+        LEFT JOIN base h
+            ON c.winner = h.winner
+            AND c.loser = h.loser
+            AND c.dma_name = h.dma_name
+            AND c.day_type = h.day_type
+            AND h.the_date < c.the_date
+        WHERE h.the_date >= c.the_date - INTERVAL '{window * 7} days'
+           OR h.the_date IS NULL
+        GROUP BY 1, 2, 3, 4
+    ), lookup AS (
+        SELECT DISTINCT c.the_date, c.winner, c.loser, c.dma_name, {lookup_expr} AS first_appearance
+        FROM current c
+        {lookup_join}
+    ), seen_pairs AS (
+        -- Only the pairs the first_seen lookup could not settle
+        SELECT DISTINCT l.the_date, l.winner, l.loser, l.dma_name
+        FROM lookup l
+        JOIN base h
+            ON l.winner = h.winner
+            AND l.loser = h.loser
+            AND l.dma_name = h.dma_name
+            AND h.the_date BETWEEN l.the_date - INTERVAL '{lookback_days} days'
+                               AND l.the_date - INTERVAL '1 day'
+        WHERE l.first_appearance IS NULL
+    )
+    SELECT
+        c.the_date,
+        c.winner,
+        c.loser,
+        c.dma_name,
+        c.state,
+        c.pair_wins_current,
+        COALESCE(h.pair_mu_wins, 0) AS pair_mu_wins,
+        COALESCE(h.pair_sigma_wins, 0) AS pair_sigma_wins,
+        COALESCE(h.pair_mu_window, 0) AS pair_mu_window,
+        CASE
+            WHEN h.pair_sigma_wins > 0 AND h.pair_mu_window > 1
+            THEN (c.pair_wins_current - h.pair_mu_wins) / h.pair_sigma_wins
+            ELSE 0
+        END AS pair_z,
+        CASE
+            WHEN h.pair_mu_wins > 0
+            THEN (c.pair_wins_current - h.pair_mu_wins) / h.pair_mu_wins
+            ELSE 0
+        END AS pct_change,
+        COALESCE(l.first_appearance, s.winner IS NULL) AS first_appearance
+    FROM current c
+    LEFT JOIN historical h
+        ON c.the_date = h.the_date
+        AND c.winner = h.winner
+        AND c.loser = h.loser
+        AND c.dma_name = h.dma_name
+    JOIN lookup l
+        ON c.the_date = l.the_date
+        AND c.winner = l.winner
+        AND c.loser = l.loser
+        AND c.dma_name = l.dma_name
+    LEFT JOIN seen_pairs s
+        ON c.the_date = s.the_date
+        AND c.winner = s.winner
+        AND c.loser = s.loser
+        AND c.dma_name = s.dma_name
+    ORDER BY c.the_date, c.winner, c.loser, c.dma_name, c.state
+    """
+
+    return db.query(sql, db_path, relations={'outlier_keys': outlier_keys})
+
+
+def _auto_reasons(auto: pd.DataFrame) -> pd.Series:
+    """Comma-separated stage-1 reasons, built column-wise"""
+    reason = pd.Series('', index=auto.index, dtype=object)
+    parts = [
+        (auto['pair_outlier'], 'z-score=' + auto['pair_z'].map('{:.2f}'.format)),
+        (auto['pct_outlier'], 'jump=' + (auto['pct_change'] * 100).map('{:.1f}'.format) + '%'),
+        (auto['rare_pair'], 'rare (baseline=' + auto['pair_mu_wins'].map('{:.1f}'.format) + ')'),
+        (auto['first_appearance'].astype(bool), pd.Series('first appearance', index=auto.index)),
+    ]
+    for flag, text in parts:
+        sep = np.where(reason.str.len() > 0, ', ', '')
+        reason = reason.where(~flag, reason + sep + text)
+    return reason
+
+
+def build_suppression_plans(
+    db_path: str,
+    ds: str,
+    mover_ind: bool,
+    targets: pd.DataFrame,
+    z_thresh: float = 2.0,
+    pct_thresh: float = 0.30,
+    rare_thresh: float = 5.0,
+    min_volume: float = 5.0,
+    window: int = 14,
+    lookback_days: int = 90
+) -> pd.DataFrame:
+    """
+    Build 2-stage suppression plans for many winner/date outliers at once.
+
+    Produces the same rows as concatenating build_suppression_plan() over
+    targets, but fetches every pair baseline in a single query and runs the
+    stage-1 budget cut and stage-2 equalized distribution per group with
+    vectorized pandas instead of one query and Python loop per outlier.
+
+    Args:
+        db_path: Path to database
+        ds: Dataset name
+        mover_ind: True for movers, False for non-movers
+        targets: DataFrame with the_date, winner and removal_target columns
+        z_thresh: Z-score threshold for auto-suppression
+        pct_thresh: Percentage change threshold (0.30 = 30%)
+        rare_thresh: Baseline threshold for "rare" pairs
+        min_volume: Minimum current volume to consider for removal
+        window: Lookback window for statistics
+        lookback_days: Days to look back for first appearance detection
+
+    Returns:
+        DataFrame with the build_suppression_plan() columns plus `target_idx`,
+        the positional index of the targets row each plan line belongs to.
+        Plans appear in targets order.
+    """
+    if targets.empty:
+        return pd.DataFrame()
+
+    targets = targets.reset_index(drop=True)
+    keyed = pd.DataFrame({
+        'target_idx': np.arange(len(targets)),
+        'the_date': pd.to_datetime(targets['the_date']).dt.normalize().astype('datetime64[ns]'),
+        'winner': targets['winner'].astype(str),
+        'removal_target': targets['removal_target'].astype('int64'),
+    })
+
+    details = get_pair_dma_details_batch(
+        db_path, ds, mover_ind, keyed[['the_date', 'winner']], window, lookback_days
+    )
+    if details.empty:
+        return pd.DataFrame()
+
+    details['the_date'] = details['the_date'].astype('datetime64[ns]')
+    pairs = keyed.merge(details, on=['the_date', 'winner'], how='inner', sort=False)
+    pairs = pairs.sort_values('target_idx', kind='stable').reset_index(drop=True)
+
+    # Filter to minimum volume
+    pairs = pairs[pairs['pair_wins_current'] >= min_volume].copy()
+    if pairs.empty:
+        return pd.DataFrame()
+
+    group = 'target_idx'
+    removal_target = keyed['removal_target']
+
+    # ========== Stage 1: Targeted Auto-Suppression ==========
+
+    pairs['pair_outlier'] = pairs['pair_z'] > z_thresh
+    pairs['pct_outlier'] = pairs['pct_change'] > pct_thresh
+    pairs['rare_pair'] = pairs['pair_mu_wins'] < rare_thresh
+
+    auto = pairs[
+        pairs['pair_outlier'] |
+        pairs['pct_outlier'] |
+        pairs['rare_pair'] |
+        pairs['first_appearance']
+    ].copy()
+
+    auto['rm_pair'] = np.where(
+        auto['pair_mu_wins'] < rare_thresh,
+        np.ceil(auto['pair_wins_current']),
+        np.ceil(np.maximum(0, auto['pair_wins_current'] - auto['pair_mu_wins']))
+    ).astype(int)
+
+    # Priority order within each outlier (stable, like the per-outlier sort)
+    auto = auto.sort_values(
+        [group, 'pair_z', 'pair_wins_current'], ascending=[True, False, False], kind='stable'
+    )
+
+    # Budget cut per outlier: cumulative removal up to its target
+    cum = auto.groupby(group)['rm_pair'].cumsum()
+    budget = auto['removal_target']
+    auto['rm1'] = np.where(
+        cum <= budget,
+        auto['rm_pair'],
+        np.maximum(0, budget - (cum - auto['rm_pair']))
+    ).astype(int)
+
+    auto = auto[auto['rm1'] > 0].copy()
+    auto['stage'] = 'auto'
+    auto['remove_units'] = auto['rm1']
+    auto['reason'] = _auto_reasons(auto)
+    auto['_stage_order'] = 0
+    auto['_pos'] = auto.groupby(group).cumcount()
+
+    taken = auto.groupby(group)['rm1'].sum().reindex(keyed[group], fill_value=0)
+    need_after = np.maximum(0, removal_target.to_numpy() - taken.to_numpy())
+
+    # ========== Stage 2: Equalized Distribution ==========
+
+    # Pairs not already in the auto stage (any state of the same loser/DMA)
+    taken_pairs = auto[[group, 'loser', 'dma_name']].drop_duplicates()
+    remaining = pairs.merge(
+        taken_pairs, on=[group, 'loser', 'dma_name'], how='left', indicator=True, sort=False
+    )
+    remaining = remaining[remaining['_merge'] == 'left_only'].drop(columns='_merge')
+    remaining['need_after'] = need_after[remaining[group].to_numpy()]
+    remaining = remaining[remaining['need_after'] > 0].copy()
+
+    if not remaining.empty:
+        m = remaining.groupby(group)[group].transform('size')
+        base_removal = remaining['need_after'] // m
+
+        remaining['rm_base'] = np.minimum(remaining['pair_wins_current'], base_removal).astype(int)
+        remaining['residual'] = (remaining['pair_wins_current'] - remaining['rm_base']).astype(int)
+        remaining['still_needed'] = (
+            remaining['need_after'] - remaining.groupby(group)['rm_base'].transform('sum')
+        )
+        remaining['_orig_pos'] = remaining.groupby(group).cumcount()
+
+        # Extra units go to the highest residual capacity first
+        remaining = remaining.sort_values(
+            [group, 'residual', 'pair_wins_current'], ascending=[True, False, False], kind='stable'
+        )
+        has_room = remaining['residual'] > 0
+        room_rank = has_room.astype(int).groupby(remaining[group]).cumsum()
+        topping_up = remaining['still_needed'] > 0
+        remaining['extra'] = (topping_up & has_room & (room_rank <= remaining['still_needed'])).astype(int)
+
+        # Per-outlier plans keep the residual order only when topping up
+        remaining['_pos'] = np.where(
+            topping_up, remaining.groupby(group).cumcount(), remaining['_orig_pos']
+        )
+        remaining['rm2'] = (remaining['rm_base'] + remaining['extra']).astype(int)
+
+        distributed = remaining[remaining['rm2'] > 0].copy()
+        distributed['stage'] = 'distributed'
+        distributed['remove_units'] = distributed['rm2']
+        distributed['reason'] = 'equalized distribution'
+        distributed['_stage_order'] = 1
+    else:
+        distributed = pd.DataFrame()
+
+    # ========== Combine Plans ==========
+
+    plan_columns = [
+        'winner', 'loser', 'dma_name', 'state',
+        'remove_units', 'stage', 'reason',
+        'pair_wins_current', 'pair_mu_wins', 'pair_sigma_wins',
+        'pair_z', 'pct_change', 'first_appearance'
+    ]
+    order = [group, '_stage_order', '_pos']
+
+    plan_parts = [part[plan_columns + order] for part in (auto, distributed) if not part.empty]
+    if not plan_parts:
+        return pd.DataFrame()
+
+    plan = pd.concat(plan_parts, ignore_index=True)
+    plan = plan.sort_values(order, kind='stable').reset_index(drop=True)
+    plan['date'] = targets['the_date'].to_numpy()[plan[group].to_numpy()]
+    plan['mover_ind'] = mover_ind
+    plan['ds'] = ds
+    return plan[plan_columns + ['date', 'mover_ind', 'ds', group]]
+
+
+ENRICHED_PLAN_COLUMNS = [
+    'date', 'winner', 'loser', 'dma_name', 'state', 'mover_ind',
+    'remove_units', 'stage',
+    'pair_wins_current', 'pair_mu_wins', 'pair_sigma_wins', 'pair_z', 'pair_pct_change',
+    'dma_wins', 'pair_share', 'pair_share_mu',
+    'nat_total_wins', 'nat_share_current', 'nat_mu_share', 'nat_z_score',
+    'impact'
+]
+
+INSUFFICIENT_COLUMNS = ['date', 'winner', 'need_remaining', 'auto_removed', 'min_wins_required', 'reason']
+
+
+def build_enriched_plan(
+    enriched: pd.DataFrame,
+    mover_ind: bool,
+    auto_min_wins: float = 2,
+    distributed_min_wins: float = 1
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    2-stage suppression plan for every (the_date, winner) of an enriched cube.
+    
+    The allocation behind main.py's "Build Plan" step, run for all outliers
+    at once with grouped cumsum/transform instead of a loop per group:
+    
+    - need: wins to remove to bring the winner's national share back to
+      nat_mu_share (groups with no need are skipped)
+    - Stage 1 (auto): pair outliers, 30% spikes, new pairs and rare pairs
+      with pair_z > 1.5 and |impact| > 15, at least auto_min_wins current
+      wins; their full excess is removed in pair_z/volume order up to need
+    - Stage 2 (distributed): the rest of the need spread over the other
+      pairs with at least distributed_min_wins wins, proportionally to
+      their current wins (rounded)
+    
+    Args:
+        enriched: build_enriched_cube() rows for the outlier dates/winners
+        mover_ind: True for movers, False for non-movers
+        auto_min_wins: Minimum current wins for a stage-1 pair
+        distributed_min_wins: Minimum current wins for a stage-2 pair
+    
+    Returns:
+        (plan, insufficient): plan rows (ENRICHED_PLAN_COLUMNS) grouped by
+        date/winner, auto rows first; and one INSUFFICIENT_COLUMNS row per
+        group whose remaining need found no pair to distribute over
+    """
+    plan_empty = pd.DataFrame(columns=ENRICHED_PLAN_COLUMNS)
+    report_empty = pd.DataFrame(columns=INSUFFICIENT_COLUMNS)
+    if enriched.empty:
+        return plan_empty, report_empty
+    
+    group = '_gid'
+    pairs = enriched.reset_index(drop=True)
+    pairs[group] = pairs.groupby(['the_date', 'winner'], sort=True).ngroup()
+    pairs = pairs[pairs[group] >= 0].sort_values(group, kind='stable').reset_index(drop=True)
+    
+    # National context and need per group (from its first row)
+    nat = pairs.drop_duplicates(group).set_index(group)
+    W = pd.to_numeric(nat['nat_total_wins'], errors='coerce').astype(float)
+    T = pd.to_numeric(nat['nat_market_wins'], errors='coerce').astype(float)
+    mu_share = pd.to_numeric(nat['nat_mu_share'], errors='coerce').astype(float)
+    need = np.ceil(np.maximum((W - mu_share * T) / np.maximum(1e-12, 1 - mu_share), 0))
+    need = need.fillna(0).astype('int64')
+    
+    pairs = pairs[need.reindex(pairs[group]).to_numpy() > 0].reset_index(drop=True)
+    if pairs.empty:
+        return plan_empty, report_empty
+    
+    # DMA-level aggregates for share calculations
+    pairs['dma_wins'] = pairs.groupby([group, 'dma_name'])['pair_wins_current'].transform('sum').fillna(0)
+    pairs['_dma_mu'] = pairs.groupby([group, 'dma_name'])['pair_mu_wins'].transform('sum').fillna(0)
+    pw = pd.to_numeric(pairs['pair_wins_current'], errors='coerce').fillna(0.0)
+    
+    # ===  STAGE 1: AUTO SUPPRESSION ===
+    # Rare pairs need both z-score AND impact > 15
+    is_rare_eligible = (pairs['rare_pair'] == True) & (pairs['pair_z'] > 1.5) & (pairs['impact'].abs() > 15)
+    is_auto = (
+        (pairs['pair_outlier_pos'] == True) |
+        (pairs['pct_outlier_pos'] == True) |
+        is_rare_eligible |
+        (pairs['new_pair'] == True)
+    ) & (pairs['pair_wins_current'] >= auto_min_wins)
+    
+    auto = pairs[is_auto].copy()
+    mu_eff = pd.to_numeric(auto['pair_mu_wins'], errors='coerce').fillna(0.0)
+    auto['rm_pair'] = np.ceil(np.maximum(0.0, pw[is_auto] - mu_eff)).astype(int)
+    
+    # Severity order (z-score, then current wins), budget cut up to need
+    auto = auto.sort_values([group, 'pair_z', 'pair_wins_current'], ascending=[True, False, False], kind='stable')
+    cum = auto.groupby(group)['rm_pair'].cumsum()
+    budget = need.reindex(auto[group]).to_numpy()
+    auto['rm_final'] = np.where(
+        cum <= budget,
+        auto['rm_pair'],
+        np.maximum(0, budget - (cum - auto['rm_pair']))
+    ).astype(int)
+    auto = auto[auto['rm_final'] > 0]
+    
+    # === STAGE 2: DISTRIBUTED SUPPRESSION ===
+    groups = need[need > 0].index
+    auto_removed = auto.groupby(group)['rm_final'].sum().reindex(groups, fill_value=0)
+    need_remaining = np.maximum(0, need[groups] - auto_removed)
+    
+    taken = pd.MultiIndex.from_frame(auto[[group, 'loser', 'dma_name']])
+    in_auto = pd.MultiIndex.from_frame(pairs[[group, 'loser', 'dma_name']]).isin(taken)
+    eligible = pairs[
+        (need_remaining.reindex(pairs[group]).to_numpy() > 0) &
+        ~in_auto &
+        (pairs['pair_wins_current'] >= distributed_min_wins)
+    ].copy()
+    
+    stuck = need_remaining[(need_remaining > 0) & ~need_remaining.index.isin(eligible[group])].index
+    insufficient = pd.DataFrame({
+        'date': pd.to_datetime(nat.loc[stuck, 'the_date']).dt.date.to_numpy(),
+        'winner': nat.loc[stuck, 'winner'].to_numpy(),
+        'need_remaining': need_remaining[stuck].to_numpy(),
+        'auto_removed': auto_removed[stuck].to_numpy(),
+        'min_wins_required': distributed_min_wins,
+        'reason': f'All remaining pairs have < {distributed_min_wins} wins',
+    }, columns=INSUFFICIENT_COLUMNS)
+    
+    # Distribute proportionally across eligible pairs
+    capacity = pw[eligible.index]
+    total_eligible = capacity.groupby(eligible[group]).transform('sum')
+    proportion = capacity / total_eligible
+    eligible['rm_final'] = (
+        proportion * need_remaining.reindex(eligible[group]).to_numpy()
+    ).round().fillna(0).astype(int)
+    distributed = eligible[(total_eligible > 0) & (eligible['rm_final'] > 0)]
+    
+    # === COLLECT PLAN ROWS ===
+    plan = pd.concat(
+        [auto.assign(stage='auto'), distributed.assign(stage='distributed')], ignore_index=True
+    )
+    if plan.empty:
+        return plan_empty, insufficient
+    plan['_stage_order'] = (plan['stage'] == 'distributed').astype(int)
+    plan = plan.sort_values([group, '_stage_order'], kind='stable').reset_index(drop=True)
+    
+    for col in ['nat_total_wins', 'nat_share_current', 'nat_mu_share', 'nat_z_score']:
+        plan[col] = nat[col].reindex(plan[group]).to_numpy()
+    plan['date'] = pd.to_datetime(plan['the_date']).dt.date
+    plan['mover_ind'] = mover_ind
+    plan['remove_units'] = plan['rm_final'].astype(int)
+    plan['impact'] = plan['remove_units']
+    plan['pair_share'] = (plan['pair_wins_current'] / plan['dma_wins']).where(plan['dma_wins'] > 0)
+    plan['pair_share_mu'] = (plan['pair_mu_wins'] / plan['_dma_mu']).where(plan['_dma_mu'] > 0)
+    return plan[ENRICHED_PLAN_COLUMNS], insufficient
+
+
 def build_full_suppression_plan(
     db_path: str,
     ds: str,
@@ -440,7 +975,8 @@ def build_full_suppression_plan(
     
     1. Detect national-level outliers (winner/date combos)
     2. For each outlier, calculate removal target
-    3. Build 2-stage distribution plan
+    3. Build 2-stage distribution plans for all outliers in one batch
+       (see build_suppression_plans)
     
     Args:
         db_path: Path to database
@@ -476,8 +1012,8 @@ def build_full_suppression_plan(
     
     print(f"[INFO] Detected {len(nat_outliers)} national outliers")
     
-    # Step 2: Build plans for each outlier
-    plans = []
+    # Step 2: Removal target per outlier
+    targets = []
     
     for idx, row in nat_outliers.iterrows():
         the_date = str(row['the_date'])
@@ -499,15 +1035,26 @@ def build_full_suppression_plan(
             continue
         
         print(f"[INFO] {the_date} {winner}: Target removal = {removal_target:,} wins")
-        
-        # Build suppression plan
-        plan = build_suppression_plan(
+        targets.append({
+            'the_date': the_date,
+            'winner': winner,
+            'removal_target': removal_target,
+            'nat_total_wins': current_wins,
+            'market_total_wins': market_total,
+            'nat_mu_share': historical_share,
+            'nat_share_current': current_wins / market_total if market_total > 0 else 0,
+        })
+    
+    # Step 3: Build every plan in one batched pass
+    plans = []
+    
+    if targets:
+        targets = pd.DataFrame(targets)
+        batch = build_suppression_plans(
             db_path=db_path,
             ds=ds,
             mover_ind=mover_ind,
-            the_date=the_date,
-            winner=winner,
-            removal_target=removal_target,
+            targets=targets,
             z_thresh=z_pair,
             pct_thresh=pct_thresh,
             rare_thresh=rare_thresh,
@@ -516,17 +1063,21 @@ def build_full_suppression_plan(
             lookback_days=lookback_days
         )
         
-        if not plan.empty:
+        for target_idx, plan in (batch.groupby('target_idx', sort=True) if not batch.empty else []):
+            target = targets.iloc[target_idx]
+            plan = plan.drop(columns='target_idx').reset_index(drop=True)
+            
             # Add national-level context
-            plan['nat_total_wins'] = current_wins
-            plan['market_total_wins'] = market_total
-            plan['nat_mu_share'] = historical_share
-            plan['nat_share_current'] = current_wins / market_total if market_total > 0 else 0
-            plan['removal_target'] = removal_target
+            plan['nat_total_wins'] = target['nat_total_wins']
+            plan['market_total_wins'] = target['market_total_wins']
+            plan['nat_mu_share'] = target['nat_mu_share']
+            plan['nat_share_current'] = target['nat_share_current']
+            plan['removal_target'] = target['removal_target']
             plan['removal_actual'] = plan['remove_units'].sum()
             
             plans.append(plan)
             
+            print(f"[INFO] {target['the_date']} {target['winner']}:")
             print(f"  → Stage 1 (auto): {plan[plan['stage']=='auto']['remove_units'].sum():,} wins from {len(plan[plan['stage']=='auto'])} pairs")
             print(f"  → Stage 2 (dist): {plan[plan['stage']=='distributed']['remove_units'].sum():,} wins from {len(plan[plan['stage']=='distributed'])} pairs")
     